@@ -1,5 +1,6 @@
 # alembic/env.py
 import os
+import re
 import sys
 from logging.config import fileConfig
 from pathlib import Path
@@ -47,6 +48,12 @@ except ImportError as e:
 target_metadata = SQLModel.metadata
 # --- FIN MODIFICACIÓN SQLMODEL ---
 
+# Partições de tarefas (migração f1b6d3a8c452): criadas pela base (tarefas_criar_particao), fora dos modelos
+_PARTICAO_TAREFAS = re.compile(r"tarefas_padrao|tarefas_obra_\d+")
+
+def incluir_nome(name, type_, parent_names) -> bool:
+    return not (type_ == "table" and _PARTICAO_TAREFAS.fullmatch(name))
+
 # ... (Resto do arquivo env.py como estava antes) ...
 
 def run_migrations_offline() -> None:
@@ -60,6 +67,7 @@ def run_migrations_offline() -> None:
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
         compare_type=True,
+        include_name=incluir_nome,
     )
 
     with context.begin_transaction():
@@ -79,6 +87,7 @@ def run_migrations_online() -> None:
             connection=connection,
             target_metadata=target_metadata,
             compare_type=True,
+            include_name=incluir_nome,
             # compare_server_default=True, # Opcional
         )
 
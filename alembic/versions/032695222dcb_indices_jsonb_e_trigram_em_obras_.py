@@ -0,0 +1,51 @@
+"""indices JSONB e trigram em obras, pessoas e tarefas
+
+Revision ID: 032695222dcb
+Revises: e517de8618b3
+Create Date: 2026-10-18 03:07:57.799266
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '032695222dcb'
+down_revision: Union[str, None] = 'e517de8618b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # pg_trgm fornece os operadores de similaridade usados na busca aproximada por nome
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # GIN jsonb_path_ops: atende os filtros por contenção (dados @> '{...}')
+    op.create_index('ix_obras_dados_gin', 'obras', ['dados'], postgresql_using='gin', postgresql_ops={'dados': 'jsonb_path_ops'})
+    op.create_index('ix_pessoas_dados_gin', 'pessoas', ['dados'], postgresql_using='gin', postgresql_ops={'dados': 'jsonb_path_ops'})
+    op.create_index('ix_tarefas_dados_gin', 'tarefas', ['dados'], postgresql_using='gin', postgresql_ops={'dados': 'jsonb_path_ops'})
+
+    # B-tree de expressão: busca exata por código de obra, CPF e e-mail
+    op.create_index('ix_obras_codigo', 'obras', [sa.text("(dados ->> 'codigo')")])
+    op.create_index('ix_pessoas_cpf', 'pessoas', [sa.text("(dados ->> 'cpf')")])
+    op.create_index('ix_pessoas_email', 'pessoas', [sa.text("lower(dados ->> 'email')")])
+
+    # GIN trigram: busca aproximada (ILIKE / %) por nome
+    op.create_index('ix_obras_nome_trgm', 'obras', [sa.text("(dados ->> 'nome') gin_trgm_ops")], postgresql_using='gin')
+    op.create_index('ix_pessoas_nome_trgm', 'pessoas', [sa.text("(dados ->> 'nome_completo') gin_trgm_ops")], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_pessoas_nome_trgm', table_name='pessoas')
+    op.drop_index('ix_obras_nome_trgm', table_name='obras')
+    op.drop_index('ix_pessoas_email', table_name='pessoas')
+    op.drop_index('ix_pessoas_cpf', table_name='pessoas')
+    op.drop_index('ix_obras_codigo', table_name='obras')
+    op.drop_index('ix_tarefas_dados_gin', table_name='tarefas')
+    op.drop_index('ix_pessoas_dados_gin', table_name='pessoas')
+    op.drop_index('ix_obras_dados_gin', table_name='obras')
+    # A extensão pg_trgm não é removida: outros objetos da base podem depender dela
@@ -0,0 +1,182 @@
+"""resumo de obras por status e responsavel
+
+Revision ID: 5b8e0c3f9a12
+Revises: a4d2f8c61e07
+Create Date: 2026-10-18 03:46:08.770890
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e0c3f9a12'
+down_revision: Union[str, None] = 'a4d2f8c61e07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('obras_resumo',
+    sa.Column('obra_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('status', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('tarefas', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('sem_preco', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('valor', sa.Numeric(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('obra_id', 'status')
+    )
+    op.create_table('obras_resumo_responsavel',
+    sa.Column('obra_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('pessoa_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('tarefas', sa.BigInteger(), server_default=sa.text('0'), nullable=False),
+    sa.Column('valor', sa.Numeric(), server_default=sa.text('0'), nullable=False),
+    sa.PrimaryKeyConstraint('obra_id', 'pessoa_id')
+    )
+
+    # Obra de uma tarefa: a primeira tag de tarefas.hierarquia ('obra:N', migração 7c1e5a9d2b40)
+    op.execute("""
+        CREATE FUNCTION tarefa_obra_id(hierarquia text[]) RETURNS integer
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT CASE WHEN hierarquia[1] LIKE 'obra:%' THEN substr(hierarquia[1], 6)::integer END
+        $$
+    """)
+    # Soma (sinal = 1) ou subtrai (sinal = -1) um conjunto de tarefas dos resumos.
+    # As linhas são atualizadas em ordem de chave para que escritas concorrentes
+    # em várias obras travem os resumos sempre na mesma ordem (sem deadlock)
+    op.execute("""
+        CREATE FUNCTION obras_resumo_aplicar(linhas tarefas[], sinal integer) RETURNS void
+        LANGUAGE sql AS $$
+            WITH t AS (
+                SELECT tarefa_obra_id(l.hierarquia) AS obra_id,
+                       coalesce(l.dados ->> 'status', '') AS status,
+                       CASE WHEN jsonb_typeof(l.dados -> 'responsaveis') = 'array' THEN l.dados -> 'responsaveis' ELSE '[]' END AS responsaveis,
+                       p.preco
+                  FROM unnest(linhas) l
+                  LEFT JOIN precos_tarefa_local p ON p.id = (l.dados ->> 'preco_tarefa_local_id')::integer
+                 WHERE tarefa_obra_id(l.hierarquia) IS NOT NULL
+            ), por_status AS (
+                INSERT INTO obras_resumo AS r (obra_id, status, tarefas, sem_preco, valor)
+                SELECT obra_id, status, sinal * count(*), sinal * count(*) FILTER (WHERE preco IS NULL), sinal * coalesce(sum(preco), 0)
+                  FROM t GROUP BY obra_id, status ORDER BY obra_id, status
+                ON CONFLICT (obra_id, status) DO UPDATE
+                   SET tarefas = r.tarefas + EXCLUDED.tarefas,
+                       sem_preco = r.sem_preco + EXCLUDED.sem_preco,
+                       valor = r.valor + EXCLUDED.valor
+            )
+            INSERT INTO obras_resumo_responsavel AS r (obra_id, pessoa_id, tarefas, valor)
+            SELECT t.obra_id, (e ->> 'pessoa_id')::integer, sinal * count(*),
+                   sinal * coalesce(sum(t.preco * coalesce((e ->> 'percentual')::numeric, 100) / 100), 0)
+              FROM t, jsonb_array_elements(t.responsaveis) e
+             GROUP BY 1, 2 ORDER BY 1, 2
+            ON CONFLICT (obra_id, pessoa_id) DO UPDATE
+               SET tarefas = r.tarefas + EXCLUDED.tarefas,
+                   valor = r.valor + EXCLUDED.valor;
+
+            -- Obras/responsáveis que ficaram sem tarefas
+            DELETE FROM obras_resumo
+             WHERE tarefas = 0 AND obra_id IN (SELECT tarefa_obra_id(l.hierarquia) FROM unnest(linhas) l);
+            DELETE FROM obras_resumo_responsavel
+             WHERE tarefas = 0 AND obra_id IN (SELECT tarefa_obra_id(l.hierarquia) FROM unnest(linhas) l);
+        $$
+    """)
+    # Refaz do zero os resumos das obras informadas (carga inicial e mudança de preços)
+    op.execute("""
+        CREATE FUNCTION obras_resumo_recalcular(obras integer[]) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            obra integer;
+        BEGIN
+            DELETE FROM obras_resumo WHERE obra_id = ANY (obras);
+            DELETE FROM obras_resumo_responsavel WHERE obra_id = ANY (obras);
+            FOREACH obra IN ARRAY obras LOOP
+                PERFORM obras_resumo_aplicar(
+                    (SELECT array_agg(t) FROM tarefas t WHERE t.hierarquia @> ARRAY['obra:' || obra]), 1);
+            END LOOP;
+        END
+        $$
+    """)
+
+    # Triggers por comando: um lote de tarefas atualiza cada linha de resumo uma vez.
+    # Um UPDATE (inclusive o de hierarquia, quando um local muda de obra) tira a
+    # versão antiga e soma a nova
+    op.execute("""
+        CREATE FUNCTION tarefas_resumo() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                PERFORM obras_resumo_aplicar((SELECT array_agg(a::tarefas) FROM antigos a), -1);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                PERFORM obras_resumo_aplicar((SELECT array_agg(n::tarefas) FROM novos n), 1);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER tarefas_resumo_inseridas AFTER INSERT ON tarefas
+        REFERENCING NEW TABLE AS novos
+        FOR EACH STATEMENT EXECUTE FUNCTION tarefas_resumo()
+    """)
+    op.execute("""
+        CREATE TRIGGER tarefas_resumo_alteradas AFTER UPDATE ON tarefas
+        REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+        FOR EACH STATEMENT EXECUTE FUNCTION tarefas_resumo()
+    """)
+    op.execute("""
+        CREATE TRIGGER tarefas_resumo_removidas AFTER DELETE ON tarefas
+        REFERENCING OLD TABLE AS antigos
+        FOR EACH STATEMENT EXECUTE FUNCTION tarefas_resumo()
+    """)
+
+    # Preço alterado ou removido: recalcula as obras com tarefas que apontam para ele
+    op.execute("""
+        CREATE FUNCTION precos_resumo() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            PERFORM obras_resumo_recalcular(coalesce((
+                SELECT array_agg(DISTINCT tarefa_obra_id(t.hierarquia))
+                  FROM antigos a
+                  JOIN tarefas t ON t.dados @> jsonb_build_object('preco_tarefa_local_id', a.id)
+                 WHERE tarefa_obra_id(t.hierarquia) IS NOT NULL
+            ), '{}'));
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER precos_resumo_alterados AFTER UPDATE ON precos_tarefa_local
+        REFERENCING OLD TABLE AS antigos
+        FOR EACH STATEMENT EXECUTE FUNCTION precos_resumo()
+    """)
+    op.execute("""
+        CREATE TRIGGER precos_resumo_removidos AFTER DELETE ON precos_tarefa_local
+        REFERENCING OLD TABLE AS antigos
+        FOR EACH STATEMENT EXECUTE FUNCTION precos_resumo()
+    """)
+
+    # Carga inicial com as tarefas existentes
+    op.execute("""
+        SELECT obras_resumo_recalcular(coalesce(array_agg(DISTINCT tarefa_obra_id(hierarquia)), '{}'))
+          FROM tarefas WHERE tarefa_obra_id(hierarquia) IS NOT NULL
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER precos_resumo_removidos ON precos_tarefa_local")
+    op.execute("DROP TRIGGER precos_resumo_alterados ON precos_tarefa_local")
+    op.execute("DROP FUNCTION precos_resumo()")
+    op.execute("DROP TRIGGER tarefas_resumo_removidas ON tarefas")
+    op.execute("DROP TRIGGER tarefas_resumo_alteradas ON tarefas")
+    op.execute("DROP TRIGGER tarefas_resumo_inseridas ON tarefas")
+    op.execute("DROP FUNCTION tarefas_resumo()")
+    op.execute("DROP FUNCTION obras_resumo_recalcular(integer[])")
+    op.execute("DROP FUNCTION obras_resumo_aplicar(tarefas[], integer)")
+    op.execute("DROP FUNCTION tarefa_obra_id(text[])")
+    op.drop_table('obras_resumo_responsavel')
+    op.drop_table('obras_resumo')
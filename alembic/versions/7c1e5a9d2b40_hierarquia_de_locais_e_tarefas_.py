@@ -0,0 +1,127 @@
+"""hierarquia de locais e tarefas.hierarquia
+
+Revision ID: 7c1e5a9d2b40
+Revises: 032695222dcb
+Create Date: 2026-10-18 03:30:27.116854
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a9d2b40'
+down_revision: Union[str, None] = '032695222dcb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Um local por linha com todos os níveis acima dele; 'ancestrais' é o caminho
+    # materializado (ex: {obra:2,modulo:5,bloco:70,local:901}) calculado pelo Postgres
+    op.create_table('locais_hierarquia',
+    sa.Column('local_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('tipo_local', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('nome', sqlmodel.sql.sqltypes.AutoString(), nullable=True),
+    sa.Column('obra_id', sa.Integer(), nullable=False),
+    sa.Column('modulo_id', sa.Integer(), nullable=True),
+    sa.Column('bloco_id', sa.Integer(), nullable=True),
+    sa.Column('pavimento_id', sa.Integer(), nullable=True),
+    sa.Column('apartamento_id', sa.Integer(), nullable=True),
+    sa.Column('ancestrais', postgresql.ARRAY(sa.Text()), sa.Computed(
+        "array_remove(ARRAY["
+        "'obra:' || obra_id::text, 'modulo:' || modulo_id::text, 'bloco:' || bloco_id::text, "
+        "'pavimento:' || pavimento_id::text, 'apartamento:' || apartamento_id::text, 'local:' || local_id::text"
+        "], NULL)", persisted=True), nullable=True),
+    sa.PrimaryKeyConstraint('local_id')
+    )
+
+    # Cópia dos ancestrais do local de cada tarefa: "todas as tarefas do bloco 70"
+    # vira hierarquia @> '{bloco:70}', uma única busca no índice GIN
+    op.add_column('tarefas', sa.Column('hierarquia', postgresql.ARRAY(sa.Text()), server_default=sa.text("'{}'"), nullable=False))
+
+    # Ancestrais de uma tarefa a partir de dados->>'local_id'; sem local registrado,
+    # ao menos a obra de dados->>'obra_id_ref'
+    op.execute("""
+        CREATE FUNCTION tarefas_hierarquia_de(dados jsonb) RETURNS text[]
+        LANGUAGE sql STABLE AS $$
+            SELECT coalesce(
+                (SELECT h.ancestrais FROM locais_hierarquia h WHERE h.local_id = (dados ->> 'local_id')::bigint),
+                CASE WHEN dados ? 'obra_id_ref' THEN ARRAY['obra:' || (dados ->> 'obra_id_ref')] ELSE '{}'::text[] END
+            )
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION tarefas_hierarquia() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.hierarquia := tarefas_hierarquia_de(NEW.dados);
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER tarefas_hierarquia BEFORE INSERT OR UPDATE OF dados ON tarefas
+        FOR EACH ROW EXECUTE FUNCTION tarefas_hierarquia()
+    """)
+    # Local criado, movido ou removido: recalcula as tarefas que apontam para ele.
+    # Triggers por comando, com as tabelas de transição: um lote de locais gera um
+    # único UPDATE, que busca as tarefas por dados @> '{"local_id": N}' em ix_tarefas_dados_gin
+    op.execute("""
+        CREATE FUNCTION locais_hierarquia_propagar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE tarefas t SET hierarquia = tarefas_hierarquia_de(t.dados)
+                  FROM antigos a
+                 WHERE t.dados @> jsonb_build_object('local_id', a.local_id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                UPDATE tarefas t SET hierarquia = n.ancestrais
+                  FROM novos n
+                 WHERE t.dados @> jsonb_build_object('local_id', n.local_id)
+                   AND t.hierarquia IS DISTINCT FROM n.ancestrais;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    # Tabelas de transição exigem um trigger por evento
+    op.execute("""
+        CREATE TRIGGER locais_hierarquia_inseridos AFTER INSERT ON locais_hierarquia
+        REFERENCING NEW TABLE AS novos
+        FOR EACH STATEMENT EXECUTE FUNCTION locais_hierarquia_propagar()
+    """)
+    op.execute("""
+        CREATE TRIGGER locais_hierarquia_alterados AFTER UPDATE ON locais_hierarquia
+        REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+        FOR EACH STATEMENT EXECUTE FUNCTION locais_hierarquia_propagar()
+    """)
+    op.execute("""
+        CREATE TRIGGER locais_hierarquia_removidos AFTER DELETE ON locais_hierarquia
+        REFERENCING OLD TABLE AS antigos
+        FOR EACH STATEMENT EXECUTE FUNCTION locais_hierarquia_propagar()
+    """)
+
+    # Tarefas já existentes (sem locais registrados ainda, só a obra)
+    op.execute("UPDATE tarefas SET hierarquia = tarefas_hierarquia_de(dados) WHERE dados ? 'obra_id_ref'")
+    op.create_index('ix_tarefas_hierarquia', 'tarefas', ['hierarquia'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tarefas_hierarquia', table_name='tarefas')
+    op.execute("DROP TRIGGER locais_hierarquia_removidos ON locais_hierarquia")
+    op.execute("DROP TRIGGER locais_hierarquia_alterados ON locais_hierarquia")
+    op.execute("DROP TRIGGER locais_hierarquia_inseridos ON locais_hierarquia")
+    op.execute("DROP FUNCTION locais_hierarquia_propagar()")
+    op.execute("DROP TRIGGER tarefas_hierarquia ON tarefas")
+    op.execute("DROP FUNCTION tarefas_hierarquia()")
+    op.execute("DROP FUNCTION tarefas_hierarquia_de(jsonb)")
+    op.drop_column('tarefas', 'hierarquia')
+    op.drop_table('locais_hierarquia')
@@ -0,0 +1,126 @@
+"""constraint trigger de responsaveis das tarefas
+
+Revision ID: 9f3a6d1c7e25
+Revises: 5b8e0c3f9a12
+Create Date: 2026-10-18 03:48:43.439562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3a6d1c7e25'
+down_revision: Union[str, None] = '5b8e0c3f9a12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# obras_resumo_aplicar (5b8e0c3f9a12) com o filtro das obras tocadas no DELETE dos zerados
+# como parâmetro: o IN (SELECT ... FROM unnest(linhas)) virava um semi join em laço aninhado
+# (linhas zeradas x tarefas do lote), quadrático num UPDATE de milhares de tarefas
+_OBRAS_RESUMO_APLICAR = """
+        CREATE OR REPLACE FUNCTION obras_resumo_aplicar(linhas tarefas[], sinal integer) RETURNS void
+        LANGUAGE sql AS $$
+            WITH t AS (
+                SELECT tarefa_obra_id(l.hierarquia) AS obra_id,
+                       coalesce(l.dados ->> 'status', '') AS status,
+                       CASE WHEN jsonb_typeof(l.dados -> 'responsaveis') = 'array' THEN l.dados -> 'responsaveis' ELSE '[]' END AS responsaveis,
+                       p.preco
+                  FROM unnest(linhas) l
+                  LEFT JOIN precos_tarefa_local p ON p.id = (l.dados ->> 'preco_tarefa_local_id')::integer
+                 WHERE tarefa_obra_id(l.hierarquia) IS NOT NULL
+            ), por_status AS (
+                INSERT INTO obras_resumo AS r (obra_id, status, tarefas, sem_preco, valor)
+                SELECT obra_id, status, sinal * count(*), sinal * count(*) FILTER (WHERE preco IS NULL), sinal * coalesce(sum(preco), 0)
+                  FROM t GROUP BY obra_id, status ORDER BY obra_id, status
+                ON CONFLICT (obra_id, status) DO UPDATE
+                   SET tarefas = r.tarefas + EXCLUDED.tarefas,
+                       sem_preco = r.sem_preco + EXCLUDED.sem_preco,
+                       valor = r.valor + EXCLUDED.valor
+            )
+            INSERT INTO obras_resumo_responsavel AS r (obra_id, pessoa_id, tarefas, valor)
+            SELECT t.obra_id, (e ->> 'pessoa_id')::integer, sinal * count(*),
+                   sinal * coalesce(sum(t.preco * coalesce((e ->> 'percentual')::numeric, 100) / 100), 0)
+              FROM t, jsonb_array_elements(t.responsaveis) e
+             GROUP BY 1, 2 ORDER BY 1, 2
+            ON CONFLICT (obra_id, pessoa_id) DO UPDATE
+               SET tarefas = r.tarefas + EXCLUDED.tarefas,
+                   valor = r.valor + EXCLUDED.valor;
+
+            -- Obras/responsáveis que ficaram sem tarefas
+            DELETE FROM obras_resumo
+             WHERE tarefas = 0 AND {obras_tocadas};
+            DELETE FROM obras_resumo_responsavel
+             WHERE tarefas = 0 AND {obras_tocadas};
+        $$
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Mesma regra de checar_soma_100_tarefa do esquema antigo, agora sobre dados->'responsaveis':
+    # percentuais somando 100 (tolerância 0.01), um único principal e sem pessoa repetida.
+    # Lê a versão atual da linha (e não NEW): adiado até o commit, o trigger pode disparar
+    # depois de outras alterações da mesma tarefa na transação
+    op.execute("""
+        CREATE FUNCTION tarefas_checar_responsaveis() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v_responsaveis jsonb;
+            v_soma numeric;
+            v_principais integer;
+            v_pessoas integer;
+            v_total integer;
+        BEGIN
+            SELECT dados -> 'responsaveis' INTO v_responsaveis FROM tarefas WHERE id = NEW.id;
+            IF jsonb_typeof(v_responsaveis) IS DISTINCT FROM 'array' OR jsonb_array_length(v_responsaveis) = 0 THEN
+                RETURN NULL;
+            END IF;
+            SELECT sum(coalesce((r ->> 'percentual')::numeric, 100)),
+                   count(*) FILTER (WHERE coalesce((r ->> 'eh_principal')::boolean, false)),
+                   count(DISTINCT r ->> 'pessoa_id'),
+                   count(*)
+              INTO v_soma, v_principais, v_pessoas, v_total
+              FROM jsonb_array_elements(v_responsaveis) r;
+            IF abs(v_soma - 100.00) > 0.01 THEN
+                RAISE EXCEPTION USING
+                    MESSAGE = format('Erro de Validação: A soma dos percentuais de responsabilidade para a tarefa ID %s deve ser exatamente 100.00. Soma atual: %s%%',
+                                     NEW.id, round(v_soma, 2)),
+                    ERRCODE = 'P0001',
+                    HINT = 'Ajuste os percentuais em dados->responsaveis para que somem 100 para esta tarefa.';
+            END IF;
+            IF v_principais <> 1 THEN
+                RAISE EXCEPTION USING
+                    MESSAGE = format('Erro de Validação: A tarefa ID %s deve ter exatamente um responsável principal (tem %s).', NEW.id, v_principais),
+                    ERRCODE = 'P0001';
+            END IF;
+            IF v_pessoas <> v_total THEN
+                RAISE EXCEPTION USING
+                    MESSAGE = format('Erro de Validação: A tarefa ID %s tem a mesma pessoa como responsável mais de uma vez.', NEW.id),
+                    ERRCODE = 'P0001';
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    # Uma verificação por tarefa escrita, no commit, olhando só o JSON daquela tarefa.
+    # As tarefas já existentes não são revalidadas (só as que forem escritas daqui em diante)
+    op.execute("""
+        CREATE CONSTRAINT TRIGGER tarefas_responsaveis_validos AFTER INSERT OR UPDATE OF dados ON tarefas
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION tarefas_checar_responsaveis()
+    """)
+    # Lotes grandes de atribuição disparam o resumo com milhares de linhas de uma vez
+    op.execute(_OBRAS_RESUMO_APLICAR.format(
+        obras_tocadas="obra_id = ANY (ARRAY(SELECT DISTINCT tarefa_obra_id(l.hierarquia) FROM unnest(linhas) l))"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(_OBRAS_RESUMO_APLICAR.format(
+        obras_tocadas="obra_id IN (SELECT tarefa_obra_id(l.hierarquia) FROM unnest(linhas) l)"))
+    op.execute("DROP TRIGGER tarefas_responsaveis_validos ON tarefas")
+    op.execute("DROP FUNCTION tarefas_checar_responsaveis()")
@@ -0,0 +1,45 @@
+"""precos_tarefa_local
+
+Revision ID: a4d2f8c61e07
+Revises: 7c1e5a9d2b40
+Create Date: 2026-10-18 03:42:53.868051
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4d2f8c61e07'
+down_revision: Union[str, None] = '7c1e5a9d2b40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Preços por (tipo de tarefa, local) com janela de validade, como no esquema antigo
+    op.create_table('precos_tarefa_local',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tipos_tarefa_id', sa.Integer(), nullable=False),
+    sa.Column('local_id', sa.Integer(), nullable=False),
+    sa.Column('preco', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('unidade_medida', sqlmodel.sql.sqltypes.AutoString(length=50), nullable=True),
+    sa.Column('validade_inicio', sa.Date(), server_default=sa.text('CURRENT_DATE'), nullable=True),
+    sa.Column('validade_fim', sa.Date(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.CheckConstraint('preco >= 0', name='precos_tarefa_local_preco_check'),
+    sa.CheckConstraint('validade_fim >= validade_inicio', name='precos_tarefa_local_validade_check'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # Carga das janelas de um lote de pares (tipo, local) numa única consulta
+    op.create_index('ix_precos_tarefa_local_tipo_local', 'precos_tarefa_local', ['tipos_tarefa_id', 'local_id', 'validade_inicio'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_precos_tarefa_local_tipo_local', table_name='precos_tarefa_local')
+    op.drop_table('precos_tarefa_local')
@@ -0,0 +1,74 @@
+"""notify de obras_resumo
+
+Revision ID: b8d4e2f6a391
+Revises: f1b6d3a8c452
+Create Date: 2026-10-18 09:12:37.502914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b8d4e2f6a391'
+down_revision: Union[str, None] = 'f1b6d3a8c452'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ('obras_resumo', 'obras_resumo_responsavel')
+# (sufixo do trigger, evento, tabelas de transição), como em e3c9a5f17b84
+EVENTOS = [
+    ('inseridas', 'INSERT', 'REFERENCING NEW TABLE AS novas'),
+    ('alteradas', 'UPDATE', 'REFERENCING OLD TABLE AS antigas NEW TABLE AS novas'),
+    ('removidas', 'DELETE', 'REFERENCING OLD TABLE AS antigas'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # obras://id/{id}/resumo também muda sem tocar em tarefas: os triggers precos_resumo_*
+    # (5b8e0c3f9a12) recalculam os totais quando um preço muda ou é removido. Um NOTIFY
+    # "obras_resumo:1,2" em mcp_alteracoes por comando que altera as tabelas do resumo
+    # (app/server/assinaturas.py), com '*' se o payload passar do limite do NOTIFY
+    op.execute("""
+        CREATE FUNCTION resumo_alteracoes_notificar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            obras integer[] := '{}';
+            payload text;
+        BEGIN
+            IF TG_OP <> 'DELETE' THEN
+                obras := obras || ARRAY(SELECT n.obra_id FROM novas n);
+            END IF;
+            IF TG_OP <> 'INSERT' THEN
+                obras := obras || ARRAY(SELECT a.obra_id FROM antigas a);
+            END IF;
+            IF cardinality(obras) = 0 THEN
+                RETURN NULL;
+            END IF;
+            payload := 'obras_resumo:' || (SELECT string_agg(DISTINCT o::text, ',') FROM unnest(obras) o);
+            IF octet_length(payload) > 7900 THEN
+                payload := 'obras_resumo:*';
+            END IF;
+            PERFORM pg_notify('mcp_alteracoes', payload);
+            RETURN NULL;
+        END
+        $$
+    """)
+    for tabela in TABELAS:
+        for sufixo, evento, transicao in EVENTOS:
+            op.execute(f"""
+                CREATE TRIGGER {tabela}_alteracoes_{sufixo} AFTER {evento} ON {tabela}
+                {transicao}
+                FOR EACH STATEMENT EXECUTE FUNCTION resumo_alteracoes_notificar()
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabela in reversed(TABELAS):
+        for sufixo, _, _ in reversed(EVENTOS):
+            op.execute(f"DROP TRIGGER {tabela}_alteracoes_{sufixo} ON {tabela}")
+    op.execute("DROP FUNCTION resumo_alteracoes_notificar()")
@@ -0,0 +1,41 @@
+"""checkpoint da importação do esquema antigo
+
+Revision ID: c2e7a4b91d58
+Revises: 9f3a6d1c7e25
+Create Date: 2026-10-18 05:12:40.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e7a4b91d58'
+down_revision: Union[str, None] = '9f3a6d1c7e25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Um trecho (anterior_id, ultimo_id] de cada etapa de app/db/importacao_legado.py,
+    # gravado na mesma transação do COPY das suas linhas: retomar a importação é
+    # pular os trechos que já estão aqui
+    op.create_table('importacao_legado_lotes',
+    sa.Column('etapa', sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+    sa.Column('anterior_id', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('ultimo_id', sa.BigInteger(), nullable=False),
+    sa.Column('linhas', sa.Integer(), nullable=False),
+    sa.Column('rejeitadas', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'[]'"), nullable=False),
+    sa.Column('gravado_em', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('etapa', 'anterior_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('importacao_legado_lotes')
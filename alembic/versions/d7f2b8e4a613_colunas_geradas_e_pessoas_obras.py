@@ -0,0 +1,126 @@
+"""colunas geradas e pessoas_obras
+
+Revision ID: d7f2b8e4a613
+Revises: c2e7a4b91d58
+Create Date: 2026-10-18 06:02:19.584731
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f2b8e4a613'
+down_revision: Union[str, None] = 'c2e7a4b91d58'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (tabela, coluna, chave de 'dados')
+COLUNAS = [
+    ('obras', 'nome', 'nome'),
+    ('obras', 'status', 'status'),
+    ('pessoas', 'nome_completo', 'nome_completo'),
+    ('pessoas', 'cpf', 'cpf'),
+    ('tarefas', 'nome', 'nome'),
+    ('tarefas', 'status', 'status'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Chaves quentes de 'dados' como colunas geradas: o Postgres extrai o valor uma vez,
+    # na escrita, e filtros/ordenação leem a coluna sem abrir o JSONB. Cada ADD COLUMN
+    # ... STORED reescreve a tabela (ACCESS EXCLUSIVE durante a migração)
+    for tabela, coluna, chave in COLUNAS:
+        op.add_column(tabela, sa.Column(coluna, sa.Text(), sa.Computed(f"dados ->> '{chave}'", persisted=True), nullable=True))
+
+    # (valor, id): o filtro das páginas keyset (pessoas://filtro/cpf/...) vira um range scan já em ordem de id
+    op.create_index('ix_obras_nome', 'obras', ['nome', 'id'])
+    op.create_index('ix_obras_status', 'obras', ['status', 'id'])
+    op.create_index('ix_pessoas_nome_completo', 'pessoas', ['nome_completo', 'id'])
+    op.create_index('ix_tarefas_status', 'tarefas', ['status', 'id'])
+    # O índice de expressão da 032695222dcb passa para a coluna
+    op.drop_index('ix_pessoas_cpf', table_name='pessoas')
+    op.create_index('ix_pessoas_cpf', 'pessoas', ['cpf'])
+
+    # Vínculo pessoa <-> obra normalizado a partir de dados->'obras_associadas'
+    # ("pessoas da obra X" vira um join pela PK em vez de varrer o array de cada pessoa)
+    op.create_table('pessoas_obras',
+    sa.Column('obra_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('pessoa_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.ForeignKeyConstraint(['pessoa_id'], ['pessoas.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('obra_id', 'pessoa_id')
+    )
+    op.create_index('ix_pessoas_obras_pessoa_id', 'pessoas_obras', ['pessoa_id'])
+
+    # Obras de um documento de pessoa; obra_id_ref que não é um inteiro é ignorado
+    op.execute("""
+        CREATE FUNCTION pessoas_obras_de(dados jsonb) RETURNS SETOF integer
+        LANGUAGE sql IMMUTABLE AS $$
+            SELECT DISTINCT (o ->> 'obra_id_ref')::integer
+              FROM jsonb_array_elements(
+                       CASE WHEN jsonb_typeof(dados -> 'obras_associadas') = 'array' THEN dados -> 'obras_associadas' ELSE '[]' END
+                   ) o
+             WHERE o ->> 'obra_id_ref' ~ '^[0-9]{1,9}$'
+        $$
+    """)
+    # Triggers por comando, como os de tarefas_resumo: um lote de pessoas gera um
+    # único DELETE e um único INSERT. Só as pessoas cujo obras_associadas mudou são
+    # refeitas; a remoção de pessoas sai pelo ON DELETE CASCADE
+    op.execute("""
+        CREATE FUNCTION pessoas_obras_sincronizar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP = 'UPDATE' THEN
+                DELETE FROM pessoas_obras p
+                 USING novas n JOIN antigas a USING (id)
+                 WHERE p.pessoa_id = n.id
+                   AND (n.dados -> 'obras_associadas') IS DISTINCT FROM (a.dados -> 'obras_associadas');
+                INSERT INTO pessoas_obras (obra_id, pessoa_id)
+                SELECT o, n.id
+                  FROM novas n JOIN antigas a USING (id), pessoas_obras_de(n.dados) o
+                 WHERE (n.dados -> 'obras_associadas') IS DISTINCT FROM (a.dados -> 'obras_associadas');
+            ELSE
+                INSERT INTO pessoas_obras (obra_id, pessoa_id)
+                SELECT o, n.id FROM novas n, pessoas_obras_de(n.dados) o;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER pessoas_obras_inseridas AFTER INSERT ON pessoas
+        REFERENCING NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION pessoas_obras_sincronizar()
+    """)
+    op.execute("""
+        CREATE TRIGGER pessoas_obras_alteradas AFTER UPDATE ON pessoas
+        REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+        FOR EACH STATEMENT EXECUTE FUNCTION pessoas_obras_sincronizar()
+    """)
+
+    # Carga inicial com as pessoas existentes
+    op.execute("""
+        INSERT INTO pessoas_obras (obra_id, pessoa_id)
+        SELECT o, p.id FROM pessoas p, pessoas_obras_de(p.dados) o
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER pessoas_obras_alteradas ON pessoas")
+    op.execute("DROP TRIGGER pessoas_obras_inseridas ON pessoas")
+    op.execute("DROP FUNCTION pessoas_obras_sincronizar()")
+    op.execute("DROP FUNCTION pessoas_obras_de(jsonb)")
+    op.drop_index('ix_pessoas_obras_pessoa_id', table_name='pessoas_obras')
+    op.drop_table('pessoas_obras')
+    op.drop_index('ix_pessoas_cpf', table_name='pessoas')
+    op.create_index('ix_pessoas_cpf', 'pessoas', [sa.text("(dados ->> 'cpf')")])
+    op.drop_index('ix_tarefas_status', table_name='tarefas')
+    op.drop_index('ix_pessoas_nome_completo', table_name='pessoas')
+    op.drop_index('ix_obras_status', table_name='obras')
+    op.drop_index('ix_obras_nome', table_name='obras')
+    for tabela, coluna, _ in reversed(COLUNAS):
+        op.drop_column(tabela, coluna)
@@ -0,0 +1,89 @@
+"""notify de alteracoes para assinaturas
+
+Revision ID: e3c9a5f17b84
+Revises: d7f2b8e4a613
+Create Date: 2026-10-18 06:48:51.207363
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3c9a5f17b84'
+down_revision: Union[str, None] = 'd7f2b8e4a613'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABELAS = ('obras', 'pessoas', 'tarefas')
+# (sufixo do trigger, evento, tabelas de transição)
+EVENTOS = [
+    ('inseridas', 'INSERT', 'REFERENCING NEW TABLE AS novas'),
+    ('alteradas', 'UPDATE', 'REFERENCING OLD TABLE AS antigas NEW TABLE AS novas'),
+    ('removidas', 'DELETE', 'REFERENCING OLD TABLE AS antigas'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Um NOTIFY por comando no canal mcp_alteracoes (app/server/assinaturas.py), entregue
+    # no commit: "obras:1,2,3", "pessoas:7" ou, para tarefas, as tags de hierarquia das
+    # linhas novas e antigas ("tarefas:bloco:70,local:901,obra:2"). O payload do NOTIFY
+    # é limitado (8000 bytes): acima disso tarefas fica só com as obras mais '*' (algo
+    # abaixo delas mudou) e obras/pessoas com '*' (qualquer linha)
+    op.execute("""
+        CREATE FUNCTION alteracoes_notificar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            chaves text[] := '{}';
+            payload text;
+        BEGIN
+            IF TG_TABLE_NAME = 'tarefas' THEN
+                IF TG_OP <> 'DELETE' THEN
+                    chaves := chaves || ARRAY(SELECT unnest(n.hierarquia) FROM novas n);
+                END IF;
+                IF TG_OP <> 'INSERT' THEN
+                    chaves := chaves || ARRAY(SELECT unnest(a.hierarquia) FROM antigas a);
+                END IF;
+            ELSE
+                IF TG_OP <> 'DELETE' THEN
+                    chaves := chaves || ARRAY(SELECT n.id::text FROM novas n);
+                END IF;
+                IF TG_OP <> 'INSERT' THEN
+                    chaves := chaves || ARRAY(SELECT a.id::text FROM antigas a);
+                END IF;
+            END IF;
+            IF cardinality(chaves) = 0 THEN
+                RETURN NULL;
+            END IF;
+            payload := TG_TABLE_NAME || ':' || (SELECT string_agg(DISTINCT c, ',') FROM unnest(chaves) c);
+            IF octet_length(payload) > 7900 AND TG_TABLE_NAME = 'tarefas' THEN
+                payload := 'tarefas:' || coalesce(
+                    (SELECT string_agg(DISTINCT c, ',') || ',' FROM unnest(chaves) c WHERE c LIKE 'obra:%'), '') || '*';
+            END IF;
+            IF octet_length(payload) > 7900 THEN
+                payload := TG_TABLE_NAME || ':*';
+            END IF;
+            PERFORM pg_notify('mcp_alteracoes', payload);
+            RETURN NULL;
+        END
+        $$
+    """)
+    # Triggers por comando (tabelas de transição só são aceitas com um evento por trigger)
+    for tabela in TABELAS:
+        for sufixo, evento, transicao in EVENTOS:
+            op.execute(f"""
+                CREATE TRIGGER {tabela}_alteracoes_{sufixo} AFTER {evento} ON {tabela}
+                {transicao}
+                FOR EACH STATEMENT EXECUTE FUNCTION alteracoes_notificar()
+            """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for tabela in reversed(TABELAS):
+        for sufixo, _, _ in reversed(EVENTOS):
+            op.execute(f"DROP TRIGGER {tabela}_alteracoes_{sufixo} ON {tabela}")
+    op.execute("DROP FUNCTION alteracoes_notificar()")
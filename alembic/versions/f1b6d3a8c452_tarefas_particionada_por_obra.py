@@ -0,0 +1,414 @@
+"""tarefas particionada por obra
+
+Revision ID: f1b6d3a8c452
+Revises: e3c9a5f17b84
+Create Date: 2026-10-18 07:41:12.408516
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b6d3a8c452'
+down_revision: Union[str, None] = 'e3c9a5f17b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Triggers de tarefas (migrações 7c1e5a9d2b40, 5b8e0c3f9a12, 9f3a6d1c7e25 e e3c9a5f17b84),
+# recriados na tabela nova. Os de linha são clonados pelo Postgres em cada partição
+TRIGGERS = [
+    """CREATE TRIGGER tarefas_hierarquia BEFORE INSERT OR UPDATE OF dados ON tarefas
+       FOR EACH ROW EXECUTE FUNCTION tarefas_hierarquia()""",
+    """CREATE CONSTRAINT TRIGGER tarefas_responsaveis_validos AFTER INSERT OR UPDATE OF dados ON tarefas
+       DEFERRABLE INITIALLY DEFERRED
+       FOR EACH ROW EXECUTE FUNCTION tarefas_checar_responsaveis()""",
+    """CREATE TRIGGER tarefas_resumo_inseridas AFTER INSERT ON tarefas
+       REFERENCING NEW TABLE AS novos
+       FOR EACH STATEMENT EXECUTE FUNCTION tarefas_resumo()""",
+    """CREATE TRIGGER tarefas_resumo_alteradas AFTER UPDATE ON tarefas
+       REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+       FOR EACH STATEMENT EXECUTE FUNCTION tarefas_resumo()""",
+    """CREATE TRIGGER tarefas_resumo_removidas AFTER DELETE ON tarefas
+       REFERENCING OLD TABLE AS antigos
+       FOR EACH STATEMENT EXECUTE FUNCTION tarefas_resumo()""",
+    """CREATE TRIGGER tarefas_alteracoes_inseridas AFTER INSERT ON tarefas
+       REFERENCING NEW TABLE AS novas
+       FOR EACH STATEMENT EXECUTE FUNCTION alteracoes_notificar()""",
+    """CREATE TRIGGER tarefas_alteracoes_alteradas AFTER UPDATE ON tarefas
+       REFERENCING OLD TABLE AS antigas NEW TABLE AS novas
+       FOR EACH STATEMENT EXECUTE FUNCTION alteracoes_notificar()""",
+    """CREATE TRIGGER tarefas_alteracoes_removidas AFTER DELETE ON tarefas
+       REFERENCING OLD TABLE AS antigas
+       FOR EACH STATEMENT EXECUTE FUNCTION alteracoes_notificar()""",
+]
+
+# Funções que leem tarefas: (versão particionada, versão anterior)
+FUNCOES = [
+    # Com obra_id o Postgres só olha a partição da tarefa (a busca só por id passaria por todas)
+    ("""
+        CREATE OR REPLACE FUNCTION tarefas_checar_responsaveis() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v_responsaveis jsonb;
+            v_soma numeric;
+            v_principais integer;
+            v_pessoas integer;
+            v_total integer;
+        BEGIN
+            SELECT dados -> 'responsaveis' INTO v_responsaveis FROM tarefas WHERE id = NEW.id AND obra_id = NEW.obra_id;
+            {corpo}
+    """, """
+        CREATE OR REPLACE FUNCTION tarefas_checar_responsaveis() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            v_responsaveis jsonb;
+            v_soma numeric;
+            v_principais integer;
+            v_pessoas integer;
+            v_total integer;
+        BEGIN
+            SELECT dados -> 'responsaveis' INTO v_responsaveis FROM tarefas WHERE id = NEW.id;
+            {corpo}
+    """),
+    ("""
+        CREATE OR REPLACE FUNCTION obras_resumo_recalcular(obras integer[]) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            obra integer;
+        BEGIN
+            DELETE FROM obras_resumo WHERE obra_id = ANY (obras);
+            DELETE FROM obras_resumo_responsavel WHERE obra_id = ANY (obras);
+            FOREACH obra IN ARRAY obras LOOP
+                PERFORM obras_resumo_aplicar(
+                    (SELECT array_agg(t) FROM tarefas t WHERE t.obra_id = obra), 1);
+            END LOOP;
+        END
+        $$
+    """, """
+        CREATE OR REPLACE FUNCTION obras_resumo_recalcular(obras integer[]) RETURNS void
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            obra integer;
+        BEGIN
+            DELETE FROM obras_resumo WHERE obra_id = ANY (obras);
+            DELETE FROM obras_resumo_responsavel WHERE obra_id = ANY (obras);
+            FOREACH obra IN ARRAY obras LOOP
+                PERFORM obras_resumo_aplicar(
+                    (SELECT array_agg(t) FROM tarefas t WHERE t.hierarquia @> ARRAY['obra:' || obra]), 1);
+            END LOOP;
+        END
+        $$
+    """),
+    # Local movido para outra obra: obra_id acompanha a hierarquia e o UPDATE move a linha de partição
+    ("""
+        CREATE OR REPLACE FUNCTION locais_hierarquia_propagar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE tarefas t SET (hierarquia, obra_id) = (
+                           SELECT h, coalesce(tarefa_obra_id(h), 0) FROM tarefas_hierarquia_de(t.dados) h)
+                  FROM antigos a
+                 WHERE t.dados @> jsonb_build_object('local_id', a.local_id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                UPDATE tarefas t SET hierarquia = n.ancestrais, obra_id = n.obra_id
+                  FROM novos n
+                 WHERE t.dados @> jsonb_build_object('local_id', n.local_id)
+                   AND t.hierarquia IS DISTINCT FROM n.ancestrais;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """, """
+        CREATE OR REPLACE FUNCTION locais_hierarquia_propagar() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP <> 'INSERT' THEN
+                UPDATE tarefas t SET hierarquia = tarefas_hierarquia_de(t.dados)
+                  FROM antigos a
+                 WHERE t.dados @> jsonb_build_object('local_id', a.local_id);
+            END IF;
+            IF TG_OP <> 'DELETE' THEN
+                UPDATE tarefas t SET hierarquia = n.ancestrais
+                  FROM novos n
+                 WHERE t.dados @> jsonb_build_object('local_id', n.local_id)
+                   AND t.hierarquia IS DISTINCT FROM n.ancestrais;
+            END IF;
+            RETURN NULL;
+        END
+        $$
+    """),
+    # A partição é escolhida por obra_id antes deste trigger (o de linha de cada partição):
+    # no INSERT a obra tem que vir pronta em obra_id (tarefa_obra_de(dados)). Só a partição
+    # padrão aceita corrigi-la aqui, para uma obra que ainda não tem partição. Um UPDATE de
+    # dados que muda a obra também tem que trazer o obra_id novo: sem ele a linha iria para
+    # outra partição calada (pela tabela tarefas) ou falharia na restrição da partição (UPDATE
+    # direto nela). Com ele o Postgres move a linha (DELETE + INSERT) para a partição certa
+    ("""
+        CREATE OR REPLACE FUNCTION tarefas_hierarquia() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            obra integer;
+        BEGIN
+            NEW.hierarquia := tarefas_hierarquia_de(NEW.dados);
+            obra := coalesce(tarefa_obra_id(NEW.hierarquia), 0);
+            IF NEW.obra_id IS DISTINCT FROM obra THEN
+                IF TG_OP = 'UPDATE' THEN
+                    RAISE EXCEPTION USING
+                        MESSAGE = format('A tarefa %s passou para a obra %s mas o UPDATE manteve obra_id %s.', NEW.id, obra, NEW.obra_id),
+                        ERRCODE = 'P0001',
+                        HINT = 'Inclua obra_id = tarefa_obra_de(<dados novos>) no SET do UPDATE: a partição é escolhida por obra_id.';
+                END IF;
+                IF TG_TABLE_NAME <> 'tarefas_padrao' OR to_regclass('tarefas_obra_' || obra) IS NOT NULL THEN
+                    RAISE EXCEPTION USING
+                        MESSAGE = format('A tarefa é da obra %s mas foi inserida com obra_id %s.', obra, NEW.obra_id),
+                        ERRCODE = 'P0001',
+                        HINT = 'Inclua obra_id = tarefa_obra_de(dados) no INSERT: a partição é escolhida antes deste trigger.';
+                END IF;
+                NEW.obra_id := obra;
+            END IF;
+            RETURN NEW;
+        END
+        $$
+    """, """
+        CREATE OR REPLACE FUNCTION tarefas_hierarquia() RETURNS trigger
+        LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.hierarquia := tarefas_hierarquia_de(NEW.dados);
+            RETURN NEW;
+        END
+        $$
+    """),
+]
+
+# Resto de tarefas_checar_responsaveis (9f3a6d1c7e25), igual nas duas versões
+_CHECAR_RESPONSAVEIS_CORPO = """IF jsonb_typeof(v_responsaveis) IS DISTINCT FROM 'array' OR jsonb_array_length(v_responsaveis) = 0 THEN
+                RETURN NULL;
+            END IF;
+            SELECT sum(coalesce((r ->> 'percentual')::numeric, 100)),
+                   count(*) FILTER (WHERE coalesce((r ->> 'eh_principal')::boolean, false)),
+                   count(DISTINCT r ->> 'pessoa_id'),
+                   count(*)
+              INTO v_soma, v_principais, v_pessoas, v_total
+              FROM jsonb_array_elements(v_responsaveis) r;
+            IF abs(v_soma - 100.00) > 0.01 THEN
+                RAISE EXCEPTION USING
+                    MESSAGE = format('Erro de Validação: A soma dos percentuais de responsabilidade para a tarefa ID %s deve ser exatamente 100.00. Soma atual: %s%%',
+                                     NEW.id, round(v_soma, 2)),
+                    ERRCODE = 'P0001',
+                    HINT = 'Ajuste os percentuais em dados->responsaveis para que somem 100 para esta tarefa.';
+            END IF;
+            IF v_principais <> 1 THEN
+                RAISE EXCEPTION USING
+                    MESSAGE = format('Erro de Validação: A tarefa ID %s deve ter exatamente um responsável principal (tem %s).', NEW.id, v_principais),
+                    ERRCODE = 'P0001';
+            END IF;
+            IF v_pessoas <> v_total THEN
+                RAISE EXCEPTION USING
+                    MESSAGE = format('Erro de Validação: A tarefa ID %s tem a mesma pessoa como responsável mais de uma vez.', NEW.id),
+                    ERRCODE = 'P0001';
+            END IF;
+            RETURN NULL;
+        END
+        $$"""
+
+INDICES = [
+    ('ix_tarefas_dados_gin', ['dados'], dict(postgresql_using='gin', postgresql_ops={'dados': 'jsonb_path_ops'})),
+    ('ix_tarefas_hierarquia', ['hierarquia'], dict(postgresql_using='gin')),
+    ('ix_tarefas_status', ['status', 'id'], {}),
+]
+
+
+def _trocar_tabela(particionada: bool) -> None:
+    """Recria tarefas (particionada por obra ou não) com as mesmas linhas, índices e triggers."""
+    conn = op.get_bind()
+    # obras_resumo_aplicar recebe tarefas[]: depende do tipo da tabela antiga. A definição
+    # atual é guardada e recriada igual depois da troca
+    definicao_resumo = conn.execute(sa.text(
+        "SELECT pg_get_functiondef('obras_resumo_aplicar(tarefas[], integer)'::regprocedure)")).scalar()
+    op.execute("DROP FUNCTION obras_resumo_aplicar(tarefas[], integer)")
+    op.execute("ALTER TABLE tarefas RENAME TO tarefas_antiga")
+    op.execute("ALTER TABLE tarefas_antiga RENAME CONSTRAINT tarefas_pkey TO tarefas_antiga_pkey")
+    for nome, _, _ in INDICES:
+        op.drop_index(nome, table_name='tarefas_antiga')
+
+    colunas = """
+        id integer NOT NULL DEFAULT nextval('tarefas_id_seq'::regclass),
+        dados jsonb,
+        created_at timestamp with time zone NOT NULL DEFAULT now(),
+        hierarquia text[] NOT NULL DEFAULT '{}'::text[],
+        nome text GENERATED ALWAYS AS (dados ->> 'nome') STORED,
+        status text GENERATED ALWAYS AS (dados ->> 'status') STORED"""
+    if particionada:
+        # A chave de partição tem que fazer parte da PK; 0 = tarefa sem obra. O Postgres deixa
+        # de garantir id único (não há índice único só em id numa tabela particionada): os ids
+        # vêm de tarefas_id_seq e quem grava ids explícitos confere antes (importacao_legado)
+        op.execute(f"""
+            CREATE TABLE tarefas ({colunas},
+                obra_id integer NOT NULL DEFAULT 0,
+                CONSTRAINT tarefas_pkey PRIMARY KEY (id, obra_id)
+            ) PARTITION BY LIST (obra_id)
+        """)
+        # Tarefas sem obra e das obras que ainda não têm partição (tarefas_criar_particao)
+        op.execute("CREATE TABLE tarefas_padrao PARTITION OF tarefas DEFAULT")
+        op.execute("""
+            INSERT INTO tarefas (id, dados, created_at, hierarquia, obra_id)
+            SELECT id, dados, created_at, hierarquia, coalesce(tarefa_obra_id(hierarquia), 0) FROM tarefas_antiga
+        """)
+    else:
+        op.execute(f"CREATE TABLE tarefas ({colunas}, CONSTRAINT tarefas_pkey PRIMARY KEY (id))")
+        op.execute("""
+            INSERT INTO tarefas (id, dados, created_at, hierarquia)
+            SELECT id, dados, created_at, hierarquia FROM tarefas_antiga
+        """)
+    op.execute("ALTER SEQUENCE tarefas_id_seq OWNED BY tarefas.id")
+    op.execute("DROP TABLE tarefas_antiga")
+
+    for nome, colunas_indice, opcoes in INDICES:
+        op.create_index(nome, 'tarefas', colunas_indice, **opcoes)
+    op.execute(definicao_resumo)
+    for trigger in TRIGGERS:
+        op.execute(trigger)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Obra de uma tarefa a partir de 'dados', a mesma que o trigger põe em hierarquia (0 = sem obra).
+    # Quem insere em tarefas usa para preencher obra_id, a chave de partição
+    op.execute("""
+        CREATE FUNCTION tarefa_obra_de(dados jsonb) RETURNS integer
+        LANGUAGE sql STABLE AS $$
+            SELECT coalesce(tarefa_obra_id(tarefas_hierarquia_de(dados)), 0)
+        $$
+    """)
+
+    # tarefas passa a ser particionada por LIST (obra_id). Uma obra ganha a sua partição
+    # tarefas_obra_<id> quando passa de TAREFAS_PARTICAO_MIN_LINHAS tarefas (app/db/particoes.py);
+    # as menores ficam na partição padrão. Consultas sem obra (por id) planejam e travam cada
+    # partição, então o número delas acompanha o de obras grandes, não o de obras.
+    # Todas as linhas começam na padrão: as obras grandes são distribuídas depois, uma por
+    # transação (python -m app.db.particoes distribuir), sem travar milhares de tabelas até o commit
+    _trocar_tabela(particionada=True)
+    for nova, _ in FUNCOES:
+        op.execute(nova.replace("{corpo}", _CHECAR_RESPONSAVEIS_CORPO))
+
+    # Cria a partição de uma obra e move para ela as linhas da obra que estão na padrão.
+    # Tabela criada à parte e anexada com ATTACH (SHARE UPDATE EXCLUSIVE em tarefas: leituras e
+    # escritas seguem) em vez de CREATE TABLE ... PARTITION OF (ACCESS EXCLUSIVE em tarefas).
+    # A padrão fica travada até o commit: nada entra nela entre a cópia e o ATTACH, que a varre
+    op.execute("""
+        CREATE FUNCTION tarefas_criar_particao(obra integer) RETURNS boolean
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            nome text := 'tarefas_obra_' || obra;
+        BEGIN
+            IF obra = 0 THEN
+                RETURN false;
+            END IF;
+            LOCK TABLE tarefas IN SHARE UPDATE EXCLUSIVE MODE;
+            IF to_regclass(nome) IS NOT NULL THEN
+                RETURN false;
+            END IF;
+            LOCK TABLE tarefas_padrao IN ACCESS EXCLUSIVE MODE;
+            EXECUTE format('CREATE TABLE %I (LIKE tarefas INCLUDING DEFAULTS INCLUDING GENERATED)', nome);
+            EXECUTE format(
+                'WITH movidas AS (DELETE FROM tarefas_padrao WHERE obra_id = %s RETURNING id, dados, created_at, hierarquia, obra_id) '
+                'INSERT INTO %I (id, dados, created_at, hierarquia, obra_id) SELECT * FROM movidas', obra, nome);
+            EXECUTE format('ALTER TABLE tarefas ATTACH PARTITION %I FOR VALUES IN (%s)', nome, obra);
+            RETURN true;
+        END
+        $$
+    """)
+    # Partições das obras informadas que já têm pelo menos 'minimo' tarefas (obras_resumo).
+    # Só trava tarefas se alguma delas ainda não tem partição
+    op.execute("""
+        CREATE FUNCTION tarefas_criar_particoes(obras integer[], minimo integer DEFAULT 0) RETURNS integer
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            obra integer;
+            criadas integer := 0;
+        BEGIN
+            FOR obra IN SELECT DISTINCT o FROM unnest(obras) o
+                         WHERE o <> 0 AND to_regclass('tarefas_obra_' || o) IS NULL
+                           AND (minimo <= 0 OR (SELECT sum(r.tarefas) FROM obras_resumo r WHERE r.obra_id = o) >= minimo)
+                         ORDER BY o LOOP
+                IF tarefas_criar_particao(obra) THEN
+                    criadas := criadas + 1;
+                END IF;
+            END LOOP;
+            RETURN criadas;
+        END
+        $$
+    """)
+    # Obra encerrada: a partição sai de tarefas (DETACH, só metadados) e vai para o schema
+    # arquivo, de onde pode ir para um dump e ser apagada. As outras obras não são lidas nem
+    # escritas e os triggers não disparam: obras_resumo da obra continua como estava. Uma
+    # obra que ainda está na padrão ganha a partição antes (cópia só das linhas dela)
+    op.execute("""
+        CREATE FUNCTION tarefas_arquivar_obra(obra integer) RETURNS text
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            nome text := 'tarefas_obra_' || obra;
+        BEGIN
+            IF to_regclass(nome) IS NULL THEN
+                IF obra = 0 OR NOT EXISTS (SELECT 1 FROM tarefas_padrao WHERE obra_id = obra) THEN
+                    RAISE EXCEPTION 'A obra % não tem tarefas para arquivar.', obra;
+                END IF;
+                PERFORM tarefas_criar_particao(obra);
+            END IF;
+            EXECUTE format('ALTER TABLE tarefas DETACH PARTITION %I', nome);
+            CREATE SCHEMA IF NOT EXISTS arquivo;
+            EXECUTE format('ALTER TABLE %I SET SCHEMA arquivo', nome);
+            PERFORM pg_notify('mcp_alteracoes', 'tarefas:obra:' || obra || ',*');
+            RETURN 'arquivo.' || nome;
+        END
+        $$
+    """)
+    # Volta uma partição arquivada (se a obra não recebeu tarefas novas desde então)
+    op.execute("""
+        CREATE FUNCTION tarefas_restaurar_obra(obra integer) RETURNS text
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            nome text := 'tarefas_obra_' || obra;
+        BEGIN
+            IF to_regclass('arquivo.' || nome) IS NULL THEN
+                RAISE EXCEPTION 'Não há arquivo.% para restaurar.', nome;
+            END IF;
+            IF to_regclass(nome) IS NOT NULL OR EXISTS (SELECT 1 FROM tarefas_padrao WHERE obra_id = obra) THEN
+                RAISE EXCEPTION 'A obra % já tem tarefas novas em tarefas; junte-as a arquivo.% manualmente.', obra, nome;
+            END IF;
+            EXECUTE format('ALTER TABLE arquivo.%I SET SCHEMA %I', nome,
+                           (SELECT relnamespace::regnamespace::text FROM pg_class WHERE oid = 'tarefas'::regclass));
+            EXECUTE format('ALTER TABLE tarefas ATTACH PARTITION %I FOR VALUES IN (%s)', nome, obra);
+            PERFORM pg_notify('mcp_alteracoes', 'tarefas:obra:' || obra || ',*');
+            RETURN nome;
+        END
+        $$
+    """)
+
+    # tarefas://bloco/70 acha a obra do bloco aqui para que o Postgres descarte as outras partições
+    op.create_index('ix_locais_hierarquia_ancestrais', 'locais_hierarquia', ['ancestrais'], postgresql_using='gin')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # A PK (id) da versão anterior não aceita o mesmo id em duas obras, o que (id, obra_id) aceita
+    repetidos = op.get_bind().execute(sa.text(
+        "SELECT id FROM tarefas GROUP BY id HAVING count(*) > 1 ORDER BY id LIMIT 20")).scalars().all()
+    if repetidos:
+        raise RuntimeError(
+            f"tarefas tem ids repetidos em obras diferentes ({', '.join(map(str, repetidos))}): a PK (id) "
+            "anterior não pode ser recriada. Apague ou renumere as cópias antes do downgrade.")
+    # Partições arquivadas (schema arquivo) ficam como estão, fora de tarefas
+    op.drop_index('ix_locais_hierarquia_ancestrais', table_name='locais_hierarquia')
+    op.execute("DROP FUNCTION tarefas_restaurar_obra(integer)")
+    op.execute("DROP FUNCTION tarefas_arquivar_obra(integer)")
+    op.execute("DROP FUNCTION tarefas_criar_particoes(integer[], integer)")
+    op.execute("DROP FUNCTION tarefas_criar_particao(integer)")
+    for _, anterior in FUNCOES:
+        op.execute(anterior.replace("{corpo}", _CHECAR_RESPONSAVEIS_CORPO))
+    _trocar_tabela(particionada=False)
+    op.execute("DROP FUNCTION tarefa_obra_de(jsonb)")
@@ -0,0 +1,100 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.core.config import settings
+
+class CacheLRU:
+    """
+    Cache en memoria del proceso con expulsión LRU y expiración por TTL.
+
+    Pensado para ser usado desde un único event loop (sin locks). Para evitar
+    guardar datos viejos cuando una lectura compite con una escritura, quien lee
+    de la base toma una 'marca' antes de la consulta y la pasa a guardar(): si
+    hubo cualquier invalidación entre medio, el valor se descarta. Con una réplica
+    atrasada, la escritura puede haber sido confirmada (e invalidada) antes de la
+    marca: quien leyó de la réplica pasa 'atraso_s' y el valor también se descarta si
+    hubo una invalidación en esos últimos segundos.
+    """
+
+    def __init__(self, tamanho_max: int, ttl_s: float):
+        self.tamanho_max = tamanho_max
+        self.ttl_s = ttl_s
+        self._itens: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._invalidacoes = 0
+        self._invalidado_em = float("-inf") # time.monotonic() de la última invalidación
+        self.hits = 0
+        self.misses = 0
+        self.expulsoes = 0 # Entradas quitadas por falta de espacio (LRU)
+        self.expiradas = 0 # Entradas quitadas por TTL
+
+    @property
+    def ativo(self) -> bool:
+        return self.tamanho_max > 0 and self.ttl_s > 0
+
+    def obter(self, chave: Hashable) -> Optional[Any]:
+        """Devuelve el valor guardado o None (miss, expirado o cache desactivado)."""
+        if not self.ativo:
+            return None
+        item = self._itens.get(chave)
+        if item is None:
+            self.misses += 1
+            return None
+        expira_em, valor = item
+        if expira_em < time.monotonic():
+            del self._itens[chave]
+            self.expiradas += 1
+            self.misses += 1
+            return None
+        self._itens.move_to_end(chave)
+        self.hits += 1
+        return valor
+
+    def marca(self) -> int:
+        """Marca a tomar antes de leer de la base (ver guardar)."""
+        return self._invalidacoes
+
+    def guardar(self, chave: Hashable, valor: Any, marca: int, atraso_s: float = 0.0) -> None:
+        if not self.ativo or marca != self._invalidacoes:
+            return
+        if atraso_s and time.monotonic() - self._invalidado_em < atraso_s:
+            return
+        self._itens[chave] = (time.monotonic() + self.ttl_s, valor)
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.tamanho_max:
+            self._itens.popitem(last=False)
+            self.expulsoes += 1
+
+    def invalidar(self, chave: Hashable) -> None:
+        self._invalidacoes += 1
+        self._invalidado_em = time.monotonic()
+        self._itens.pop(chave, None)
+
+    def invalidar_prefixo(self, prefixo: str) -> None:
+        """Invalida todas las claves (prefixo, ...) de una entidad."""
+        self._invalidacoes += 1
+        self._invalidado_em = time.monotonic()
+        for chave in [c for c in self._itens if isinstance(c, tuple) and c and c[0] == prefixo]:
+            del self._itens[chave]
+
+    def limpar(self) -> None:
+        self._invalidacoes += 1
+        self._invalidado_em = time.monotonic()
+        self._itens.clear()
+
+    def estatisticas(self) -> dict:
+        consultas = self.hits + self.misses
+        return {
+            "ativo": self.ativo,
+            "entradas": len(self._itens),
+            "tamanho_max": self.tamanho_max,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "taxa_acerto": round(self.hits / consultas, 4) if consultas else 0.0,
+            "expulsoes": self.expulsoes,
+            "expiradas": self.expiradas,
+            "invalidacoes": self._invalidacoes,
+        }
+
+# Cache de los read models (JSON ya serializado) de obras://id/... y pessoas://id/...
+cache_leituras = CacheLRU(settings.CACHE_TAMANHO_MAX, settings.CACHE_TTL_S)
@@ -10,9 +10,72 @@ load_dotenv(dotenv_path=env_path)
 class Settings(BaseSettings):
     """Configuraciones de la aplicación cargadas desde .env"""
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+
+    # Pool de conexiones (ver app/db/session.py). Se pueden sobreescribir en .env
+    DB_POOL_SIZE: int = 5 # Conexiones que el pool mantiene abiertas
+    DB_MAX_OVERFLOW: int = 10 # Conexiones extra permitidas en picos de carga
+    DB_POOL_TIMEOUT: float = 30.0 # Segundos esperando una conexión libre antes de fallar
+    DB_POOL_RECYCLE: int = 1800 # Segundos de vida de una conexión (-1 = sin límite)
+    DB_POOL_PRE_PING: bool = True # Verifica la conexión antes de entregarla (descarta conexiones muertas)
+    DB_STATEMENT_TIMEOUT_MS: int = 0 # statement_timeout de Postgres por conexión (0 = sin límite)
+
+    # Réplica de lectura (opcional), ver get_async_session_leitura en app/db/session.py
+    DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL", "") # Vacío = todo va al primario
+    LEITURA_APOS_ESCRITA_S: float = 5.0 # Segundos que un cliente lee del primario tras escribir
+    REPLICA_REINTENTO_S: float = 30.0 # Segundos en el primario tras un fallo de la réplica
+    REPLICA_CONNECT_TIMEOUT_S: int = 2 # connect_timeout de libpq para la réplica
+    REPLICA_SEM_SESSAO: bool = False # Sin sesión MCP (SERVIDOR_WORKERS>1) lee igual de la réplica, sin leer lo que uno escribió
     # Añade otras variables de entorno aquí si las necesitas
     # OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
 
+    # Paginación keyset de los resources obras://pagina/... y pessoas://pagina/...
+    PAGINA_TAMANHO_MAX: int = 500 # Límite superior del tamaño de página pedido por el cliente
+
+    # Tools de creación en lote (criar_*_lote)
+    LOTE_TAMANHO_MAX: int = 10000 # Máximo de items aceptados en una sola llamada
+
+    # Caché de lecturas por ID (obras://id/..., pessoas://id/...), ver app/core/cache.py
+    CACHE_TAMANHO_MAX: int = 10000 # Entradas máximas (0 = caché desactivada)
+    CACHE_TTL_S: float = 300.0 # Segundos que una entrada es válida
+    CACHE_NOTIFY: bool = False # Invalidación entre procesos vía LISTEN/NOTIFY de Postgres
+
+    # Índice en memoria de precos_tarefa_local por (tipo, local), ver app/core/precos.py
+    PRECOS_INDICE_TAMANHO_MAX: int = 100000 # Pares (tipo, local) guardados (0 = siempre consulta la base)
+    PRECOS_INDICE_TTL_S: float = 300.0 # Segundos hasta recargar un par (cambios hechos fuera del servidor)
+
+    # Serialización de las lecturas
+    LEITURA_CONFIAVEL: bool = True # No re-valida el JSONB leído (ya se validó al escribirlo) y arma dicts en vez de modelos
+    JSON_LISTAS_POSTGRES: bool = False # Listados (todas/páginas) con el JSON armado por Postgres
+
+    # Group commit de criar_obra/criar_pessoa, ver app/db/agrupador.py
+    AGRUPAR_ESCRITAS: bool = False # Junta las creaciones concurrentes en una sola transacción
+    AGRUPAR_JANELA_MS: float = 2.0 # Milisegundos que la primera fila espera a las siguientes
+    AGRUPAR_LOTE_MAX: int = 100 # Filas que disparan el commit sin esperar la ventana
+
+    # Suscripciones a resources (resources/subscribe), ver app/server/assinaturas.py
+    ASSINATURAS_ESPERA_MS: float = 200.0 # Milisegundos sin cambios antes de avisar (junta las ráfagas)
+    ASSINATURAS_ESPERA_MAX_MS: float = 1000.0 # Espera máxima desde el primer cambio pendiente
+
+    # Particiones de tarefas por obra (migración f1b6d3a8c452), ver app/db/particoes.py
+    TAREFAS_PARTICAO_MIN_LINHAS: int = 10000 # Tarefas con que una obra sale de tarefas_padrao a su propia partición (0 = nunca automática)
+    PARTICOES_LOCK_TIMEOUT_MS: int = 2000 # Espera máxima por los locks al crear una partición (si vence, se reintenta en el próximo lote)
+
+    # Exportación NDJSON (tool exportar_ndjson)
+    EXPORT_DIR: str = "exports" # Carpeta (en el servidor) de los archivos exportados
+    EXPORT_LOTE: int = 2000 # Filas por FETCH del cursor del lado del servidor (yield_per)
+    EXPORT_PAGINA_MAX: int = 5000 # Filas máximas por página con arquivo=False
+
+    # Importación del esquema antiguo (python -m app.db.importacao_legado), ver README
+    IMPORTACION_LOTE: int = 5000 # Filas por COPY (y por checkpoint)
+    IMPORTACION_PARALELO: int = 4 # Conexiones escribiendo lotes a la vez
+
+    # Arranque del servidor (modo stdio: un proceso por sesión), ver app/server/esquemas.py
+    ESQUEMAS_CACHE: bool = True # Reutiliza los JSON Schemas de tools/templates guardados en el arranque anterior
+
+    # Servidor HTTP (python -m app.server.main http), ver README
+    SERVIDOR_WORKERS: int = 1 # Procesos worker en el mismo puerto (>1 usa streamable-http sin sesión)
+    SERVIDOR_TIMEOUT_APAGADO_S: float = 30.0 # Segundos para terminar las peticiones en curso tras SIGTERM
+
     # Puedes añadir configuraciones que no vengan de .env también
     PROJECT_NAME: str = "Backend MCP"
     API_V1_STR: str = "/api/v1" # Si usas API REST adicional
@@ -0,0 +1,184 @@
+import time
+from bisect import bisect_left
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Optional
+from sqlalchemy import event
+
+# Límites (segundos) de los buckets de los histogramas, como los de Prometheus
+BUCKETS_S = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histograma:
+    """Histograma acumulativo de duraciones con buckets fijos (ver BUCKETS_S)."""
+
+    def __init__(self, buckets: tuple = BUCKETS_S):
+        self.buckets = buckets
+        self.contagens = [0] * (len(buckets) + 1) # El último es +Inf
+        self.soma = 0.0
+        self.total = 0
+
+    def observar(self, segundos: float) -> None:
+        self.contagens[bisect_left(self.buckets, segundos)] += 1
+        self.soma += segundos
+        self.total += 1
+
+    def acumulados(self) -> list[tuple[str, int]]:
+        """(le, cantidad <= le) de cada bucket, en el formato de Prometheus."""
+        acumulado, linhas = 0, []
+        for limite, contagem in zip([*self.buckets, None], self.contagens):
+            acumulado += contagem
+            linhas.append(("+Inf" if limite is None else repr(limite), acumulado))
+        return linhas
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Estimación del percentil: límite superior del bucket donde cae (None si vacío)."""
+        if not self.total:
+            return None
+        alvo, acumulado = p / 100 * self.total, 0
+        for limite, contagem in zip(self.buckets, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+@dataclass
+class MetricasEndpoint:
+    """Contadores de un tool o resource (los resources se agrupan por template)."""
+    chamadas: int = 0
+    erros: int = 0
+    latencia: Histograma = field(default_factory=Histograma)
+    consultas_db: int = 0
+    tempo_db_s: float = 0.0
+
+@dataclass
+class ConsultasPeticion:
+    """Consultas SQL hechas durante una petición MCP (acumulado vía contextvar)."""
+    consultas: int = 0
+    segundos: float = 0.0
+
+_peticion_actual: ContextVar[Optional[ConsultasPeticion]] = ContextVar("peticion_actual", default=None)
+
+class RegistroMetricas:
+    """
+    Métricas del proceso: por endpoint MCP (llamadas, errores, latencia y tiempo
+    en Postgres) y totales de consultas SQL, incluidas las hechas fuera de una
+    petición. Pensado para un único event loop, como CacheLRU.
+    """
+
+    def __init__(self):
+        self.endpoints: dict[tuple[str, str], MetricasEndpoint] = {}
+        self.consultas_db = 0
+        self.erros_db = 0
+        self.tempo_db = Histograma()
+
+    @asynccontextmanager
+    async def medir(self, tipo: str, nome: str):
+        """Mide una petición: latencia total, si falló y las consultas SQL que hizo."""
+        metricas = self.endpoints.get((tipo, nome))
+        if metricas is None:
+            metricas = self.endpoints[(tipo, nome)] = MetricasEndpoint()
+        consultas = ConsultasPeticion()
+        token = _peticion_actual.set(consultas)
+        inicio = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            metricas.erros += 1
+            raise
+        finally:
+            metricas.latencia.observar(time.perf_counter() - inicio)
+            metricas.chamadas += 1
+            metricas.consultas_db += consultas.consultas
+            metricas.tempo_db_s += consultas.segundos
+            _peticion_actual.reset(token)
+
+    def registrar_consulta(self, segundos: float) -> None:
+        self.consultas_db += 1
+        self.tempo_db.observar(segundos)
+        consultas = _peticion_actual.get()
+        if consultas is not None:
+            consultas.consultas += 1
+            consultas.segundos += segundos
+
+    def instrumentar_engine(self, engine) -> None:
+        """
+        Registra los eventos de SQLAlchemy que cronometran cada consulta. Para un
+        AsyncEngine hay que pasar engine.sync_engine. El contextvar de la petición
+        llega a estos eventos porque SQLAlchemy ejecuta el código síncrono en un
+        greenlet que comparte el contexto de la tarea asyncio.
+        """
+        @event.listens_for(engine, "before_cursor_execute")
+        def _antes(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def _despues(conn, cursor, statement, parameters, context, executemany):
+            self.registrar_consulta(time.perf_counter() - conn.info["inicio_consultas"].pop())
+
+        @event.listens_for(engine, "handle_error")
+        def _error(contexto_excepcion):
+            conn = contexto_excepcion.connection
+            if conn is not None and conn.info.get("inicio_consultas"):
+                conn.info["inicio_consultas"].pop()
+            self.erros_db += 1
+
+    def snapshot(self) -> dict:
+        """Estado actual en un dict apto para JSON (resource://metrics)."""
+        ms = lambda s: None if s is None else round(s * 1000, 3)
+        endpoints = {}
+        for (tipo, nome), m in sorted(self.endpoints.items()):
+            endpoints.setdefault(tipo, {})[nome] = {
+                "chamadas": m.chamadas,
+                "erros": m.erros,
+                "latencia_media_ms": ms(m.latencia.soma / m.chamadas) if m.chamadas else None,
+                "latencia_p50_ms": ms(m.latencia.percentil(50)),
+                "latencia_p95_ms": ms(m.latencia.percentil(95)),
+                "latencia_p99_ms": ms(m.latencia.percentil(99)),
+                "consultas_db": m.consultas_db,
+                "tempo_db_ms": ms(m.tempo_db_s),
+                # Lo que no es Postgres: validación, lógica del handler, serialización y transporte
+                "tempo_fora_db_ms": ms(m.latencia.soma - m.tempo_db_s),
+            }
+        return {
+            "endpoints": endpoints,
+            "db": {
+                "consultas": self.consultas_db,
+                "erros": self.erros_db,
+                "tempo_total_ms": ms(self.tempo_db.soma),
+                "p95_ms": ms(self.tempo_db.percentil(95)),
+            },
+        }
+
+    def prometheus(self, extras: Optional[dict[str, float]] = None) -> str:
+        """Texto en el formato de exposición de Prometheus (ruta /metrics)."""
+        linhas = [
+            "# HELP mcp_chamadas_total Llamadas a tools/resources MCP.",
+            "# TYPE mcp_chamadas_total counter",
+        ]
+        etiquetas = {chave: f'tipo="{chave[0]}",nome="{_escapar(chave[1])}"' for chave in self.endpoints}
+        itens = sorted(self.endpoints.items())
+        linhas += [f"mcp_chamadas_total{{{etiquetas[c]}}} {m.chamadas}" for c, m in itens]
+        linhas += ["# HELP mcp_erros_total Llamadas que terminaron con error.", "# TYPE mcp_erros_total counter"]
+        linhas += [f"mcp_erros_total{{{etiquetas[c]}}} {m.erros}" for c, m in itens]
+        linhas += ["# HELP mcp_latencia_segundos Latencia de las llamadas MCP.", "# TYPE mcp_latencia_segundos histogram"]
+        for c, m in itens:
+            linhas += [f'mcp_latencia_segundos_bucket{{{etiquetas[c]},le="{le}"}} {n}' for le, n in m.latencia.acumulados()]
+            linhas.append(f"mcp_latencia_segundos_sum{{{etiquetas[c]}}} {m.latencia.soma!r}")
+            linhas.append(f"mcp_latencia_segundos_count{{{etiquetas[c]}}} {m.latencia.total}")
+        linhas += ["# HELP mcp_consultas_db_total Consultas SQL hechas por las llamadas MCP.", "# TYPE mcp_consultas_db_total counter"]
+        linhas += [f"mcp_consultas_db_total{{{etiquetas[c]}}} {m.consultas_db}" for c, m in itens]
+        linhas += ["# HELP mcp_tempo_db_segundos_total Tiempo en Postgres de las llamadas MCP.", "# TYPE mcp_tempo_db_segundos_total counter"]
+        linhas += [f"mcp_tempo_db_segundos_total{{{etiquetas[c]}}} {m.tempo_db_s!r}" for c, m in itens]
+        linhas += ["# HELP db_consulta_segundos Duración de cada consulta SQL del proceso.", "# TYPE db_consulta_segundos histogram"]
+        linhas += [f'db_consulta_segundos_bucket{{le="{le}"}} {n}' for le, n in self.tempo_db.acumulados()]
+        linhas += [f"db_consulta_segundos_sum {self.tempo_db.soma!r}", f"db_consulta_segundos_count {self.tempo_db.total}"]
+        linhas += ["# TYPE db_erros_total counter", f"db_erros_total {self.erros_db}"]
+        for nome, valor in (extras or {}).items():
+            linhas += [f"# TYPE {nome} gauge", f"{nome} {valor}"]
+        return "\n".join(linhas) + "\n"
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+metricas = RegistroMetricas()
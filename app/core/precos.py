@@ -0,0 +1,53 @@
+import bisect
+import datetime
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterable, Optional
+from app.core.cache import CacheLRU
+from app.core.config import settings
+
+@dataclass(frozen=True)
+class PrecoVigente:
+    """Una fila de precos_tarefa_local, con lo necesario para resolver y devolver el precio."""
+    id: int
+    preco: Decimal
+    unidade_medida: Optional[str]
+    validade_inicio: Optional[datetime.date]
+    validade_fim: Optional[datetime.date]
+
+class JanelasPreco:
+    """
+    Ventanas de validez de los precios de un (tipos_tarefa_id, local_id), ordenadas
+    por validade_inicio (None = desde siempre; validade_fim None = sin fin).
+
+    vigente(data) busca con bisect la última ventana que empieza hasta 'data' y
+    retrocede mientras no la cubra; con ventanas solapadas gana la que empezó más
+    tarde (y, a igual inicio, la de mayor id). El máximo acumulado de validade_fim
+    corta la búsqueda cuando ninguna ventana anterior llega hasta 'data'.
+    """
+    __slots__ = ("_inicios", "_fim_max", "_precos")
+
+    def __init__(self, precos: Iterable[PrecoVigente]):
+        self._precos = sorted(precos, key=lambda p: (p.validade_inicio or datetime.date.min, p.id))
+        self._inicios = [p.validade_inicio or datetime.date.min for p in self._precos]
+        self._fim_max: list[datetime.date] = []
+        fim_max = datetime.date.min
+        for p in self._precos:
+            fim_max = max(fim_max, p.validade_fim or datetime.date.max)
+            self._fim_max.append(fim_max)
+
+    def __len__(self) -> int:
+        return len(self._precos)
+
+    def vigente(self, data: datetime.date) -> Optional[PrecoVigente]:
+        i = bisect.bisect_right(self._inicios, data)
+        while i > 0 and self._fim_max[i - 1] >= data:
+            i -= 1
+            preco = self._precos[i]
+            if preco.validade_fim is None or preco.validade_fim >= data:
+                return preco
+        return None
+
+# Índice de precios por (tipos_tarefa_id, local_id) -> JanelasPreco, cargado bajo
+# demanda por precificar_tarefas/criar_tarefas_lote (claves sin precios también se guardan)
+indice_precos = CacheLRU(settings.PRECOS_INDICE_TAMANHO_MAX, settings.PRECOS_INDICE_TTL_S)
@@ -0,0 +1,192 @@
+# app/db/agrupador.py
+"""
+Group commit para las creaciones de a una fila (criar_obra, criar_pessoa).
+
+Con muchos agentes creando al mismo tiempo, cada llamada abre su transacción y
+paga su propio commit (un fsync del WAL). AgrupadorInsercoes retiene cada fila
+unos milisegundos (AGRUPAR_JANELA_MS) o hasta juntar AGRUPAR_LOTE_MAX, y las
+inserta todas en un único INSERT ... SELECT FROM jsonb_array_elements, en una
+sola transacción (insercao_lote, también usado por los tools criar_*_lote). Cada llamada recibe su propio id (o su propio error).
+
+Hay a lo sumo un lote en vuelo por tabla: lo que llega mientras ese lote hace
+su commit espera y sale junto en el siguiente (como el group commit del WAL),
+salvo que ya junte AGRUPAR_LOTE_MAX filas.
+
+Si el INSERT del lote falla, las filas se reintentan una por una, cada una en
+su SAVEPOINT dentro de una misma transacción: la fila que falla no arrastra a
+las demás y el error le llega solo a quien la pidió.
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB, REGCLASS
+from sqlmodel import insert, select
+
+from app.core.config import settings
+from app.db.session import get_async_session, marcar_escrita
+
+logger = logging.getLogger(__name__)
+
+# ao_gravar(db, ids): corre en la transacción del lote, antes del commit (ej: invalidar cachés)
+CallbackGravacao = Callable[[Any, list[int]], Awaitable[None]]
+
+def insercao_lote(tabla: sa.Table, calculadas: Optional[dict] = None, retorno: tuple = ()) -> sa.Select:
+    """
+    INSERT de un elemento del parámetro JSONB 'lote' por fila (en 'dados'), que devuelve
+    (n, id, *retorno) en orden de n, la posición del elemento en 'lote' (desde 1).
+    Los ids se piden a la secuencia en un CTE junto con n y el INSERT se une por id:
+    la fila de cada elemento no depende del orden en que salen los ids (otra
+    transacción puede tomar valores de la secuencia en medio del lote).
+    'calculadas' = {columna: función(value)} para columnas que salen del elemento.
+    """
+    elementos = (
+        sa.func.jsonb_array_elements(sa.bindparam("lote", type_=JSONB))
+        .table_valued(sa.column("value", JSONB), with_ordinality="n")
+        .render_derived()
+    )
+    secuencia = sa.cast(sa.func.pg_get_serial_sequence(tabla.name, "id"), REGCLASS)
+    itens = select(elementos.c.n, elementos.c.value, sa.func.nextval(secuencia).label("id")).cte("itens")
+    colunas, valores = [tabla.c.id, tabla.c.dados], [itens.c.id, itens.c.value]
+    for coluna, funcao in (calculadas or {}).items():
+        colunas.append(tabla.c[coluna])
+        valores.append(funcao(itens.c.value))
+    novas = insert(tabla).from_select(colunas, select(*valores)).returning(tabla.c.id, *retorno).cte("novas")
+    return (
+        select(itens.c.n, *novas.c)
+        .select_from(novas.join(itens, itens.c.id == novas.c.id))
+        .order_by(itens.c.n)
+    )
+
+class AgrupadorInsercoes:
+    """
+    Cola de filas ('dados' JSONB) para una tabla con columnas id/dados/created_at.
+    Se usa desde un único event loop (sin locks), como CacheLRU.
+    """
+
+    def __init__(self, tabla: sa.Table, ao_gravar: Optional[CallbackGravacao] = None,
+                 janela_ms: Optional[float] = None, lote_max: Optional[int] = None):
+        self.tabla = tabla
+        self._ao_gravar = ao_gravar
+        self._janela_ms = janela_ms
+        self._lote_max = lote_max
+        self._pendentes: list[tuple[dict, asyncio.Future]] = []
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._gravacoes: set[asyncio.Task] = set()
+        self._vencido = False # La ventana terminó con un lote en vuelo: sale apenas termine
+        self.linhas = 0
+        self.lotes = 0 # Transacciones confirmadas
+        self.lotes_reintentados = 0 # Lotes que pasaron a una fila por SAVEPOINT
+        self.maior_lote = 0
+
+    @property
+    def janela_s(self) -> float:
+        return (self._janela_ms if self._janela_ms is not None else settings.AGRUPAR_JANELA_MS) / 1000
+
+    @property
+    def lote_max(self) -> int:
+        return max(self._lote_max or settings.AGRUPAR_LOTE_MAX, 1)
+
+    async def inserir(self, dados: dict) -> tuple[int, Any]:
+        """Encola una fila y espera a que su lote se confirme: devuelve (id, created_at)."""
+        loop = asyncio.get_running_loop()
+        futuro = loop.create_future()
+        self._pendentes.append((dados, futuro))
+        if len(self._pendentes) >= self.lote_max:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.janela_s, self._ao_vencer_janela)
+        resultado = await futuro
+        # El lote se grabó en otra tarea: la marca de read-your-writes es de quien pidió la fila
+        marcar_escrita()
+        return resultado
+
+    def _ao_vencer_janela(self) -> None:
+        self._temporizador = None
+        if self._gravacoes:
+            self._vencido = True
+        else:
+            self._despachar()
+
+    def _despachar(self) -> None:
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        self._vencido = False
+        lote, self._pendentes = self._pendentes, []
+        if not lote:
+            return
+        tarefa = asyncio.get_running_loop().create_task(self._gravar(lote))
+        self._gravacoes.add(tarefa)
+        tarefa.add_done_callback(self._ao_terminar)
+
+    def _ao_terminar(self, tarefa: asyncio.Task) -> None:
+        self._gravacoes.discard(tarefa)
+        if self._vencido and not self._gravacoes:
+            self._despachar()
+
+    async def _gravar(self, lote: list[tuple[dict, asyncio.Future]]) -> None:
+        # Quien canceló su llamada (cliente desconectado) ya no espera la fila
+        lote = [(dados, futuro) for dados, futuro in lote if not futuro.done()]
+        if not lote:
+            return
+        filas = [dados for dados, _ in lote]
+        try:
+            try:
+                resultados = await self._inserir_lote(filas)
+            except Exception as e:
+                logger.warning("Lote de %d filas en %s falló (%s); se reintenta fila por fila", len(filas), self.tabla.name, e)
+                self.lotes_reintentados += 1
+                resultados = await self._inserir_separadas(filas)
+        except Exception as e:
+            resultados = [e] * len(lote)
+        for (_, futuro), resultado in zip(lote, resultados):
+            if futuro.done():
+                continue
+            if isinstance(resultado, Exception):
+                futuro.set_exception(resultado)
+            else:
+                futuro.set_result(resultado)
+
+    async def _inserir_lote(self, filas: list[dict]) -> list[tuple[int, Any]]:
+        statement = insercao_lote(self.tabla, retorno=(self.tabla.c.created_at,))
+        async with get_async_session() as db:
+            # En orden de n: la fila i del resultado es la de filas[i]
+            linhas = (await db.exec(statement, params={"lote": filas})).all()
+            if self._ao_gravar is not None:
+                await self._ao_gravar(db, [linha.id for linha in linhas])
+        self._contar(len(filas))
+        return [(linha.id, linha.created_at) for linha in linhas]
+
+    async def _inserir_separadas(self, filas: list[dict]) -> list:
+        resultados: list = []
+        statement = insert(self.tabla).returning(self.tabla.c.id, self.tabla.c.created_at)
+        async with get_async_session() as db:
+            for dados in filas:
+                try:
+                    async with db.begin_nested():
+                        linha = (await db.exec(statement, params={"dados": dados})).one()
+                    resultados.append((linha[0], linha[1]))
+                except Exception as e:
+                    resultados.append(e)
+            ids = [resultado[0] for resultado in resultados if not isinstance(resultado, Exception)]
+            if ids and self._ao_gravar is not None:
+                await self._ao_gravar(db, ids)
+        self._contar(len(ids))
+        return resultados
+
+    def _contar(self, linhas: int) -> None:
+        self.linhas += linhas
+        self.lotes += 1
+        self.maior_lote = max(self.maior_lote, linhas)
+
+    def estatisticas(self) -> dict:
+        return {
+            "linhas": self.linhas,
+            "lotes": self.lotes,
+            "linhas_por_lote": round(self.linhas / self.lotes, 2) if self.lotes else None,
+            "maior_lote": self.maior_lote,
+            "lotes_reintentados": self.lotes_reintentados,
+            "pendentes": len(self._pendentes),
+        }
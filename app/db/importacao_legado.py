@@ -0,0 +1,418 @@
+# app/db/importacao_legado.py
+"""
+Importación de los datos del esquema relacional antiguo (archivo.sql) a las
+tablas JSONB de la aplicación:
+
+    python -m app.db.importacao_legado --origen postgresql://usuario@host/base_antigua \\
+        [--destino URL] [--etapas obras,pessoas,locais,precos,tarefas] [--lote 5000] [--paralelo 4]
+
+Cada etapa lee su tabla de origen en orden de id con un cursor del lado del
+servidor (FETCH de a --lote filas, en una transacción REPEATABLE READ de solo
+lectura), convierte cada fila al formato de 'dados' (ObraDados, PessoaDados,
+TarefaDados) y reparte los lotes entre --paralelo conexiones al destino, que los
+graban con COPY. La cola entre el lector y las conexiones es acotada, así que
+la memoria no depende del tamaño de la tabla: como mucho unos 3 x paralelo lotes.
+
+Cada lote se graba junto con su fila en importacao_legado_lotes (misma
+transacción), que registra el tramo de ids (anterior_id, ultimo_id] que cubre.
+Si la importación se corta, volver a ejecutarla salta los tramos ya grabados y
+sigue desde ahí; para rehacer una etapa desde cero hay que vaciar su tabla de
+destino y borrar sus filas de importacao_legado_lotes.
+
+Los ids se conservan (las tarefas apuntan a pessoas, locales y precios por id) y
+al final de cada etapa la secuencia de la tabla se mueve más allá del mayor.
+Las filas que no pasan la conversión no detienen la importación: quedan en
+importacao_legado_lotes.rejeitadas con el motivo (entre ellas, las tarefas cuyo
+local no existe). Las tarefas sin local se importan sin obra (obra_id 0). También las tarefas con un id
+que ya existe: la PK de tarefas es (id, obra_id) y no lo impediría. Después de las tarefas, las
+obras con al menos TAREFAS_PARTICAO_MIN_LINHAS pasan a su propia partición
+(app/db/particoes.py).
+"""
+import argparse
+import json
+import queue
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Callable, Iterator, Optional
+
+import psycopg
+from psycopg.types.json import Jsonb
+
+from app.core.config import settings
+from app.db.notificacoes import CANAL_CACHE, _dsn_libpq
+from app.db.particoes import distribuir
+
+# Misma tolerancia que validar_equipe (app/server/main.py) y el checar_soma_100_tarefa antiguo
+TOLERANCIA_PERCENTUAL = 0.01
+
+class FilaRechazada(Exception):
+    """La fila de origen no se puede convertir; el mensaje es el motivo."""
+
+@dataclass(frozen=True)
+class Etapa:
+    nombre: str
+    tabla: str # Tabla de destino
+    columnas: tuple[str, ...]
+    consulta: str # Sobre el esquema antiguo; la primera columna es el id y recibe %(desde)s
+    transformar: Callable[[tuple], tuple]
+    secuencia: bool = True # Ajustar la secuencia de 'id' al terminar
+    entidad_cache: Optional[str] = None # Payload '<entidad>:*' en CANAL_CACHE al terminar
+    # La PK no cubre el id solo (tarefas: (id, obra_id)): los ids ya grabados se rechazan antes del COPY
+    id_sin_pk: bool = False
+
+def _sin_nulos(dados: dict) -> dict:
+    return {clave: valor for clave, valor in dados.items() if valor is not None}
+
+def _texto_numero(valor: Optional[Decimal]) -> Optional[str]:
+    """matricula es numeric en el esquema antiguo y texto en PessoaObraAssociada (sin '.0' ni exponente)."""
+    return None if valor is None else format(valor.normalize(), "f")
+
+def _obra(fila: tuple) -> tuple:
+    obra_id, nome = fila
+    return obra_id, json.dumps({"nome": nome})
+
+def _pessoa(fila: tuple) -> tuple:
+    # data_admissao y salario_categoria no tienen campo en PessoaDados y no se importan
+    id_, nome, matricula, funcao, situacao, obra_id, obra_nome = fila
+    dados = _sin_nulos({"nome_completo": nome, "situacao_atual": situacao})
+    dados["obras_associadas"] = [] if obra_id is None else [_sin_nulos({
+        "obra_id_ref": obra_id, "obra_nome_ref": obra_nome,
+        "matricula_obra": _texto_numero(matricula), "funcao_na_obra": funcao,
+    })]
+    return id_, json.dumps(dados)
+
+def _local(fila: tuple) -> tuple:
+    return fila
+
+def _preco(fila: tuple) -> tuple:
+    id_, _, _, preco, _, inicio, fim, _ = fila
+    # Restricciones de precos_tarefa_local que el esquema antiguo no tenía
+    if preco < 0:
+        raise FilaRechazada(f"preco negativo ({preco})")
+    if inicio is not None and fim is not None and fim < inicio:
+        raise FilaRechazada(f"validade_fim ({fim}) anterior a validade_inicio ({inicio})")
+    return fila
+
+def _equipe(responsaveis: Optional[list]) -> list[dict]:
+    """
+    tarefa_responsaveis de una tarefa ([responsavel_id, percentual, eh_principal]
+    ordenados por responsavel_id) con las reglas de TarefaCriar. Sin principal
+    marcado (el esquema antiguo no lo exigía) lo es el de mayor percentual.
+    """
+    if not responsaveis:
+        return []
+    soma = sum(percentual for _, percentual, _ in responsaveis)
+    if abs(soma - 100) > TOLERANCIA_PERCENTUAL:
+        raise FilaRechazada(f"la suma de los percentuales es {soma:.2f}")
+    principais = sum(1 for _, _, principal in responsaveis if principal)
+    if principais > 1:
+        raise FilaRechazada(f"hay {principais} responsables principales")
+    if principais == 0:
+        # max() devuelve el primero entre iguales: a igual percentual, el menor responsavel_id
+        principal = max(range(len(responsaveis)), key=lambda i: responsaveis[i][1])
+        responsaveis = [[p, pct, i == principal] for i, (p, pct, _) in enumerate(responsaveis)]
+    return [{"pessoa_id": p, "percentual": float(pct), "eh_principal": bool(principal)} for p, pct, principal in responsaveis]
+
+def _tarefa(fila: tuple) -> tuple:
+    id_, nome, created_at, inicio, fim, local_id, tipo_id, preco_id, obra_id, responsaveis = fila
+    if local_id is not None and obra_id is None:
+        # locais.obra_id es NOT NULL en el esquema antiguo: sólo pasa si el local no existe
+        raise FilaRechazada(f"el local {local_id} no existe o no tiene obra")
+    dados = _sin_nulos({
+        "nome": nome, "obra_id_ref": obra_id, "local_id": local_id, "tipos_tarefa_id": tipo_id,
+        "preco_tarefa_local_id": preco_id,
+        "inicio": inicio.isoformat() if inicio else None, "fim": fim.isoformat() if fim else None,
+    })
+    dados["responsaveis"] = _equipe(responsaveis)
+    # obra_id es la clave de partición de tarefas: el COPY elige la partición antes del trigger.
+    # Sin local (fk_tarefas_local es ON DELETE SET NULL) la tarefa no tiene obra y va a
+    # obra_id 0, las tarefas sin obra de tarefas_padrao, como una creada sin local_id
+    return id_, json.dumps(dados), created_at, 0 if local_id is None else obra_id
+
+# En el orden en que se importan: las tarefas referencian locales (tarefas.hierarquia
+# la completa un trigger desde locais_hierarquia) y precios (obras_resumo.valor)
+ETAPAS = {etapa.nombre: etapa for etapa in (
+    Etapa(
+        "obras", "obras", ("id", "dados"),
+        "SELECT o.obra_id, o.nome FROM obras o WHERE o.obra_id > %(desde)s ORDER BY o.obra_id",
+        _obra, entidad_cache="obras",
+    ),
+    Etapa(
+        "pessoas", "pessoas", ("id", "dados"),
+        """
+        SELECT r.id, r.nome, r.matricula, r.funcao, r.situacao, r.obra_id,
+               (SELECT o.nome FROM obras o WHERE o.obra_id = r.obra_id)
+          FROM responsaveis r
+         WHERE r.id > %(desde)s ORDER BY r.id
+        """,
+        _pessoa, entidad_cache="pessoas",
+    ),
+    Etapa(
+        # La cadena local_* -> apartamentos -> pavimentos -> blocos -> modulos, aplanada en una fila
+        "locais", "locais_hierarquia",
+        ("local_id", "tipo_local", "nome", "obra_id", "modulo_id", "bloco_id", "pavimento_id", "apartamento_id"),
+        """
+        SELECT l.id, l.tipo_local::text, l.nome_display, l.obra_id,
+               coalesce(lm.modulo_id, b.modulo_id), b.id, a.pavimento_id, a.id
+          FROM locais l
+          LEFT JOIN local_apartamento la ON la.local_id = l.id
+          LEFT JOIN local_ambiente_interno_apartamento lai ON lai.local_id = l.id
+          LEFT JOIN apartamentos a ON a.id = coalesce(la.apartamento_id, lai.apartamento_id)
+          LEFT JOIN pavimentos p ON p.id = a.pavimento_id
+          LEFT JOIN (
+                SELECT local_id, bloco_id FROM local_area_comum_externa_bloco
+                UNION ALL SELECT local_id, bloco_id FROM local_area_comum_interna_bloco
+                UNION ALL SELECT local_id, bloco_id FROM local_area_comum_fachada_bloco
+               ) lb ON lb.local_id = l.id
+          LEFT JOIN blocos b ON b.id = coalesce(lb.bloco_id, p.bloco_id)
+          LEFT JOIN local_area_comum_modulo lm ON lm.local_id = l.id
+         WHERE l.id > %(desde)s ORDER BY l.id
+        """,
+        _local, secuencia=False,
+    ),
+    Etapa(
+        "precos", "precos_tarefa_local",
+        ("id", "tipos_tarefa_id", "local_id", "preco", "unidade_medida", "validade_inicio", "validade_fim", "created_at"),
+        """
+        SELECT p.id, p.tipos_tarefa_id, p.local_id, p.preco, p.unidade_medida, p.validade_inicio, p.validade_fim, p.created_at
+          FROM precos_tarefa_local p
+         WHERE p.id > %(desde)s ORDER BY p.id
+        """,
+        _preco, entidad_cache="precos",
+    ),
+    Etapa(
+        # Subconsultas correlacionadas en vez de joins: el plan es el recorrido del
+        # índice de la PK de tarefas, que entrega filas desde el primer FETCH sin ordenar la tabla
+        "tarefas", "tarefas", ("id", "dados", "created_at", "obra_id"),
+        """
+        SELECT t.id, t.nome, t.created_at, t.inicio, t.fim, t.local_id, t.tipos_tarefa_id, t.preco_tarefa_local_id,
+               (SELECT l.obra_id FROM locais l WHERE l.id = t.local_id),
+               (SELECT json_agg(json_build_array(r.responsavel_id, r.percentual, r.eh_principal) ORDER BY r.responsavel_id)
+                  FROM tarefa_responsaveis r WHERE r.tarefa_id = t.id)
+          FROM tarefas t
+         WHERE t.id > %(desde)s ORDER BY t.id
+        """,
+        _tarefa, entidad_cache="tarefas", id_sin_pk=True,
+    ),
+)}
+
+def tramos_grabados(conn: psycopg.Connection, etapa: str) -> tuple[int, list[tuple[int, int]]]:
+    """
+    Ids hasta donde la etapa está completa (los lotes se confirman en cualquier
+    orden, así que es el final de la cadena de tramos que empieza en 0) y los
+    tramos grabados más allá de ese punto.
+    """
+    siguiente = dict(conn.execute(
+        "SELECT anterior_id, ultimo_id FROM importacao_legado_lotes WHERE etapa = %s", (etapa,)
+    ).fetchall())
+    desde = 0
+    while desde in siguiente:
+        desde = siguiente.pop(desde)
+    return desde, sorted((a, u) for a, u in siguiente.items() if a >= desde)
+
+def lotes(filas: Iterator[list[tuple]], desde: int, tramos: list[tuple[int, int]], tamano: int) -> Iterator[tuple[int, int, list[tuple]]]:
+    """
+    Agrupa las filas (en orden de id) en lotes (anterior_id, ultimo_id, filas) de
+    hasta 'tamano' filas, saltando las que caen en 'tramos' ya grabados. Los lotes
+    quedan encadenados (el anterior_id de cada uno es el ultimo_id del previo) para
+    que tramos_grabados encuentre el punto de reanudación.
+    """
+    anterior, actual, i = desde, [], 0
+    for bloque in filas:
+        for fila in bloque:
+            id_ = fila[0]
+            while i < len(tramos) and id_ > tramos[i][1]:
+                i += 1
+            if i < len(tramos) and id_ > tramos[i][0]:
+                inicio_tramo, fin_tramo = tramos[i]
+                if actual or anterior < inicio_tramo:
+                    yield anterior, inicio_tramo, actual
+                    actual = []
+                anterior = max(anterior, fin_tramo)
+                continue
+            actual.append(fila)
+            if len(actual) >= tamano:
+                yield anterior, id_, actual
+                anterior, actual = id_, []
+    if actual:
+        yield anterior, actual[-1][0], actual
+
+def _leer(conn: psycopg.Connection, etapa: Etapa, desde: int, tamano: int) -> Iterator[list[tuple]]:
+    with conn.cursor(name=f"importacion_{etapa.nombre}") as cur:
+        cur.execute(etapa.consulta, {"desde": desde})
+        while bloque := cur.fetchmany(tamano):
+            yield bloque
+
+class _Progreso:
+    """Totales de una etapa, sumados por las conexiones de escritura."""
+
+    def __init__(self, etapa: str, informar: Callable[[str], None]):
+        self.etapa = etapa
+        self.linhas = 0
+        self.rejeitadas = 0
+        self.lotes = 0
+        self.inicio = time.perf_counter()
+        self._informar = informar
+        self._ultimo_aviso = self.inicio
+        self._lock = threading.Lock()
+
+    def sumar(self, linhas: int, rejeitadas: int) -> None:
+        with self._lock:
+            self.linhas += linhas
+            self.rejeitadas += rejeitadas
+            self.lotes += 1
+            ahora = time.perf_counter()
+            if ahora - self._ultimo_aviso >= 5:
+                self._ultimo_aviso = ahora
+                self._informar(f"{self.etapa}: {self.linhas} filas ({self.linhas / (ahora - self.inicio):.0f}/s), "
+                               f"{self.rejeitadas} rechazadas")
+
+def _escribir(dsn: str, etapa: Etapa, cola: queue.Queue, progreso: _Progreso, detener: threading.Event,
+              errores: list) -> None:
+    copy_sql = f"COPY {etapa.tabla} ({', '.join(etapa.columnas)}) FROM STDIN"
+    try:
+        with psycopg.connect(dsn, autocommit=True) as conn:
+            while not detener.is_set():
+                try:
+                    lote = cola.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if lote is None:
+                    return
+                anterior, ultimo, filas = lote
+                convertidas, rechazadas = [], []
+                for fila in filas:
+                    try:
+                        convertidas.append(etapa.transformar(fila))
+                    except FilaRechazada as e:
+                        rechazadas.append({"id": fila[0], "motivo": str(e)})
+                with conn.transaction(), conn.cursor() as cur:
+                    # Chequeo de responsaveis (diferido hasta el commit) al final del COPY, antes
+                    # del trigger de obras_resumo: el lock de la fila de resumen de la obra, que
+                    # serializa las conexiones, queda tomado solo hasta el commit inmediato
+                    cur.execute("SET CONSTRAINTS ALL IMMEDIATE")
+                    if etapa.id_sin_pk and convertidas:
+                        cur.execute(f"SELECT id FROM {etapa.tabla} WHERE id = ANY(%s)", ([fila[0] for fila in convertidas],))
+                        existentes = {id_ for id_, in cur.fetchall()}
+                        if existentes:
+                            rechazadas += [{"id": fila[0], "motivo": f"el id ya existe en {etapa.tabla}"}
+                                           for fila in convertidas if fila[0] in existentes]
+                            convertidas = [fila for fila in convertidas if fila[0] not in existentes]
+                    if convertidas:
+                        with cur.copy(copy_sql) as copy:
+                            for fila in convertidas:
+                                copy.write_row(fila)
+                    cur.execute(
+                        "INSERT INTO importacao_legado_lotes (etapa, anterior_id, ultimo_id, linhas, rejeitadas) "
+                        "VALUES (%s, %s, %s, %s, %s)",
+                        (etapa.nombre, anterior, ultimo, len(convertidas), Jsonb(rechazadas)),
+                    )
+                progreso.sumar(len(convertidas), len(rechazadas))
+    except BaseException as e:
+        errores.append(e)
+        detener.set()
+
+def _finalizar(conn: psycopg.Connection, etapa: Etapa) -> None:
+    with conn.transaction():
+        if etapa.secuencia:
+            conn.execute(
+                f"SELECT setval(pg_get_serial_sequence('{etapa.tabla}', 'id'), coalesce(max(id), 0) + 1, false) FROM {etapa.tabla}"
+            )
+        if etapa.entidad_cache:
+            # Procesos del servidor con CACHE_NOTIFY descartan lo que tengan en caché de la entidad
+            conn.execute("SELECT pg_notify(%s, %s)", (CANAL_CACHE, f"{etapa.entidad_cache}:*"))
+    conn.execute(f"ANALYZE {etapa.tabla}")
+
+def importar_etapa(origen: str, destino: str, etapa: Etapa, tamano: int, paralelo: int,
+                   informar: Callable[[str], None] = print) -> dict:
+    with psycopg.connect(destino, autocommit=True) as conn:
+        desde, tramos = tramos_grabados(conn, etapa.nombre)
+    progreso = _Progreso(etapa.nombre, informar)
+    cola: queue.Queue = queue.Queue(maxsize=paralelo * 2)
+    detener = threading.Event()
+    errores: list = []
+    hilos = [
+        threading.Thread(target=_escribir, args=(destino, etapa, cola, progreso, detener, errores),
+                         name=f"importacion-{etapa.nombre}-{i}", daemon=True)
+        for i in range(paralelo)
+    ]
+    for hilo in hilos:
+        hilo.start()
+
+    def encolar(elemento) -> bool:
+        while not detener.is_set():
+            try:
+                cola.put(elemento, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    try:
+        with psycopg.connect(origen) as conn:
+            # Una sola foto del origen aunque se siga escribiendo en él durante la importación
+            conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            conn.read_only = True
+            for lote in lotes(_leer(conn, etapa, desde, tamano), desde, tramos, tamano):
+                if not encolar(lote):
+                    break
+        for _ in hilos:
+            encolar(None)
+    except BaseException:
+        detener.set() # Error o Ctrl-C leyendo: los lotes en curso terminan (o no) atómicamente
+        raise
+    finally:
+        for hilo in hilos:
+            hilo.join()
+    if errores:
+        raise errores[0]
+
+    with psycopg.connect(destino, autocommit=True) as conn:
+        _finalizar(conn, etapa)
+    segundos = time.perf_counter() - progreso.inicio
+    return {
+        "reanudada_desde": desde, "linhas": progreso.linhas, "rejeitadas": progreso.rejeitadas,
+        "lotes": progreso.lotes, "segundos": round(segundos, 3),
+        "linhas_por_s": round(progreso.linhas / segundos) if segundos else None,
+    }
+
+def importar(origen: str, destino: Optional[str] = None, etapas: Optional[list[str]] = None,
+             tamano: Optional[int] = None, paralelo: Optional[int] = None,
+             informar: Callable[[str], None] = print) -> dict:
+    origen = _dsn_libpq(origen)
+    destino = _dsn_libpq(destino or settings.DATABASE_URL)
+    desconocidas = set(etapas or []) - set(ETAPAS)
+    if desconocidas:
+        raise ValueError(f"Etapas desconocidas: {', '.join(sorted(desconocidas))} (válidas: {', '.join(ETAPAS)})")
+    resultado = {}
+    for nombre, etapa in ETAPAS.items():
+        if etapas and nombre not in etapas:
+            continue
+        resultado[nombre] = importar_etapa(origen, destino, etapa, tamano or settings.IMPORTACION_LOTE,
+                                           paralelo or settings.IMPORTACION_PARALELO, informar)
+        informar(f"{nombre}: {resultado[nombre]}")
+    if "tarefas" in resultado:
+        # Fuera de los lotes: cada obra grande pasa a su partición en su propia transacción
+        resultado["particoes"] = distribuir(destino, informar=informar)
+        informar(f"particoes: {resultado['particoes']}")
+    return resultado
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db.importacao_legado", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--origen", required=True, help="Base con el esquema antiguo (URL de libpq o de SQLAlchemy)")
+    parser.add_argument("--destino", help="Base de la aplicación (por defecto DATABASE_URL)")
+    parser.add_argument("--etapas", help=f"Separadas por coma (por defecto todas: {','.join(ETAPAS)})")
+    parser.add_argument("--lote", type=int, help=f"Filas por COPY (por defecto {settings.IMPORTACION_LOTE})")
+    parser.add_argument("--paralelo", type=int, help=f"Conexiones escribiendo (por defecto {settings.IMPORTACION_PARALELO})")
+    args = parser.parse_args()
+    resultado = importar(args.origen, args.destino, args.etapas.split(",") if args.etapas else None,
+                         args.lote, args.paralelo, informar=lambda linea: print(linea, file=sys.stderr))
+    print(json.dumps(resultado, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
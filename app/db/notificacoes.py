@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Awaitable, Callable, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Canal de Postgres por el que los procesos del servidor se avisan de escrituras
+# que invalidan cachés (payload: "<entidad>:<id>" o "<entidad>:*")
+CANAL_CACHE = "mcp_cache"
+
+# Canal de los triggers *_alteracoes_* de obras/pessoas/tarefas (migración e3c9a5f17b84),
+# usado por las suscripciones a resources (app/server/assinaturas.py)
+CANAL_ALTERACOES = "mcp_alteracoes"
+
+# callback(canal, payload); payload None = se perdió la conexión y pudieron
+# perderse notificaciones, hay que asumir que todo cambió
+CallbackNotificacao = Callable[[str, Optional[str]], Awaitable[None] | None]
+
+def _dsn_libpq(url: str) -> str:
+    """URL de SQLAlchemy ('postgresql+psycopg://...') convertida a una URL que entiende libpq."""
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+class OuvinteNotificacoes:
+    """
+    Escucha canales de Postgres (LISTEN) en una conexión dedicada, fuera del pool,
+    y reparte cada NOTIFY a los callbacks registrados. Se reconecta solo si la
+    conexión se cae.
+    """
+
+    def __init__(self):
+        self._callbacks: dict[str, list[CallbackNotificacao]] = defaultdict(list)
+        self._tarefa: Optional[asyncio.Task] = None
+        self.conectado = False
+        self.conexoes = 0 # Conexiones LISTEN abiertas (>1 = hubo reconexión)
+        self.recebidas = 0
+
+    def registrar(self, canal: str, callback: CallbackNotificacao) -> None:
+        self._callbacks[canal].append(callback)
+
+    def iniciar(self) -> None:
+        """Arranca la escucha en segundo plano si no está corriendo (idempotente)."""
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.get_running_loop().create_task(self._executar())
+
+    async def parar(self) -> None:
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    async def _despachar(self, canal: str, payload: Optional[str]) -> None:
+        for callback in self._callbacks.get(canal, []):
+            try:
+                resultado = callback(canal, payload)
+                if asyncio.iscoroutine(resultado):
+                    await resultado
+            except Exception:
+                logger.exception("Error procesando notificación del canal %s", canal)
+
+    async def _executar(self) -> None:
+        import psycopg # Sólo quien escucha necesita el driver (ver app/db/session.py)
+
+        espera = 1.0
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    _dsn_libpq(settings.DATABASE_URL), autocommit=True
+                ) as conn:
+                    for canal in self._callbacks:
+                        await conn.execute(f'LISTEN "{canal}"')
+                    self.conectado = True
+                    self.conexoes += 1
+                    espera = 1.0
+                    # Lo ocurrido mientras no escuchábamos es desconocido
+                    for canal in self._callbacks:
+                        await self._despachar(canal, None)
+                    async for notificacao in conn.notifies():
+                        self.recebidas += 1
+                        await self._despachar(notificacao.channel, notificacao.payload)
+            except asyncio.CancelledError:
+                self.conectado = False
+                raise
+            except Exception as e:
+                self.conectado = False
+                logger.warning("Conexión LISTEN perdida (%s); reintentando en %.0fs", e, espera)
+                await asyncio.sleep(espera)
+                espera = min(espera * 2, 30.0)
+
+    def estado(self) -> dict:
+        return {
+            "ativo": self._tarefa is not None and not self._tarefa.done(),
+            "conectado": self.conectado,
+            "conexoes": self.conexoes,
+            "canais": sorted(self._callbacks),
+            "notificacoes_recebidas": self.recebidas,
+        }
+
+ouvinte = OuvinteNotificacoes()
+
+async def notificar(db, canal: str, payload: str) -> None:
+    """
+    Emite un NOTIFY dentro de la transacción de la sesión 'db': Postgres sólo lo
+    entrega a los que escuchan cuando la transacción hace commit.
+    """
+    await db.exec(text("SELECT pg_notify(:canal, :payload)"), params={"canal": canal, "payload": payload})
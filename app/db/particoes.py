@@ -0,0 +1,172 @@
+# app/db/particoes.py
+"""
+Particiones de tarefas por obra (migración f1b6d3a8c452).
+
+tarefas está particionada por LIST (obra_id). Las obras chicas comparten la
+partición tarefas_padrao; una obra pasa a su propia partición tarefas_obra_<id>
+cuando llega a TAREFAS_PARTICAO_MIN_LINHAS tarefas. Las consultas con obra_id
+(tarefas://obra/..., tarefas://bloco/..., precificar_tarefas) leen sólo esa
+partición; las que buscan sólo por id planifican y bloquean todas, por eso una
+partición por obra chica costaría más de lo que ahorra.
+
+    python -m app.db.particoes estado
+    python -m app.db.particoes distribuir [--minimo 10000]
+    python -m app.db.particoes arquivar OBRA
+    python -m app.db.particoes restaurar OBRA
+
+'distribuir' crea, una obra por transacción, las particiones de las obras que ya
+pasaron el mínimo (después de la migración o de una importación). El servidor
+hace lo mismo al final de criar_tarefas_lote con las obras del lote que quedaron
+en tarefas_padrao (particionar_obras). 'arquivar' saca la partición de una obra
+terminada de tarefas (DETACH) y la deja en el schema arquivo; 'restaurar' la
+vuelve a conectar.
+"""
+import argparse
+import json
+import logging
+import sys
+from typing import TYPE_CHECKING, Callable, Iterable, Optional
+
+import sqlalchemy as sa
+
+from app.core.config import settings
+from app.db.notificacoes import _dsn_libpq
+from app.db.session import get_async_session
+
+if TYPE_CHECKING:
+    import psycopg
+
+logger = logging.getLogger(__name__)
+
+_contadores = {"criadas": 0, "adiadas": 0}
+
+async def particionar_obras(obras: Iterable[int], minimo: Optional[int] = None) -> int:
+    """
+    Crea las particiones de las 'obras' que llegaron a 'minimo' tarefas (por defecto
+    TAREFAS_PARTICAO_MIN_LINHAS), en una transacción propia. Si los locks no salen en
+    PARTICOES_LOCK_TIMEOUT_MS no hace nada: la obra sigue en tarefas_padrao y se
+    vuelve a intentar en la próxima escritura. Devuelve cuántas particiones creó.
+    """
+    minimo = settings.TAREFAS_PARTICAO_MIN_LINHAS if minimo is None else minimo
+    obras = sorted({obra for obra in obras if obra})
+    if not obras or minimo <= 0:
+        return 0
+    try:
+        async with get_async_session() as db:
+            await db.exec(sa.text(f"SET LOCAL lock_timeout = {int(settings.PARTICOES_LOCK_TIMEOUT_MS)}"))
+            criadas = (await db.exec(
+                sa.text("SELECT tarefas_criar_particoes(:obras, :minimo)"), params={"obras": obras, "minimo": minimo}
+            )).scalar_one()
+    except Exception as e:
+        _contadores["adiadas"] += 1
+        logger.warning("No se pudieron crear las particiones de las obras %s (%s); se reintenta más adelante", obras, e)
+        return 0
+    _contadores["criadas"] += criadas
+    if criadas:
+        logger.info("%d particiones de tarefas creadas (obras %s)", criadas, obras)
+    return criadas
+
+def estatisticas() -> dict:
+    return dict(_contadores)
+
+# --- Conexión síncrona (CLI, importación, benchmarks/semear.py) ---
+# app/server/main.py importa este módulo por particionar_obras: psycopg se importa
+# dentro de cada función para no cargar el driver en el arranque (ver app/db/session.py)
+def obras_candidatas(conn: "psycopg.Connection", minimo: int) -> list[tuple[int, int]]:
+    """(obra, tarefas) de las obras todavía en tarefas_padrao con al menos 'minimo' tarefas."""
+    return conn.execute(
+        """
+        SELECT obra_id, sum(tarefas)::bigint FROM obras_resumo
+         WHERE obra_id <> 0 AND to_regclass('tarefas_obra_' || obra_id) IS NULL
+         GROUP BY obra_id HAVING sum(tarefas) >= %s
+         ORDER BY obra_id
+        """,
+        (max(minimo, 1),),
+    ).fetchall()
+
+def distribuir(dsn: str, minimo: Optional[int] = None, informar: Callable[[str], None] = print) -> dict:
+    """
+    Crea las particiones de todas las obras con al menos 'minimo' tarefas, una
+    transacción por obra: cada una bloquea tarefas_padrao sólo mientras copia sus
+    filas y libera los locks en su commit.
+    """
+    import psycopg
+
+    minimo = settings.TAREFAS_PARTICAO_MIN_LINHAS if minimo is None else minimo
+    criadas: list[int] = []
+    with psycopg.connect(_dsn_libpq(dsn), autocommit=True) as conn:
+        candidatas = obras_candidatas(conn, minimo)
+        for obra, tarefas in candidatas:
+            with conn.transaction():
+                conn.execute(f"SET LOCAL lock_timeout = {int(settings.PARTICOES_LOCK_TIMEOUT_MS)}")
+                if conn.execute("SELECT tarefas_criar_particao(%s)", (obra,)).fetchone()[0]:
+                    criadas.append(obra)
+                    informar(f"obra {obra}: {tarefas} tarefas en tarefas_obra_{obra}")
+        if criadas:
+            conn.execute("ANALYZE tarefas")
+    return {"minimo": minimo, "candidatas": len(candidatas), "criadas": criadas}
+
+def estado(dsn: str) -> dict:
+    """Particiones de tarefas (con filas estimadas), particiones archivadas y obras que ya pasaron el mínimo."""
+    import psycopg
+
+    with psycopg.connect(_dsn_libpq(dsn), autocommit=True) as conn:
+        particoes = conn.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), greatest(c.reltuples, 0)::bigint
+              FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+             WHERE i.inhparent = 'tarefas'::regclass
+             ORDER BY c.relname
+            """
+        ).fetchall()
+        arquivadas = conn.execute(
+            "SELECT c.relname FROM pg_class c WHERE c.relnamespace = to_regnamespace('arquivo') AND c.relkind = 'r' ORDER BY 1"
+        ).fetchall()
+        candidatas = obras_candidatas(conn, settings.TAREFAS_PARTICAO_MIN_LINHAS)
+    return {
+        "particoes": [{"nome": nome, "valores": valores, "linhas_estimadas": linhas} for nome, valores, linhas in particoes],
+        "arquivadas": [nome for nome, in arquivadas],
+        "candidatas": [{"obra_id": obra, "tarefas": tarefas} for obra, tarefas in candidatas],
+    }
+
+def _executar_funcao(dsn: str, funcao: str, obra: int) -> str:
+    import psycopg
+
+    with psycopg.connect(_dsn_libpq(dsn), autocommit=True) as conn:
+        with conn.transaction():
+            conn.execute(f"SET LOCAL lock_timeout = {int(settings.PARTICOES_LOCK_TIMEOUT_MS)}")
+            return conn.execute(f"SELECT {funcao}(%s)", (obra,)).fetchone()[0]
+
+def arquivar(dsn: str, obra: int) -> str:
+    """DETACH de la partición de la obra (creada antes si la obra estaba en tarefas_padrao) al schema arquivo."""
+    return _executar_funcao(dsn, "tarefas_arquivar_obra", obra)
+
+def restaurar(dsn: str, obra: int) -> str:
+    return _executar_funcao(dsn, "tarefas_restaurar_obra", obra)
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.db.particoes", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--destino", help="Base de la aplicación (por defecto DATABASE_URL)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    comandos.add_parser("estado", help="Particiones, archivadas y obras que ya pasaron el mínimo")
+    distribuir_ = comandos.add_parser("distribuir", help="Crea las particiones de las obras que pasaron el mínimo")
+    distribuir_.add_argument("--minimo", type=int, help=f"Tarefas por obra (por defecto {settings.TAREFAS_PARTICAO_MIN_LINHAS})")
+    for nombre, ayuda in (("arquivar", "Saca la partición de la obra de tarefas (schema arquivo)"),
+                          ("restaurar", "Vuelve a conectar la partición archivada de la obra")):
+        comandos.add_parser(nombre, help=ayuda).add_argument("obra", type=int)
+    args = parser.parse_args()
+    dsn = args.destino or settings.DATABASE_URL
+    if args.comando == "estado":
+        resultado = estado(dsn)
+    elif args.comando == "distribuir":
+        resultado = distribuir(dsn, args.minimo, informar=lambda linea: print(linea, file=sys.stderr))
+    elif args.comando == "arquivar":
+        resultado = {"arquivada": arquivar(dsn, args.obra)}
+    else:
+        resultado = {"restaurada": restaurar(dsn, args.obra)}
+    print(json.dumps(resultado, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
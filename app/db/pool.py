@@ -0,0 +1,66 @@
+import time
+from dataclasses import dataclass
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+@dataclass
+class EstadisticasPool:
+    """Contadores acumulados de checkouts del pool desde que arrancó el proceso."""
+    checkouts: int = 0
+    timeouts: int = 0
+    espera_total_s: float = 0.0
+    espera_max_s: float = 0.0
+
+    def registrar(self, espera_s: float) -> None:
+        self.checkouts += 1
+        self.espera_total_s += espera_s
+        if espera_s > self.espera_max_s:
+            self.espera_max_s = espera_s
+
+class PoolMedido(AsyncAdaptedQueuePool):
+    """
+    AsyncAdaptedQueuePool que mide cuánto espera cada checkout por una conexión
+    (incluye abrir una conexión nueva cuando el pool está en overflow) y cuenta
+    los checkouts que fallan por DB_POOL_TIMEOUT.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estadisticas = EstadisticasPool()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            self.estadisticas.timeouts += 1
+            raise
+        self.estadisticas.registrar(time.perf_counter() - inicio)
+        return conexion
+
+    def recreate(self):
+        # engine.dispose() recrea el pool; conservamos los contadores
+        nuevo = super().recreate()
+        nuevo.estadisticas = self.estadisticas
+        return nuevo
+
+def estado_pool(pool) -> dict:
+    """Snapshot del pool: conexiones en uso/libres/overflow y tiempos de espera."""
+    datos = {
+        "tamanho": pool.size(),
+        "em_uso": pool.checkedout(),
+        "livres": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "max_overflow": pool._max_overflow,
+        "timeout_s": pool.timeout(),
+    }
+    estadisticas = getattr(pool, "estadisticas", None)
+    if estadisticas is not None:
+        media = estadisticas.espera_total_s / estadisticas.checkouts if estadisticas.checkouts else 0.0
+        datos.update({
+            "checkouts": estadisticas.checkouts,
+            "timeouts": estadisticas.timeouts,
+            "espera_media_ms": round(media * 1000, 3),
+            "espera_max_ms": round(estadisticas.espera_max_s * 1000, 3),
+        })
+    return datos
@@ -1,8 +1,111 @@
+import logging
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+from sqlalchemy import event, exc, inspect
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from sqlmodel import create_engine, SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 from app.core.config import settings # Importa la configuración
+from app.db.pool import PoolMedido, estado_pool
+from app.core.metricas import metricas
 
-# echo=True muestra las querys SQL (útil en desarrollo, quitar en producción)
-engine = create_engine(settings.DATABASE_URL, echo=False)
+logger = logging.getLogger(__name__)
+
+def _url_async(url: str) -> str:
+    """
+    Devuelve la URL de conexión usando el driver asíncrono de psycopg (v3).
+    'postgresql://' y 'postgresql+psycopg2://' no tienen variante async, así que se
+    reescriben a 'postgresql+psycopg://', que SQLAlchemy resuelve a psycopg_async.
+    """
+    url_obj = make_url(url)
+    if url_obj.drivername in ("postgresql", "postgresql+psycopg2"):
+        url_obj = url_obj.set(drivername="postgresql+psycopg")
+    return url_obj.render_as_string(hide_password=False)
+
+def _opciones_pool() -> dict:
+    """Parámetros del pool y de conexión tomados de Settings (ver app/core/config.py)."""
+    opciones = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    # TimeZone fijo: created_at sale igual (str() del datetime) sin importar el TimeZone
+    # del servidor, y coincide con el JSON que arma Postgres (_data_json en app/server/main.py)
+    parametros = ["-c TimeZone=UTC"]
+    if settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        parametros.append(f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}")
+    opciones["connect_args"] = {"options": " ".join(parametros)}
+    return opciones
+
+# Los engines se crean en el primer uso y no al importar el módulo: crearlos carga
+# el driver (psycopg), que en modo stdio se pagaría en cada arranque del servidor
+# aunque la sesión MCP sólo liste tools. 'engine' y 'async_engine' siguen
+# disponibles como atributos del módulo (ver __getattr__).
+_engine = None
+_async_engine = None
+_async_engine_leitura = None
+
+def obter_engine():
+    """Engine síncrono (scripts, benchmarks y Alembic), creado en el primer uso."""
+    global _engine
+    if _engine is None:
+        # echo=True muestra las querys SQL (útil en desarrollo, quitar en producción)
+        _engine = create_engine(settings.DATABASE_URL, echo=False, **_opciones_pool())
+        # Cuenta y cronometra cada consulta (resource://metrics y /metrics)
+        metricas.instrumentar_engine(_engine)
+    return _engine
+
+def obter_async_engine():
+    """
+    Engine asíncrono usado por los tools/resources del servidor MCP, para que una
+    query lenta no bloquee el event loop del transporte streamable-http.
+    PoolMedido registra los tiempos de espera por conexión (ver resource://db_pool).
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_engine(
+            _url_async(settings.DATABASE_URL), echo=False, poolclass=PoolMedido, **_opciones_pool()
+        )
+        metricas.instrumentar_engine(_async_engine.sync_engine)
+    return _async_engine
+
+def obter_async_engine_leitura():
+    """
+    Engine asíncrono de la réplica (DATABASE_READ_URL), con su propio pool, o None
+    si no hay réplica configurada. Sólo lo usa get_async_session_leitura().
+    """
+    global _async_engine_leitura
+    if _async_engine_leitura is None and settings.DATABASE_READ_URL:
+        opciones = _opciones_pool()
+        # Una réplica caída no debe hacer esperar el connect_timeout por defecto del sistema
+        opciones["connect_args"] = {**opciones.get("connect_args", {}), "connect_timeout": settings.REPLICA_CONNECT_TIMEOUT_S}
+        _async_engine_leitura = create_async_engine(
+            _url_async(settings.DATABASE_READ_URL), echo=False, poolclass=PoolMedido, **opciones
+        )
+        metricas.instrumentar_engine(_async_engine_leitura.sync_engine)
+    return _async_engine_leitura
+
+def __getattr__(nombre: str):
+    if nombre == "engine":
+        return obter_engine()
+    if nombre == "async_engine":
+        return obter_async_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+
+async def fechar_engines() -> None:
+    """Cierra las conexiones de los pools de los engines ya creados (no crea ninguno)."""
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    if _async_engine_leitura is not None:
+        await _async_engine_leitura.dispose()
+    if _engine is not None:
+        _engine.dispose()
 
 def create_db_and_tables():
     """
@@ -16,23 +119,177 @@ def create_db_and_tables():
     # Esto usualmente se hace importándolos en app/models/__init__.py
     # y luego importando ese __init__ aquí o en main.py
     # from app import models # Ejemplo
+    engine = obter_engine()
+    # tarefas está particionada (migración f1b6d3a8c452): su partición DEFAULT, el trigger que
+    # completa obra_id y tarefas_criar_particao(es) existen sólo en las migraciones. create_all
+    # la dejaría sin particiones y todo INSERT fallaría con "no partition of relation"
+    inspector = inspect(engine)
+    faltantes = [
+        tabla.name for tabla in SQLModel.metadata.sorted_tables
+        if tabla.dialect_options["postgresql"].get("partition_by") and not inspector.has_table(tabla.name)
+    ]
+    if faltantes:
+        raise RuntimeError(
+            f"Las tablas particionadas {', '.join(faltantes)} sólo se crean con las migraciones: "
+            "usar 'alembic upgrade head' en vez de create_db_and_tables()."
+        )
+    with engine.begin() as conn:
+        # Los índices trigram de los modelos necesitan la extensión pg_trgm
+        conn.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
     SQLModel.metadata.create_all(engine)
     print("Tablas verificadas/creadas.")
 
+@contextmanager
 def get_session():
     """
-    Generador para obtener una sesión de base de datos.
-    Maneja el commit y rollback automáticamente.
+    Context manager para obtener una sesión de base de datos (uso: 'with get_session() as db').
+    Maneja el commit y rollback automáticamente y siempre devuelve la conexión al pool.
     """
-    with Session(engine) as session:
+    with Session(obter_engine()) as session:
         try:
             yield session
             session.commit()
         except Exception:
             session.rollback()
             raise
-        finally:
-            session.close()
+
+# --- Lecturas en la réplica (DATABASE_READ_URL) ---
+# Cliente MCP de la petición en curso (lo fija app/server/instrumentacao.py). Tras
+# escribir, sus lecturas van al primario durante LEITURA_APOS_ESCRITA_S segundos, para
+# que vea lo que acaba de grabar aunque la réplica esté atrasada. None = fuera de
+# una petición MCP: la marca vale para todo el proceso.
+cliente_atual: ContextVar[Any] = ContextVar("cliente_atual", default=None)
+# Cliente de una petición sin sesión MCP (stateless_http, SERVIDOR_WORKERS>1): cada
+# petición trae una sesión nueva y puede caer en otro worker, así que no hay con qué
+# asociar la escritura. Sus lecturas van al primario salvo con REPLICA_SEM_SESSAO
+SEM_SESSAO = object()
+_escritas = weakref.WeakKeyDictionary() # cliente -> time.monotonic() de la última escritura
+_escrita_sem_cliente = 0.0
+_replica_indisponivel_ate = 0.0
+estado_replica = {"leituras": 0, "no_primario": 0, "falhas": 0, "ultimo_erro": None}
+
+@event.listens_for(Session, "do_orm_execute")
+def _detectar_escrita(estado) -> None:
+    # INSERT/UPDATE/DELETE ejecutados por la sesión (session.exec de statements core)
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info["escreveu"] = True
+
+@event.listens_for(Session, "after_flush")
+def _detectar_flush(session, contexto) -> None:
+    # Objetos ORM grabados con db.add()/flush()
+    session.info["escreveu"] = True
+
+def marcar_escrita() -> None:
+    """Registra que el cliente actual escribió: sus próximas lecturas van al primario."""
+    global _escrita_sem_cliente
+    cliente = cliente_atual.get()
+    if cliente is None:
+        _escrita_sem_cliente = time.monotonic()
+    elif cliente is not SEM_SESSAO:
+        _escritas[cliente] = time.monotonic()
+
+def _escreveu_ha_pouco() -> bool:
+    janela = settings.LEITURA_APOS_ESCRITA_S
+    agora = time.monotonic()
+    if agora - _escrita_sem_cliente < janela:
+        return True
+    cliente = cliente_atual.get()
+    if cliente is SEM_SESSAO:
+        # Pudo haber escrito en otro worker: sólo el primario garantiza verlo
+        return not settings.REPLICA_SEM_SESSAO
+    return cliente is not None and agora - _escritas.get(cliente, 0.0) < janela
+
+def _engine_leitura() -> Optional[Any]:
+    """Engine de la réplica para esta lectura, o None si tiene que ir al primario."""
+    replica = obter_async_engine_leitura()
+    if replica is None:
+        return None
+    if _escreveu_ha_pouco() or time.monotonic() < _replica_indisponivel_ate:
+        estado_replica["no_primario"] += 1
+        return None
+    return replica
+
+def _replica_falhou(erro: Exception) -> None:
+    global _replica_indisponivel_ate
+    _replica_indisponivel_ate = time.monotonic() + settings.REPLICA_REINTENTO_S
+    estado_replica["falhas"] += 1
+    estado_replica["ultimo_erro"] = str(erro).splitlines()[0] if str(erro) else type(erro).__name__
+    logger.warning("Réplica de lectura no disponible (%s); lecturas en el primario por %.0f s",
+                   estado_replica["ultimo_erro"], settings.REPLICA_REINTENTO_S)
+
+def na_replica(session) -> bool:
+    """True si la sesión de get_async_session_leitura() lee de la réplica."""
+    return bool(session.info.get("replica"))
+
+@asynccontextmanager
+async def get_async_session():
+    """
+    Context manager asíncrono para obtener una sesión de base de datos.
+    Hace commit al salir sin errores y rollback si hay una excepción;
+    la conexión siempre vuelve al pool al cerrar el bloque 'async with'.
+    expire_on_commit=False evita recargas implícitas (que no son posibles
+    en modo async) al leer atributos después del commit.
+    Si la sesión escribió, las lecturas siguientes del mismo cliente MCP van al
+    primario (ver get_async_session_leitura).
+    """
+    async with AsyncSession(obter_async_engine(), expire_on_commit=False) as session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+        if session.info.get("escreveu"):
+            marcar_escrita()
+
+@asynccontextmanager
+async def get_async_session_leitura():
+    """
+    Como get_async_session(), para tools/resources que sólo leen. Con DATABASE_READ_URL
+    usa la réplica, salvo que el cliente MCP haya escrito hace menos de
+    LEITURA_APOS_ESCRITA_S segundos (read-your-writes), que la petición no tenga sesión
+    MCP (ver SEM_SESSAO) o que la réplica haya fallado hace menos de
+    REPLICA_REINTENTO_S: en esos casos, y sin réplica, usa el primario.
+    La conexión a la réplica se abre antes de entregar la sesión, así que una réplica
+    caída cae al primario sin que el llamador vea el error.
+    """
+    replica = _engine_leitura()
+    session = None
+    if replica is not None:
+        session = AsyncSession(replica, expire_on_commit=False)
+        try:
+            await session.connection()
+        except (exc.OperationalError, exc.InterfaceError) as e:
+            await session.close()
+            _replica_falhou(e)
+            session = None
+    if session is None:
+        async with get_async_session() as session:
+            yield session
+        return
+    estado_replica["leituras"] += 1
+    session.info["replica"] = True
+    async with session:
+        try:
+            yield session
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+def estado_pool_async() -> dict:
+    """Estado del pool del engine asíncrono (el que usan los tools/resources)."""
+    return estado_pool(obter_async_engine().pool)
+
+def estado_leitura() -> Optional[dict]:
+    """Pool y contadores de la réplica de lectura (None si no hay DATABASE_READ_URL)."""
+    if not settings.DATABASE_READ_URL:
+        return None
+    indisponivel_s = _replica_indisponivel_ate - time.monotonic()
+    datos = {**estado_replica, "indisponivel_por_s": round(indisponivel_s, 1) if indisponivel_s > 0 else 0}
+    if _async_engine_leitura is not None:
+        datos["pool"] = estado_pool(_async_engine_leitura.pool)
+    return datos
 
 # También puedes definir una dependencia para FastAPI si planeas usarlo
 # def get_session_dependency() -> Generator[Session, Any, None]:
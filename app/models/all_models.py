@@ -5,14 +5,37 @@
 from typing import Optional, Dict, Any, List # Adicionar List se necessário para JSON
 from sqlmodel import SQLModel, Field, Column # Relationship não é mais usado aqui
 import sqlalchemy as sa
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 import datetime
-# from decimal import Decimal # Não mais necessário se preços estão no JSON como float/str
+from decimal import Decimal # Preços de precos_tarefa_local (NUMERIC)
+
+# --- Índices sobre o JSONB ---
+# Os mesmos índices são criados pela migração 032695222dcb; declará-los aqui mantém
+# o metadata (create_all / autogenerate do Alembic) em sincronia com a base.
+def _indice_gin_dados(tabela: str) -> sa.Index:
+    """GIN jsonb_path_ops sobre 'dados': atende filtros por contenção (dados @> '{...}')."""
+    return sa.Index(f"ix_{tabela}_dados_gin", "dados", postgresql_using="gin", postgresql_ops={"dados": "jsonb_path_ops"})
+
+def _indice_trigram(nome_indice: str, chave: str) -> sa.Index:
+    """GIN trigram (pg_trgm) sobre dados->>'chave': atende ILIKE e busca por similaridade."""
+    return sa.Index(nome_indice, sa.text(f"(dados ->> '{chave}') gin_trgm_ops"), postgresql_using="gin")
+
+# --- Chaves quentes de 'dados' como colunas geradas (migração d7f2b8e4a613) ---
+def _coluna_gerada(chave: str) -> Any:
+    """Coluna STORED com dados->>'chave': só leitura, o Postgres a recalcula a cada escrita de 'dados'."""
+    return Field(default=None, sa_column=sa.Column(sa.Text, sa.Computed(f"dados ->> '{chave}'", persisted=True)))
 
 # --- Definição de Classes ---
 
 class Obra(SQLModel, table=True):
     __tablename__ = "obras" # Boa prática especificar
+    __table_args__ = (
+        _indice_gin_dados("obras"),
+        sa.Index("ix_obras_codigo", sa.text("(dados ->> 'codigo')")),
+        _indice_trigram("ix_obras_nome_trgm", "nome"),
+        sa.Index("ix_obras_nome", "nome", "id"),
+        sa.Index("ix_obras_status", "status", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     dados: Optional[Dict[str, Any]] = Field(
@@ -23,9 +46,18 @@ class Obra(SQLModel, table=True):
         default=None,
         sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()"))
     )
+    nome: Optional[str] = _coluna_gerada("nome")
+    status: Optional[str] = _coluna_gerada("status")
 
 class Pessoa(SQLModel, table=True): # Nome da classe no singular
     __tablename__ = "pessoas"
+    __table_args__ = (
+        _indice_gin_dados("pessoas"),
+        sa.Index("ix_pessoas_cpf", "cpf"),
+        sa.Index("ix_pessoas_email", sa.text("lower(dados ->> 'email')")),
+        _indice_trigram("ix_pessoas_nome_trgm", "nome_completo"),
+        sa.Index("ix_pessoas_nome_completo", "nome_completo", "id"),
+    )
 
     id: Optional[int] = Field(default=None, primary_key=True)
     dados: Optional[Dict[str, Any]] = Field(
@@ -36,11 +68,21 @@ class Pessoa(SQLModel, table=True): # Nome da classe no singular
         default=None,
         sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()"))
     )
+    nome_completo: Optional[str] = _coluna_gerada("nome_completo")
+    cpf: Optional[str] = _coluna_gerada("cpf")
 
 class Tarefa(SQLModel, table=True):
     __tablename__ = "tarefas"
+    __table_args__ = (
+        _indice_gin_dados("tarefas"),
+        sa.Index("ix_tarefas_hierarquia", "hierarquia", postgresql_using="gin"),
+        sa.Index("ix_tarefas_status", "status", "id"),
+        # Uma partição por obra grande e tarefas_padrao para as demais (migração f1b6d3a8c452, app/db/particoes.py)
+        {"postgresql_partition_by": "LIST (obra_id)"},
+    )
 
-    id: Optional[int] = Field(default=None, primary_key=True)
+    # Com a PK (id, obra_id) o SQLAlchemy só trata id como serial se for dito
+    id: Optional[int] = Field(default=None, primary_key=True, sa_column_kwargs={"autoincrement": True})
     dados: Optional[Dict[str, Any]] = Field(
         default_factory=dict,
         sa_column=sa.Column(JSONB)
@@ -49,7 +91,141 @@ class Tarefa(SQLModel, table=True):
         default=None,
         sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()"))
     )
+    nome: Optional[str] = _coluna_gerada("nome")
+    status: Optional[str] = _coluna_gerada("status")
+    # Ancestrais do local da tarefa (ex: {'obra:2','modulo:5','bloco:70',...}), copiados de
+    # locais_hierarquia.ancestrais pelo trigger tarefas_hierarquia (migração 7c1e5a9d2b40)
+    hierarquia: Optional[List[str]] = Field(
+        default=None,
+        sa_column=sa.Column(ARRAY(sa.Text), nullable=False, server_default=sa.text("'{}'"))
+    )
+    # Chave de partição, parte da PK (0 = sem obra). O INSERT tem que trazê-la pronta,
+    # tarefa_obra_de(dados): a partição é escolhida antes do trigger tarefas_hierarquia.
+    # Com a PK (id, obra_id) a base não impede dois 'id' iguais em obras diferentes: o id
+    # continua único porque vem de tarefas_id_seq, e quem grava ids explícitos (importação) confere
+    obra_id: Optional[int] = Field(
+        default=None,
+        sa_column=sa.Column(sa.Integer, primary_key=True, autoincrement=False, nullable=False, server_default=sa.text("0"))
+    )
+
+# Caminho materializado de cada local: uma tag 'nivel:id' por nível da hierarquia
+_EXPRESSAO_ANCESTRAIS = (
+    "array_remove(ARRAY["
+    "'obra:' || obra_id::text, 'modulo:' || modulo_id::text, 'bloco:' || bloco_id::text, "
+    "'pavimento:' || pavimento_id::text, 'apartamento:' || apartamento_id::text, 'local:' || local_id::text"
+    "], NULL)"
+)
+
+class LocalHierarquia(SQLModel, table=True):
+    """
+    Posição de cada local na hierarquia obra -> módulo -> bloco -> pavimento -> apartamento,
+    achatada numa linha (os níveis abaixo do local ficam NULL). Substitui a cadeia de joins
+    pelas tabelas local_* do esquema antigo (archivo.sql) na hora de achar as tarefas de uma
+    sub-árvore: 'ancestrais' é calculado pelo Postgres e copiado para tarefas.hierarquia.
+    """
+    __tablename__ = "locais_hierarquia"
+    __table_args__ = (
+        # Obra de um bloco/pavimento/... para filtro_subarvore descartar as outras partições de tarefas
+        sa.Index("ix_locais_hierarquia_ancestrais", "ancestrais", postgresql_using="gin"),
+    )
+
+    local_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    tipo_local: Optional[str] = None # Valores de tipo_local_enum do esquema antigo (ex: 'APARTAMENTO')
+    nome: Optional[str] = None
+    obra_id: int
+    modulo_id: Optional[int] = None
+    bloco_id: Optional[int] = None
+    pavimento_id: Optional[int] = None
+    apartamento_id: Optional[int] = None
+    ancestrais: Optional[List[str]] = Field(
+        default=None,
+        sa_column=sa.Column(ARRAY(sa.Text), sa.Computed(_EXPRESSAO_ANCESTRAIS, persisted=True))
+    )
+
+class PrecoTarefaLocal(SQLModel, table=True):
+    """
+    Preço de um tipo de tarefa num local, válido entre validade_inicio e validade_fim
+    (NULL = sem limite). Mesmas colunas da tabela do esquema antigo (archivo.sql).
+    """
+    __tablename__ = "precos_tarefa_local"
+    __table_args__ = (
+        sa.CheckConstraint("preco >= 0", name="precos_tarefa_local_preco_check"),
+        sa.CheckConstraint("validade_fim >= validade_inicio", name="precos_tarefa_local_validade_check"),
+        sa.Index("ix_precos_tarefa_local_tipo_local", "tipos_tarefa_id", "local_id", "validade_inicio"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    tipos_tarefa_id: int
+    local_id: int
+    preco: Decimal = Field(sa_column=sa.Column(sa.Numeric(12, 2), nullable=False))
+    unidade_medida: Optional[str] = Field(default=None, max_length=50)
+    validade_inicio: Optional[datetime.date] = Field(
+        default=None,
+        sa_column=sa.Column(sa.Date, server_default=sa.text("CURRENT_DATE"))
+    )
+    validade_fim: Optional[datetime.date] = None
+    created_at: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()"))
+    )
+
+class ObraResumo(SQLModel, table=True):
+    """
+    Totais das tarefas de uma obra por status, mantidos pelos triggers da migração
+    5b8e0c3f9a12 a cada escrita em tarefas (e recalculados quando um preço muda).
+    A obra de uma tarefa é a de tarefas.hierarquia; 'valor' soma o preço vigente
+    (preco_tarefa_local_id) e 'sem_preco' conta as tarefas sem preço.
+    """
+    __tablename__ = "obras_resumo"
+
+    obra_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    status: str = Field(primary_key=True) # '' = tarefa sem status
+    tarefas: int = Field(sa_column=sa.Column(sa.BigInteger, nullable=False, server_default=sa.text("0")))
+    sem_preco: int = Field(sa_column=sa.Column(sa.BigInteger, nullable=False, server_default=sa.text("0")))
+    valor: Decimal = Field(sa_column=sa.Column(sa.Numeric, nullable=False, server_default=sa.text("0")))
+
+class ObraResumoResponsavel(SQLModel, table=True):
+    """Parte de cada responsável no valor das tarefas de uma obra (preço x percentual)."""
+    __tablename__ = "obras_resumo_responsavel"
+
+    obra_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    pessoa_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    tarefas: int = Field(sa_column=sa.Column(sa.BigInteger, nullable=False, server_default=sa.text("0")))
+    valor: Decimal = Field(sa_column=sa.Column(sa.Numeric, nullable=False, server_default=sa.text("0")))
+
+class PessoaObra(SQLModel, table=True):
+    """
+    Vínculo pessoa <-> obra normalizado de pessoas.dados->'obras_associadas' (obra_id_ref),
+    mantido pelos triggers pessoas_obras_* da migração d7f2b8e4a613: não escrever direto.
+    """
+    __tablename__ = "pessoas_obras"
+
+    obra_id: int = Field(primary_key=True, sa_column_kwargs={"autoincrement": False})
+    pessoa_id: int = Field(
+        sa_column=sa.Column(sa.Integer, sa.ForeignKey("pessoas.id", ondelete="CASCADE"), primary_key=True, autoincrement=False, index=True)
+    )
+
+class ImportacaoLegadoLote(SQLModel, table=True):
+    """
+    Trecho (anterior_id, ultimo_id] do esquema antigo já importado por uma etapa de
+    app/db/importacao_legado.py, gravado na mesma transação do COPY das suas linhas.
+    'rejeitadas' guarda as linhas do trecho que não passaram na conversão ({id, motivo}).
+    """
+    __tablename__ = "importacao_legado_lotes"
+
+    etapa: str = Field(primary_key=True)
+    anterior_id: int = Field(sa_column=sa.Column(sa.BigInteger, primary_key=True, autoincrement=False))
+    ultimo_id: int = Field(sa_column=sa.Column(sa.BigInteger, nullable=False))
+    linhas: int
+    rejeitadas: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        sa_column=sa.Column(JSONB, nullable=False, server_default=sa.text("'[]'"))
+    )
+    gravado_em: Optional[datetime.datetime] = Field(
+        default=None,
+        sa_column=sa.Column(sa.DateTime(timezone=True), nullable=False, server_default=sa.text("now()"))
+    )
 
-# Não há mais TiposTarefa, PrecosTarefaLocal, nem tabelas de junção como modelos SQLModel diretos.
+# Não há mais TiposTarefa nem tabelas de junção como modelos SQLModel diretos.
 # As relações e os dados específicos estão agora embutidos nos campos 'dados' JSONB.
 
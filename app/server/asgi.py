@@ -0,0 +1,47 @@
+# app/server/asgi.py
+"""
+Aplicação ASGI do servidor MCP (streamable-http) para rodar com uvicorn.
+
+Um processo:   python -m app.server.main http
+N processos:   python -m app.server.main http --workers 4
+               (ou: uvicorn app.server.asgi:criar_app_workers --factory --workers 4 --port 8000)
+
+Cada worker é um processo Python separado que importa o servidor do zero, então
+tem o seu próprio engine e pool de conexões (DB_POOL_SIZE + DB_MAX_OVERFLOW por
+worker), cache de leituras e métricas. Como as sessões MCP do streamable-http
+vivem na memória do processo que as criou e o kernel reparte as conexões entre
+os workers, com mais de um worker o transporte roda sem sessão (stateless_http):
+cada requisição é atendida por inteiro pelo worker que a recebeu.
+"""
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from app.db.notificacoes import ouvinte
+from app.db.session import fechar_engines
+from app.server.main import estado_http, mcp
+
+def criar_app(sem_estado: bool = False, path: str = "/mcp") -> Starlette:
+    """
+    App streamable-http com /mcp, /metrics, /health e /ready. No desligamento,
+    depois que o uvicorn termina as requisições em curso, para a escuta
+    LISTEN/NOTIFY e fecha as conexões do pool.
+    """
+    mcp.settings.stateless_http = sem_estado
+    app = mcp.streamable_http_app(path=path)
+    lifespan_mcp = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app_):
+        async with lifespan_mcp(app_):
+            estado_http["desligando"] = False
+            yield
+            # /ready passa a responder 503 enquanto o processo termina
+            estado_http["desligando"] = True
+        await ouvinte.parar()
+        await fechar_engines()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+def criar_app_workers() -> Starlette:
+    """Fábrica usada por cada worker do uvicorn (--factory): app sem sessão."""
+    return criar_app(sem_estado=True)
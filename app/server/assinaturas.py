@@ -0,0 +1,200 @@
+# app/server/assinaturas.py
+"""
+Assinaturas de resources (resources/subscribe do MCP) alimentadas pelo Postgres.
+
+Os triggers *_alteracoes_* (migração e3c9a5f17b84) emitem um NOTIFY por comando
+em CANAL_ALTERACOES com o que mudou: IDs de obras/pessoas e as tags de hierarquia
+das tarefas. Cada payload é comparado com as URIs assinadas e só as afetadas
+recebem notifications/resources/updated: quem assina obras://id/7 não é avisado
+quando muda a obra 8, e tarefas://bloco/70 só quando muda uma tarefa do bloco 70.
+obras://id/7/resumo também é avisado pelos triggers de obras_resumo (b8d4e2f6a391),
+que pegam os totais recalculados quando muda um preço.
+
+As alterações são acumuladas e enviadas de uma vez quando ficam
+ASSINATURAS_ESPERA_MS sem chegar outra (ou ao completar ASSINATURAS_ESPERA_MAX_MS
+desde a primeira): um lote de mil escritas vira um aviso por URI.
+
+Como as escritas são vistas pelo trigger, valem também as feitas por outros
+processos do servidor, pela importação do esquema antigo ou direto no SQL. O
+aviso só chega a sessões com estado (stdio ou streamable-http com um worker).
+"""
+import asyncio
+import logging
+import re
+import time
+import weakref
+from collections import defaultdict
+from typing import Callable, Optional
+
+from pydantic import AnyUrl
+
+from app.core.config import settings
+from app.db.notificacoes import CANAL_ALTERACOES, ouvinte
+
+logger = logging.getLogger(__name__)
+
+# Teste de uma assinatura: recebe (entidade, chaves alteradas, '*' presente) e diz se a URI mudou
+Teste = Callable[[str, set, bool], bool]
+
+def _por_id(entidade: str, id_: str) -> Teste:
+    return lambda e, chaves, tudo: e == entidade and (tudo or id_ in chaves)
+
+def _por_entidade(entidade: str) -> Teste:
+    return lambda e, chaves, tudo: e == entidade
+
+def _pagina(entidade: str, apos_id: int) -> Teste:
+    # O fim da página não está na URI: qualquer ID depois do cursor pode estar nela
+    return lambda e, chaves, tudo: e == entidade and (tudo or any(int(c) > apos_id for c in chaves))
+
+def _tarefas(tag: str) -> Teste:
+    # '*' com as obras listadas: mudou algo abaixo delas, sem detalhe de bloco/local
+    obra = tag.startswith("obra:")
+    return lambda e, chaves, tudo: e == "tarefas" and (tag in chaves or (tudo and (not obra or len(chaves) == 0)))
+
+def _resumo(obra_id: str) -> Teste:
+    # Os totais também mudam com os preços (obras_resumo, migração b8d4e2f6a391)
+    obra, resumo, tarefas = _por_id("obras", obra_id), _por_id("obras_resumo", obra_id), _tarefas(f"obra:{obra_id}")
+    return lambda e, chaves, tudo: obra(e, chaves, tudo) or resumo(e, chaves, tudo) or tarefas(e, chaves, tudo)
+
+_CAMPOS = r"(?:/campos/[^/]+)?"
+_PADROES: list[tuple[re.Pattern, Callable[[re.Match], Teste]]] = [
+    (re.compile(rf"^(obras|pessoas)://id/(\d+){_CAMPOS}$"), lambda m: _por_id(m[1], str(int(m[2])))),
+    (re.compile(r"^obras://id/(\d+)/resumo$"), lambda m: _resumo(str(int(m[1])))),
+    (re.compile(r"^(obras|pessoas)://todas$"), lambda m: _por_entidade(m[1])),
+    (re.compile(rf"^(obras|pessoas)://(?:filtro/[^/]+/[^/]+/)?pagina/(\d+)/\d+{_CAMPOS}$"), lambda m: _pagina(m[1], int(m[2]))),
+    (re.compile(rf"^tarefas://(\w+)/(\d+)(?:/pagina/\d+/\d+{_CAMPOS})?$"), lambda m: _tarefas(f"{m[1]}:{int(m[2])}")),
+]
+
+def teste_assinatura(uri: str) -> Optional[Teste]:
+    """Teste de alteração da URI, ou None se ela não aceita assinatura."""
+    for padrao, fabrica in _PADROES:
+        if m := padrao.match(uri):
+            return fabrica(m)
+    return None
+
+class Assinaturas:
+    """
+    URIs assinadas por sessão MCP e os avisos pendentes. As sessões ficam em
+    WeakSets: uma sessão encerrada some sozinha. Usado de um único event loop.
+    """
+
+    def __init__(self):
+        self._sessoes: dict[str, weakref.WeakSet] = defaultdict(weakref.WeakSet)
+        self._testes: dict[str, Teste] = {}
+        self._pendentes: set[str] = set()
+        self._temporizador: Optional[asyncio.TimerHandle] = None
+        self._primeira_em = 0.0
+        self._envios: set[asyncio.Task] = set()
+        self.enviadas = 0
+        self.coalescidas = 0 # Alterações que caíram numa URI já pendente
+
+    def assinar(self, uri: str, sessao) -> None:
+        teste = teste_assinatura(uri)
+        if teste is None:
+            raise ValueError(f"Resource sem suporte a assinatura: {uri}")
+        self._testes[uri] = teste
+        self._sessoes[uri].add(sessao)
+        ouvinte.iniciar()
+
+    def cancelar(self, uri: str, sessao) -> None:
+        sessoes = self._sessoes.get(uri)
+        if sessoes is not None:
+            sessoes.discard(sessao)
+
+    def _assinadas(self) -> list[str]:
+        for uri in [uri for uri, sessoes in self._sessoes.items() if not sessoes]:
+            del self._sessoes[uri]
+            self._testes.pop(uri, None)
+        return list(self._sessoes)
+
+    def ao_notificar(self, canal: str, payload: Optional[str]) -> None:
+        """Callback do ouvinte: marca as URIs afetadas pelo payload como pendentes."""
+        if payload is None:
+            # Reconexão: o que mudou sem ninguém escutando é desconhecido
+            if ouvinte.conexoes > 1:
+                self._marcar(self._assinadas())
+            return
+        entidade, _, lista = payload.partition(":")
+        chaves = set(lista.split(","))
+        tudo = "*" in chaves
+        chaves.discard("*")
+        self._marcar([uri for uri in self._assinadas() if self._testes[uri](entidade, chaves, tudo)])
+
+    def _marcar(self, uris: list[str]) -> None:
+        if not uris:
+            return
+        for uri in uris:
+            if uri in self._pendentes:
+                self.coalescidas += 1
+            self._pendentes.add(uri)
+        loop = asyncio.get_running_loop()
+        agora = time.monotonic()
+        if self._temporizador is None:
+            self._primeira_em = agora
+        else:
+            self._temporizador.cancel()
+        # Debounce: espera ficar quieto, mas não mais que ESPERA_MAX desde a primeira alteração
+        limite = self._primeira_em + settings.ASSINATURAS_ESPERA_MAX_MS / 1000
+        espera = max(min(settings.ASSINATURAS_ESPERA_MS / 1000, limite - agora), 0)
+        self._temporizador = loop.call_later(espera, self._despachar)
+
+    def _despachar(self) -> None:
+        self._temporizador = None
+        uris, self._pendentes = self._pendentes, set()
+        tarefa = asyncio.get_running_loop().create_task(self._enviar(uris))
+        self._envios.add(tarefa)
+        tarefa.add_done_callback(self._envios.discard)
+
+    async def _enviar(self, uris: set[str]) -> None:
+        for uri in uris:
+            for sessao in list(self._sessoes.get(uri, ())):
+                try:
+                    await sessao.send_resource_updated(AnyUrl(uri))
+                    self.enviadas += 1
+                except Exception as e:
+                    # Sessão fechada (cliente desconectou sem unsubscribe)
+                    logger.debug("Aviso de %s não entregue (%s); assinatura removida", uri, e)
+                    self.cancelar(uri, sessao)
+
+    def estatisticas(self) -> dict:
+        assinadas = self._assinadas()
+        return {
+            "uris": len(assinadas),
+            "assinaturas": sum(len(self._sessoes[uri]) for uri in assinadas),
+            "pendentes": len(self._pendentes),
+            "enviadas": self.enviadas,
+            "coalescidas": self.coalescidas,
+        }
+
+assinaturas = Assinaturas()
+ouvinte.registrar(CANAL_ALTERACOES, assinaturas.ao_notificar)
+
+def instalar(mcp) -> None:
+    """
+    Registra resources/subscribe e resources/unsubscribe no servidor de baixo nível
+    e anuncia a capacidade 'subscribe' (o FastMCP a declara sempre como False).
+    """
+    servidor = mcp._mcp_server
+
+    def _sessao():
+        return servidor.request_context.session
+
+    @servidor.subscribe_resource()
+    async def assinar(uri: AnyUrl) -> None:
+        if mcp.settings.stateless_http:
+            raise ValueError("Assinaturas exigem uma sessão MCP (servidor rodando sem sessão).")
+        assinaturas.assinar(str(uri), _sessao())
+
+    @servidor.unsubscribe_resource()
+    async def cancelar(uri: AnyUrl) -> None:
+        assinaturas.cancelar(str(uri), _sessao())
+
+    capacidades_originais = servidor.get_capabilities
+
+    def get_capabilities(notification_options, experimental_capabilities):
+        capacidades = capacidades_originais(notification_options, experimental_capabilities)
+        if capacidades.resources is not None:
+            capacidades.resources.subscribe = True
+        return capacidades
+
+    servidor.get_capabilities = get_capabilities
@@ -0,0 +1,129 @@
+# app/server/esquemas.py
+"""
+Cache em disco dos JSON Schemas dos parâmetros de tools e resource templates.
+
+O FastMCP gera esses schemas com Pydantic ao registrar cada função, ou seja, a
+cada import de app/server/main.py. No modo stdio o cliente sobe um processo novo
+por sessão, então isso entra no tempo até a primeira resposta, mesmo que a sessão
+só faça initialize e tools/list. Com o cache, o registro reaproveita o schema
+gravado e o validador de argumentos de cada função só é montado na primeira
+chamada dela.
+
+A chave do cache combina as versões de fastmcp/pydantic, o tamanho e a data de
+modificação dos .py de app/ e a configuração (defaults como PAGINA_TAMANHO_MAX
+aparecem nos schemas): qualquer mudança regenera o arquivo.
+"""
+import functools
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+import fastmcp
+import pydantic
+from fastmcp import FastMCP
+from fastmcp.resources.template import ResourceTemplate
+from fastmcp.tools.tool import Tool
+from mcp.types import ToolAnnotations
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+RAIZ_APP = Path(__file__).resolve().parent.parent
+# Ao lado do bytecode: derivado do código, ignorado pelo git e seguro de apagar
+ARQUIVO_PADRAO = Path(__file__).resolve().parent / "__pycache__" / "esquemas_mcp.json"
+
+def chave_esquemas(raiz: Path = RAIZ_APP) -> str:
+    h = hashlib.sha256()
+    h.update(f"{fastmcp.__version__}|{pydantic.VERSION}".encode())
+    for caminho in sorted(raiz.rglob("*.py")):
+        info = caminho.stat()
+        h.update(f"{caminho.relative_to(raiz)}|{info.st_size}|{info.st_mtime_ns}".encode())
+    h.update(settings.model_dump_json().encode())
+    return h.hexdigest()
+
+def _validacao_adiada(fn: Callable[..., Any]) -> Callable[..., Any]:
+    """validate_call(fn) montado na primeira chamada (o ResourceTemplate do FastMCP o monta no registro)."""
+    validada = None
+
+    @functools.wraps(fn)
+    def chamar(*args, **kwargs):
+        nonlocal validada
+        if validada is None:
+            validada = pydantic.validate_call(fn)
+        return validada(*args, **kwargs)
+
+    return chamar
+
+class EsquemasEmCache(FastMCP):
+    """
+    FastMCP que registra tools e resource templates com os schemas de
+    ARQUIVO_PADRAO quando a chave confere. Sem cache válido, registra do jeito
+    normal e salvar_esquemas() grava os schemas gerados para o próximo arranque.
+    """
+
+    def __init__(self, *args, arquivo_esquemas: Optional[Path] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._arquivo_esquemas = arquivo_esquemas or ARQUIVO_PADRAO
+        self._chave_esquemas = chave_esquemas() if settings.ESQUEMAS_CACHE else None
+        self._esquemas = {"tools": {}, "templates": {}}
+        self._esquemas_do_cache = False
+        if self._chave_esquemas:
+            try:
+                gravado = json.loads(self._arquivo_esquemas.read_text(encoding="utf-8"))
+                if gravado.get("chave") == self._chave_esquemas:
+                    self._esquemas = {"tools": gravado["tools"], "templates": gravado["templates"]}
+                    self._esquemas_do_cache = True
+            except (OSError, ValueError, KeyError):
+                pass
+
+    def add_tool(self, fn, name=None, description=None, tags=None, annotations=None) -> None:
+        nome = name or fn.__name__
+        esquema = self._esquemas["tools"].get(nome) if self._esquemas_do_cache else None
+        if esquema is None:
+            super().add_tool(fn, name=name, description=description, tags=tags, annotations=annotations)
+            self._esquemas["tools"][nome] = self._tool_manager.get_tool(nome).parameters
+            return
+        if isinstance(annotations, dict):
+            annotations = ToolAnnotations(**annotations)
+        # O TypeAdapter da função (validação dos argumentos) fica para o Tool.run da primeira chamada
+        self._tool_manager.add_tool(Tool(
+            fn=fn, name=nome, description=description or fn.__doc__ or "", parameters=esquema,
+            tags=tags or set(), annotations=annotations, serializer=self._tool_manager._serializer,
+        ))
+        self._cache.clear()
+
+    def add_resource_fn(self, fn, uri, name=None, description=None, mime_type=None, tags=None) -> None:
+        chave = f"{name or fn.__name__}|{uri}"
+        esquema = self._esquemas["templates"].get(chave) if self._esquemas_do_cache else None
+        if esquema is None:
+            super().add_resource_fn(fn, uri, name=name, description=description, mime_type=mime_type, tags=tags)
+            template = self._resource_manager.get_templates().get(uri)
+            if template is not None:
+                self._esquemas["templates"][chave] = template.parameters
+            return
+        self._resource_manager.add_template(ResourceTemplate(
+            uri_template=uri, name=name or fn.__name__, description=description or fn.__doc__ or "",
+            mime_type=mime_type or "text/plain", fn=_validacao_adiada(fn), parameters=esquema, tags=tags or set(),
+        ))
+        self._cache.clear()
+
+    def salvar_esquemas(self) -> None:
+        """Grava os schemas gerados neste arranque (nada a fazer se vieram do cache)."""
+        if not self._chave_esquemas or self._esquemas_do_cache:
+            return
+        conteudo = json.dumps({"chave": self._chave_esquemas, **self._esquemas})
+        try:
+            self._arquivo_esquemas.parent.mkdir(parents=True, exist_ok=True)
+            # Arquivo temporário + rename: workers subindo juntos não leem um JSON pela metade
+            fd, temporario = tempfile.mkstemp(dir=self._arquivo_esquemas.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(conteudo)
+            os.chmod(temporario, 0o644) # mkstemp cria com 0600
+            os.replace(temporario, self._arquivo_esquemas)
+        except OSError as e:
+            logger.warning("Não foi possível gravar o cache de schemas em %s: %s", self._arquivo_esquemas, e)
@@ -0,0 +1,53 @@
+# app/server/instrumentacao.py
+from typing import Any
+from pydantic import AnyUrl
+from fastmcp.resources.template import match_uri_template
+from app.core.metricas import metricas
+from app.db.session import SEM_SESSAO, cliente_atual
+from app.server.esquemas import EsquemasEmCache
+
+class FastMCPMedido(EsquemasEmCache):
+    """
+    FastMCP que mede cada chamada de tool e leitura de resource (ver app/core/metricas.py).
+    A medição envolve o despacho inteiro: validação dos argumentos, o handler, as
+    consultas ao Postgres e a serialização do resultado. Os schemas dos parâmetros
+    vêm do cache de app/server/esquemas.py. Cada chamada também fixa o cliente MCP
+    atual (cliente_atual), que decide se as leituras podem ir para a réplica.
+    """
+
+    def _fixar_cliente(self):
+        if self.settings.stateless_http:
+            # A sessão dura só esta requisição: não identifica o cliente (ver SEM_SESSAO)
+            return cliente_atual.set(SEM_SESSAO)
+        try:
+            sessao = self._mcp_server.request_context.session
+        except LookupError:
+            sessao = None
+        return cliente_atual.set(sessao)
+
+    def _nome_resource(self, uri: AnyUrl | str) -> str:
+        """URI fixa ou o template que a atende, para não criar uma série por ID."""
+        uri = str(uri)
+        if uri in self._resource_manager.get_resources():
+            return uri
+        for template in self._resource_manager.get_templates():
+            if match_uri_template(uri, template):
+                return template
+        return "desconhecido"
+
+    async def _mcp_call_tool(self, key: str, arguments: dict[str, Any]):
+        nome = key if self._tool_manager.has_tool(key) else "desconhecido"
+        token = self._fixar_cliente()
+        try:
+            async with metricas.medir("tool", nome):
+                return await super()._mcp_call_tool(key, arguments)
+        finally:
+            cliente_atual.reset(token)
+
+    async def _mcp_read_resource(self, uri: AnyUrl | str):
+        token = self._fixar_cliente()
+        try:
+            async with metricas.medir("resource", self._nome_resource(uri)):
+                return await super()._mcp_read_resource(uri)
+        finally:
+            cliente_atual.reset(token)
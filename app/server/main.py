@@ -1,23 +1,50 @@
 # app/server/main.py
-from typing import List, Optional, Dict, Any
-from fastmcp import FastMCP, Context
-from sqlmodel import Session, select
-from pydantic import BaseModel, Field as PydanticField # Para modelos de API/JSON
+import asyncio
+import datetime
+import os
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from decimal import Decimal
+from typing import List, Optional, Dict, Any, Tuple, Union
+from urllib.parse import quote
+from fastmcp import Context
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from sqlmodel import select
+from pydantic import BaseModel, ConfigDict, Field as PydanticField, ValidationError, model_validator # Para modelos de API/JSON
+import pydantic_core
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, aggregate_order_by, insert as pg_insert
 
 # Importa a configuração e a função de sessão
 from app.core.config import settings
-from app.db.session import get_session # Para obter a sessão da DB
+from app.db.session import get_async_session, get_async_session_leitura, estado_leitura, estado_pool_async, na_replica # Para obter a sessão (async) da DB
+from app.db.notificacoes import CANAL_CACHE, notificar, ouvinte
+from app.db.agrupador import AgrupadorInsercoes, insercao_lote
+from app.db.particoes import estatisticas as estatisticas_particoes, particionar_obras
+from app.core.cache import cache_leituras
+from app.core.precos import JanelasPreco, PrecoVigente, indice_precos
+from app.core.metricas import metricas
+from app.server.instrumentacao import FastMCPMedido
+from app.server.assinaturas import assinaturas, instalar as instalar_assinaturas
 # Importa seus modelos SQLModel
-from app.models.all_models import Obra, Pessoa
+from app.models.all_models import LocalHierarquia, Obra, ObraResumo, ObraResumoResponsavel, Pessoa, PrecoTarefaLocal, Tarefa
 
 # --- Modelos Pydantic para validação dos dados JSON ---
-class PessoaObraAssociada(BaseModel):
+class ModeloApi(BaseModel):
+    # Validadores e serializadores montados no primeiro uso de cada modelo, não no import:
+    # com os schemas dos tools em cache (app/server/esquemas.py) o arranque não precisa deles
+    model_config = ConfigDict(defer_build=True)
+
+class PessoaObraAssociada(ModeloApi):
     obra_id_ref: int
     obra_nome_ref: Optional[str] = None
     matricula_obra: Optional[str] = None
     funcao_na_obra: Optional[str] = None
 
-class PessoaDados(BaseModel):
+class PessoaDados(ModeloApi):
     nome_completo: str
     cpf: Optional[str] = PydanticField(default=None, pattern=r"^\d{3}\.\d{3}\.\d{3}-\d{2}$")
     telefone_whatsapp: Optional[str] = None
@@ -28,12 +55,12 @@ class PessoaDados(BaseModel):
 class PessoaCriar(PessoaDados):
     pass
 
-class PessoaRead(BaseModel):
+class PessoaRead(ModeloApi):
     id: int
     dados: PessoaDados
     created_at: str
 
-class ObraDados(BaseModel):
+class ObraDados(ModeloApi):
     nome: str # Mantido como 'nome' para consistência interna do modelo Pydantic
     codigo: Optional[str] = None
     status: Optional[str] = None
@@ -42,20 +69,910 @@ class ObraDados(BaseModel):
 class ObraCriar(ObraDados): # Este modelo será usado como parâmetro do Tool
     pass
 
-class ObraRead(BaseModel):
+class ObraRead(ModeloApi):
     id: int
     dados: ObraDados
     created_at: str
 
+class TarefaResponsavel(ModeloApi):
+    pessoa_id: int
+    percentual: float = PydanticField(default=100.0, gt=0, le=100)
+    eh_principal: bool = False
+
+# Mesma tolerância do checar_soma_100_tarefa do esquema antigo (e do trigger tarefas_responsaveis_validos)
+TOLERANCIA_PERCENTUAL = 0.01
+
+def validar_equipe(responsaveis: List[TarefaResponsavel]) -> None:
+    """Percentuais somando 100, exatamente um principal e nenhuma pessoa repetida."""
+    soma = sum(r.percentual for r in responsaveis)
+    if abs(soma - 100) > TOLERANCIA_PERCENTUAL:
+        raise ValueError(f"A soma dos percentuais dos responsáveis deve ser 100 (soma atual: {soma:.2f})")
+    principais = sum(1 for r in responsaveis if r.eh_principal)
+    if principais != 1:
+        raise ValueError(f"Deve haver exatamente um responsável principal (há {principais})")
+    if len({r.pessoa_id for r in responsaveis}) != len(responsaveis):
+        raise ValueError("A mesma pessoa aparece mais de uma vez entre os responsáveis")
+
+class TarefaDados(ModeloApi):
+    nome: str
+    obra_id_ref: Optional[int] = None
+    local_id: Optional[int] = None
+    tipos_tarefa_id: Optional[int] = None
+    preco_tarefa_local_id: Optional[int] = None
+    inicio: Optional[datetime.date] = None
+    fim: Optional[datetime.date] = None
+    status: Optional[str] = None
+    responsaveis: Optional[List[TarefaResponsavel]] = []
+
+class TarefaCriar(TarefaDados):
+    @model_validator(mode="after")
+    def _equipe_valida(self):
+        # Só na criação: tarefas antigas sem essas regras continuam legíveis via TarefaDados
+        if self.responsaveis:
+            validar_equipe(self.responsaveis)
+        return self
+
+class AtribuicaoResponsaveis(ModeloApi):
+    tarefa_ids: List[int] = PydanticField(min_length=1)
+    obra_id: Optional[int] = None # Obra das tarefas (0 = sem obra); sem ela as obras são lidas por id antes do UPDATE
+    responsaveis: List[TarefaResponsavel] = PydanticField(min_length=1) # Substitui a equipe inteira
+
+    @model_validator(mode="after")
+    def _equipe_valida(self):
+        validar_equipe(self.responsaveis)
+        return self
+
+class ItemAtribuicao(ModeloApi):
+    indice: int # Posição da atribuição na lista enviada
+    atualizadas: int = 0
+    nao_encontradas: List[int] = []
+    erro: Optional[str] = None
+
+class ResultadoAtribuicao(ModeloApi):
+    atualizadas: int
+    nao_encontradas: int
+    com_erro: int
+    itens: List[ItemAtribuicao]
+
+class TarefaRead(ModeloApi):
+    id: int
+    dados: TarefaDados
+    created_at: str
+
+class PrecoDados(ModeloApi):
+    tipos_tarefa_id: int
+    local_id: int
+    preco: Decimal = PydanticField(ge=0, max_digits=12, decimal_places=2)
+    unidade_medida: Optional[str] = PydanticField(default=None, max_length=50)
+    validade_inicio: Optional[datetime.date] = None # None = a partir de hoje
+    validade_fim: Optional[datetime.date] = None # None = sem fim
+
+    @model_validator(mode="after")
+    def _validade_ordenada(self):
+        if self.validade_inicio and self.validade_fim and self.validade_fim < self.validade_inicio:
+            raise ValueError("'validade_fim' anterior a 'validade_inicio'")
+        return self
+
+class PrecoCriar(PrecoDados):
+    pass
+
+class PrecoRead(PrecoDados):
+    id: int
+    created_at: str
+
+class TarefaPrecificar(ModeloApi):
+    tipos_tarefa_id: int
+    local_id: int
+    data: Optional[datetime.date] = None # None = hoje
+    tarefa_id: Optional[int] = None # Tarefa que recebe o preco_tarefa_local_id com gravar=True
+
+class ItemPreco(ModeloApi):
+    indice: int # Posição na lista enviada (ou na lista de tarefas da obra)
+    tarefa_id: Optional[int] = None
+    preco_tarefa_local_id: Optional[int] = None # None = nenhum preço vigente na data
+    preco: Optional[Decimal] = None
+    unidade_medida: Optional[str] = None
+    erro: Optional[str] = None
+
+class ResultadoPrecificacao(ModeloApi):
+    precificados: int
+    sem_preco: int
+    com_erro: int
+    gravados: int # Tarefas cujo preco_tarefa_local_id mudou (só com gravar=True)
+    itens: List[ItemPreco]
+
+class ResumoStatus(ModeloApi):
+    status: str # '' = tarefas sem status
+    tarefas: int
+    sem_preco: int
+    valor: Decimal
+
+class ResumoResponsavel(ModeloApi):
+    pessoa_id: int
+    tarefas: int
+    valor: Decimal # Soma de preço x percentual do responsável em cada tarefa
+
+class ResumoObra(ModeloApi):
+    obra_id: int
+    nome: Optional[str] = None
+    codigo: Optional[str] = None
+    tarefas: int
+    sem_preco: int # Tarefas sem preco_tarefa_local_id (ou com um preço removido)
+    valor_total: Decimal
+    valor_pendente: Decimal # Valor das tarefas que não estão 'concluida'
+    por_status: List[ResumoStatus]
+    por_responsavel: List[ResumoResponsavel]
+
+# Níveis da hierarquia de locais, do mais alto para o mais baixo
+NIVEIS_HIERARQUIA = ("obra", "modulo", "bloco", "pavimento", "apartamento", "local")
+
+class LocalHierarquiaDados(ModeloApi):
+    local_id: int
+    obra_id: int
+    modulo_id: Optional[int] = None
+    bloco_id: Optional[int] = None
+    pavimento_id: Optional[int] = None
+    apartamento_id: Optional[int] = None
+    tipo_local: Optional[str] = None
+    nome: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _niveis_contiguos(self):
+        # Um nível só pode ser informado junto com todos os de cima (bloco exige módulo etc.)
+        niveis = [self.modulo_id, self.bloco_id, self.pavimento_id, self.apartamento_id]
+        for acima, nivel, nome in zip(niveis, niveis[1:], NIVEIS_HIERARQUIA[2:]):
+            if nivel is not None and acima is None:
+                raise ValueError(f"'{nome}_id' informado sem o nível acima dele")
+        return self
+
+# --- Modelos de resposta dos tools de criação em lote ---
+class ItemLote(ModeloApi):
+    indice: int # Posição do item na lista enviada
+    id: Optional[int] = None # ID criado (None se o item teve erro)
+    erro: Optional[str] = None
+
+class ResultadoLote(ModeloApi):
+    criados: int
+    com_erro: int
+    itens: List[ItemLote]
+
+class PaginaObras(ModeloApi):
+    itens: List[ObraRead]
+    proximo_cursor: Optional[int] = None # ID a usar como {apos_id} da próxima página; None na última
+    proxima_uri: Optional[str] = None
+
+class PaginaPessoas(ModeloApi):
+    itens: List[PessoaRead]
+    proximo_cursor: Optional[int] = None
+    proxima_uri: Optional[str] = None
+
+class PaginaTarefas(ModeloApi):
+    itens: List[TarefaRead]
+    proximo_cursor: Optional[int] = None
+    proxima_uri: Optional[str] = None
+
+class ResultadoExportacao(ModeloApi):
+    entidade: str
+    linhas: int
+    bytes: int
+    arquivo: Optional[str] = None # Caminho do .ndjson gravado (modo arquivo)
+    ndjson: Optional[str] = None # As linhas da página (modo página)
+    proximo_cursor: Optional[int] = None # {apos_id} da próxima página; None na última
+    segundos: float
+
 # Cria a instancia principal do servidor FastMCP
-mcp = FastMCP(
+# (FastMCPMedido registra latência, erros e consultas SQL de cada tool/resource)
+mcp = FastMCPMedido(
     name=settings.PROJECT_NAME,
     instructions="Servidor MCP para gestão de tarefas de obra."
 )
+# resources/subscribe: avisos de alteração vindos dos triggers do Postgres (app/server/assinaturas.py)
+instalar_assinaturas(mcp)
+
+# --- Cache de leituras por ID ---
+def _json_leitura(modelo: BaseModel) -> str:
+    """Serializa um read model exatamente como o FastMCP faria com o objeto."""
+    return pydantic_core.to_json(modelo, fallback=str, indent=2).decode()
+
+async def _invalidar_cache(db, entidade: str, ids: List[int]) -> None:
+    """
+    Remove as entradas das linhas escritas do cache local e, com CACHE_NOTIFY,
+    avisa os outros processos via NOTIFY (entregue só no commit da sessão 'db').
+    """
+    for id_ in ids:
+        cache_leituras.invalidar((entidade, id_))
+    if settings.CACHE_NOTIFY:
+        # Lotes grandes viram uma invalidação da entidade inteira (payload do NOTIFY é limitado)
+        payload = f"{entidade}:{ids[0]}" if len(ids) == 1 else f"{entidade}:*"
+        await notificar(db, CANAL_CACHE, payload)
+
+def _ao_notificar_cache(canal: str, payload: Optional[str]) -> None:
+    """Aplica as invalidações recebidas de outros processos do servidor."""
+    if payload is None:
+        cache_leituras.limpar()
+        indice_precos.limpar()
+        return
+    entidade, _, id_ = payload.partition(":")
+    if entidade == "precos":
+        # O payload traz o ID do preço, não o par (tipo, local): recarrega o índice todo
+        indice_precos.limpar()
+    elif id_ == "*":
+        cache_leituras.invalidar_prefixo(entidade)
+    else:
+        cache_leituras.invalidar((entidade, int(id_)))
+
+ouvinte.registrar(CANAL_CACHE, _ao_notificar_cache)
+
+def _cache_ativo() -> bool:
+    if settings.CACHE_NOTIFY:
+        ouvinte.iniciar()
+    return cache_leituras.ativo
+
+# --- Caminho rápido de serialização ---
+def _colunas_leitura(modelo):
+    """Só as colunas dos read models: linhas simples, sem objetos ORM nem identity map."""
+    return select(modelo.id, modelo.dados, modelo.created_at)
+
+def _molde_campos(modelo) -> Dict[str, Any]:
+    """Todos os campos de 'modelo' na ordem do schema, com os seus defaults (None se obrigatório)."""
+    return {
+        nome: None if campo.is_required() else campo.get_default(call_default_factory=True)
+        for nome, campo in modelo.model_fields.items()
+    }
+
+_MOLDE_OBRA = _molde_campos(ObraDados)
+_MOLDE_PESSOA = _molde_campos(PessoaDados)
+_MOLDE_PESSOA_OBRA = _molde_campos(PessoaObraAssociada)
+_MOLDE_TAREFA = _molde_campos(TarefaDados)
+_MOLDE_TAREFA_RESPONSAVEL = _molde_campos(TarefaResponsavel)
+
+def _obra_read(linha) -> Union[ObraRead, Dict[str, Any]]:
+    """
+    ObraRead de uma linha da tabela obras. Com LEITURA_CONFIAVEL o JSONB, que já foi
+    validado por ObraCriar ao ser gravado, não é validado de novo: devolve um dict que
+    serializa igual ao ObraRead (mesmos campos, ordem e defaults), bem mais barato de
+    montar que o modelo (model_construct não ajuda aqui: é mais lento que validar).
+    """
+    if not settings.LEITURA_CONFIAVEL:
+        return ObraRead(id=linha.id, dados=ObraDados(**linha.dados), created_at=str(linha.created_at))
+    return {"id": linha.id, "dados": {**_MOLDE_OBRA, **linha.dados}, "created_at": str(linha.created_at)}
+
+def _pessoa_read(linha) -> Union[PessoaRead, Dict[str, Any]]:
+    """PessoaRead de uma linha da tabela pessoas (ver _obra_read)."""
+    if not settings.LEITURA_CONFIAVEL:
+        return PessoaRead(id=linha.id, dados=PessoaDados(**linha.dados), created_at=str(linha.created_at))
+    dados = {**_MOLDE_PESSOA, **linha.dados}
+    if dados["obras_associadas"]:
+        dados["obras_associadas"] = [{**_MOLDE_PESSOA_OBRA, **o} for o in dados["obras_associadas"]]
+    return {"id": linha.id, "dados": dados, "created_at": str(linha.created_at)}
+
+def _tarefa_read(linha) -> Union[TarefaRead, Dict[str, Any]]:
+    """TarefaRead de uma linha da tabela tarefas (ver _obra_read)."""
+    if not settings.LEITURA_CONFIAVEL:
+        return TarefaRead(id=linha.id, dados=TarefaDados(**linha.dados), created_at=str(linha.created_at))
+    dados = {**_MOLDE_TAREFA, **linha.dados}
+    if dados["responsaveis"]:
+        dados["responsaveis"] = [{**_MOLDE_TAREFA_RESPONSAVEL, **r} for r in dados["responsaveis"]]
+    return {"id": linha.id, "dados": dados, "created_at": str(linha.created_at)}
+
+def _pagina(modelo_pagina, itens: list, proximo: Optional[int], proxima_uri: Optional[str]):
+    """PaginaObras/PaginaPessoas/PaginaTarefas, ou um dict equivalente se os itens vieram do caminho confiável."""
+    if not settings.LEITURA_CONFIAVEL:
+        return modelo_pagina(itens=itens, proximo_cursor=proximo, proxima_uri=proxima_uri)
+    return {"itens": itens, "proximo_cursor": proximo, "proxima_uri": proxima_uri}
+
+def _chave_json(chave: str):
+    # Chave literal: json_build_object não aceita parâmetros de tipo desconhecido
+    return sa.literal_column(f"'{chave}'")
+
+# Defaults de primeiro nível de 'dados', aplicados no SQL com jsonb || (os campos
+# gravados prevalecem)
+_PADROES_JSON = {
+    Obra: {nome: valor for nome, valor in _MOLDE_OBRA.items() if not ObraDados.model_fields[nome].is_required()},
+    Pessoa: {nome: valor for nome, valor in _MOLDE_PESSOA.items() if not PessoaDados.model_fields[nome].is_required()},
+    Tarefa: {nome: valor for nome, valor in _MOLDE_TAREFA.items() if not TarefaDados.model_fields[nome].is_required()},
+}
+# Listas de 'dados' cujos itens recebem os defaults do seu modelo, como em _pessoa_read/_tarefa_read
+_ANINHADOS_JSON = {
+    Pessoa: {"obras_associadas": _MOLDE_PESSOA_OBRA},
+    Tarefa: {"responsaveis": _MOLDE_TAREFA_RESPONSAVEL},
+}
+
+def _data_json(coluna):
+    """
+    created_at como texto igual ao str() do datetime que o driver devolve (as sessões
+    usam TimeZone=UTC, ver app/db/session.py): 'AAAA-MM-DD HH:MM:SS[.ffffff]+00:00'.
+    """
+    utc = sa.func.timezone(sa.literal_column("'UTC'"), coluna)
+    microssegundos = sa.func.to_char(utc, sa.literal_column("'US'"), type_=sa.Text)
+    return (
+        sa.func.to_char(utc, sa.literal_column("'YYYY-MM-DD HH24:MI:SS'"), type_=sa.Text)
+        + sa.case((microssegundos != "000000", "." + microssegundos), else_="")
+        + "+00:00"
+    )
+
+def _itens_com_padroes(lista, molde: Dict[str, Any]):
+    """Cada item da lista JSONB com os defaults de 'molde' (a lista fica como está se vazia ou nula)."""
+    itens = sa.func.jsonb_array_elements(lista).table_valued(sa.column("value", JSONB), with_ordinality="n").render_derived()
+    com_padroes = select(
+        sa.func.jsonb_agg(aggregate_order_by(sa.literal(molde, JSONB).op("||")(itens.c.value), itens.c.n))
+    ).scalar_subquery()
+    nao_vazia = sa.and_(sa.func.jsonb_typeof(lista) == "array", sa.func.jsonb_array_length(lista) > 0)
+    return sa.case((nao_vazia, com_padroes), else_=lista)
+
+def _dados_json(modelo, colunas):
+    """'dados' completo com os defaults do modelo, também nos itens das listas aninhadas."""
+    dados = sa.literal(_PADROES_JSON[modelo], JSONB).op("||")(colunas.dados)
+    aninhados = _ANINHADOS_JSON.get(modelo, {})
+    if not aninhados:
+        return dados
+    argumentos = []
+    for campo, molde in aninhados.items():
+        argumentos += [_chave_json(campo), _itens_com_padroes(dados.op("->")(sa.literal_column(f"'{campo}'")), molde)]
+    return dados.op("||")(sa.func.jsonb_build_object(*argumentos))
+
+# --- Projeção de 'dados' (templates .../campos/{campos}) ---
+_MODELOS_DADOS = {Obra: ObraDados, Pessoa: PessoaDados, Tarefa: TarefaDados}
+
+def campos_projecao(modelo, campos: str) -> List[str]:
+    """
+    Chaves de 'dados' pedidas em {campos} (separadas por vírgula, ex: 'nome,codigo'),
+    sem repetições e na ordem pedida. 'created_at' também pode ser pedido; 'id' sai sempre.
+    """
+    pedidos = list(dict.fromkeys(campo.strip() for campo in campos.split(",") if campo.strip()))
+    validos = set(_MODELOS_DADOS[modelo].model_fields) | {"created_at"}
+    invalidos = [campo for campo in pedidos if campo not in validos]
+    if not pedidos or invalidos:
+        raise ValueError(f"Campos inválidos: '{campos}'. Use um ou mais de: {', '.join(sorted(validos))}")
+    return pedidos
+
+def _dados_projetados(modelo, colunas, campos: List[str]):
+    """
+    jsonb_build_object só com as chaves pedidas (dados->'chave'), com o default do
+    modelo para as ausentes (e nos itens das listas aninhadas): o Postgres não envia
+    o resto do documento.
+    As chaves vêm de campos_projecao, nunca direto do cliente.
+    """
+    argumentos = []
+    for campo in campos:
+        valor = colunas.dados.op("->")(sa.literal_column(f"'{campo}'"))
+        padrao = _PADROES_JSON[modelo].get(campo)
+        if padrao is not None:
+            valor = sa.func.coalesce(valor, sa.literal(padrao, JSONB))
+        molde = _ANINHADOS_JSON.get(modelo, {}).get(campo)
+        if molde is not None:
+            valor = _itens_com_padroes(valor, molde)
+        argumentos += [_chave_json(campo), valor]
+    return sa.func.jsonb_build_object(*argumentos)
+
+def _objeto_json_linha(modelo, colunas, campos: Optional[List[str]] = None):
+    """
+    json_build_object com o formato de ObraRead/PessoaRead/TarefaRead (ou só com os
+    'campos' pedidos): mesmos valores que _obra_read/_pessoa_read/_tarefa_read.
+    """
+    if campos is None:
+        return sa.func.json_build_object(
+            _chave_json("id"), colunas.id,
+            _chave_json("dados"), _dados_json(modelo, colunas),
+            _chave_json("created_at"), _data_json(colunas.created_at),
+        )
+    pares = [_chave_json("id"), colunas.id]
+    campos_dados = [campo for campo in campos if campo != "created_at"]
+    if campos_dados:
+        pares += [_chave_json("dados"), _dados_projetados(modelo, colunas, campos_dados)]
+    if "created_at" in campos:
+        pares += [_chave_json("created_at"), _data_json(colunas.created_at)]
+    return sa.func.json_build_object(*pares)
+
+async def _ler_projetado(modelo, id_: int, campos: List[str]) -> Optional[str]:
+    """Uma linha de 'modelo' como texto JSON só com os campos pedidos (None se não existe)."""
+    statement = select(sa.cast(_objeto_json_linha(modelo, modelo.__table__.c, campos), sa.Text)).where(modelo.id == id_)
+    async with get_async_session_leitura() as db:
+        return (await db.exec(statement)).first()
+
+def _lista_json(modelo, colunas, dentro=None, campos: Optional[List[str]] = None):
+    """json_agg das linhas em ordem de id ('[]' se não houver nenhuma)."""
+    agregado = sa.func.json_agg(aggregate_order_by(_objeto_json_linha(modelo, colunas, campos), colunas.id))
+    if dentro is not None:
+        agregado = agregado.filter(dentro)
+    return sa.func.coalesce(agregado, sa.literal_column("'[]'::json"))
+
+async def _listar_json_postgres(modelo) -> str:
+    """A tabela inteira como texto JSON, montado pelo Postgres numa única linha."""
+    tabela = modelo.__table__
+    statement = select(sa.cast(_lista_json(modelo, tabela.c), sa.Text)).select_from(tabela)
+    async with get_async_session_leitura() as db:
+        return (await db.exec(statement)).one()
+
+# --- Paginação keyset (cursor = último ID recebido) ---
+# Chaves do JSONB 'dados' que podem ser usadas como filtro nas páginas
+FILTROS_OBRA = {"nome", "codigo", "status"}
+FILTROS_PESSOA = {"nome_completo", "cpf", "email", "situacao_atual"}
+
+def _consulta_pagina(modelo, apos_id: int, limite: int, chave: Optional[str], valor: Optional[str], filtros_validos: set, condicao=None):
+    """
+    SELECT de uma página de 'modelo' com id > apos_id, em ordem de id, com uma
+    linha a mais para saber se existe próxima página sem um COUNT(*).
+    'condicao' é um filtro extra montado pelo código (ex: a sub-árvore de locais).
+    Devolve (statement, limite efetivo).
+    """
+    if limite < 1:
+        raise ValueError("O limite da página deve ser pelo menos 1.")
+    limite = min(limite, settings.PAGINA_TAMANHO_MAX)
+    statement = _colunas_leitura(modelo).where(modelo.id > apos_id)
+    if chave is not None:
+        if chave not in filtros_validos:
+            raise ValueError(f"Filtro '{chave}' não suportado. Use um de: {', '.join(sorted(filtros_validos))}")
+        coluna = modelo.__table__.c.get(chave)
+        if coluna is not None and coluna.computed is not None:
+            # Coluna gerada (migração d7f2b8e4a613): o índice (coluna, id) já entrega a página em ordem de id
+            statement = statement.where(coluna == valor)
+        else:
+            # @> (contains) permite usar um índice GIN sobre 'dados'
+            statement = statement.where(modelo.dados.contains({chave: valor}))
+    if condicao is not None:
+        statement = statement.where(condicao)
+    return statement.order_by(modelo.id).limit(limite + 1), limite
+
+async def _ler_pagina(modelo, apos_id: int, limite: int, chave: Optional[str], valor: Optional[str], filtros_validos: set, condicao=None):
+    """
+    Lê uma página de 'modelo' com id > apos_id, em ordem de id.
+    Devolve (linhas, proximo_cursor). O custo depende só do tamanho da página,
+    não do tamanho da tabela, porque a busca começa direto no índice da PK.
+    """
+    statement, limite = _consulta_pagina(modelo, apos_id, limite, chave, valor, filtros_validos, condicao)
+    async with get_async_session_leitura() as db:
+        linhas = (await db.exec(statement)).all()
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        return linhas, linhas[-1].id
+    return linhas, None
+
+async def _ler_pagina_json(prefixo_uri: str, modelo, apos_id: int, limite: int, chave: Optional[str], valor: Optional[str], filtros_validos: set, condicao=None, campos: Optional[List[str]] = None) -> str:
+    """
+    Como _ler_pagina, mas o Postgres devolve a página pronta como texto JSON
+    (itens, proximo_cursor, proxima_uri), no formato de PaginaObras/PaginaPessoas/PaginaTarefas.
+    'prefixo_uri' é a URI da próxima página sem o cursor e o limite. Com 'campos',
+    cada item traz só essas chaves de 'dados' e a próxima URI mantém a projeção.
+    """
+    statement, limite = _consulta_pagina(modelo, apos_id, limite, chave, valor, filtros_validos, condicao)
+    pagina = statement.add_columns(sa.func.row_number().over(order_by=modelo.id).label("n")).subquery()
+    dentro = pagina.c.n <= limite
+    tem_mais = sa.func.count() > limite
+    cursor = sa.func.max(pagina.c.id).filter(dentro)
+    objeto = sa.func.json_build_object(
+        _chave_json("itens"), _lista_json(modelo, pagina.c, dentro, campos),
+        _chave_json("proximo_cursor"), sa.case((tem_mais, cursor)),
+        _chave_json("proxima_uri"), sa.case(
+            (tem_mais, sa.literal(prefixo_uri) + sa.cast(cursor, sa.Text) + f"/{limite}{_sufixo_campos(campos)}")
+        ),
+    )
+    async with get_async_session_leitura() as db:
+        return (await db.exec(select(sa.cast(objeto, sa.Text)).select_from(pagina))).one()
+
+def _sufixo_campos(campos: Optional[List[str]]) -> str:
+    return f"/campos/{quote(','.join(campos), safe=',')}" if campos else ""
+
+def _prefixo_uri_pagina(esquema: str, chave: Optional[str], valor: Optional[str]) -> str:
+    if chave is not None:
+        return f"{esquema}://filtro/{chave}/{quote(valor, safe='')}/pagina/"
+    return f"{esquema}://pagina/"
+
+def _uri_pagina(esquema: str, cursor: Optional[int], limite: int, chave: Optional[str], valor: Optional[str]) -> Optional[str]:
+    if cursor is None:
+        return None
+    limite = min(limite, settings.PAGINA_TAMANHO_MAX)
+    return f"{_prefixo_uri_pagina(esquema, chave, valor)}{cursor}/{limite}"
+
+# --- Busca indexada (índices da migração 032695222dcb) ---
+def _texto_jsonb(modelo, chave: str):
+    """
+    dados->>'chave' com a chave literal no SQL (e não como parâmetro), para que a
+    expressão case com os índices de expressão/trigram também em planos genéricos.
+    Só deve receber chaves fixas do código, nunca texto vindo do cliente.
+    """
+    return modelo.dados.op("->>")(sa.literal_column(f"'{chave}'"))
+
+def _padrao_ilike(texto: str) -> str:
+    """Padrão '%texto%' para ILIKE, escapando os curingas digitados pelo usuário."""
+    escapado = texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escapado}%"
+
+def _filtro_nome_aproximado(campo, nome: str):
+    """Nome contendo o texto (ILIKE) ou parecido com ele (operador % do pg_trgm)."""
+    return sa.or_(campo.ilike(_padrao_ilike(nome)), campo.op("%")(nome))
+
+def consulta_busca_pessoas(cpf: Optional[str], email: Optional[str], nome: Optional[str], limite: int):
+    """Monta o SELECT de buscar_pessoas (também usado pelo benchmarks/explain_indices.py)."""
+    statement = select(Pessoa)
+    if cpf:
+        statement = statement.where(Pessoa.cpf == cpf)
+    if email:
+        statement = statement.where(sa.func.lower(_texto_jsonb(Pessoa, "email")) == email.lower())
+    if nome:
+        campo_nome = _texto_jsonb(Pessoa, "nome_completo")
+        statement = statement.where(_filtro_nome_aproximado(campo_nome, nome))
+        statement = statement.order_by(sa.func.similarity(campo_nome, nome).desc(), Pessoa.id)
+    else:
+        statement = statement.order_by(Pessoa.id)
+    return statement.limit(min(limite, settings.PAGINA_TAMANHO_MAX))
+
+def consulta_busca_obras(codigo: Optional[str], nome: Optional[str], limite: int):
+    """Monta o SELECT de buscar_obras (também usado pelo benchmarks/explain_indices.py)."""
+    statement = select(Obra)
+    if codigo:
+        statement = statement.where(_texto_jsonb(Obra, "codigo") == codigo)
+    if nome:
+        campo_nome = _texto_jsonb(Obra, "nome")
+        statement = statement.where(_filtro_nome_aproximado(campo_nome, nome))
+        statement = statement.order_by(sa.func.similarity(campo_nome, nome).desc(), Obra.id)
+    else:
+        statement = statement.order_by(Obra.id)
+    return statement.limit(min(limite, settings.PAGINA_TAMANHO_MAX))
+
+# --- Criação em lote ---
+def _resumo_erro_validacao(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in erro['loc']) or 'item'}: {erro['msg']}" for erro in e.errors())
+
+async def _inserir_lote(modelo, modelo_criar, itens: List[Dict[str, Any]], entidade: str, completar=None) -> ResultadoLote:
+    """
+    Valida todos os itens com 'modelo_criar' antes de tocar na base e insere os
+    válidos num único INSERT ... SELECT FROM jsonb_array_elements(:lote) (insercao_lote):
+    um só parâmetro e uma só ida e volta ao Postgres, qualquer que seja o tamanho do lote.
+    Itens inválidos são reportados pelo índice e não impedem a inserção dos demais;
+    um erro da base de dados aborta o lote inteiro (uma única transação).
+    'completar' (async, opcional) recebe os dicts já validados e pode preenchê-los antes do INSERT.
+    """
+    if len(itens) > settings.LOTE_TAMANHO_MAX:
+        raise ValueError(f"Lote com {len(itens)} itens excede o máximo de {settings.LOTE_TAMANHO_MAX}.")
+
+    resultados: List[ItemLote] = []
+    validos: List[int] = []
+    linhas: List[Dict[str, Any]] = []
+    for indice, item in enumerate(itens):
+        try:
+            dados = modelo_criar.model_validate(item)
+        except ValidationError as e:
+            resultados.append(ItemLote(indice=indice, erro=_resumo_erro_validacao(e)))
+            continue
+        validos.append(indice)
+        # mode="json" converte datas etc. em tipos serializáveis para o JSONB
+        linhas.append(dados.model_dump(mode="json", exclude_none=True))
+
+    if linhas and completar is not None:
+        await completar(linhas)
+    if linhas:
+        tabela = modelo.__table__
+        if modelo is Tarefa:
+            # Chave de partição calculada no INSERT; o RETURNING diz quais obras ficaram na partição padrão
+            statement = insercao_lote(tabela, {"obra_id": sa.func.tarefa_obra_de}, (
+                tabela.c.obra_id, sa.literal_column("tableoid = 'tarefas_padrao'::regclass").label("na_padrao")))
+        else:
+            statement = insercao_lote(tabela)
+        async with get_async_session() as db:
+            gravadas = (await db.exec(statement, params={"lote": linhas})).all()
+            await _invalidar_cache(db, entidade, [linha.id for linha in gravadas])
+        if modelo is Tarefa:
+            # Depois do commit e numa transação à parte: a obra que passou do mínimo ganha a sua partição
+            await particionar_obras({linha.obra_id for linha in gravadas if linha.na_padrao})
+        # n é a posição do item em 'linhas' (desde 1), que segue a ordem de 'validos'
+        resultados.extend(ItemLote(indice=validos[linha.n - 1], id=linha.id) for linha in gravadas)
+
+    resultados.sort(key=lambda item: item.indice)
+    return ResultadoLote(criados=len(linhas), com_erro=len(itens) - len(linhas), itens=resultados)
+
+# --- Group commit de criar_obra/criar_pessoa (AGRUPAR_ESCRITAS, ver app/db/agrupador.py) ---
+agrupador_obras = AgrupadorInsercoes(Obra.__table__, ao_gravar=lambda db, ids: _invalidar_cache(db, "obras", ids))
+agrupador_pessoas = AgrupadorInsercoes(Pessoa.__table__, ao_gravar=lambda db, ids: _invalidar_cache(db, "pessoas", ids))
+
+async def _criar_agrupado(agrupador: AgrupadorInsercoes, dados: BaseModel) -> Tuple[int, Dict[str, Any], str]:
+    """Insere 'dados' no próximo lote do agrupador: (id, dados gravados, created_at)."""
+    # mode="json", como em _inserir_lote: o lote inteiro vai num único parâmetro JSONB
+    dados_db = dados.model_dump(mode="json", exclude_none=True)
+    novo_id, created_at = await agrupador.inserir(dados_db)
+    return novo_id, dados_db, str(created_at)
+
+# --- Atribuição de responsáveis (trigger tarefas_responsaveis_validos, migração 9f3a6d1c7e25) ---
+def atualizacao_responsaveis(obras: List[int]):
+    """
+    UPDATE ... FROM jsonb_to_recordset(:lote), unnest(tarefa_ids) que troca dados->responsaveis.
+    Cada registro traz a obra das suas tarefas: com obra_id IN (obras) constante o Postgres
+    só abre as partições dessas obras (a busca só por id passaria por todas).
+    """
+    registros = (
+        sa.func.jsonb_to_recordset(sa.bindparam("lote", type_=JSONB))
+        .table_valued(sa.column("tarefa_ids", ARRAY(sa.Integer)), sa.column("obra_id", sa.Integer), sa.column("responsaveis", JSONB))
+        .render_derived(name="r", with_types=True)
+    )
+    alvos = select(sa.func.unnest(registros.c.tarefa_ids).label("id"), registros.c.obra_id, registros.c.responsaveis).subquery("alvo")
+    return (
+        sa.update(Tarefa.__table__)
+        .values(dados=Tarefa.dados.op("||")(sa.func.jsonb_build_object(sa.literal_column("'responsaveis'"), alvos.c.responsaveis)))
+        .where(Tarefa.id == alvos.c.id, Tarefa.obra_id == alvos.c.obra_id, Tarefa.obra_id.in_(obras))
+        .returning(Tarefa.id)
+    )
+
+async def _lote_por_obra(db, lote: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Os itens do lote com o obra_id das suas tarefas. Os que vieram sem 'obra_id' são
+    separados por obra, lida antes por id (uma leitura que passa por todas as partições,
+    sem travar linhas); as tarefas que não existem ficam de fora.
+    """
+    sem_obra = [id_ for item in lote if item["obra_id"] is None for id_ in item["tarefa_ids"]]
+    obra_de: Dict[int, int] = {}
+    if sem_obra:
+        statement = select(Tarefa.id, Tarefa.obra_id).where(Tarefa.id == sa.any_(sa.bindparam("ids", type_=ARRAY(sa.Integer))))
+        obra_de = dict((await db.exec(statement, params={"ids": sem_obra})).all())
+    por_obra: List[Dict[str, Any]] = []
+    for item in lote:
+        if item["obra_id"] is not None:
+            por_obra.append(item)
+            continue
+        ids_da_obra: Dict[int, List[int]] = {}
+        for id_ in item["tarefa_ids"]:
+            if id_ in obra_de:
+                ids_da_obra.setdefault(obra_de[id_], []).append(id_)
+        por_obra.extend({**item, "tarefa_ids": ids, "obra_id": obra} for obra, ids in ids_da_obra.items())
+    return por_obra
+
+async def _atribuir_responsaveis(atribuicoes: List[Dict[str, Any]]) -> ResultadoAtribuicao:
+    """
+    Valida todas as equipes em Python (soma 100, um principal, sem pessoa repetida) e
+    grava as válidas num único UPDATE (atualizacao_responsaveis), filtrado pelas obras
+    das tarefas. O constraint trigger adiado confere cada tarefa uma vez, no commit, em
+    vez de uma verificação por linha de responsável. Uma tarefa já atribuída por um item
+    anterior invalida o item seguinte inteiro (sem atribuição parcial).
+    """
+    itens: List[ItemAtribuicao] = []
+    lote: List[Dict[str, Any]] = []
+    validos: List[Tuple[ItemAtribuicao, List[int]]] = []
+    vistas: set = set()
+    total = 0
+    for indice, item in enumerate(atribuicoes):
+        try:
+            atribuicao = AtribuicaoResponsaveis.model_validate(item)
+        except ValidationError as e:
+            itens.append(ItemAtribuicao(indice=indice, erro=_resumo_erro_validacao(e)))
+            continue
+        ids = list(dict.fromkeys(atribuicao.tarefa_ids))
+        repetidas = vistas.intersection(ids)
+        if repetidas:
+            itens.append(ItemAtribuicao(indice=indice, erro=f"Tarefas já atribuídas por outro item do lote: {sorted(repetidas)}"))
+            continue
+        total += len(ids)
+        if total > settings.LOTE_TAMANHO_MAX:
+            raise ValueError(f"Lote com mais de {settings.LOTE_TAMANHO_MAX} tarefas.")
+        vistas.update(ids)
+        resultado = ItemAtribuicao(indice=indice)
+        itens.append(resultado)
+        validos.append((resultado, ids))
+        lote.append({
+            "tarefa_ids": ids,
+            "obra_id": atribuicao.obra_id,
+            "responsaveis": [r.model_dump(mode="json") for r in atribuicao.responsaveis],
+        })
+
+    atualizadas: set = set()
+    if lote:
+        async with get_async_session() as db:
+            lote = await _lote_por_obra(db, lote)
+            obras = sorted({item["obra_id"] for item in lote})
+            if lote:
+                statement = atualizacao_responsaveis(obras)
+                atualizadas = set((await db.exec(statement, params={"lote": lote})).scalars().all())
+            if atualizadas:
+                await _invalidar_cache(db, "tarefas", sorted(atualizadas))
+
+    for resultado, ids in validos:
+        resultado.nao_encontradas = [i for i in ids if i not in atualizadas]
+        resultado.atualizadas = len(ids) - len(resultado.nao_encontradas)
+    return ResultadoAtribuicao(
+        atualizadas=len(atualizadas),
+        nao_encontradas=sum(len(item.nao_encontradas) for item in itens),
+        com_erro=sum(1 for item in itens if item.erro is not None),
+        itens=itens,
+    )
+
+# --- Hierarquia de locais (tabela locais_hierarquia, migração 7c1e5a9d2b40) ---
+def filtro_subarvore(nivel: str, nivel_id: int):
+    """
+    Tarefas em qualquer ponto abaixo de nivel/nivel_id: hierarquia @> '{bloco:70}',
+    atendido pelo índice GIN ix_tarefas_hierarquia (também usado pelo benchmarks/explain_indices.py).
+    O filtro por obra_id faz o Postgres ler só a partição da obra: constante para uma
+    obra e, abaixo dela, a obra do nível em locais_hierarquia (uma subconsulta escalar,
+    avaliada antes de escolher as partições; com ANY(ARRAY(...)) ele leria todas).
+    """
+    if nivel not in NIVEIS_HIERARQUIA:
+        raise ValueError(f"Nível '{nivel}' não suportado. Use um de: {', '.join(NIVEIS_HIERARQUIA)}")
+    tag = f"{nivel}:{nivel_id}"
+    if nivel == "obra":
+        obra = nivel_id
+    else:
+        obra = (
+            select(sa.func.coalesce(LocalHierarquia.obra_id, 0))
+            .where(LocalHierarquia.ancestrais.contains([tag]))
+            .limit(1)
+            .scalar_subquery()
+        )
+    return sa.and_(Tarefa.obra_id == obra, Tarefa.hierarquia.contains([tag]))
+
+_COLUNAS_LOCAL = list(LocalHierarquiaDados.model_fields)
+
+async def _registrar_locais(itens: List[Dict[str, Any]]) -> ResultadoLote:
+    """
+    Valida os locais com LocalHierarquiaDados e grava os válidos num único
+    INSERT ... SELECT FROM jsonb_to_recordset(:lote) ON CONFLICT (local_id) DO UPDATE.
+    Os triggers da tabela recalculam tarefas.hierarquia das tarefas desses locais
+    na mesma transação. Um local_id repetido no lote fica com o último item.
+    """
+    if len(itens) > settings.LOTE_TAMANHO_MAX:
+        raise ValueError(f"Lote com {len(itens)} itens excede o máximo de {settings.LOTE_TAMANHO_MAX}.")
+
+    resultados: List[ItemLote] = []
+    por_local: Dict[int, Dict[str, Any]] = {}
+    for indice, item in enumerate(itens):
+        try:
+            local = LocalHierarquiaDados.model_validate(item)
+        except ValidationError as e:
+            resultados.append(ItemLote(indice=indice, erro=_resumo_erro_validacao(e)))
+            continue
+        resultados.append(ItemLote(indice=indice, id=local.local_id))
+        por_local[local.local_id] = local.model_dump()
+
+    if por_local:
+        tabela = LocalHierarquia.__table__
+        registros = (
+            sa.func.jsonb_to_recordset(sa.bindparam("lote", type_=JSONB))
+            .table_valued(*(sa.column(nome, tabela.c[nome].type) for nome in _COLUNAS_LOCAL))
+            .render_derived(with_types=True)
+        )
+        statement = pg_insert(tabela).from_select(_COLUNAS_LOCAL, select(*(registros.c[nome] for nome in _COLUNAS_LOCAL)))
+        statement = statement.on_conflict_do_update(
+            index_elements=[tabela.c.local_id],
+            set_={nome: statement.excluded[nome] for nome in _COLUNAS_LOCAL if nome != "local_id"},
+        )
+        async with get_async_session() as db:
+            await db.exec(statement, params={"lote": list(por_local.values())})
+
+    validos = sum(1 for item in resultados if item.erro is None)
+    return ResultadoLote(criados=validos, com_erro=len(itens) - validos, itens=resultados)
+
+# --- Resolução de preços (precos_tarefa_local, índice em app/core/precos.py) ---
+async def _janelas_precos(chaves: set) -> Dict[Tuple[int, int], JanelasPreco]:
+    """
+    Janelas de validade de cada par (tipos_tarefa_id, local_id): as que estão no índice
+    em memória e, as que faltam, carregadas todas numa única consulta (unnest dos pares).
+    """
+    if settings.CACHE_NOTIFY:
+        ouvinte.iniciar()
+    janelas: Dict[Tuple[int, int], JanelasPreco] = {}
+    faltam = []
+    for chave in chaves:
+        if (em_indice := indice_precos.obter(chave)) is not None:
+            janelas[chave] = em_indice
+        else:
+            faltam.append(chave)
+    if not faltam:
+        return janelas
+
+    marca = indice_precos.marca()
+    pares = select(
+        sa.func.unnest(sa.literal([tipo for tipo, _ in faltam], ARRAY(sa.Integer))),
+        sa.func.unnest(sa.literal([local for _, local in faltam], ARRAY(sa.Integer))),
+    )
+    statement = select(
+        PrecoTarefaLocal.id, PrecoTarefaLocal.tipos_tarefa_id, PrecoTarefaLocal.local_id, PrecoTarefaLocal.preco,
+        PrecoTarefaLocal.unidade_medida, PrecoTarefaLocal.validade_inicio, PrecoTarefaLocal.validade_fim,
+    ).where(sa.tuple_(PrecoTarefaLocal.tipos_tarefa_id, PrecoTarefaLocal.local_id).in_(pares))
+    async with get_async_session() as db:
+        linhas = (await db.exec(statement)).all()
+    por_chave = defaultdict(list)
+    for linha in linhas:
+        por_chave[(linha.tipos_tarefa_id, linha.local_id)].append(PrecoVigente(
+            id=linha.id, preco=linha.preco, unidade_medida=linha.unidade_medida,
+            validade_inicio=linha.validade_inicio, validade_fim=linha.validade_fim,
+        ))
+    for chave in faltam:
+        # Pares sem nenhum preço também entram no índice (janela vazia)
+        janelas[chave] = JanelasPreco(por_chave.get(chave, ()))
+        indice_precos.guardar(chave, janelas[chave], marca)
+    return janelas
+
+async def _resolver_precos(pedidos: List[Tuple[int, int, datetime.date]]) -> List[Optional[PrecoVigente]]:
+    """Preço vigente de cada (tipos_tarefa_id, local_id, data), na ordem recebida."""
+    janelas = await _janelas_precos({(tipo, local) for tipo, local, _ in pedidos})
+    return [janelas[(tipo, local)].vigente(data) for tipo, local, data in pedidos]
+
+async def _completar_precos_tarefas(linhas: List[Dict[str, Any]]) -> None:
+    """
+    Preenche preco_tarefa_local_id das tarefas de um lote que têm tipo e local mas não
+    trazem o preço, com o vigente em 'inicio' (ou hoje): um só acesso ao índice por lote.
+    """
+    hoje = datetime.date.today()
+    alvos = [
+        linha for linha in linhas
+        if linha.get("preco_tarefa_local_id") is None and linha.get("tipos_tarefa_id") is not None and linha.get("local_id") is not None
+    ]
+    if not alvos:
+        return
+    precos = await _resolver_precos([
+        (linha["tipos_tarefa_id"], linha["local_id"], datetime.date.fromisoformat(linha["inicio"]) if linha.get("inicio") else hoje)
+        for linha in alvos
+    ])
+    for linha, preco in zip(alvos, precos):
+        if preco is not None:
+            linha["preco_tarefa_local_id"] = preco.id
+
+async def _gravar_precos_tarefas(atribuicoes: List[Dict[str, Any]], obra_id: Optional[int] = None) -> int:
+    """
+    Grava {'id': tarefa, 'preco_id': preço ou None} em dados->preco_tarefa_local_id com um
+    único UPDATE ... FROM jsonb_to_recordset(:lote). Só conta (e reescreve) as tarefas que mudam.
+    Com 'obra_id' (tarefas todas dessa obra) o UPDATE só abre a partição da obra.
+    """
+    registros = (
+        sa.func.jsonb_to_recordset(sa.bindparam("lote", type_=JSONB))
+        .table_valued(sa.column("id", sa.Integer), sa.column("preco_id", sa.Integer))
+        .render_derived(with_types=True)
+    )
+    chave = sa.literal_column("'preco_tarefa_local_id'")
+    novo = sa.case(
+        (registros.c.preco_id.is_(None), Tarefa.dados.op("-")(chave)),
+        else_=Tarefa.dados.op("||")(sa.func.jsonb_build_object(chave, registros.c.preco_id)),
+    )
+    statement = (
+        sa.update(Tarefa.__table__)
+        .values(dados=novo)
+        .where(Tarefa.id == registros.c.id)
+        .where(sa.cast(_texto_jsonb(Tarefa, "preco_tarefa_local_id"), sa.Integer).is_distinct_from(registros.c.preco_id))
+    )
+    if obra_id is not None:
+        statement = statement.where(Tarefa.obra_id == obra_id)
+    async with get_async_session() as db:
+        resultado = await db.exec(statement, params={"lote": atribuicoes})
+    return resultado.rowcount
+
+# --- Resumo de obras (tabelas obras_resumo*, migração 5b8e0c3f9a12) ---
+STATUS_CONCLUIDA = "concluida"
+
+def _centavos(valor: Decimal) -> Decimal:
+    return valor.quantize(Decimal("0.01"))
+
+async def _resumo_obra(db, obra: Obra) -> ResumoObra:
+    """
+    Resumo já agregado pelos triggers: lê poucas linhas por obra (uma por status e
+    uma por responsável), qualquer que seja o número de tarefas.
+    """
+    por_status = (await db.exec(
+        select(ObraResumo).where(ObraResumo.obra_id == obra.id).order_by(ObraResumo.status)
+    )).all()
+    por_responsavel = (await db.exec(
+        select(ObraResumoResponsavel)
+        .where(ObraResumoResponsavel.obra_id == obra.id)
+        .order_by(ObraResumoResponsavel.valor.desc(), ObraResumoResponsavel.pessoa_id)
+    )).all()
+    valor_total = sum((linha.valor for linha in por_status), Decimal(0))
+    valor_concluido = sum((linha.valor for linha in por_status if linha.status == STATUS_CONCLUIDA), Decimal(0))
+    return ResumoObra(
+        obra_id=obra.id,
+        nome=obra.dados.get("nome"),
+        codigo=obra.dados.get("codigo"),
+        tarefas=sum(linha.tarefas for linha in por_status),
+        sem_preco=sum(linha.sem_preco for linha in por_status),
+        valor_total=_centavos(valor_total),
+        valor_pendente=_centavos(valor_total - valor_concluido),
+        por_status=[
+            ResumoStatus(status=linha.status, tarefas=linha.tarefas, sem_preco=linha.sem_preco, valor=_centavos(linha.valor))
+            for linha in por_status
+        ],
+        por_responsavel=[
+            ResumoResponsavel(pessoa_id=linha.pessoa_id, tarefas=linha.tarefas, valor=_centavos(linha.valor))
+            for linha in por_responsavel
+        ],
+    )
 
 # --- Tools e Resources para Obras ---
 @mcp.tool()
-def criar_obra(
+async def criar_obra(
     dados_obra: ObraCriar, # <<-- MUDANÇA: Agora aceita o modelo Pydantic diretamente
     ctx: Context = None
 ) -> ObraRead:
@@ -65,71 +982,220 @@ def criar_obra(
     O campo 'nome' dentro de dados_obra é obrigatório.
     """
     if ctx:
-        ctx.info(f"Tentando criar obra: {dados_obra.nome}")
+        await ctx.info(f"Tentando criar obra: {dados_obra.nome}")
 
     # model_dump() converte o modelo Pydantic para um dict
     # exclude_none=True remove campos que não foram enviados (são None)
     json_data_para_db = dados_obra.model_dump(exclude_none=True)
 
-    db: Session = next(get_session())
     try:
-        nova_obra = Obra(dados=json_data_para_db)
-        db.add(nova_obra)
-        db.commit()
-        db.refresh(nova_obra)
-        if ctx:
-            ctx.info(f"Obra '{json_data_para_db.get('nome')}' criada com ID: {nova_obra.id}")
-        # Ao retornar, parseamos o dicionário 'dados' de volta para ObraDados para consistência
-        return ObraRead(id=nova_obra.id, dados=ObraDados(**nova_obra.dados), created_at=str(nova_obra.created_at))
+        if settings.AGRUPAR_ESCRITAS:
+            novo_id, dados_db, created_at = await _criar_agrupado(agrupador_obras, dados_obra)
+            if ctx:
+                await ctx.info(f"Obra '{dados_db.get('nome')}' criada com ID: {novo_id}")
+            return ObraRead(id=novo_id, dados=ObraDados(**dados_db), created_at=created_at)
+        async with get_async_session() as db:
+            nova_obra = Obra(dados=json_data_para_db)
+            db.add(nova_obra)
+            await db.flush()
+            await _invalidar_cache(db, "obras", [nova_obra.id])
+            await db.commit()
+            await db.refresh(nova_obra)
     except Exception as e:
-        db.rollback()
         if ctx:
-            ctx.error(f"Erro ao criar obra {dados_obra.nome}: {e}")
+            await ctx.error(f"Erro ao criar obra {dados_obra.nome}: {e}")
         raise ValueError(f"Não foi possível criar a obra: {e}")
-    finally:
-        db.close()
+    if ctx:
+        await ctx.info(f"Obra '{json_data_para_db.get('nome')}' criada com ID: {nova_obra.id}")
+    # Ao retornar, parseamos o dicionário 'dados' de volta para ObraDados para consistência
+    return ObraRead(id=nova_obra.id, dados=ObraDados(**nova_obra.dados), created_at=str(nova_obra.created_at))
+
+@mcp.tool()
+async def criar_obras_lote(
+    obras: List[Dict[str, Any]],
+    ctx: Context = None
+) -> ResultadoLote:
+    """
+    Cria várias obras numa única chamada. Cada item da lista segue o schema de ObraCriar
+    (o campo 'nome' é obrigatório). Todos os itens são validados antes de gravar; os
+    válidos são inseridos numa única transação e os inválidos voltam com a mensagem
+    de erro, identificados pela sua posição ('indice') na lista.
+    """
+    if ctx:
+        await ctx.info(f"Tentando criar lote de {len(obras)} obras")
+    try:
+        resultado = await _inserir_lote(Obra, ObraCriar, obras, "obras")
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Erro ao criar lote de obras: {e}")
+        raise ValueError(f"Não foi possível criar o lote de obras: {e}")
+    if ctx:
+        await ctx.info(f"Lote de obras: {resultado.criados} criadas, {resultado.com_erro} com erro.")
+    return resultado
 
 @mcp.resource("obras://id/{obra_id}")
-def obter_obra_por_id(obra_id: int, ctx: Context = None) -> Optional[ObraRead]:
-    """Obtém os detalhes de uma obra pelo seu ID."""
-    db: Session = next(get_session())
-    try:
-        obra_db = db.get(Obra, obra_id)
-        if obra_db:
-            if ctx: ctx.info(f"Obra encontrada: ID {obra_id}")
-            return ObraRead(id=obra_db.id, dados=ObraDados(**obra_db.dados), created_at=str(obra_db.created_at))
-        else:
-            if ctx: ctx.warning(f"Obra com ID {obra_id} não encontrada.")
-            return None
+async def obter_obra_por_id(obra_id: int, ctx: Context = None) -> Optional[str]:
+    """Obtém os detalhes de uma obra pelo seu ID (JSON de ObraRead)."""
+    chave = ("obras", obra_id)
+    if _cache_ativo() and (em_cache := cache_leituras.obter(chave)) is not None:
+        if ctx: await ctx.info(f"Obra encontrada (cache): ID {obra_id}")
+        return em_cache
+    marca = cache_leituras.marca()
+    try:
+        async with get_async_session_leitura() as db:
+            obra_db = await db.get(Obra, obra_id)
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao obter obra {obra_id}: {e}")
+        raise ValueError(f"Erro ao buscar obra: {e}")
+    if obra_db:
+        if ctx: await ctx.info(f"Obra encontrada: ID {obra_id}")
+        obra_json = _json_leitura(_obra_read(obra_db))
+        cache_leituras.guardar(chave, obra_json, marca, atraso_s=settings.LEITURA_APOS_ESCRITA_S if na_replica(db) else 0.0)
+        return obra_json
+    else:
+        if ctx: await ctx.warning(f"Obra com ID {obra_id} não encontrada.")
+        return None
+
+@mcp.resource("obras://id/{obra_id}/campos/{campos}", name="obter_obra_campos")
+async def obter_obra_campos(obra_id: int, campos: str, ctx: Context = None) -> Optional[str]:
+    """
+    Só alguns campos de uma obra (ex: obras://id/7/campos/nome,codigo): 'id', as
+    chaves pedidas de 'dados' e 'created_at' se pedido. Lido direto do Postgres,
+    sem passar pelo cache de obras://id/{obra_id}.
+    """
+    try:
+        obra_json = await _ler_projetado(Obra, obra_id, campos_projecao(Obra, campos))
     except Exception as e:
-        if ctx: ctx.error(f"Erro ao obter obra {obra_id}: {e}")
+        if ctx: await ctx.error(f"Erro ao obter obra {obra_id}: {e}")
         raise ValueError(f"Erro ao buscar obra: {e}")
-    finally:
-        db.close()
+    if obra_json is None and ctx:
+        await ctx.warning(f"Obra com ID {obra_id} não encontrada.")
+    return obra_json
+
+@mcp.resource("obras://id/{obra_id}/resumo")
+async def obter_resumo_obra(obra_id: int, ctx: Context = None) -> Optional[ResumoObra]:
+    """
+    Resumo das tarefas de uma obra: quantidade e valor por status, valor total e
+    pendente (tarefas não concluídas), tarefas sem preço e a parte de cada responsável
+    no valor (preço x percentual). Vem de tabelas de resumo mantidas a cada escrita,
+    então custa o mesmo para uma obra com 10 ou 100 mil tarefas.
+    """
+    try:
+        async with get_async_session_leitura() as db:
+            obra_db = await db.get(Obra, obra_id)
+            resumo = await _resumo_obra(db, obra_db) if obra_db else None
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao obter resumo da obra {obra_id}: {e}")
+        raise ValueError(f"Erro ao obter resumo da obra: {e}")
+    if resumo is None:
+        if ctx: await ctx.warning(f"Obra com ID {obra_id} não encontrada.")
+    return resumo
+
+@mcp.tool()
+async def resumir_obra(
+    obra_id: Optional[int] = None,
+    codigo: Optional[str] = None,
+    ctx: Context = None
+) -> ResumoObra:
+    """
+    Resumo de progresso e custo de uma obra, pelo ID ou pelo código (ex: 'ML2'):
+    tarefas e valor por status, valor total e pendente, tarefas sem preço e valor por
+    responsável. Use em vez de paginar as tarefas e somar os preços.
+    """
+    if not (obra_id or codigo):
+        raise ValueError("Informe 'obra_id' ou 'codigo' da obra.")
+    try:
+        async with get_async_session_leitura() as db:
+            if obra_id:
+                obra_db = await db.get(Obra, obra_id)
+            else:
+                obra_db = (await db.exec(select(Obra).where(_texto_jsonb(Obra, "codigo") == codigo).order_by(Obra.id))).first()
+            resumo = await _resumo_obra(db, obra_db) if obra_db else None
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao resumir obra: {e}")
+        raise ValueError(f"Erro ao resumir obra: {e}")
+    if resumo is None:
+        raise ValueError(f"Obra {obra_id or codigo} não encontrada.")
+    if ctx:
+        await ctx.info(f"Resumo da obra {resumo.obra_id}: {resumo.tarefas} tarefas, valor total {resumo.valor_total}.")
+    return resumo
 
 @mcp.resource("obras://todas")
-def listar_obras(ctx: Context = None) -> List[ObraRead]:
+async def listar_obras(ctx: Context = None) -> Union[List[ObraRead], str]:
     """Lista todas as obras cadastradas."""
-    db: Session = next(get_session())
-    try:
-        statement = select(Obra)
-        results = db.exec(statement).all()
-        obras_list = [
-            ObraRead(id=obra.id, dados=ObraDados(**obra.dados), created_at=str(obra.created_at))
-            for obra in results
-        ]
-        if ctx:
-            ctx.info(f"Listando {len(obras_list)} obras.")
-        return obras_list
+    try:
+        if settings.JSON_LISTAS_POSTGRES:
+            return await _listar_json_postgres(Obra)
+        async with get_async_session_leitura() as db:
+            results = (await db.exec(_colunas_leitura(Obra))).all()
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao listar obras: {e}")
+        raise ValueError(f"Erro ao listar obras: {e}")
+    obras_list = [_obra_read(obra) for obra in results]
+    if ctx:
+        await ctx.info(f"Listando {len(obras_list)} obras.")
+    return obras_list
+
+@mcp.resource("obras://pagina/{apos_id}/{limite}", name="listar_obras_pagina")
+@mcp.resource("obras://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}", name="listar_obras_filtradas_pagina")
+@mcp.resource("obras://pagina/{apos_id}/{limite}/campos/{campos}", name="listar_obras_pagina_campos")
+@mcp.resource("obras://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}/campos/{campos}", name="listar_obras_filtradas_pagina_campos")
+async def listar_obras_pagina(
+    apos_id: int,
+    limite: int,
+    chave: Optional[str] = None,
+    valor: Optional[str] = None,
+    campos: Optional[str] = None,
+    ctx: Context = None
+) -> Union[PaginaObras, Dict[str, Any], str]:
+    """
+    Lista obras em páginas, ordenadas por ID. Use apos_id=0 para a primeira página
+    e depois o 'proximo_cursor' (ou a 'proxima_uri') devolvido em cada resposta.
+    O limite é truncado no máximo configurado (PAGINA_TAMANHO_MAX).
+    Filtro opcional por chave de 'dados': nome, codigo ou status (ex: obras://filtro/status/ativa/pagina/0/50).
+    Com /campos/{campos} no fim da URI, cada item traz só essas chaves de 'dados'
+    (ex: obras://pagina/0/50/campos/nome,codigo).
+    """
+    try:
+        projecao = campos_projecao(Obra, campos) if campos is not None else None
+        if projecao is not None or settings.JSON_LISTAS_POSTGRES:
+            return await _ler_pagina_json(_prefixo_uri_pagina("obras", chave, valor), Obra, apos_id, limite, chave, valor, FILTROS_OBRA, campos=projecao)
+        linhas, proximo = await _ler_pagina(Obra, apos_id, limite, chave, valor, FILTROS_OBRA)
     except Exception as e:
-        if ctx: ctx.error(f"Erro ao listar obras: {e}")
+        if ctx: await ctx.error(f"Erro ao listar página de obras: {e}")
         raise ValueError(f"Erro ao listar obras: {e}")
-    finally:
-        db.close()
+    itens = [_obra_read(obra) for obra in linhas]
+    if ctx:
+        await ctx.info(f"Página de obras após ID {apos_id}: {len(itens)} itens.")
+    return _pagina(PaginaObras, itens, proximo, _uri_pagina("obras", proximo, limite, chave, valor))
+
+@mcp.tool()
+async def buscar_obras(
+    codigo: Optional[str] = None,
+    nome: Optional[str] = None,
+    limite: int = 20,
+    ctx: Context = None
+) -> List[ObraRead]:
+    """
+    Busca obras pelo código exato e/ou por nome aproximado (parte do nome ou nome
+    parecido, ignorando maiúsculas). Os resultados por nome vêm dos mais parecidos
+    para os menos parecidos. Informe pelo menos um critério.
+    """
+    if not (codigo or nome):
+        raise ValueError("Informe 'codigo' ou 'nome' para buscar obras.")
+    try:
+        async with get_async_session_leitura() as db:
+            results = (await db.exec(consulta_busca_obras(codigo, nome, limite))).all()
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao buscar obras: {e}")
+        raise ValueError(f"Erro ao buscar obras: {e}")
+    if ctx:
+        await ctx.info(f"Busca de obras encontrou {len(results)} resultados.")
+    return [_obra_read(obra) for obra in results]
 
 # --- Tools e Resources para Pessoas ---
 @mcp.tool()
-def criar_pessoa(
+async def criar_pessoa(
     dados_pessoa: PessoaCriar,
     ctx: Context = None
 ) -> PessoaRead:
@@ -138,77 +1204,500 @@ def criar_pessoa(
     Os dados da pessoa são fornecidos como um objeto JSON que corresponde ao schema de PessoaCriar.
     """
     if ctx:
-        ctx.info(f"Tentando criar pessoa: {dados_pessoa.nome_completo}")
+        await ctx.info(f"Tentando criar pessoa: {dados_pessoa.nome_completo}")
 
     json_data_para_db = dados_pessoa.model_dump(exclude_none=True)
 
-    db: Session = next(get_session())
     try:
-        nova_pessoa = Pessoa(dados=json_data_para_db)
-        db.add(nova_pessoa)
-        db.commit()
-        db.refresh(nova_pessoa)
-        if ctx:
-            ctx.info(f"Pessoa '{nova_pessoa.dados.get('nome_completo')}' criada com ID: {nova_pessoa.id}")
-        return PessoaRead(id=nova_pessoa.id, dados=PessoaDados(**nova_pessoa.dados), created_at=str(nova_pessoa.created_at))
+        if settings.AGRUPAR_ESCRITAS:
+            novo_id, dados_db, created_at = await _criar_agrupado(agrupador_pessoas, dados_pessoa)
+            if ctx:
+                await ctx.info(f"Pessoa '{dados_db.get('nome_completo')}' criada com ID: {novo_id}")
+            return PessoaRead(id=novo_id, dados=PessoaDados(**dados_db), created_at=created_at)
+        async with get_async_session() as db:
+            nova_pessoa = Pessoa(dados=json_data_para_db)
+            db.add(nova_pessoa)
+            await db.flush()
+            await _invalidar_cache(db, "pessoas", [nova_pessoa.id])
+            await db.commit()
+            await db.refresh(nova_pessoa)
     except Exception as e:
-        db.rollback()
         if ctx:
-            ctx.error(f"Erro ao criar pessoa {dados_pessoa.nome_completo}: {e}")
+            await ctx.error(f"Erro ao criar pessoa {dados_pessoa.nome_completo}: {e}")
         raise ValueError(f"Não foi possível criar a pessoa: {e}")
-    finally:
-        db.close()
+    if ctx:
+        await ctx.info(f"Pessoa '{nova_pessoa.dados.get('nome_completo')}' criada com ID: {nova_pessoa.id}")
+    return PessoaRead(id=nova_pessoa.id, dados=PessoaDados(**nova_pessoa.dados), created_at=str(nova_pessoa.created_at))
+
+@mcp.tool()
+async def criar_pessoas_lote(
+    pessoas: List[Dict[str, Any]],
+    ctx: Context = None
+) -> ResultadoLote:
+    """
+    Cria várias pessoas numa única chamada. Cada item da lista segue o schema de
+    PessoaCriar (o campo 'nome_completo' é obrigatório). Todos os itens são validados
+    antes de gravar; os válidos são inseridos numa única transação e os inválidos
+    voltam com a mensagem de erro, identificados pela sua posição ('indice') na lista.
+    """
+    if ctx:
+        await ctx.info(f"Tentando criar lote de {len(pessoas)} pessoas")
+    try:
+        resultado = await _inserir_lote(Pessoa, PessoaCriar, pessoas, "pessoas")
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Erro ao criar lote de pessoas: {e}")
+        raise ValueError(f"Não foi possível criar o lote de pessoas: {e}")
+    if ctx:
+        await ctx.info(f"Lote de pessoas: {resultado.criados} criadas, {resultado.com_erro} com erro.")
+    return resultado
 
 @mcp.resource("pessoas://id/{pessoa_id}")
-def obter_pessoa_por_id(pessoa_id: int, ctx: Context = None) -> Optional[PessoaRead]:
-    """Obtém os detalhes de uma pessoa pelo seu ID."""
-    db: Session = next(get_session())
-    try:
-        pessoa_db = db.get(Pessoa, pessoa_id)
-        if pessoa_db:
-            if ctx: ctx.info(f"Pessoa encontrada: ID {pessoa_id}")
-            dados_parseados = PessoaDados(**pessoa_db.dados)
-            return PessoaRead(id=pessoa_db.id, dados=dados_parseados, created_at=str(pessoa_db.created_at))
-        else:
-            if ctx: ctx.warning(f"Pessoa com ID {pessoa_id} não encontrada.")
-            return None
+async def obter_pessoa_por_id(pessoa_id: int, ctx: Context = None) -> Optional[str]:
+    """Obtém os detalhes de uma pessoa pelo seu ID (JSON de PessoaRead)."""
+    chave = ("pessoas", pessoa_id)
+    if _cache_ativo() and (em_cache := cache_leituras.obter(chave)) is not None:
+        if ctx: await ctx.info(f"Pessoa encontrada (cache): ID {pessoa_id}")
+        return em_cache
+    marca = cache_leituras.marca()
+    try:
+        async with get_async_session_leitura() as db:
+            pessoa_db = await db.get(Pessoa, pessoa_id)
     except Exception as e:
-        if ctx: ctx.error(f"Erro ao obter pessoa {pessoa_id}: {e}")
+        if ctx: await ctx.error(f"Erro ao obter pessoa {pessoa_id}: {e}")
         raise ValueError(f"Erro ao buscar pessoa: {e}")
-    finally:
-        db.close()
+    if pessoa_db:
+        if ctx: await ctx.info(f"Pessoa encontrada: ID {pessoa_id}")
+        pessoa_json = _json_leitura(_pessoa_read(pessoa_db))
+        cache_leituras.guardar(chave, pessoa_json, marca, atraso_s=settings.LEITURA_APOS_ESCRITA_S if na_replica(db) else 0.0)
+        return pessoa_json
+    else:
+        if ctx: await ctx.warning(f"Pessoa com ID {pessoa_id} não encontrada.")
+        return None
+
+@mcp.resource("pessoas://id/{pessoa_id}/campos/{campos}", name="obter_pessoa_campos")
+async def obter_pessoa_campos(pessoa_id: int, campos: str, ctx: Context = None) -> Optional[str]:
+    """
+    Só alguns campos de uma pessoa (ex: pessoas://id/7/campos/nome_completo,email),
+    como em obras://id/{obra_id}/campos/{campos}.
+    """
+    try:
+        pessoa_json = await _ler_projetado(Pessoa, pessoa_id, campos_projecao(Pessoa, campos))
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao obter pessoa {pessoa_id}: {e}")
+        raise ValueError(f"Erro ao buscar pessoa: {e}")
+    if pessoa_json is None and ctx:
+        await ctx.warning(f"Pessoa com ID {pessoa_id} não encontrada.")
+    return pessoa_json
 
 @mcp.resource("pessoas://todas")
-def listar_pessoas(ctx: Context = None) -> List[PessoaRead]:
+async def listar_pessoas(ctx: Context = None) -> Union[List[PessoaRead], str]:
     """Lista todas as pessoas cadastradas."""
-    db: Session = next(get_session())
-    try:
-        statement = select(Pessoa)
-        results = db.exec(statement).all()
-        pessoas_list = []
-        for pessoa_db in results:
-            dados_parseados = PessoaDados(**pessoa_db.dados)
-            pessoas_list.append(
-                PessoaRead(id=pessoa_db.id, dados=dados_parseados, created_at=str(pessoa_db.created_at))
-            )
-        if ctx:
-            ctx.info(f"Listando {len(pessoas_list)} pessoas.")
-        return pessoas_list
+    try:
+        if settings.JSON_LISTAS_POSTGRES:
+            return await _listar_json_postgres(Pessoa)
+        async with get_async_session_leitura() as db:
+            results = (await db.exec(_colunas_leitura(Pessoa))).all()
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao listar pessoas: {e}")
+        raise ValueError(f"Erro ao listar pessoas: {e}")
+    pessoas_list = [_pessoa_read(pessoa_db) for pessoa_db in results]
+    if ctx:
+        await ctx.info(f"Listando {len(pessoas_list)} pessoas.")
+    return pessoas_list
+
+@mcp.resource("pessoas://pagina/{apos_id}/{limite}", name="listar_pessoas_pagina")
+@mcp.resource("pessoas://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}", name="listar_pessoas_filtradas_pagina")
+@mcp.resource("pessoas://pagina/{apos_id}/{limite}/campos/{campos}", name="listar_pessoas_pagina_campos")
+@mcp.resource("pessoas://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}/campos/{campos}", name="listar_pessoas_filtradas_pagina_campos")
+async def listar_pessoas_pagina(
+    apos_id: int,
+    limite: int,
+    chave: Optional[str] = None,
+    valor: Optional[str] = None,
+    campos: Optional[str] = None,
+    ctx: Context = None
+) -> Union[PaginaPessoas, Dict[str, Any], str]:
+    """
+    Lista pessoas em páginas, ordenadas por ID. Use apos_id=0 para a primeira página
+    e depois o 'proximo_cursor' (ou a 'proxima_uri') devolvido em cada resposta.
+    O limite é truncado no máximo configurado (PAGINA_TAMANHO_MAX).
+    Filtro opcional por chave de 'dados': nome_completo, cpf, email ou situacao_atual
+    (ex: pessoas://filtro/situacao_atual/Ativo/pagina/0/100).
+    Com /campos/{campos} no fim da URI, cada item traz só essas chaves de 'dados'
+    (ex: pessoas://pagina/0/100/campos/nome_completo).
+    """
+    try:
+        projecao = campos_projecao(Pessoa, campos) if campos is not None else None
+        if projecao is not None or settings.JSON_LISTAS_POSTGRES:
+            return await _ler_pagina_json(_prefixo_uri_pagina("pessoas", chave, valor), Pessoa, apos_id, limite, chave, valor, FILTROS_PESSOA, campos=projecao)
+        linhas, proximo = await _ler_pagina(Pessoa, apos_id, limite, chave, valor, FILTROS_PESSOA)
     except Exception as e:
-        if ctx: ctx.error(f"Erro ao listar pessoas: {e}")
+        if ctx: await ctx.error(f"Erro ao listar página de pessoas: {e}")
         raise ValueError(f"Erro ao listar pessoas: {e}")
-    finally:
-        db.close()
+    itens = [_pessoa_read(pessoa_db) for pessoa_db in linhas]
+    if ctx:
+        await ctx.info(f"Página de pessoas após ID {apos_id}: {len(itens)} itens.")
+    return _pagina(PaginaPessoas, itens, proximo, _uri_pagina("pessoas", proximo, limite, chave, valor))
+
+@mcp.tool()
+async def buscar_pessoas(
+    cpf: Optional[str] = None,
+    email: Optional[str] = None,
+    nome: Optional[str] = None,
+    limite: int = 20,
+    ctx: Context = None
+) -> List[PessoaRead]:
+    """
+    Busca pessoas pelo CPF exato (formato 000.000.000-00), pelo e-mail exato (sem
+    diferenciar maiúsculas) e/ou por nome aproximado (parte do nome ou nome parecido).
+    Os critérios informados são combinados (E). Os resultados por nome vêm dos mais
+    parecidos para os menos parecidos. Informe pelo menos um critério.
+    """
+    if not (cpf or email or nome):
+        raise ValueError("Informe 'cpf', 'email' ou 'nome' para buscar pessoas.")
+    try:
+        async with get_async_session_leitura() as db:
+            results = (await db.exec(consulta_busca_pessoas(cpf, email, nome, limite))).all()
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao buscar pessoas: {e}")
+        raise ValueError(f"Erro ao buscar pessoas: {e}")
+    if ctx:
+        await ctx.info(f"Busca de pessoas encontrou {len(results)} resultados.")
+    return [_pessoa_read(pessoa_db) for pessoa_db in results]
+
+# --- Tools e Resources para Tarefas ---
+@mcp.tool()
+async def criar_tarefas_lote(
+    tarefas: List[Dict[str, Any]],
+    ctx: Context = None
+) -> ResultadoLote:
+    """
+    Cria várias tarefas numa única chamada. Cada item da lista segue o schema de
+    TarefaCriar (o campo 'nome' é obrigatório; datas no formato AAAA-MM-DD).
+    Todos os itens são validados antes de gravar; os válidos são inseridos numa única
+    transação e os inválidos voltam com a mensagem de erro, identificados pela sua
+    posição ('indice') na lista. Tarefas com 'tipos_tarefa_id' e 'local_id' e sem
+    'preco_tarefa_local_id' recebem o preço vigente no 'inicio' (ou hoje), se houver.
+    """
+    if ctx:
+        await ctx.info(f"Tentando criar lote de {len(tarefas)} tarefas")
+    try:
+        resultado = await _inserir_lote(Tarefa, TarefaCriar, tarefas, "tarefas", completar=_completar_precos_tarefas)
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Erro ao criar lote de tarefas: {e}")
+        raise ValueError(f"Não foi possível criar o lote de tarefas: {e}")
+    if ctx:
+        await ctx.info(f"Lote de tarefas: {resultado.criados} criadas, {resultado.com_erro} com erro.")
+    return resultado
+
+@mcp.tool()
+async def atribuir_responsaveis_lote(
+    atribuicoes: List[Dict[str, Any]],
+    ctx: Context = None
+) -> ResultadoAtribuicao:
+    """
+    Define a equipe responsável de muitas tarefas numa única chamada. Cada item segue
+    AtribuicaoResponsaveis: 'tarefa_ids' e 'responsaveis' (pessoa_id, percentual,
+    eh_principal), que substitui a equipe atual dessas tarefas, e opcionalmente 'obra_id',
+    a obra das tarefas (as de outra obra voltam como não encontradas; sem ela a obra de
+    cada tarefa é buscada antes). Os percentuais de cada equipe devem somar 100 e ela deve
+    ter exatamente um principal. Itens inválidos voltam
+    com o erro pelo 'indice'; os válidos são gravados juntos numa única transação.
+    """
+    if ctx:
+        await ctx.info(f"Tentando atribuir responsáveis em {len(atribuicoes)} grupos de tarefas")
+    try:
+        resultado = await _atribuir_responsaveis(atribuicoes)
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Erro ao atribuir responsáveis: {e}")
+        raise ValueError(f"Não foi possível atribuir os responsáveis: {e}")
+    if ctx:
+        await ctx.info(f"Responsáveis: {resultado.atualizadas} tarefas atualizadas, "
+                       f"{resultado.nao_encontradas} não encontradas, {resultado.com_erro} grupos com erro.")
+    return resultado
+
+@mcp.tool()
+async def registrar_locais(
+    locais: List[Dict[str, Any]],
+    ctx: Context = None
+) -> ResultadoLote:
+    """
+    Registra (ou atualiza) a posição de locais na hierarquia obra -> módulo -> bloco ->
+    pavimento -> apartamento. Cada item segue o schema de LocalHierarquiaDados: 'local_id'
+    e 'obra_id' são obrigatórios e um nível só pode vir com todos os de cima. As tarefas
+    com esse 'local_id' passam a aparecer em tarefas://<nível>/<id> de cada ancestral.
+    """
+    if ctx:
+        await ctx.info(f"Tentando registrar {len(locais)} locais")
+    try:
+        resultado = await _registrar_locais(locais)
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Erro ao registrar locais: {e}")
+        raise ValueError(f"Não foi possível registrar os locais: {e}")
+    if ctx:
+        await ctx.info(f"Locais: {resultado.criados} registrados, {resultado.com_erro} com erro.")
+    return resultado
+
+@mcp.resource("tarefas://{nivel}/{nivel_id}", name="listar_tarefas_subarvore")
+@mcp.resource("tarefas://{nivel}/{nivel_id}/pagina/{apos_id}/{limite}", name="listar_tarefas_subarvore_pagina")
+@mcp.resource("tarefas://{nivel}/{nivel_id}/pagina/{apos_id}/{limite}/campos/{campos}", name="listar_tarefas_subarvore_pagina_campos")
+async def listar_tarefas_subarvore(
+    nivel: str,
+    nivel_id: int,
+    apos_id: int = 0,
+    limite: int = settings.PAGINA_TAMANHO_MAX,
+    campos: Optional[str] = None,
+    ctx: Context = None
+) -> Union[PaginaTarefas, Dict[str, Any], str]:
+    """
+    Todas as tarefas de uma obra, módulo, bloco, pavimento, apartamento ou local, em
+    qualquer nível abaixo dele (ex: tarefas://bloco/70 traz as dos pavimentos, apartamentos
+    e áreas comuns do bloco 70). Páginas ordenadas por ID como em obras://pagina/...:
+    tarefas://bloco/70/pagina/0/100 e depois a 'proxima_uri' de cada resposta.
+    Com /campos/{campos} no fim, só essas chaves de 'dados' (ex: .../pagina/0/100/campos/nome,status).
+    """
+    condicao = filtro_subarvore(nivel, nivel_id)
+    prefixo_uri = f"tarefas://{nivel}/{nivel_id}/pagina/"
+    try:
+        projecao = campos_projecao(Tarefa, campos) if campos is not None else None
+        if projecao is not None or settings.JSON_LISTAS_POSTGRES:
+            return await _ler_pagina_json(prefixo_uri, Tarefa, apos_id, limite, None, None, set(), condicao, projecao)
+        linhas, proximo = await _ler_pagina(Tarefa, apos_id, limite, None, None, set(), condicao)
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao listar tarefas de {nivel} {nivel_id}: {e}")
+        raise ValueError(f"Erro ao listar tarefas: {e}")
+    itens = [_tarefa_read(tarefa) for tarefa in linhas]
+    if ctx:
+        await ctx.info(f"Tarefas de {nivel} {nivel_id} após ID {apos_id}: {len(itens)} itens.")
+    proxima_uri = f"{prefixo_uri}{proximo}/{min(limite, settings.PAGINA_TAMANHO_MAX)}" if proximo is not None else None
+    return _pagina(PaginaTarefas, itens, proximo, proxima_uri)
+
+# --- Tools para Preços ---
+@mcp.tool()
+async def criar_preco(
+    dados_preco: PrecoCriar,
+    ctx: Context = None
+) -> PrecoRead:
+    """
+    Cria um preço para um tipo de tarefa num local, válido de 'validade_inicio' (padrão:
+    hoje) até 'validade_fim' (sem fim se omitido). Para trocar um preço, encerre a janela
+    do anterior ou crie um com início posterior: numa data coberta por várias janelas
+    vale a que começou por último.
+    """
+    if ctx:
+        await ctx.info(f"Tentando criar preço: tipo {dados_preco.tipos_tarefa_id}, local {dados_preco.local_id}")
+    try:
+        async with get_async_session() as db:
+            novo_preco = PrecoTarefaLocal(**dados_preco.model_dump(exclude_none=True))
+            db.add(novo_preco)
+            await db.flush()
+            await _invalidar_cache(db, "precos", [novo_preco.id])
+            await db.commit()
+            await db.refresh(novo_preco)
+    except Exception as e:
+        if ctx:
+            await ctx.error(f"Erro ao criar preço: {e}")
+        raise ValueError(f"Não foi possível criar o preço: {e}")
+    # Depois do commit: leituras em curso antes dele são descartadas pela marca do índice
+    indice_precos.invalidar((novo_preco.tipos_tarefa_id, novo_preco.local_id))
+    if ctx:
+        await ctx.info(f"Preço criado com ID: {novo_preco.id}")
+    return PrecoRead(**novo_preco.model_dump(exclude={"created_at"}), created_at=str(novo_preco.created_at))
+
+@mcp.tool()
+async def precificar_tarefas(
+    itens: Optional[List[Dict[str, Any]]] = None,
+    obra_id: Optional[int] = None,
+    data: Optional[datetime.date] = None,
+    gravar: bool = False,
+    ctx: Context = None
+) -> ResultadoPrecificacao:
+    """
+    Resolve de uma vez o preço vigente (precos_tarefa_local) de muitas combinações de
+    tipo de tarefa, local e data. Informe 'itens' (cada um segue TarefaPrecificar:
+    tipos_tarefa_id, local_id, data opcional e tarefa_id opcional) ou 'obra_id' para
+    precificar todas as tarefas da obra pelo seu 'inicio'. 'data' é a data usada quando
+    o item ou a tarefa não tem uma (padrão: hoje). Com gravar=True o preço encontrado
+    (ou a falta dele) é gravado em preco_tarefa_local_id das tarefas, num único UPDATE.
+    """
+    if (itens is None) == (obra_id is None):
+        raise ValueError("Informe 'itens' ou 'obra_id' (um dos dois).")
+    data_padrao = data or datetime.date.today()
+    resultados: List[ItemPreco] = []
+    pedidos: List[Tuple[int, int, datetime.date]] = []
+    alvos: List[Tuple[int, Optional[int]]] = [] # (indice, tarefa_id) de cada pedido
+    try:
+        if obra_id is not None:
+            async with get_async_session() as db:
+                statement = select(Tarefa.id, Tarefa.dados).where(filtro_subarvore("obra", obra_id)).order_by(Tarefa.id)
+                tarefas = (await db.exec(statement)).all()
+            for indice, tarefa in enumerate(tarefas):
+                tipo, local, inicio = (tarefa.dados.get(c) for c in ("tipos_tarefa_id", "local_id", "inicio"))
+                if tipo is None or local is None:
+                    resultados.append(ItemPreco(indice=indice, tarefa_id=tarefa.id, erro="Tarefa sem tipos_tarefa_id ou local_id."))
+                    continue
+                pedidos.append((tipo, local, datetime.date.fromisoformat(inicio) if inicio else data_padrao))
+                alvos.append((indice, tarefa.id))
+        else:
+            if len(itens) > settings.LOTE_TAMANHO_MAX:
+                raise ValueError(f"Lote com {len(itens)} itens excede o máximo de {settings.LOTE_TAMANHO_MAX}.")
+            for indice, item in enumerate(itens):
+                try:
+                    pedido = TarefaPrecificar.model_validate(item)
+                except ValidationError as e:
+                    resultados.append(ItemPreco(indice=indice, erro=_resumo_erro_validacao(e)))
+                    continue
+                pedidos.append((pedido.tipos_tarefa_id, pedido.local_id, pedido.data or data_padrao))
+                alvos.append((indice, pedido.tarefa_id))
+
+        precos = await _resolver_precos(pedidos)
+        gravados = 0
+        if gravar:
+            atribuicoes = [
+                {"id": tarefa_id, "preco_id": preco.id if preco else None}
+                for (_, tarefa_id), preco in zip(alvos, precos) if tarefa_id is not None
+            ]
+            if atribuicoes:
+                gravados = await _gravar_precos_tarefas(atribuicoes, obra_id)
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao precificar tarefas: {e}")
+        raise ValueError(f"Não foi possível precificar as tarefas: {e}")
+
+    for (indice, tarefa_id), preco in zip(alvos, precos):
+        if preco is None:
+            resultados.append(ItemPreco(indice=indice, tarefa_id=tarefa_id))
+        else:
+            resultados.append(ItemPreco(
+                indice=indice, tarefa_id=tarefa_id, preco_tarefa_local_id=preco.id,
+                preco=preco.preco, unidade_medida=preco.unidade_medida,
+            ))
+    resultados.sort(key=lambda item: item.indice)
+    precificados = sum(1 for preco in precos if preco is not None)
+    if ctx:
+        await ctx.info(f"Precificação: {precificados} com preço, {len(precos) - precificados} sem preço, {gravados} gravadas.")
+    return ResultadoPrecificacao(
+        precificados=precificados,
+        sem_preco=len(precos) - precificados,
+        com_erro=len(resultados) - len(precos),
+        gravados=gravados,
+        itens=resultados,
+    )
+
+# --- Exportação NDJSON ---
+ENTIDADES_EXPORTACAO = {
+    "obras": (Obra, _obra_read),
+    "pessoas": (Pessoa, _pessoa_read),
+    "tarefas": (Tarefa, _tarefa_read),
+}
+
+def _consulta_exportacao(modelo, apos_id: int):
+    """Linhas com id > apos_id em ordem de id; com JSON_LISTAS_POSTGRES, cada uma já como texto JSON."""
+    if settings.JSON_LISTAS_POSTGRES:
+        statement = select(modelo.id, sa.cast(_objeto_json_linha(modelo, modelo.__table__.c), sa.Text).label("json"))
+    else:
+        statement = _colunas_leitura(modelo)
+    return statement.where(modelo.id > apos_id).order_by(modelo.id)
+
+def _ndjson(linhas, montar) -> str:
+    """Uma linha JSON por registro, no formato de ObraRead/PessoaRead/TarefaRead."""
+    if settings.JSON_LISTAS_POSTGRES:
+        return "".join(f"{linha.json}\n" for linha in linhas)
+    return "".join(pydantic_core.to_json(montar(linha), fallback=str).decode() + "\n" for linha in linhas)
+
+async def _exportar_arquivo(entidade: str, apos_id: int, ctx: Optional[Context]) -> Tuple[Path, int, int]:
+    """
+    Grava as linhas de 'entidade' com id > apos_id em EXPORT_DIR, lendo com um cursor
+    do lado do servidor (yield_per): só um lote de EXPORT_LOTE linhas fica em memória
+    por vez. O arquivo aparece com o nome final só depois de completo.
+    """
+    modelo, montar = ENTIDADES_EXPORTACAO[entidade]
+    pasta = Path(settings.EXPORT_DIR)
+    pasta.mkdir(parents=True, exist_ok=True)
+    destino = pasta / f"{entidade}-{datetime.datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson"
+    parcial = destino.with_suffix(".ndjson.parcial")
+    linhas = tamanho = 0
+    try:
+        with open(parcial, "w", encoding="utf-8") as arquivo:
+            async with get_async_session_leitura() as db:
+                total = (await db.exec(select(sa.func.count()).select_from(modelo).where(modelo.id > apos_id))).one()
+                resultado = await db.stream(_consulta_exportacao(modelo, apos_id).execution_options(yield_per=settings.EXPORT_LOTE))
+                async for lote in resultado.partitions():
+                    texto = _ndjson(lote, montar)
+                    await asyncio.to_thread(arquivo.write, texto)
+                    linhas += len(lote)
+                    tamanho += len(texto.encode())
+                    if ctx:
+                        await ctx.report_progress(linhas, max(total, linhas))
+        os.replace(parcial, destino)
+    except BaseException:
+        parcial.unlink(missing_ok=True)
+        raise
+    return destino, linhas, tamanho
+
+async def _exportar_pagina(entidade: str, apos_id: int, limite: int) -> Tuple[str, int, Optional[int]]:
+    if limite < 1:
+        raise ValueError("O limite da página deve ser pelo menos 1.")
+    limite = min(limite, settings.EXPORT_PAGINA_MAX)
+    modelo, montar = ENTIDADES_EXPORTACAO[entidade]
+    async with get_async_session_leitura() as db:
+        linhas = (await db.exec(_consulta_exportacao(modelo, apos_id).limit(limite + 1))).all()
+    proximo = None
+    if len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo = linhas[-1].id
+    return _ndjson(linhas, montar), len(linhas), proximo
+
+@mcp.tool()
+async def exportar_ndjson(
+    entidade: str,
+    arquivo: bool = True,
+    apos_id: int = 0,
+    limite: int = settings.EXPORT_PAGINA_MAX,
+    ctx: Context = None
+) -> ResultadoExportacao:
+    """
+    Exporta obras, pessoas ou tarefas em NDJSON (um JSON por linha, no formato de
+    obras://id/..., pessoas://id/... e das páginas de tarefas), em ordem de ID.
+
+    - arquivo=True: grava todas as linhas com ID > apos_id num arquivo em EXPORT_DIR
+      no servidor e devolve o caminho. Envia notificações de progresso (linhas
+      gravadas / total) se a requisição trouxer um progressToken.
+    - arquivo=False: devolve em 'ndjson' uma página de até 'limite' linhas (truncado
+      em EXPORT_PAGINA_MAX); passe o 'proximo_cursor' como apos_id na chamada seguinte.
+    """
+    if entidade not in ENTIDADES_EXPORTACAO:
+        raise ValueError(f"Entidade '{entidade}' não suportada. Use uma de: {', '.join(ENTIDADES_EXPORTACAO)}")
+    inicio = time.perf_counter()
+    try:
+        if arquivo:
+            caminho, linhas, tamanho = await _exportar_arquivo(entidade, apos_id, ctx)
+            resultado = ResultadoExportacao(entidade=entidade, linhas=linhas, bytes=tamanho, arquivo=str(caminho),
+                                            segundos=round(time.perf_counter() - inicio, 3))
+        else:
+            texto, linhas, proximo = await _exportar_pagina(entidade, apos_id, limite)
+            resultado = ResultadoExportacao(entidade=entidade, linhas=linhas, bytes=len(texto.encode()), ndjson=texto,
+                                            proximo_cursor=proximo, segundos=round(time.perf_counter() - inicio, 3))
+    except Exception as e:
+        if ctx: await ctx.error(f"Erro ao exportar {entidade}: {e}")
+        raise ValueError(f"Erro ao exportar {entidade}: {e}")
+    if ctx:
+        destino = f"em {resultado.arquivo}" if arquivo else f"(página após ID {apos_id})"
+        await ctx.info(f"Exportação de {entidade}: {resultado.linhas} linhas {destino}.")
+    return resultado
 
 # --- Exemplo de Tool Ping (mantido) ---
 @mcp.tool()
-def ping() -> str:
+async def ping() -> str:
     """Responde 'pong' para verificar que el servidor está activo."""
     return "pong"
 
 # --- Exemplo de Resource server_info (mantido) ---
 @mcp.resource("resource://server_info")
-def get_server_info(ctx: Context = None) -> dict:
+async def get_server_info(ctx: Context = None) -> dict:
      """Devuelve información básica del servidor."""
      client_id_info = "N/A"
      request_id_info = "N/A"
@@ -221,6 +1710,81 @@ def get_server_info(ctx: Context = None) -> dict:
          "client_id": client_id_info
      }
 
+# --- Resource de diagnóstico do pool de conexões ---
+@mcp.resource("resource://db_pool")
+async def obter_estado_pool_db() -> dict:
+    """
+    Estado do pool de conexões com o Postgres: conexões em uso, livres e em overflow,
+    checkouts que estouraram o timeout e tempo médio/máximo de espera por uma conexão.
+    """
+    return estado_pool_async()
+
+# --- Resource de diagnóstico do cache de leituras ---
+@mcp.resource("resource://cache_stats")
+async def obter_estatisticas_cache() -> dict:
+    """
+    Estatísticas do cache de obras://id/... e pessoas://id/...: entradas, hits,
+    misses, taxa de acerto, expulsões (LRU), expirações (TTL) e invalidações,
+    além das do índice de preços por (tipo, local) e do estado da escuta
+    LISTEN/NOTIFY entre processos.
+    """
+    return {**cache_leituras.estatisticas(), "precos": indice_precos.estatisticas(), "notificacoes": ouvinte.estado()}
+
+# --- Métricas (latência por tool/resource e tempo no Postgres) ---
+@mcp.resource("resource://metrics")
+async def obter_metricas() -> dict:
+    """
+    Métricas do processo desde que iniciou: por tool e por template de resource,
+    chamadas, erros, latência (média e p50/p95/p99 estimados pelos buckets),
+    número de consultas SQL e tempo gasto no Postgres vs. fora dele, além
+    dos lotes do group commit de criar_obra/criar_pessoa (AGRUPAR_ESCRITAS), da
+    réplica de leitura (DATABASE_READ_URL; null sem réplica), das assinaturas
+    de resources (URIs assinadas e avisos enviados) e das partições de tarefas
+    criadas por criar_tarefas_lote.
+    """
+    return {
+        **metricas.snapshot(),
+        "pool": estado_pool_async(),
+        "replica": estado_leitura(),
+        "agrupador": {"obras": agrupador_obras.estatisticas(), "pessoas": agrupador_pessoas.estatisticas()},
+        "assinaturas": assinaturas.estatisticas(),
+        "particoes": estatisticas_particoes(),
+    }
+
+@mcp.custom_route("/metrics", methods=["GET"])
+async def metricas_prometheus(request: Request) -> PlainTextResponse:
+    """As mesmas métricas no formato do Prometheus (só no modo http, ao lado de /mcp)."""
+    pool = estado_pool_async()
+    extras = {f"db_pool_{chave}": valor for chave, valor in pool.items() if chave in ("em_uso", "livres", "overflow", "timeouts")}
+    return PlainTextResponse(metricas.prometheus(extras), media_type="text/plain; version=0.0.4")
+
+# --- Liveness/readiness para o modo http (ver app/server/asgi.py) ---
+# 'desligando' é ligado pelo lifespan de app/server/asgi.py quando o processo recebe SIGTERM
+estado_http = {"desligando": False}
+
+@mcp.custom_route("/health", methods=["GET"])
+async def health(request: Request) -> JSONResponse:
+    """Liveness: o processo está de pé e o event loop responde."""
+    return JSONResponse({"status": "ok"})
+
+@mcp.custom_route("/ready", methods=["GET"])
+async def ready(request: Request) -> JSONResponse:
+    """
+    Readiness: 200 se este worker consegue uma conexão do pool e executar uma
+    consulta no Postgres; 503 se não consegue ou se está desligando.
+    """
+    if estado_http["desligando"]:
+        return JSONResponse({"pronto": False, "motivo": "desligando"}, status_code=503)
+    try:
+        async with get_async_session() as db:
+            await db.exec(sa.text("SELECT 1"))
+    except Exception as e:
+        return JSONResponse({"pronto": False, "motivo": f"base de dados: {e}"}, status_code=503)
+    return JSONResponse({"pronto": True, "pool": estado_pool_async()})
+
+# Schemas gerados neste import ficam para o próximo arranque (ver app/server/esquemas.py)
+mcp.salvar_esquemas()
+
 # --- Punto de entrada para ejecutar el servidor ---
 # --- Punto de entrada para ejecutar el servidor ---
 if __name__ == "__main__":
@@ -229,9 +1793,23 @@ if __name__ == "__main__":
     transport_mode = "stdio" # Default
     port = 8000 # Default para HTTP
     if len(sys.argv) > 1 and sys.argv[1] == "http":
-        transport_mode = "streamable-http"
-        print(f"Iniciando servidor FastMCP '{mcp.name}' em modo Streamable HTTP na porta {port}...")
-        mcp.run(transport=transport_mode, host="0.0.0.0", port=port, path="/mcp")
+        import uvicorn
+        # Número de workers: http --workers N (ou SERVIDOR_WORKERS no .env)
+        workers = int(sys.argv[sys.argv.index("--workers") + 1]) if "--workers" in sys.argv else settings.SERVIDOR_WORKERS
+        print(f"Iniciando servidor FastMCP '{mcp.name}' em modo Streamable HTTP na porta {port} com {workers} worker(s)...")
+        print(f"Métricas Prometheus em http://localhost:{port}/metrics, readiness em /ready")
+        # A app é importada por string (e não a deste __main__) para que cada worker a crie no seu processo
+        uvicorn.run(
+            "app.server.asgi:criar_app_workers" if workers > 1 else "app.server.asgi:criar_app",
+            factory=True,
+            host="0.0.0.0",
+            port=port,
+            workers=workers,
+            lifespan="on",
+            timeout_graceful_shutdown=settings.SERVIDOR_TIMEOUT_APAGADO_S,
+            log_level="info",
+        )
     else:
-        print(f"Iniciando servidor FastMCP '{mcp.name}' em modo STDIO...")
+        # stderr: no modo stdio o stdout é o canal JSON-RPC com o cliente
+        print(f"Iniciando servidor FastMCP '{mcp.name}' em modo STDIO...", file=sys.stderr)
         mcp.run(transport=transport_mode) # Default para STDIO
@@ -0,0 +1,15 @@
+"""
+Benchmarks do servidor MCP.
+
+    python -m benchmarks semear --escala 100000     # dados sintéticos via COPY
+    python -m benchmarks carga --clientes 8          # latência/throughput por endpoint, em JSON
+    python -m benchmarks comparar base.json novo.json
+    python -m benchmarks workers --workers 1,2,4      # escala do modo HTTP multi-processo
+    python -m benchmarks responsaveis --tarefas 10000 # equipes em lote x por tarefa x esquema antigo
+    python -m benchmarks arranque --importtime       # arranque a frio do modo stdio
+    python -m benchmarks projecao                    # documento inteiro x .../campos/{campos}
+    python -m benchmarks agrupador --clientes 1,16,64 # criações concorrentes com e sem group commit
+
+Os scripts avulsos (concorrencia.py, explain_indices.py, serializacao.py)
+continuam rodando com PYTHONPATH=. python benchmarks/<script>.py.
+"""
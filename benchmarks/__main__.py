@@ -0,0 +1,170 @@
+"""
+Linha de comando dos benchmarks (rodar da raiz do projeto, com DATABASE_URL no .env):
+
+    python -m benchmarks semear --escala 100000 [--limpar]
+    python -m benchmarks carga --transportes memoria,http --clientes 8 --saida bench.json
+    python -m benchmarks comparar base.json bench.json --tolerancia 10
+    python -m benchmarks workers --workers 1,2,4 --processos 4 --clientes 4
+    python -m benchmarks responsaveis --tarefas 10000 --equipes 50
+    python -m benchmarks arranque --repeticoes 10 --importtime
+    python -m benchmarks projecao --requisicoes 200 --limite 100
+    python -m benchmarks agrupador --clientes 1,16,64 --duracao 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+def _semear(args) -> int:
+    from benchmarks.semear import semear
+
+    obras = args.obras if args.obras is not None else max(args.escala // 100, 1)
+    pessoas = args.pessoas if args.pessoas is not None else args.escala
+    tarefas = args.tarefas if args.tarefas is not None else args.escala
+    resultado = semear(obras, pessoas, tarefas, semente=args.semente, limpar=args.limpar)
+    print(json.dumps(resultado, indent=2))
+    return 0
+
+def _carga(args) -> int:
+    from benchmarks.carga import executar
+
+    relatorio = asyncio.run(executar(
+        transportes=args.transportes.split(","),
+        n_clientes=args.clientes,
+        requisicoes=args.requisicoes,
+        requisicoes_pesadas=args.requisicoes_pesadas,
+        padroes=args.endpoints.split(",") if args.endpoints else None,
+        somente_leitura=args.somente_leitura,
+        url=args.url,
+        progresso=lambda linha: print(linha, file=sys.stderr),
+    ))
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"Relatório gravado em {args.saida}", file=sys.stderr)
+    else:
+        print(texto)
+    if relatorio["nao_cobertos"]:
+        print(f"Aviso: endpoints sem carga definida: {', '.join(relatorio['nao_cobertos'])}", file=sys.stderr)
+    return 0
+
+def _comparar(args) -> int:
+    from benchmarks.carga import carregar_relatorio, comparar
+
+    linhas, regressoes = comparar(carregar_relatorio(args.base), carregar_relatorio(args.novo), args.tolerancia)
+    print("\n".join(linhas))
+    print(f"{regressoes} regressão(ões) acima de {args.tolerancia}%")
+    return 1 if regressoes else 0
+
+def _workers(args) -> int:
+    from benchmarks.workers import executar
+
+    relatorio = executar([int(w) for w in args.workers.split(",")], args.processos, args.clientes, args.duracao,
+                         progresso=lambda linha: print(linha, file=sys.stderr))
+    print(json.dumps(relatorio, indent=2))
+    return 0
+
+def _responsaveis(args) -> int:
+    from benchmarks.responsaveis import executar
+
+    print(json.dumps(executar(args.tarefas, args.equipes, semente=args.semente), indent=2))
+    return 0
+
+def _arranque(args) -> int:
+    from benchmarks.arranque import executar
+
+    relatorio = executar(args.repeticoes, com_importtime=args.importtime, progresso=lambda linha: print(linha, file=sys.stderr))
+    print(json.dumps(relatorio, indent=2))
+    return 0
+
+def _projecao(args) -> int:
+    from benchmarks.projecao import executar
+
+    print(json.dumps(executar(args.requisicoes, args.limite, semente=args.semente), indent=2))
+    return 0
+
+def _agrupador(args) -> int:
+    from benchmarks.agrupador import executar
+
+    relatorio = executar([int(n) for n in args.clientes.split(",")], args.duracao,
+                         progresso=lambda linha: print(linha, file=sys.stderr))
+    print(json.dumps(relatorio, indent=2))
+    return 0
+
+def _servidor(args) -> int:
+    from app.server.main import mcp
+
+    mcp.run(transport="streamable-http", host="127.0.0.1", port=args.porta, path="/mcp", log_level="warning")
+    return 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p = comandos.add_parser("semear", help="Insere obras/pessoas/tarefas sintéticas via COPY")
+    p.add_argument("--escala", type=int, default=1000, help="Pessoas e tarefas a inserir (obras = escala/100)")
+    p.add_argument("--obras", type=int, help="Sobrescreve a quantidade de obras")
+    p.add_argument("--pessoas", type=int, help="Sobrescreve a quantidade de pessoas")
+    p.add_argument("--tarefas", type=int, help="Sobrescreve a quantidade de tarefas")
+    p.add_argument("--semente", type=int, default=42, help="Semente dos dados aleatórios")
+    p.add_argument("--limpar", action="store_true", help="TRUNCATE das três tabelas antes de inserir")
+    p.set_defaults(funcao=_semear)
+
+    p = comandos.add_parser("carga", help="Mede throughput e p50/p95/p99 por endpoint")
+    p.add_argument("--transportes", default="memoria,http", help="memoria, http ou ambos separados por vírgula")
+    p.add_argument("--clientes", type=int, default=8, help="Sessões MCP concorrentes")
+    p.add_argument("--requisicoes", type=int, default=50, help="Requisições por cliente e endpoint")
+    p.add_argument("--requisicoes-pesadas", type=int, default=2,
+                   help="Requisições dos endpoints que leem a tabela inteira (com um só cliente)")
+    p.add_argument("--endpoints", help="Padrões fnmatch separados por vírgula (ex: 'buscar_*,obras://*')")
+    p.add_argument("--somente-leitura", action="store_true", help="Não executa os tools de criação")
+    p.add_argument("--url", help="Usa um servidor HTTP já rodando (ex: http://127.0.0.1:8000/mcp/)")
+    p.add_argument("--saida", help="Arquivo JSON do relatório (padrão: stdout)")
+    p.set_defaults(funcao=_carga)
+
+    p = comandos.add_parser("comparar", help="Compara dois relatórios de carga")
+    p.add_argument("base")
+    p.add_argument("novo")
+    p.add_argument("--tolerancia", type=float, default=10.0, help="Variação percentual aceita antes de acusar regressão")
+    p.set_defaults(funcao=_comparar)
+
+    p = comandos.add_parser("workers", help="Throughput do modo HTTP com 1..N workers do uvicorn")
+    p.add_argument("--workers", default="1,2,4", help="Números de workers a medir, separados por vírgula")
+    p.add_argument("--processos", type=int, default=4, help="Processos cliente gerando carga")
+    p.add_argument("--clientes", type=int, default=4, help="Sessões MCP concorrentes por processo cliente")
+    p.add_argument("--duracao", type=float, default=10.0, help="Segundos de carga por medição")
+    p.set_defaults(funcao=_workers)
+
+    p = comandos.add_parser("responsaveis", help="Equipes para milhares de tarefas: lote x UPDATE por tarefa x esquema antigo")
+    p.add_argument("--tarefas", type=int, default=10000, help="Tarefas (as de menor ID) que recebem equipe")
+    p.add_argument("--equipes", type=int, default=50, help="Equipes distintas de 3 pessoas repartidas entre as tarefas")
+    p.add_argument("--semente", type=int, default=42, help="Semente da escolha das pessoas")
+    p.set_defaults(funcao=_responsaveis)
+
+    p = comandos.add_parser("arranque", help="Tempo até a primeira resposta do modo stdio (processo novo por medição)")
+    p.add_argument("--repeticoes", type=int, default=10, help="Processos a medir (depois de um de aquecimento)")
+    p.add_argument("--importtime", action="store_true", help="Inclui os módulos mais lentos de -X importtime")
+    p.set_defaults(funcao=_arranque)
+
+    p = comandos.add_parser("projecao", help="Bytes e latência: documento inteiro x .../campos/{campos}")
+    p.add_argument("--requisicoes", type=int, default=200, help="Leituras de cada forma por par de URIs")
+    p.add_argument("--limite", type=int, default=100, help="Itens por página nas URIs de página")
+    p.add_argument("--semente", type=int, default=42, help="Semente da escolha dos IDs")
+    p.set_defaults(funcao=_projecao)
+
+    p = comandos.add_parser("agrupador", help="criar_pessoa/criar_obra concorrentes com e sem group commit")
+    p.add_argument("--clientes", default="1,16,64", help="Sessões MCP concorrentes a medir, separadas por vírgula")
+    p.add_argument("--duracao", type=float, default=10.0, help="Segundos de carga por medição")
+    p.set_defaults(funcao=_agrupador)
+
+    p = comandos.add_parser("servidor", help="Servidor streamable-HTTP usado pelo transporte http")
+    p.add_argument("--porta", type=int, default=8000)
+    p.set_defaults(funcao=_servidor)
+
+    args = parser.parse_args()
+    return args.funcao(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
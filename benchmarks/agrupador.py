@@ -0,0 +1,79 @@
+"""
+criar_pessoa/criar_obra com muitos clientes ao mesmo tempo, com e sem group commit
+(AGRUPAR_ESCRITAS): criações por segundo, commits de escrita por segundo (uma
+transação por criação sem agrupar; os lotes do agrupador com ele), linhas por
+commit e latência de cada chamada.
+
+Cada cliente é uma sessão MCP própria pelo transporte em memória e chama os tools
+de criação um depois do outro durante --duracao segundos. As linhas criadas ficam
+na base (nomes 'Pessoa Agrupador N' / 'Obra agrupador N').
+"""
+import asyncio
+import itertools
+import time
+
+from app.core.config import settings
+
+async def _cliente(mcp, contador, fim: float, latencias: list[float], erros: list[str]) -> None:
+    from fastmcp import Client
+
+    async with Client(mcp) as client:
+        while time.perf_counter() < fim:
+            n = next(contador)
+            if n % 2:
+                tool, argumentos = "criar_pessoa", {"dados_pessoa": {"nome_completo": f"Pessoa Agrupador {n}", "email": f"agrupador{n}@exemplo.com"}}
+            else:
+                tool, argumentos = "criar_obra", {"dados_obra": {"nome": f"Obra agrupador {n}", "codigo": f"AG{n}"}}
+            inicio = time.perf_counter()
+            try:
+                await client.call_tool(tool, argumentos)
+            except Exception as e:
+                erros.append(str(e))
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+async def _medir(clientes: int, duracao: float) -> dict:
+    from app.server.main import agrupador_obras, agrupador_pessoas, mcp
+
+    contador = itertools.count(int(time.time() * 1000))
+    latencias: list[float] = []
+    erros: list[str] = []
+    lotes_antes = agrupador_obras.lotes + agrupador_pessoas.lotes
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_cliente(mcp, contador, inicio + duracao, latencias, erros) for _ in range(clientes)))
+    segundos = time.perf_counter() - inicio
+    lotes = agrupador_obras.lotes + agrupador_pessoas.lotes - lotes_antes
+    commits = lotes if settings.AGRUPAR_ESCRITAS else len(latencias)
+    latencias.sort()
+    return {
+        "criacoes": len(latencias),
+        "erros": len(erros),
+        "criacoes_por_s": round(len(latencias) / segundos, 1),
+        "commits_por_s": round(commits / segundos, 1),
+        "criacoes_por_commit": round(len(latencias) / commits, 2) if commits else None,
+        "p50_ms": round(latencias[len(latencias) // 2], 2) if latencias else None,
+        "p95_ms": round(latencias[min(int(len(latencias) * 0.95), len(latencias) - 1)], 2) if latencias else None,
+    }
+
+async def _executar(clientes: list[int], duracao: float, progresso) -> list[dict]:
+    resultados = []
+    original = settings.AGRUPAR_ESCRITAS
+    try:
+        for n in clientes:
+            for agrupar in (False, True):
+                settings.AGRUPAR_ESCRITAS = agrupar
+                medicao = {"clientes": n, "agrupar": agrupar, **await _medir(n, duracao)}
+                progresso(f"clientes={n} agrupar={agrupar}: {medicao['criacoes_por_s']} criações/s, "
+                          f"{medicao['commits_por_s']} commits/s")
+                resultados.append(medicao)
+    finally:
+        settings.AGRUPAR_ESCRITAS = original
+    return resultados
+
+def executar(clientes: list[int], duracao: float = 10.0, progresso=print) -> dict:
+    return {
+        "duracao_s": duracao,
+        "janela_ms": settings.AGRUPAR_JANELA_MS,
+        "lote_max": settings.AGRUPAR_LOTE_MAX,
+        "medicoes": asyncio.run(_executar(clientes, duracao, progresso)),
+    }
@@ -0,0 +1,128 @@
+"""
+Arranque a frio do modo stdio: um processo novo do servidor por medição, como
+faz um cliente MCP a cada sessão, cronometrando desde o spawn até:
+
+- initialize:       a resposta ao initialize (imports + registro de tools/resources);
+- tools_list:       a resposta ao tools/list que vem logo depois;
+- primeira_consulta: a resposta de um tool que vai ao Postgres (cria engine/pool,
+                     carrega o driver e abre a primeira conexão).
+
+Com --importtime roda também 'python -X importtime -c "import app.server.main"'
+e lista os módulos de maior tempo acumulado.
+"""
+import json
+import os
+import queue
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+PROTOCOLO = "2025-03-26"
+
+def _mensagem(id_, metodo: str, params: dict | None = None) -> bytes:
+    corpo = {"jsonrpc": "2.0", "method": metodo, "params": params or {}}
+    if id_ is not None:
+        corpo["id"] = id_
+    return (json.dumps(corpo) + "\n").encode()
+
+def _esperar_resposta(linhas: queue.Queue, id_: int, limite: float) -> dict:
+    """Consome linhas do stdout até a resposta com 'id_' (ignora notificações, como os logs dos tools)."""
+    while True:
+        try:
+            linha = linhas.get(timeout=max(limite - time.monotonic(), 0))
+        except queue.Empty:
+            raise TimeoutError(f"Sem resposta para a requisição {id_}")
+        if linha is None:
+            raise RuntimeError("Servidor terminou antes de responder")
+        try:
+            mensagem = json.loads(linha)
+        except ValueError:
+            continue
+        if mensagem.get("id") == id_:
+            if "error" in mensagem:
+                raise RuntimeError(f"Erro na requisição {id_}: {mensagem['error']}")
+            return mensagem["result"]
+
+def _ler_linhas(processo: subprocess.Popen, linhas: queue.Queue) -> None:
+    for linha in processo.stdout:
+        linhas.put(linha)
+    linhas.put(None)
+
+def medir_uma_vez(comando: list[str], espera_s: float = 60.0) -> dict:
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(comando, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                env={**os.environ, "PYTHONPATH": os.getcwd()})
+    linhas: queue.Queue = queue.Queue()
+    threading.Thread(target=_ler_linhas, args=(processo, linhas), daemon=True).start()
+    limite = time.monotonic() + espera_s
+    tempos = {}
+    try:
+        processo.stdin.write(_mensagem(1, "initialize", {
+            "protocolVersion": PROTOCOLO, "capabilities": {},
+            "clientInfo": {"name": "benchmark-arranque", "version": "1"},
+        }))
+        processo.stdin.flush()
+        _esperar_resposta(linhas, 1, limite)
+        tempos["initialize_ms"] = (time.perf_counter() - inicio) * 1000
+
+        processo.stdin.write(_mensagem(None, "notifications/initialized"))
+        processo.stdin.write(_mensagem(2, "tools/list"))
+        processo.stdin.flush()
+        ferramentas = _esperar_resposta(linhas, 2, limite)["tools"]
+        tempos["tools_list_ms"] = (time.perf_counter() - inicio) * 1000
+
+        processo.stdin.write(_mensagem(3, "tools/call", {"name": "buscar_obras", "arguments": {"codigo": "OB0000001"}}))
+        processo.stdin.flush()
+        _esperar_resposta(linhas, 3, limite)
+        tempos["primeira_consulta_ms"] = (time.perf_counter() - inicio) * 1000
+        tempos["tools"] = len(ferramentas)
+    finally:
+        processo.stdin.close()
+        try:
+            processo.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+    return tempos
+
+def importtime(top: int = 15) -> list[dict]:
+    """Os 'top' módulos com maior tempo acumulado no import de app.server.main."""
+    saida = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.server.main"],
+                           capture_output=True, text=True, env={**os.environ, "PYTHONPATH": os.getcwd()}).stderr
+    modulos = []
+    for linha in saida.splitlines():
+        if not linha.startswith("import time:"):
+            continue
+        partes = [parte.strip() for parte in linha[len("import time:"):].split("|")]
+        if len(partes) != 3 or not partes[0].isdigit():
+            continue # Cabeçalho "self [us] | cumulative | imported package"
+        proprio, acumulado, nome = partes
+        modulos.append({"modulo": nome, "proprio_ms": int(proprio) / 1000, "acumulado_ms": int(acumulado) / 1000})
+    modulos.sort(key=lambda m: m["acumulado_ms"], reverse=True)
+    return modulos[:top]
+
+def executar(repeticoes: int = 10, com_importtime: bool = False, progresso=print) -> dict:
+    comando = [sys.executable, "-m", "app.server.main"]
+    # A primeira execução depois de uma mudança no código grava bytecode e o cache de schemas
+    medir_uma_vez(comando)
+    medicoes = []
+    for i in range(repeticoes):
+        medicoes.append(medir_uma_vez(comando))
+        progresso(f"{i + 1}/{repeticoes}: initialize {medicoes[-1]['initialize_ms']:.0f} ms, "
+                  f"tools/list {medicoes[-1]['tools_list_ms']:.0f} ms, primeira consulta {medicoes[-1]['primeira_consulta_ms']:.0f} ms")
+    relatorio = {
+        "repeticoes": repeticoes,
+        "tools": medicoes[0]["tools"],
+        **{
+            f"{etapa}_p50": round(statistics.median(m[f"{etapa}_ms"] for m in medicoes), 1)
+            for etapa in ("initialize", "tools_list", "primeira_consulta")
+        },
+        **{
+            f"{etapa}_min": round(min(m[f"{etapa}_ms"] for m in medicoes), 1)
+            for etapa in ("initialize", "tools_list", "primeira_consulta")
+        },
+    }
+    if com_importtime:
+        relatorio["importtime"] = importtime()
+    return relatorio
@@ -0,0 +1,376 @@
+"""
+Carga por endpoint através do fastmcp.Client.
+
+Para cada transporte (cliente em memória e/ou streamable-HTTP contra um servidor
+em outro processo) abre N sessões MCP e, endpoint por endpoint, faz as N sessões
+dispararem requisições em paralelo, medindo a latência de cada uma. O resultado é
+um dict pronto para JSON com throughput e p50/p95/p99 por endpoint, que o
+comando 'comparar' confronta com o de outro commit.
+
+Os endpoints são identificados pelo nome do tool ou pelo template do resource
+(obras://id/{obra_id}, não a URI concreta). Tools e resources do servidor que
+não estão em ENDPOINTS aparecem em 'nao_cobertos' no relatório.
+"""
+import asyncio
+import datetime
+import fnmatch
+import json
+import math
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+import psycopg
+from fastmcp import Client
+
+from app.core.config import settings
+from app.db.notificacoes import _dsn_libpq
+
+# --- Contexto com IDs reais para montar os argumentos ---
+@dataclass
+class Contexto:
+    obras: list[int]
+    pessoas: list[int]
+    blocos: list[int]
+    contagens: dict[str, int]
+    rnd: random.Random = field(default_factory=lambda: random.Random(7))
+    sequencia: int = 0
+
+    def proximo(self) -> int:
+        self.sequencia += 1
+        return self.sequencia
+
+def carregar_contexto(amostra: int = 1000) -> Contexto:
+    """Amostra de IDs existentes e contagem de linhas de cada tabela."""
+    with psycopg.connect(_dsn_libpq(settings.DATABASE_URL)) as conn:
+        contagens = {
+            tabela: conn.execute(f"SELECT count(*) FROM {tabela}").fetchone()[0]
+            for tabela in ("obras", "pessoas", "tarefas")
+        }
+        obras = [l[0] for l in conn.execute("SELECT id FROM obras ORDER BY random() LIMIT %s", (amostra,))]
+        pessoas = [l[0] for l in conn.execute("SELECT id FROM pessoas ORDER BY random() LIMIT %s", (amostra,))]
+        blocos = [l[0] for l in conn.execute(
+            "SELECT DISTINCT bloco_id FROM locais_hierarquia WHERE bloco_id IS NOT NULL ORDER BY 1 LIMIT %s", (amostra,))]
+    if not obras or not pessoas:
+        raise SystemExit("Base sem obras/pessoas: rode antes 'python -m benchmarks semear'.")
+    return Contexto(obras=obras, pessoas=pessoas, blocos=blocos, contagens=contagens)
+
+# --- Endpoints ---
+@dataclass
+class Endpoint:
+    nome: str # Nome do tool ou template do resource
+    tipo: str # "tool" ou "resource"
+    argumentos: Callable[[Contexto], Any] # tool: dict de argumentos; resource: URI concreta
+    escrita: bool = False
+    pesado: bool = False # Lê a tabela inteira: roda com um só cliente e poucas requisições
+
+def _obra_nova(c: Contexto) -> dict:
+    n = c.proximo()
+    return {"nome": f"Obra carga {n}", "codigo": f"CG{n}", "status": "ativa"}
+
+def _pessoa_nova(c: Contexto) -> dict:
+    n = c.proximo()
+    return {"nome_completo": f"Pessoa Carga {n}", "email": f"carga{n}@exemplo.com"}
+
+def _tarefa_nova(c: Contexto) -> dict:
+    return {
+        "nome": f"Tarefa carga {c.proximo()}",
+        "obra_id_ref": c.rnd.choice(c.obras),
+        "responsaveis": [{"pessoa_id": c.rnd.choice(c.pessoas), "eh_principal": True}],
+    }
+
+def _atribuicoes(c: Contexto) -> list[dict]:
+    # 100 tarefas do semear (IDs contíguos a partir de 1) divididas entre duas equipes
+    ids = c.rnd.sample(range(1, max(c.contagens["tarefas"], 100) + 1), 100)
+    return [
+        {"tarefa_ids": ids[i::2], "responsaveis": [
+            {"pessoa_id": principal, "percentual": 70, "eh_principal": True},
+            {"pessoa_id": apoio, "percentual": 30},
+        ]}
+        for i, (principal, apoio) in enumerate(c.rnd.sample(c.pessoas, 2) for _ in range(2))
+    ]
+
+def _local_novo(c: Contexto) -> dict:
+    # IDs altos para não colidir com os locais do semear
+    obra_id = c.rnd.choice(c.obras)
+    return {"local_id": 10_000_000 + c.proximo(), "obra_id": obra_id, "modulo_id": obra_id * 10, "bloco_id": obra_id * 100}
+
+def _preco_novo(c: Contexto) -> dict:
+    # Pares (tipo, local) fora dos do semear: não mexem nos preços medidos por precificar_tarefas
+    return {"tipos_tarefa_id": 1000 + c.proximo(), "local_id": c.rnd.randint(1, 5000), "preco": "10.00"}
+
+def _pedidos_preco(c: Contexto) -> list[dict]:
+    return [{"tipos_tarefa_id": c.rnd.randint(1, 20), "local_id": c.rnd.randint(1, 5000)} for _ in range(500)]
+
+def _subarvore(c: Contexto) -> str:
+    # Blocos do semear; sem locais registrados, a obra (preenchida a partir de obra_id_ref)
+    return f"bloco/{c.rnd.choice(c.blocos)}" if c.blocos else f"obra/{c.rnd.choice(c.obras)}"
+
+def _apos_id(c: Contexto, total: int) -> int:
+    # Cursores espalhados pela tabela (os IDs do semear começam em 1 e são contíguos)
+    return c.rnd.randrange(max(total - 100, 1))
+
+ENDPOINTS = [
+    Endpoint("ping", "tool", lambda c: {}),
+    Endpoint("buscar_obras", "tool", lambda c: {"codigo": f"OB{c.rnd.randrange(max(c.contagens['obras'], 1)):07d}"}),
+    Endpoint("buscar_obras[nome]", "tool", lambda c: {"nome": c.rnd.choice(["Silva", "Residencial Souza", "lima 1"])}),
+    Endpoint("buscar_pessoas", "tool", lambda c: {"email": f"pessoa{c.rnd.randrange(max(c.contagens['pessoas'], 1))}@exemplo.com"}),
+    Endpoint("buscar_pessoas[nome]", "tool", lambda c: {"nome": c.rnd.choice(["Ana Silva", "Bruno", "costa"])}),
+    Endpoint("criar_obra", "tool", lambda c: {"dados_obra": _obra_nova(c)}, escrita=True),
+    Endpoint("criar_pessoa", "tool", lambda c: {"dados_pessoa": _pessoa_nova(c)}, escrita=True),
+    Endpoint("criar_obras_lote", "tool", lambda c: {"obras": [_obra_nova(c) for _ in range(100)]}, escrita=True),
+    Endpoint("criar_pessoas_lote", "tool", lambda c: {"pessoas": [_pessoa_nova(c) for _ in range(100)]}, escrita=True),
+    Endpoint("criar_tarefas_lote", "tool", lambda c: {"tarefas": [_tarefa_nova(c) for _ in range(100)]}, escrita=True),
+    Endpoint("criar_preco", "tool", lambda c: {"dados_preco": _preco_novo(c)}, escrita=True),
+    Endpoint("precificar_tarefas", "tool", lambda c: {"itens": _pedidos_preco(c)}),
+    Endpoint("precificar_tarefas[obra]", "tool", lambda c: {"obra_id": c.rnd.choice(c.obras)}),
+    Endpoint("atribuir_responsaveis_lote", "tool", lambda c: {"atribuicoes": _atribuicoes(c)}, escrita=True),
+    Endpoint("registrar_locais", "tool", lambda c: {"locais": [_local_novo(c) for _ in range(100)]}, escrita=True),
+    Endpoint("obras://id/{obra_id}", "resource", lambda c: f"obras://id/{c.rnd.choice(c.obras)}"),
+    Endpoint("pessoas://id/{pessoa_id}", "resource", lambda c: f"pessoas://id/{c.rnd.choice(c.pessoas)}"),
+    Endpoint("obras://id/{obra_id}/resumo", "resource", lambda c: f"obras://id/{c.rnd.choice(c.obras)}/resumo"),
+    Endpoint("resumir_obra", "tool", lambda c: {"codigo": f"OB{c.rnd.randrange(max(c.contagens['obras'], 1)):07d}"}),
+    Endpoint("obras://pagina/{apos_id}/{limite}", "resource",
+             lambda c: f"obras://pagina/{_apos_id(c, c.contagens['obras'])}/50"),
+    Endpoint("obras://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}", "resource",
+             lambda c: "obras://filtro/status/ativa/pagina/0/50"),
+    Endpoint("pessoas://pagina/{apos_id}/{limite}", "resource",
+             lambda c: f"pessoas://pagina/{_apos_id(c, c.contagens['pessoas'])}/50"),
+    Endpoint("pessoas://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}", "resource",
+             lambda c: "pessoas://filtro/situacao_atual/Ativo/pagina/0/50"),
+    Endpoint("tarefas://{nivel}/{nivel_id}", "resource", lambda c: f"tarefas://{_subarvore(c)}"),
+    Endpoint("tarefas://{nivel}/{nivel_id}/pagina/{apos_id}/{limite}", "resource",
+             lambda c: f"tarefas://{_subarvore(c)}/pagina/0/50"),
+    Endpoint("exportar_ndjson", "tool", lambda c: {"entidade": "tarefas", "arquivo": False,
+                                                   "apos_id": _apos_id(c, c.contagens["tarefas"]), "limite": 500}),
+    Endpoint("exportar_ndjson[arquivo]", "tool", lambda c: {"entidade": "pessoas"}, pesado=True),
+    Endpoint("obras://id/{obra_id}/campos/{campos}", "resource", lambda c: f"obras://id/{c.rnd.choice(c.obras)}/campos/nome,codigo"),
+    Endpoint("pessoas://id/{pessoa_id}/campos/{campos}", "resource",
+             lambda c: f"pessoas://id/{c.rnd.choice(c.pessoas)}/campos/nome_completo,email"),
+    Endpoint("obras://pagina/{apos_id}/{limite}/campos/{campos}", "resource",
+             lambda c: f"obras://pagina/{_apos_id(c, c.contagens['obras'])}/50/campos/nome"),
+    Endpoint("obras://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}/campos/{campos}", "resource",
+             lambda c: "obras://filtro/status/ativa/pagina/0/50/campos/nome,codigo"),
+    Endpoint("pessoas://pagina/{apos_id}/{limite}/campos/{campos}", "resource",
+             lambda c: f"pessoas://pagina/{_apos_id(c, c.contagens['pessoas'])}/50/campos/nome_completo"),
+    Endpoint("pessoas://filtro/{chave}/{valor}/pagina/{apos_id}/{limite}/campos/{campos}", "resource",
+             lambda c: "pessoas://filtro/situacao_atual/Ativo/pagina/0/50/campos/nome_completo"),
+    Endpoint("tarefas://{nivel}/{nivel_id}/pagina/{apos_id}/{limite}/campos/{campos}", "resource",
+             lambda c: f"tarefas://{_subarvore(c)}/pagina/0/50/campos/nome,status"),
+    Endpoint("obras://todas", "resource", lambda c: "obras://todas", pesado=True),
+    Endpoint("pessoas://todas", "resource", lambda c: "pessoas://todas", pesado=True),
+    Endpoint("resource://server_info", "resource", lambda c: "resource://server_info"),
+    Endpoint("resource://db_pool", "resource", lambda c: "resource://db_pool"),
+    Endpoint("resource://cache_stats", "resource", lambda c: "resource://cache_stats"),
+    Endpoint("resource://metrics", "resource", lambda c: "resource://metrics"),
+]
+
+def selecionar_endpoints(padroes: Optional[list[str]], somente_leitura: bool) -> list[Endpoint]:
+    """Filtra ENDPOINTS por padrões fnmatch (ex: 'buscar_*', 'obras://*')."""
+    return [
+        e for e in ENDPOINTS
+        if (not padroes or any(fnmatch.fnmatch(e.nome, p) for p in padroes))
+        and not (somente_leitura and e.escrita)
+    ]
+
+async def nao_cobertos(client: Client) -> list[str]:
+    """Tools/resources anunciados pelo servidor que não têm Endpoint correspondente."""
+    conhecidos = {e.nome.split("[")[0] for e in ENDPOINTS}
+    anunciados = [t.name for t in await client.list_tools()]
+    anunciados += [str(r.uri) for r in await client.list_resources()]
+    anunciados += [t.uriTemplate for t in await client.list_resource_templates()]
+    return sorted(nome for nome in anunciados if nome not in conhecidos)
+
+# --- Medição ---
+def percentil(ordenados: list[float], p: float) -> float:
+    """Percentil pelo método do posto mais próximo (lista já ordenada)."""
+    if not ordenados:
+        return 0.0
+    posto = max(math.ceil(p / 100 * len(ordenados)), 1)
+    return ordenados[posto - 1]
+
+def resumir(latencias: list[float], erros: int, duracao: float) -> dict:
+    ordenadas = sorted(latencias)
+    ms = lambda s: round(s * 1000, 3)
+    return {
+        "requisicoes": len(latencias),
+        "erros": erros,
+        "throughput_rps": round(len(latencias) / duracao, 2) if duracao else 0.0,
+        "media_ms": ms(sum(ordenadas) / len(ordenadas)) if ordenadas else 0.0,
+        "p50_ms": ms(percentil(ordenadas, 50)),
+        "p95_ms": ms(percentil(ordenadas, 95)),
+        "p99_ms": ms(percentil(ordenadas, 99)),
+        "max_ms": ms(ordenadas[-1]) if ordenadas else 0.0,
+    }
+
+async def _requisitar(client: Client, endpoint: Endpoint, ctx: Contexto) -> None:
+    if endpoint.tipo == "tool":
+        await client.call_tool(endpoint.nome.split("[")[0], endpoint.argumentos(ctx))
+    else:
+        await client.read_resource(endpoint.argumentos(ctx))
+
+async def medir_endpoint(clientes: list[Client], endpoint: Endpoint, ctx: Contexto, requisicoes: int) -> dict:
+    """As sessões em 'clientes' fazem 'requisicoes' chamadas cada uma, em paralelo."""
+    latencias: list[float] = []
+    erros = 0
+    primeiro_erro: Optional[str] = None
+
+    async def trabalhar(client: Client) -> None:
+        nonlocal erros, primeiro_erro
+        for _ in range(requisicoes):
+            inicio = time.perf_counter()
+            try:
+                await _requisitar(client, endpoint, ctx)
+            except Exception as e:
+                erros += 1
+                primeiro_erro = primeiro_erro or str(e)[:200]
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    # Aquecimento (conexões do pool, caches de schema) fora da medição
+    await asyncio.gather(*(_requisitar(c, endpoint, ctx) for c in clientes), return_exceptions=True)
+    inicio = time.perf_counter()
+    await asyncio.gather(*(trabalhar(c) for c in clientes))
+    resumo = resumir(latencias, erros, time.perf_counter() - inicio)
+    resumo["clientes"] = len(clientes)
+    if primeiro_erro:
+        resumo["primeiro_erro"] = primeiro_erro
+    return resumo
+
+async def medir_transporte(alvo: Any, endpoints: list[Endpoint], ctx: Contexto, n_clientes: int,
+                           requisicoes: int, requisicoes_pesadas: int, progresso: Callable[[str], None]) -> tuple[dict, list[str]]:
+    """Roda todos os endpoints com N sessões abertas em 'alvo' (FastMCP ou URL)."""
+    async with AsyncExitStack() as pilha:
+        # AsyncExitStack fecha as sessões na ordem inversa (exigência dos cancel scopes do anyio)
+        clientes = [await pilha.enter_async_context(Client(alvo)) for _ in range(n_clientes)]
+        faltando = await nao_cobertos(clientes[0])
+        resultados = {}
+        for endpoint in endpoints:
+            if endpoint.pesado:
+                resultados[endpoint.nome] = await medir_endpoint(clientes[:1], endpoint, ctx, requisicoes_pesadas)
+            else:
+                resultados[endpoint.nome] = await medir_endpoint(clientes, endpoint, ctx, requisicoes)
+            r = resultados[endpoint.nome]
+            progresso(f"{endpoint.nome:<58} {r['throughput_rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}  "
+                      f"p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms  erros {r['erros']}")
+        return resultados, faltando
+
+# --- Servidor streamable-HTTP em outro processo ---
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+async def iniciar_servidor_http(porta: Optional[int] = None, espera_s: float = 30.0) -> tuple[subprocess.Popen, str]:
+    """Sobe 'python -m benchmarks servidor' e espera a porta aceitar conexões."""
+    porta = porta or _porta_livre()
+    processo = subprocess.Popen([sys.executable, "-m", "benchmarks", "servidor", "--porta", str(porta)])
+    limite = time.monotonic() + espera_s
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"Servidor HTTP terminou com código {processo.returncode}")
+        try:
+            _, escritor = await asyncio.open_connection("127.0.0.1", porta)
+            escritor.close()
+            # "/mcp/" com barra: "/mcp" responde 307 e dobra as idas e voltas
+            return processo, f"http://127.0.0.1:{porta}/mcp/"
+        except OSError:
+            await asyncio.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError(f"Servidor HTTP não respondeu na porta {porta} em {espera_s:.0f}s")
+
+def _commit_atual() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        sujo = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True).stdout.strip()
+        return f"{commit}-dirty" if sujo else commit
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+async def executar(transportes: list[str], n_clientes: int, requisicoes: int, requisicoes_pesadas: int,
+                   padroes: Optional[list[str]] = None, somente_leitura: bool = False, url: Optional[str] = None,
+                   progresso: Callable[[str], None] = lambda linha: None) -> dict:
+    """Executa a carga e devolve o relatório (ver o módulo)."""
+    ctx = carregar_contexto()
+    endpoints = selecionar_endpoints(padroes, somente_leitura)
+    relatorio = {
+        "meta": {
+            "commit": _commit_atual(),
+            "data": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "clientes": n_clientes,
+            "requisicoes_por_cliente": requisicoes,
+            "requisicoes_pesadas": requisicoes_pesadas,
+            "linhas": ctx.contagens,
+        },
+        "resultados": {},
+    }
+    faltando: list[str] = []
+    for transporte in transportes:
+        progresso(f"--- {transporte} ({n_clientes} clientes) ---")
+        if transporte == "memoria":
+            from app.db.session import async_engine
+            from app.server.main import mcp
+            try:
+                relatorio["resultados"][transporte], faltando = await medir_transporte(
+                    mcp, endpoints, ctx, n_clientes, requisicoes, requisicoes_pesadas, progresso)
+            finally:
+                await async_engine.dispose()
+        elif transporte == "http":
+            processo = None
+            if url is None:
+                processo, alvo = await iniciar_servidor_http()
+            else:
+                alvo = url
+            try:
+                relatorio["resultados"][transporte], faltando = await medir_transporte(
+                    alvo, endpoints, ctx, n_clientes, requisicoes, requisicoes_pesadas, progresso)
+            finally:
+                if processo is not None:
+                    processo.terminate()
+                    processo.wait(timeout=10)
+        else:
+            raise ValueError(f"Transporte desconhecido: {transporte} (use memoria ou http)")
+    relatorio["nao_cobertos"] = faltando
+    return relatorio
+
+# --- Comparação entre dois relatórios ---
+def comparar(base: dict, novo: dict, tolerancia_pct: float) -> tuple[list[str], int]:
+    """
+    Linhas de texto com a variação de throughput e p50/p95/p99 por endpoint, e o
+    número de regressões: p95 ou p99 mais de tolerancia_pct acima, ou throughput
+    mais de tolerancia_pct abaixo do relatório base.
+    """
+    def variacao(antes: float, depois: float) -> float:
+        return (depois - antes) / antes * 100 if antes else 0.0
+
+    linhas = [f"base {base['meta'].get('commit')}  ->  novo {novo['meta'].get('commit')}"]
+    regressoes = 0
+    for transporte, endpoints in novo["resultados"].items():
+        anteriores = base["resultados"].get(transporte, {})
+        linhas.append(f"--- {transporte} ---")
+        for nome, r in endpoints.items():
+            if nome not in anteriores:
+                linhas.append(f"{nome:<58} (novo)")
+                continue
+            a = anteriores[nome]
+            d_rps = variacao(a["throughput_rps"], r["throughput_rps"])
+            d_p95 = variacao(a["p95_ms"], r["p95_ms"])
+            d_p99 = variacao(a["p99_ms"], r["p99_ms"])
+            regressao = d_rps < -tolerancia_pct or d_p95 > tolerancia_pct or d_p99 > tolerancia_pct
+            regressoes += regressao
+            linhas.append(
+                f"{nome:<58} rps {d_rps:+7.1f}%  p50 {variacao(a['p50_ms'], r['p50_ms']):+7.1f}%  "
+                f"p95 {d_p95:+7.1f}%  p99 {d_p99:+7.1f}%{'  REGRESSÃO' if regressao else ''}"
+            )
+    return linhas, regressoes
+
+def carregar_relatorio(caminho: str) -> dict:
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
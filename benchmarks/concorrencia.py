@@ -0,0 +1,123 @@
+"""
+Benchmark de concurrencia: mide el throughput del servidor MCP en función del
+número de clientes concurrentes.
+
+Cada cliente abre su propia sesión en memoria (Client(mcp)) y lee
+repetidamente recursos que consultan la base de datos. Con los handlers
+async, las consultas de distintos clientes se solapan en el event loop,
+así que el throughput debería crecer con el número de clientes hasta que
+se sature el pool de conexiones o Postgres.
+
+Contra un Postgres local cada query tarda décimas de milisegundo y el coste
+lo domina la CPU de Python, así que no hay I/O que solapar. Con
+--latencia-ms se interpone un proxy TCP que retrasa cada paquete, simulando
+una base de datos en otra máquina (el caso real en producción).
+
+Uso (requiere DATABASE_URL apuntando a una base con las migraciones aplicadas):
+    PYTHONPATH=. python benchmarks/concorrencia.py --clientes 1,2,4,8,16 --leituras 200 --latencia-ms 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+from sqlalchemy.engine import make_url
+
+async def _bombear(origen: asyncio.StreamReader, destino: asyncio.StreamWriter, retraso: float) -> None:
+    """Copia bytes de origen a destino, retrasando cada bloque."""
+    try:
+        while datos := await origen.read(65536):
+            await asyncio.sleep(retraso)
+            destino.write(datos)
+            await destino.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        destino.close()
+
+async def iniciar_proxy(host: str, puerto: int, latencia_ms: float) -> asyncio.AbstractServer:
+    """Proxy TCP local hacia host:puerto que añade latencia_ms de ida y vuelta."""
+    retraso = latencia_ms / 2000
+
+    async def conectar(lector: asyncio.StreamReader, escritor: asyncio.StreamWriter) -> None:
+        lector_pg, escritor_pg = await asyncio.open_connection(host, puerto)
+        try:
+            await asyncio.gather(
+                _bombear(lector, escritor_pg, retraso),
+                _bombear(lector_pg, escritor, retraso),
+            )
+        except asyncio.CancelledError:
+            pass
+
+    return await asyncio.start_server(conectar, "127.0.0.1", 0)
+
+async def preparar_dados(mcp, n_obras: int) -> list[int]:
+    """Crea n_obras obras de prueba y devuelve sus IDs."""
+    from fastmcp import Client
+
+    ids = []
+    async with Client(mcp) as client:
+        for i in range(n_obras):
+            resultado = await client.call_tool(
+                "criar_obra", {"dados_obra": {"nome": f"Bench {i}", "codigo": f"B{i}", "status": "bench"}}
+            )
+            ids.append(json.loads(resultado[0].text)["id"])
+    return ids
+
+async def cliente(mcp, ids: list[int], leituras: int, uri_lista: bool) -> None:
+    """Un cliente MCP que hace 'leituras' lecturas secuenciales."""
+    from fastmcp import Client
+
+    async with Client(mcp) as client:
+        for i in range(leituras):
+            if uri_lista:
+                await client.read_resource("obras://todas")
+            else:
+                await client.read_resource(f"obras://id/{ids[i % len(ids)]}")
+
+async def medir(mcp, n_clientes: int, ids: list[int], leituras: int, uri_lista: bool) -> float:
+    """Ejecuta n_clientes en paralelo y devuelve lecturas por segundo."""
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente(mcp, ids, leituras, uri_lista) for _ in range(n_clientes)))
+    duracion = time.perf_counter() - inicio
+    return (n_clientes * leituras) / duracion
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clientes", default="1,2,4,8,16", help="Lista de niveles de concurrencia, separados por coma")
+    parser.add_argument("--leituras", type=int, default=200, help="Lecturas por cliente")
+    parser.add_argument("--obras", type=int, default=50, help="Obras de prueba a crear")
+    parser.add_argument("--lista", action="store_true", help="Leer obras://todas en lugar de obras://id/{id}")
+    parser.add_argument("--latencia-ms", type=float, default=0, help="Latencia de red simulada hacia Postgres (ida y vuelta)")
+    args = parser.parse_args()
+
+    if args.latencia_ms > 0:
+        # El engine se crea al importar app.db.session, así que la URL se
+        # reescribe hacia el proxy antes de importar el servidor.
+        load_dotenv()
+        url = make_url(os.environ["DATABASE_URL"])
+        proxy = await iniciar_proxy(url.host or "localhost", url.port or 5432, args.latencia_ms)
+        puerto_proxy = proxy.sockets[0].getsockname()[1]
+        query = {k: v for k, v in url.query.items() if k != "host"}
+        url = url.set(host="127.0.0.1", port=puerto_proxy, query=query)
+        os.environ["DATABASE_URL"] = url.render_as_string(hide_password=False)
+
+    from app.db.session import async_engine
+    from app.server.main import mcp
+
+    ids = await preparar_dados(mcp, args.obras)
+    niveles = [int(n) for n in args.clientes.split(",")]
+
+    print(f"{'clientes':>8} {'lecturas/s':>12} {'escala':>8}")
+    base = None
+    for n in niveles:
+        throughput = await medir(mcp, n, ids, args.leituras, args.lista)
+        base = base or throughput
+        print(f"{n:>8} {throughput:>12.1f} {throughput / base:>7.2f}x")
+
+    await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
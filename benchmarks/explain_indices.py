@@ -0,0 +1,92 @@
+"""
+Verifica com EXPLAIN que as buscas de buscar_pessoas/buscar_obras usam os índices
+criados pela migração 032695222dcb, tarefas://{nivel}/{nivel_id} o índice
+ix_tarefas_hierarquia da 7c1e5a9d2b40 e o filtro das páginas e "pessoas da obra"
+as colunas geradas e pessoas_obras da d7f2b8e4a613 (e não um seq scan da tabela).
+
+As consultas são montadas pelas mesmas funções usadas pelos tools
+(consulta_busca_pessoas / consulta_busca_obras / filtro_subarvore / _consulta_pagina). As tabelas são analisadas
+e enable_seqscan é desligado na transação para que o resultado não dependa
+do tamanho da tabela de teste: se o planner ainda assim não usar o índice
+esperado, a expressão da consulta não casa com a do índice. Em tarefas,
+particionada por obra (f1b6d3a8c452), vale a cópia do índice em cada partição.
+
+Uso (DATABASE_URL com as migrações aplicadas):
+    PYTHONPATH=. python benchmarks/explain_indices.py
+Sai com código 1 se alguma consulta não usar o índice esperado. Os mesmos casos
+rodam no pytest (tests/test_explain_indices.py) com as funções deste módulo.
+"""
+import json
+import sys
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from app.db.session import engine
+from app.models.all_models import Obra, Pessoa, PessoaObra, Tarefa
+from app.server.main import FILTROS_OBRA, _consulta_pagina, consulta_busca_obras, consulta_busca_pessoas, filtro_subarvore
+
+CASOS = [
+    ("pessoa por CPF", consulta_busca_pessoas("123.456.789-00", None, None, 20), "ix_pessoas_cpf"),
+    ("pessoa por e-mail", consulta_busca_pessoas(None, "Ana@Exemplo.com", None, 20), "ix_pessoas_email"),
+    ("pessoa por nome", consulta_busca_pessoas(None, None, "silva", 20), "ix_pessoas_nome_trgm"),
+    ("obra por código", consulta_busca_obras("ML2", None, 20), "ix_obras_codigo"),
+    ("obra por nome", consulta_busca_obras(None, "residencial", 20), "ix_obras_nome_trgm"),
+    ("tarefas do bloco", select(Tarefa.id).where(filtro_subarvore("bloco", 70)).order_by(Tarefa.id).limit(100), "ix_tarefas_hierarquia"),
+    ("página de obras por status", _consulta_pagina(Obra, 0, 50, "status", "pausada", FILTROS_OBRA)[0], "ix_obras_status"),
+    ("pessoas da obra", select(Pessoa.id).join(PessoaObra, PessoaObra.pessoa_id == Pessoa.id)
+        .where(PessoaObra.obra_id == 2).order_by(Pessoa.id).limit(100), "pessoas_obras_pkey"),
+]
+
+def indices_usados(plano: dict) -> set[str]:
+    """Nomes de todos os índices que aparecem na árvore do plano."""
+    nomes = {plano["Index Name"]} if "Index Name" in plano else set()
+    for filho in plano.get("Plans", []):
+        nomes |= indices_usados(filho)
+    return nomes
+
+def indices_aceitos(conn, indice: str) -> set[str]:
+    """O índice e as suas cópias nas partições (tarefas_padrao_hierarquia_idx etc.)."""
+    copias = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = to_regclass(:indice)"
+    ), {"indice": indice}).scalars().all()
+    return {indice, *copias}
+
+def preparar(conn) -> None:
+    """ANALYZE e enable_seqscan desligado na transação de 'conn' (desfeito no rollback)."""
+    # Estatísticas atualizadas: sem elas o planner pode preferir varrer a PK em ordem
+    conn.execute(text("ANALYZE obras, pessoas, pessoas_obras, tarefas, locais_hierarquia"))
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+
+def indice_existe(conn, indice: str) -> bool:
+    """Os índices trigram só existem onde o pg_trgm está instalado."""
+    return conn.execute(text("SELECT to_regclass(:indice) IS NOT NULL"), {"indice": indice}).scalar()
+
+def plano(conn, statement) -> dict:
+    """Raiz do EXPLAIN (FORMAT JSON) de 'statement', compilado com os valores literais."""
+    # Com o dialeto da conexão e exec_driver_sql o '%' do pg_trgm chega ao Postgres sem escape duplo
+    sql = statement.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    resultado = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    return (json.loads(resultado) if isinstance(resultado, str) else resultado)[0]["Plan"]
+
+def usa_indice(conn, statement, indice: str) -> tuple[bool, set[str]]:
+    """Se o plano usa 'indice' (ou uma cópia dele numa partição) e todos os índices usados."""
+    usados = indices_usados(plano(conn, statement))
+    return bool(indices_aceitos(conn, indice) & usados), usados
+
+def main() -> int:
+    falhas = 0
+    with engine.connect() as conn:
+        preparar(conn)
+        for descricao, statement, indice in CASOS:
+            if not indice_existe(conn, indice):
+                print(f"[PULADO] {descricao}: {indice} não existe nesta base")
+                continue
+            ok, usados = usa_indice(conn, statement, indice)
+            falhas += not ok
+            print(f"[{'OK' if ok else 'FALHA'}] {descricao}: esperado {indice}, plano usa {sorted(usados) or 'nenhum índice'}")
+        conn.rollback()
+    return 1 if falhas else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
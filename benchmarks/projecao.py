@@ -0,0 +1,79 @@
+"""
+Documento inteiro x só alguns campos de 'dados' (templates .../campos/{campos}):
+bytes da resposta e latência de cada leitura, pelo transporte em memória.
+
+Cada par lê as mesmas linhas das duas formas. O cache de obras://id/... e
+pessoas://id/... fica desligado neste processo, para que as duas formas vão ao
+Postgres em toda requisição.
+"""
+import asyncio
+import random
+import statistics
+import time
+
+import psycopg
+
+from app.core.config import settings
+from app.db.notificacoes import _dsn_libpq
+
+# (nome, URI do documento inteiro, URI projetada); {id}/{apos} são preenchidos por requisição
+PARES = [
+    ("obras://id", "obras://id/{id}", "obras://id/{id}/campos/nome,codigo"),
+    ("pessoas://id", "pessoas://id/{id}", "pessoas://id/{id}/campos/nome_completo"),
+    ("pessoas://pagina", "pessoas://pagina/{apos}/{limite}", "pessoas://pagina/{apos}/{limite}/campos/nome_completo"),
+    ("tarefas://obra", "tarefas://obra/{obra}/pagina/0/{limite}", "tarefas://obra/{obra}/pagina/0/{limite}/campos/nome,status"),
+]
+
+def _percentil(valores: list[float], p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * p / 100), len(ordenados) - 1)]
+
+async def _medir(client, uris: list[str]) -> dict:
+    tempos, tamanhos = [], []
+    for uri in uris:
+        inicio = time.perf_counter()
+        resposta = await client.read_resource(uri)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        tamanhos.append(len(resposta[0].text.encode()))
+    return {
+        "bytes_medio": round(statistics.mean(tamanhos)),
+        "p50_ms": round(_percentil(tempos, 50), 2),
+        "p95_ms": round(_percentil(tempos, 95), 2),
+    }
+
+async def _executar(requisicoes: int, limite: int, ids: dict, semente: int) -> dict:
+    from fastmcp import Client
+    from app.core.cache import cache_leituras
+    from app.server.main import mcp
+
+    cache_leituras.tamanho_max = 0
+    rnd = random.Random(semente)
+    resultados = {}
+    async with Client(mcp) as client:
+        for nome, inteiro, projetado in PARES:
+            valores = [
+                {"id": rnd.choice(ids["obras" if nome.startswith("obras") else "pessoas"]),
+                 "apos": rnd.randrange(max(len(ids["pessoas"]) - limite, 1)),
+                 "obra": rnd.choice(ids["obras"]), "limite": limite}
+                for _ in range(requisicoes)
+            ]
+            await _medir(client, [inteiro.format(**valores[0]), projetado.format(**valores[0])]) # aquecimento
+            completo = await _medir(client, [inteiro.format(**v) for v in valores])
+            campos = await _medir(client, [projetado.format(**v) for v in valores])
+            resultados[nome] = {
+                "inteiro": completo,
+                "campos": {**campos, "uri_exemplo": projetado.format(**valores[0])},
+                "bytes_relativo": round(campos["bytes_medio"] / completo["bytes_medio"], 3),
+                "p50_relativo": round(campos["p50_ms"] / completo["p50_ms"], 3),
+            }
+    return resultados
+
+def executar(requisicoes: int = 200, limite: int = 100, semente: int = 42) -> dict:
+    with psycopg.connect(_dsn_libpq(settings.DATABASE_URL)) as conn:
+        ids = {
+            "obras": [linha[0] for linha in conn.execute("SELECT id FROM obras ORDER BY id LIMIT 10000")],
+            "pessoas": [linha[0] for linha in conn.execute("SELECT id FROM pessoas ORDER BY id LIMIT 100000")],
+        }
+    if not ids["obras"] or not ids["pessoas"]:
+        raise SystemExit("Base sem obras/pessoas: rode antes 'python -m benchmarks semear'.")
+    return {"requisicoes": requisicoes, "limite": limite, "resultados": asyncio.run(_executar(requisicoes, limite, ids, semente))}
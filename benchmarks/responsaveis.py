@@ -0,0 +1,120 @@
+"""
+Atribuição de equipes (responsaveis) a muitas tarefas de uma vez, comparando:
+
+- lote:       o tool atribuir_responsaveis_lote, pelo transporte em memória: validação
+              em Python, um único UPDATE e o constraint trigger adiado conferindo cada
+              tarefa uma vez, no commit;
+- por_tarefa: um UPDATE por tarefa na mesma transação (executemany, sem as idas e
+              voltas do MCP que um tool de uma tarefa só somaria a cada uma);
+- legado:     o esquema antigo, reproduzido em tabela temporária: uma linha por
+              responsável em tarefa_responsaveis e a checagem da soma 100 disparada por
+              linha (adiada, senão o primeiro membro de uma equipe já falharia), que
+              relê todos os membros da tarefa a cada responsável inserido.
+
+Reescreve os responsaveis das primeiras --tarefas tarefas da base (rode sobre os
+dados do 'semear', não sobre dados reais).
+"""
+import asyncio
+import json
+import random
+import time
+
+import psycopg
+
+from app.core.config import settings
+from app.db.notificacoes import _dsn_libpq
+
+PERCENTUAIS = (50.0, 30.0, 20.0)
+
+_LEGADO = """
+CREATE TEMP TABLE tarefa_responsaveis (
+    tarefa_id bigint NOT NULL,
+    responsavel_id bigint NOT NULL,
+    percentual numeric(5,2) DEFAULT 100.00 NOT NULL CHECK (percentual > 0 AND percentual <= 100.00),
+    eh_principal boolean DEFAULT false NOT NULL,
+    PRIMARY KEY (tarefa_id, responsavel_id)
+);
+CREATE FUNCTION pg_temp.checar_soma_100_tarefa() RETURNS trigger LANGUAGE plpgsql AS $$
+DECLARE
+    v_soma_percentual numeric;
+BEGIN
+    SELECT coalesce(sum(percentual), 0.00) INTO v_soma_percentual FROM tarefa_responsaveis WHERE tarefa_id = NEW.tarefa_id;
+    IF abs(v_soma_percentual - 100.00) > 0.01 THEN
+        RAISE EXCEPTION 'Soma dos percentuais da tarefa % = %', NEW.tarefa_id, v_soma_percentual;
+    END IF;
+    RETURN NULL;
+END
+$$;
+CREATE CONSTRAINT TRIGGER tarefa_responsaveis_soma AFTER INSERT OR UPDATE ON tarefa_responsaveis
+    DEFERRABLE INITIALLY DEFERRED FOR EACH ROW EXECUTE FUNCTION pg_temp.checar_soma_100_tarefa();
+"""
+
+def _equipes(pessoas: list[int], quantidade: int, semente: int) -> list[list[dict]]:
+    rnd = random.Random(semente)
+    return [
+        [
+            {"pessoa_id": pessoa_id, "percentual": percentual, "eh_principal": i == 0}
+            for i, (pessoa_id, percentual) in enumerate(zip(rnd.sample(pessoas, len(PERCENTUAIS)), PERCENTUAIS))
+        ]
+        for _ in range(quantidade)
+    ]
+
+async def _medir_lote(atribuicoes: list[dict]) -> tuple[float, dict]:
+    from fastmcp import Client
+    from app.server.main import mcp
+
+    async with Client(mcp) as client:
+        inicio = time.perf_counter()
+        resposta = await client.call_tool("atribuir_responsaveis_lote", {"atribuicoes": atribuicoes})
+        duracao = time.perf_counter() - inicio
+    resultado = json.loads(resposta[0].text)
+    return duracao, {k: resultado[k] for k in ("atualizadas", "nao_encontradas", "com_erro")}
+
+def executar(n_tarefas: int, n_equipes: int, semente: int = 42, database_url=None) -> dict:
+    dsn = _dsn_libpq(database_url or settings.DATABASE_URL)
+    with psycopg.connect(dsn) as conn:
+        tarefas = [linha[0] for linha in conn.execute("SELECT id FROM tarefas ORDER BY id LIMIT %s", (n_tarefas,))]
+        pessoas = [linha[0] for linha in conn.execute("SELECT id FROM pessoas ORDER BY id LIMIT 1000")]
+    if len(tarefas) < n_tarefas or len(pessoas) < len(PERCENTUAIS):
+        raise SystemExit(f"Base com {len(tarefas)} tarefas e {len(pessoas)} pessoas; rode antes: python -m benchmarks semear --escala {n_tarefas}")
+
+    equipes = _equipes(pessoas, n_equipes, semente)
+    equipe_de = {tarefa_id: i % n_equipes for i, tarefa_id in enumerate(tarefas)}
+    resultados = {}
+
+    # Cada medição grava uma combinação diferente, para que nenhuma encontre as tarefas já no estado final
+    atribuicoes = [{"tarefa_ids": [t for t in tarefas if equipe_de[t] == e], "responsaveis": equipes[e]} for e in range(n_equipes)]
+    duracao, resumo = asyncio.run(_medir_lote(atribuicoes))
+    resultados["lote"] = {"segundos": round(duracao, 3), "checagens": len(tarefas), **resumo}
+
+    deslocadas = {t: equipes[(e + 1) % n_equipes] for t, e in equipe_de.items()}
+    with psycopg.connect(dsn) as conn:
+        inicio = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.executemany(
+                "UPDATE tarefas SET dados = dados || jsonb_build_object('responsaveis', %s::jsonb) WHERE id = %s",
+                [(json.dumps(equipe), t) for t, equipe in deslocadas.items()],
+            )
+        conn.commit()
+        resultados["por_tarefa"] = {"segundos": round(time.perf_counter() - inicio, 3), "checagens": len(tarefas)}
+
+    with psycopg.connect(dsn) as conn:
+        conn.execute(_LEGADO)
+        conn.commit()
+        linhas = [
+            (t, r["pessoa_id"], r["percentual"], r["eh_principal"])
+            for t, e in equipe_de.items() for r in equipes[e]
+        ]
+        inicio = time.perf_counter()
+        with conn.cursor() as cur:
+            cur.executemany(
+                "INSERT INTO tarefa_responsaveis (tarefa_id, responsavel_id, percentual, eh_principal) VALUES (%s, %s, %s, %s)",
+                linhas,
+            )
+        conn.commit()
+        resultados["legado"] = {"segundos": round(time.perf_counter() - inicio, 3), "checagens": len(linhas)}
+
+    base = resultados["lote"]["segundos"]
+    for r in resultados.values():
+        r["relativo_ao_lote"] = round(r["segundos"] / base, 2) if base else None
+    return {"tarefas": n_tarefas, "equipes": n_equipes, "membros_por_equipe": len(PERCENTUAIS), "resultados": resultados}
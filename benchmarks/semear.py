@@ -0,0 +1,156 @@
+"""
+Popula o Postgres com obras, pessoas e tarefas sintéticas usando COPY, que
+carrega centenas de milhares de linhas por segundo (os tools de lote passam
+pela validação Pydantic e servem para até LOTE_TAMANHO_MAX itens por chamada).
+
+Os dados são determinísticos para uma mesma --semente, e seguem os schemas de
+ObraCriar/PessoaCriar/TarefaCriar: pessoas associadas a obras existentes e
+tarefas com obra_id_ref, local_id e responsaveis apontando para linhas reais.
+Os locais (locais_hierarquia) vêm antes das tarefas, para que o trigger já
+preencha tarefas.hierarquia durante o COPY. Cada local tem preços (duas janelas
+de validade: o ano passado e a partir deste ano) para alguns tipos de tarefa.
+"""
+import datetime
+import json
+import random
+import time
+from typing import Optional
+
+import psycopg
+
+from app.core.config import settings
+from app.db.notificacoes import _dsn_libpq
+from app.db.particoes import distribuir
+
+STATUS_OBRA = ["planejada", "ativa", "pausada", "concluida"]
+STATUS_TAREFA = ["pendente", "em_andamento", "concluida"]
+SITUACOES = ["Ativo", "Ativo", "Ativo", "Afastado", "Desligado"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Isabela", "João"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Almeida", "Ribeiro", "Gomes"]
+LOCAIS = 5000
+TIPOS_TAREFA = 20
+TIPOS_COM_PRECO_POR_LOCAL = 3
+FUNCOES = ["Pedreiro", "Servente", "Eletricista", "Encanador", "Mestre de obras", "Engenheiro"]
+
+def _obra(rnd: random.Random, n: int) -> dict:
+    return {"nome": f"Residencial {rnd.choice(SOBRENOMES)} {n}", "codigo": f"OB{n:07d}", "status": rnd.choice(STATUS_OBRA)}
+
+def _pessoa(rnd: random.Random, n: int, obras: list[int]) -> dict:
+    nome = f"{rnd.choice(NOMES)} {rnd.choice(SOBRENOMES)} {rnd.choice(SOBRENOMES)}"
+    dados = {
+        "nome_completo": nome,
+        "cpf": f"{n // 1000000 % 1000:03d}.{n // 1000 % 1000:03d}.{n % 1000:03d}-{rnd.randrange(100):02d}",
+        "email": f"pessoa{n}@exemplo.com",
+        "situacao_atual": rnd.choice(SITUACOES),
+    }
+    if obras:
+        dados["obras_associadas"] = [
+            {"obra_id_ref": obra_id, "funcao_na_obra": rnd.choice(FUNCOES)}
+            for obra_id in rnd.sample(obras, min(len(obras), rnd.randint(1, 2)))
+        ]
+    return dados
+
+def _local(rnd: random.Random, local_id: int, obras: list[int]) -> tuple:
+    """Linha de locais_hierarquia: 2 módulos por obra, 4 blocos por módulo, 10 pavimentos por bloco."""
+    obra_id = rnd.choice(obras)
+    modulo_id = obra_id * 10 + rnd.randrange(2)
+    bloco_id = modulo_id * 10 + rnd.randrange(4)
+    if rnd.random() < 0.2:
+        return (local_id, "AREA_COMUM_INTERNA_BLOCO", f"Área comum {local_id}", obra_id, modulo_id, bloco_id, None, None)
+    pavimento_id = bloco_id * 100 + rnd.randrange(10)
+    apartamento_id = pavimento_id * 10 + rnd.randrange(4)
+    return (local_id, "APARTAMENTO", f"Apto {apartamento_id}", obra_id, modulo_id, bloco_id, pavimento_id, apartamento_id)
+
+def _tarefa(rnd: random.Random, n: int, locais: list[tuple], pessoas: list[int]) -> dict:
+    dados = {"nome": f"Tarefa {n}", "status": rnd.choice(STATUS_TAREFA), "tipos_tarefa_id": rnd.randint(1, TIPOS_TAREFA)}
+    if locais:
+        local = rnd.choice(locais)
+        dados["local_id"], dados["obra_id_ref"] = local[0], local[3]
+    if pessoas:
+        principal, *outros = rnd.sample(pessoas, min(len(pessoas), rnd.randint(1, 3)))
+        percentual = round(100 / (1 + len(outros)), 2)
+        # O principal fica com o resto, para a soma dar exatamente 100
+        dados["responsaveis"] = [
+            {"pessoa_id": principal, "percentual": round(100 - percentual * len(outros), 2), "eh_principal": True}
+        ] + [{"pessoa_id": pessoa_id, "percentual": percentual} for pessoa_id in outros]
+    return dados
+
+def _precos(rnd: random.Random, locais: list[tuple]):
+    """Linhas de precos_tarefa_local: janela fechada no ano passado e aberta a partir de 1º de janeiro."""
+    ano = datetime.date.today().year
+    for local in locais:
+        for tipo in rnd.sample(range(1, TIPOS_TAREFA + 1), TIPOS_COM_PRECO_POR_LOCAL):
+            preco = round(rnd.uniform(5, 200), 2)
+            yield (tipo, local[0], preco, "m2", datetime.date(ano - 1, 1, 1), datetime.date(ano - 1, 12, 31))
+            yield (tipo, local[0], round(preco * 1.08, 2), "m2", datetime.date(ano, 1, 1), None)
+
+def _copiar(conn: psycopg.Connection, tabela: str, linhas, particionada: bool = False) -> list[int]:
+    """
+    COPY das linhas (dicts) para 'tabela' e devolve os IDs criados. particionada=True
+    (tarefas) manda junto obra_id, a chave de partição, que o COPY precisa antes do trigger.
+    """
+    colunas = "dados, obra_id" if particionada else "dados"
+    with conn.cursor() as cur:
+        antes = cur.execute(f"SELECT coalesce(max(id), 0) FROM {tabela}").fetchone()[0]
+        with cur.copy(f"COPY {tabela} ({colunas}) FROM STDIN") as copy:
+            for dados in linhas:
+                linha = (json.dumps(dados, ensure_ascii=False),)
+                copy.write_row(linha + (dados.get("obra_id_ref", 0),) if particionada else linha)
+        return [linha[0] for linha in cur.execute(f"SELECT id FROM {tabela} WHERE id > %s ORDER BY id", (antes,))]
+
+def semear(obras: int, pessoas: int, tarefas: int, semente: int = 42, limpar: bool = False,
+           database_url: Optional[str] = None) -> dict:
+    """
+    Insere as quantidades pedidas de cada entidade e devolve as contagens e tempos.
+    limpar=True esvazia as três tabelas antes (TRUNCATE ... RESTART IDENTITY).
+    """
+    rnd = random.Random(semente)
+    resultado = {}
+    with psycopg.connect(_dsn_libpq(database_url or settings.DATABASE_URL)) as conn:
+        if limpar:
+            conn.execute("TRUNCATE obras, pessoas, tarefas, locais_hierarquia, precos_tarefa_local, "
+                         "obras_resumo, obras_resumo_responsavel RESTART IDENTITY")
+        inicio = time.perf_counter()
+        ids_obras = _copiar(conn, "obras", (_obra(rnd, n) for n in range(obras)))
+        resultado["obras"] = {"linhas": len(ids_obras), "segundos": round(time.perf_counter() - inicio, 3)}
+
+        inicio = time.perf_counter()
+        ids_pessoas = _copiar(conn, "pessoas", (_pessoa(rnd, n, ids_obras) for n in range(pessoas)))
+        resultado["pessoas"] = {"linhas": len(ids_pessoas), "segundos": round(time.perf_counter() - inicio, 3)}
+
+        inicio = time.perf_counter()
+        locais = []
+        if ids_obras:
+            # Locais novos depois dos já existentes (o semear pode rodar mais de uma vez)
+            primeiro = conn.execute("SELECT coalesce(max(local_id), 0) + 1 FROM locais_hierarquia").fetchone()[0]
+            locais = [_local(rnd, local_id, ids_obras) for local_id in range(primeiro, primeiro + LOCAIS)]
+            with conn.cursor().copy(
+                "COPY locais_hierarquia (local_id, tipo_local, nome, obra_id, modulo_id, bloco_id, pavimento_id, apartamento_id) FROM STDIN"
+            ) as copy:
+                for local in locais:
+                    copy.write_row(local)
+        resultado["locais_hierarquia"] = {"linhas": len(locais), "segundos": round(time.perf_counter() - inicio, 3)}
+
+        inicio = time.perf_counter()
+        with conn.cursor() as cur:
+            with cur.copy(
+                "COPY precos_tarefa_local (tipos_tarefa_id, local_id, preco, unidade_medida, validade_inicio, validade_fim) FROM STDIN"
+            ) as copy:
+                for preco in _precos(rnd, locais):
+                    copy.write_row(preco)
+            resultado["precos_tarefa_local"] = {"linhas": cur.rowcount, "segundos": round(time.perf_counter() - inicio, 3)}
+
+        inicio = time.perf_counter()
+        ids_tarefas = _copiar(conn, "tarefas", (_tarefa(rnd, n, locais, ids_pessoas) for n in range(tarefas)), particionada=True)
+        resultado["tarefas"] = {"linhas": len(ids_tarefas), "segundos": round(time.perf_counter() - inicio, 3)}
+        conn.commit()
+
+    # Obras que passaram de TAREFAS_PARTICAO_MIN_LINHAS saem de tarefas_padrao (uma transação por obra)
+    inicio = time.perf_counter()
+    particoes = distribuir(database_url or settings.DATABASE_URL, informar=lambda linha: None)
+    resultado["particoes"] = {"criadas": len(particoes["criadas"]), "segundos": round(time.perf_counter() - inicio, 3)}
+
+    # ANALYZE fora da transação do COPY, para o planner ver os novos volumes
+    with psycopg.connect(_dsn_libpq(database_url or settings.DATABASE_URL), autocommit=True) as conn:
+        conn.execute("ANALYZE obras, pessoas, tarefas, locais_hierarquia, precos_tarefa_local")
+    return resultado
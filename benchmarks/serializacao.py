@@ -0,0 +1,96 @@
+"""
+Mede o custo de serializar pessoas://todas nos três modos de leitura:
+
+  validar          : PessoaDados(**dados) revalida cada linha (LEITURA_CONFIAVEL=False)
+  confiavel        : dicts no formato de PessoaRead, sem revalidar (LEITURA_CONFIAVEL=True, padrão)
+  json_postgres    : o Postgres monta o JSON e o handler só o repassa (JSON_LISTAS_POSTGRES=True)
+
+Para cada modo reporta o tempo de parede, o tempo de CPU do processo e o pico de
+memória alocada em Python (tracemalloc) de uma leitura completa do resource por
+um cliente em memória (Client(mcp)), que roda no mesmo processo que o servidor.
+Se a tabela tiver menos pessoas que --linhas, completa com criar_pessoas_lote.
+
+Uso (DATABASE_URL com as migrações aplicadas):
+    PYTHONPATH=. python benchmarks/serializacao.py --linhas 50000 --repeticoes 3
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from sqlalchemy import func
+from fastmcp import Client
+from sqlmodel import select
+
+from app.core.config import settings
+from app.db.session import async_engine, get_async_session
+from app.models.all_models import Pessoa
+from app.server.main import PessoaCriar, _inserir_lote, mcp
+
+MODOS = {
+    "validar": {"LEITURA_CONFIAVEL": False, "JSON_LISTAS_POSTGRES": False},
+    "confiavel": {"LEITURA_CONFIAVEL": True, "JSON_LISTAS_POSTGRES": False},
+    "json_postgres": {"LEITURA_CONFIAVEL": True, "JSON_LISTAS_POSTGRES": True},
+}
+
+async def garantir_pessoas(linhas: int) -> int:
+    async with get_async_session() as db:
+        existentes = (await db.exec(select(func.count()).select_from(Pessoa))).one()
+    faltam = linhas - existentes
+    while faltam > 0:
+        lote = min(faltam, settings.LOTE_TAMANHO_MAX)
+        itens = [
+            {
+                "nome_completo": f"Pessoa Benchmark {existentes + i}",
+                "cpf": f"{(existentes + i) % 1000:03d}.{i % 1000:03d}.000-00",
+                "email": f"pessoa{existentes + i}@exemplo.com",
+                "obras_associadas": [{"obra_id_ref": 1, "funcao_na_obra": "Pedreiro"}],
+            }
+            for i in range(lote)
+        ]
+        await _inserir_lote(Pessoa, PessoaCriar, itens, "pessoas")
+        existentes += lote
+        faltam -= lote
+    return existentes
+
+async def medir(client: Client, repeticoes: int) -> dict:
+    """Melhor tempo entre as repetições e, numa leitura à parte, o pico do tracemalloc
+    (medido separado porque o tracemalloc deixa as alocações bem mais lentas)."""
+    melhor = None
+    for _ in range(repeticoes):
+        parede, cpu = time.perf_counter(), time.process_time()
+        conteudo = await client.read_resource("pessoas://todas")
+        parede, cpu = time.perf_counter() - parede, time.process_time() - cpu
+        if melhor is None or parede < melhor["parede_s"]:
+            melhor = {"parede_s": parede, "cpu_s": cpu, "bytes": len(conteudo[0].text.encode())}
+    del conteudo
+    tracemalloc.start()
+    await client.read_resource("pessoas://todas")
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    melhor["pico_mb"] = pico / 2**20
+    return melhor
+
+async def main(linhas: int, repeticoes: int) -> None:
+    total = await garantir_pessoas(linhas)
+    print(f"pessoas na tabela: {total}")
+    print(f"{'modo':<16} {'parede (s)':>10} {'CPU (s)':>8} {'pico (MB)':>10} {'resposta (MB)':>14}")
+    originais = {chave: getattr(settings, chave) for chave in MODOS["validar"]}
+    try:
+        async with Client(mcp) as client:
+            for nome, valores in MODOS.items():
+                for chave, valor in valores.items():
+                    setattr(settings, chave, valor)
+                r = await medir(client, repeticoes)
+                print(f"{nome:<16} {r['parede_s']:>10.3f} {r['cpu_s']:>8.3f} {r['pico_mb']:>10.1f} {r['bytes'] / 2**20:>14.1f}")
+    finally:
+        for chave, valor in originais.items():
+            setattr(settings, chave, valor)
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=50000, help="Pessoas mínimas na tabela")
+    parser.add_argument("--repeticoes", type=int, default=3, help="Leituras por modo (vale a mais rápida)")
+    args = parser.parse_args()
+    asyncio.run(main(args.linhas, args.repeticoes))
@@ -0,0 +1,108 @@
+"""
+Escalabilidade do modo multi-processo: throughput do servidor streamable-HTTP
+com 1..N workers do uvicorn (app.server.asgi:criar_app_workers) na mesma porta.
+
+A carga vem de vários processos cliente (um só processo Python cliente seria o
+gargalo antes do servidor), cada um com algumas sessões MCP concorrentes que
+repetem, durante --duracao segundos, os endpoints de leitura leves da suíte de
+carga (ENDPOINTS de benchmarks/carga.py sem escrita e sem as listas completas).
+"""
+import asyncio
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import time
+from contextlib import AsyncExitStack
+
+from benchmarks.carga import _porta_livre, carregar_contexto, resumir, selecionar_endpoints, _requisitar
+
+def _processo_cliente(url: str, clientes: int, duracao_s: float, fila) -> None:
+    """Roda num processo separado e devolve (latências, erros) pela fila."""
+    from fastmcp import Client
+
+    ctx = carregar_contexto()
+    endpoints = [e for e in selecionar_endpoints(None, somente_leitura=True) if not e.pesado]
+    latencias: list[float] = []
+    erros = 0
+
+    async def sessao(client) -> None:
+        nonlocal erros
+        i = 0
+        fim = time.monotonic() + duracao_s
+        while time.monotonic() < fim:
+            endpoint = endpoints[i % len(endpoints)]
+            i += 1
+            inicio = time.perf_counter()
+            try:
+                await _requisitar(client, endpoint, ctx)
+            except Exception:
+                erros += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    async def principal() -> None:
+        async with AsyncExitStack() as pilha:
+            sessoes = [await pilha.enter_async_context(Client(url)) for _ in range(clientes)]
+            await asyncio.gather(*(sessao(c) for c in sessoes))
+
+    asyncio.run(principal())
+    fila.put((latencias, erros))
+
+async def _esperar_pronto(porta: int, espera_s: float = 60.0) -> None:
+    """Espera /ready responder 200 (todos os workers sobem juntos na mesma porta)."""
+    limite = time.monotonic() + espera_s
+    while time.monotonic() < limite:
+        try:
+            leitor, escritor = await asyncio.open_connection("127.0.0.1", porta)
+            escritor.write(b"GET /ready HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+            await escritor.drain()
+            resposta = await leitor.read()
+            escritor.close()
+            if resposta.startswith(b"HTTP/1.1 200"):
+                return
+        except OSError:
+            pass
+        await asyncio.sleep(0.3)
+    raise RuntimeError(f"Servidor na porta {porta} não ficou pronto em {espera_s:.0f}s")
+
+def medir_workers(workers: int, processos: int, clientes: int, duracao_s: float) -> dict:
+    porta = _porta_livre()
+    servidor = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.server.asgi:criar_app_workers", "--factory",
+        "--host", "127.0.0.1", "--port", str(porta), "--workers", str(workers), "--log-level", "warning",
+    ], env={**os.environ, "PYTHONPATH": os.getcwd()})
+    try:
+        asyncio.run(_esperar_pronto(porta))
+        # "/mcp/" com barra: "/mcp" responde 307 e dobra as idas e voltas
+        url = f"http://127.0.0.1:{porta}/mcp/"
+        contexto_mp = multiprocessing.get_context("spawn")
+        fila = contexto_mp.Queue()
+        filhos = [contexto_mp.Process(target=_processo_cliente, args=(url, clientes, duracao_s, fila)) for _ in range(processos)]
+        for filho in filhos:
+            filho.start()
+        resultados = [fila.get() for _ in filhos]
+        for filho in filhos:
+            filho.join()
+    finally:
+        servidor.send_signal(signal.SIGTERM)
+        servidor.wait(timeout=60)
+    latencias = [l for lista, _ in resultados for l in lista]
+    erros = sum(e for _, e in resultados)
+    resumo = resumir(latencias, erros, duracao_s)
+    resumo.update({"workers": workers, "processos_cliente": processos, "clientes_por_processo": clientes})
+    return resumo
+
+def executar(lista_workers: list[int], processos: int, clientes: int, duracao_s: float, progresso=print) -> dict:
+    resultados = []
+    base = None
+    progresso(f"{'workers':>7} {'req/s':>9} {'escala':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'erros':>6}")
+    for workers in lista_workers:
+        r = medir_workers(workers, processos, clientes, duracao_s)
+        base = base or r["throughput_rps"]
+        r["escala"] = round(r["throughput_rps"] / base, 2) if base else 0.0
+        resultados.append(r)
+        progresso(f"{workers:>7} {r['throughput_rps']:>9.1f} {r['escala']:>6.2f}x {r['p50_ms']:>8.2f} "
+                  f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['erros']:>6}")
+    return {"cpus": os.cpu_count(), "duracao_s": duracao_s, "resultados": resultados}
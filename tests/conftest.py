@@ -0,0 +1,114 @@
+"""
+Fixtures dos testes que vão ao Postgres. Esses módulos são pulados sem DATABASE_URL
+(uma base com as migrações aplicadas):
+    DATABASE_URL=postgresql+psycopg://... python -m pytest
+
+As linhas criadas pelos testes são gravadas de verdade (os tools e resources abrem as
+suas próprias sessões) e removidas no fim de cada teste.
+"""
+import asyncio
+import json
+
+import pytest
+
+@pytest.fixture
+def sql():
+    """Conexão psycopg em autocommit para preparar e conferir os dados."""
+    import psycopg
+    from app.core.config import settings
+    from app.db.notificacoes import _dsn_libpq
+
+    with psycopg.connect(_dsn_libpq(settings.DATABASE_URL), autocommit=True) as conn:
+        yield conn
+
+@pytest.fixture
+def executar():
+    """
+    Roda uma corrotina num event loop novo e fecha os pools no fim: as conexões do
+    engine assíncrono ficam presas ao loop que as abriu.
+    """
+    from app.db.session import fechar_engines
+
+    def _executar(corrotina):
+        async def _com_fechamento():
+            try:
+                return await corrotina
+            finally:
+                await fechar_engines()
+        return asyncio.run(_com_fechamento())
+    return _executar
+
+@pytest.fixture
+def mcp_cliente(executar):
+    """
+    ler(uri) e chamar(tool, **argumentos) pelo transporte em memória do FastMCP, com o
+    cache de leituras vazio (cada teste lê da base).
+    """
+    from fastmcp import Client
+    from app.core.cache import cache_leituras
+    from app.server.main import mcp
+
+    cache_leituras.limpar()
+
+    class _Cliente:
+        def ler(self, uri: str):
+            async def _ler():
+                async with Client(mcp) as client:
+                    return (await client.read_resource(uri))[0].text
+            return json.loads(executar(_ler()))
+
+        def chamar(self, tool: str, **argumentos):
+            async def _chamar():
+                async with Client(mcp) as client:
+                    return (await client.call_tool(tool, argumentos))[0].text
+            return json.loads(executar(_chamar()))
+
+    yield _Cliente()
+    cache_leituras.limpar()
+
+@pytest.fixture
+def criar(sql):
+    """
+    criar(tabela, dados) grava uma linha direto na base e devolve o id; as linhas são
+    removidas no fim do teste, na ordem inversa (tarefas antes dos locais e obras).
+    """
+    criadas = []
+
+    def _criar(tabela: str, dados: dict, **colunas) -> int:
+        if tabela == "tarefas":
+            # A partição é escolhida antes dos triggers de linha: obra_id vai no INSERT
+            colunas.setdefault("obra_id", sql.execute(
+                "SELECT coalesce(tarefa_obra_de(%s::jsonb), 0)", (json.dumps(dados),)).fetchone()[0])
+        nomes = ["dados", *colunas]
+        valores = [json.dumps(dados), *colunas.values()]
+        id_ = sql.execute(
+            f"INSERT INTO {tabela} ({', '.join(nomes)}) VALUES ({', '.join(['%s'] * len(nomes))}) RETURNING id",
+            valores,
+        ).fetchone()[0]
+        criadas.append((tabela, id_))
+        return id_
+
+    yield _criar
+    for tabela, id_ in reversed(criadas):
+        sql.execute(f"DELETE FROM {tabela} WHERE id = %s", (id_,))
+
+@pytest.fixture
+def sequencia_decrescente(sql):
+    """
+    sequencia_decrescente(tabela): os próximos ids da tabela saem em ordem decrescente,
+    a partir de um valor bem acima dos existentes. A sequência volta ao estado
+    anterior e as linhas criadas são removidas no fim do teste.
+    """
+    alteradas = []
+
+    def _alterar(tabela: str) -> None:
+        sequencia = sql.execute("SELECT pg_get_serial_sequence(%s, 'id')", (tabela,)).fetchone()[0]
+        ultimo = sql.execute(f"SELECT last_value FROM {sequencia}").fetchone()[0]
+        sql.execute(f"ALTER SEQUENCE {sequencia} INCREMENT BY -1 MINVALUE 1 RESTART WITH 2000000000")
+        alteradas.append((tabela, sequencia, ultimo))
+
+    yield _alterar
+    for tabela, sequencia, ultimo in alteradas:
+        sql.execute(f"DELETE FROM {tabela} WHERE id > %s", (ultimo,))
+        sql.execute(f"ALTER SEQUENCE {sequencia} INCREMENT BY 1")
+        sql.execute("SELECT setval(%s, %s)", (sequencia, ultimo))
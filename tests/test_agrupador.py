@@ -0,0 +1,94 @@
+"""
+Group commit (app/db/agrupador.py): chamadas concorrentes saem num só INSERT e cada
+uma recebe o seu id; se o lote falha, as linhas são reintentadas uma a uma e só
+quem pediu a linha ruim recebe o erro.
+"""
+import asyncio
+import json
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+from app.core.config import settings
+from app.db.agrupador import AgrupadorInsercoes
+
+@pytest.fixture
+def tabela(sql):
+    """Tabela com id/dados/created_at em que 'dados' precisa de 'nome' (CHECK): uma linha sem ele falha no INSERT."""
+    sql.execute("""
+        CREATE TABLE teste_agrupador (
+            id serial PRIMARY KEY,
+            dados jsonb CHECK (dados ? 'nome'),
+            created_at timestamptz NOT NULL DEFAULT now()
+        )
+    """)
+    yield sa.Table(
+        "teste_agrupador", sa.MetaData(),
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("dados", JSONB),
+        sa.Column("created_at", sa.DateTime(timezone=True)),
+    )
+    sql.execute("DROP TABLE teste_agrupador")
+
+def _inserir_juntas(executar, agrupador: AgrupadorInsercoes, filas: list) -> list:
+    async def _todas():
+        return await asyncio.gather(*(agrupador.inserir(dados) for dados in filas), return_exceptions=True)
+    return executar(_todas())
+
+def test_lote_grava_cada_linha_com_o_seu_id(executar, sql, tabela):
+    agrupador = AgrupadorInsercoes(tabela, janela_ms=50)
+    filas = [{"nome": f"linha {i}"} for i in range(5)]
+    resultados = _inserir_juntas(executar, agrupador, filas)
+    assert agrupador.estatisticas()["lotes"] == 1 and agrupador.lotes_reintentados == 0
+    for dados, (id_, created_at) in zip(filas, resultados):
+        assert sql.execute("SELECT dados, created_at FROM teste_agrupador WHERE id = %s", (id_,)).fetchone() == (dados, created_at)
+
+def test_lote_com_erro_reintenta_linha_a_linha(executar, sql, tabela):
+    gravados = []
+
+    async def _ao_gravar(db, ids):
+        gravados.extend(ids)
+
+    agrupador = AgrupadorInsercoes(tabela, ao_gravar=_ao_gravar, janela_ms=50)
+    filas = [{"nome": "primeira"}, {"sem": "nome"}, {"nome": "terceira"}]
+    primeira, erro, terceira = _inserir_juntas(executar, agrupador, filas)
+    assert isinstance(erro, sa.exc.IntegrityError)
+    assert agrupador.lotes_reintentados == 1
+    # As outras linhas do lote foram gravadas, numa única transação (um só ao_gravar)
+    assert sorted(gravados) == sorted([primeira[0], terceira[0]])
+    assert sql.execute("SELECT id, dados ->> 'nome' FROM teste_agrupador ORDER BY id").fetchall() == [
+        (primeira[0], "primeira"), (terceira[0], "terceira")]
+
+def test_lote_max_despacha_sem_esperar_a_janela(executar, tabela):
+    agrupador = AgrupadorInsercoes(tabela, janela_ms=60_000, lote_max=3)
+    resultados = _inserir_juntas(executar, agrupador, [{"nome": str(i)} for i in range(3)])
+    assert len({id_ for id_, _ in resultados}) == 3
+    assert agrupador.estatisticas()["maior_lote"] == 3
+
+def test_criar_obra_agrupada_devolve_o_id_de_cada_chamada(sql, monkeypatch, sequencia_decrescente, executar):
+    # Com os ids saindo da sequência em ordem decrescente, cada chamada continua com a sua obra
+    from fastmcp import Client
+    from app.server.main import agrupador_obras, mcp
+
+    monkeypatch.setattr(settings, "AGRUPAR_ESCRITAS", True)
+    monkeypatch.setattr(settings, "AGRUPAR_JANELA_MS", 50.0)
+    sequencia_decrescente("obras")
+    nomes = [f"Agrupada {i}" for i in range(5)]
+
+    async def _criar():
+        async with Client(mcp) as client:
+            respostas = await asyncio.gather(*(
+                client.call_tool("criar_obra", {"dados_obra": {"nome": nome}}) for nome in nomes))
+        return [json.loads(resposta[0].text) for resposta in respostas]
+    lotes = agrupador_obras.lotes
+    criadas = executar(_criar())
+    assert agrupador_obras.lotes - lotes < len(nomes) # Saíram juntas em algum lote
+    for nome, obra in zip(nomes, criadas):
+        assert obra["dados"]["nome"] == nome
+        assert sql.execute("SELECT dados ->> 'nome' FROM obras WHERE id = %s", (obra["id"],)).fetchone() == (nome,)
@@ -0,0 +1,16 @@
+"""
+O modo stdio não carrega o driver ao importar o servidor (user-015): psycopg só
+entra com a primeira conexão.
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+def test_importar_servidor_nao_carrega_psycopg():
+    codigo = "import sys, app.server.main; print(sorted(m for m in sys.modules if m.split('.')[0] == 'psycopg'))"
+    resultado = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, check=True,
+                               cwd=RAIZ, env={**os.environ, "PYTHONPATH": str(RAIZ)})
+    assert resultado.stdout.strip() == "[]"
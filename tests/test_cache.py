@@ -0,0 +1,70 @@
+"""
+Cache de obras://id e pessoas://id (app/core/cache.py): a leitura toma a marca antes
+da consulta e guardar() descarta o valor se houve uma invalidação no meio (uma
+escrita deste ou de outro processo), ou pouco antes de uma leitura na réplica.
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+import json
+
+from app.core.cache import cache_leituras
+from app.core.config import settings
+from app.server import main
+
+@pytest.fixture
+def obra(criar):
+    return criar("obras", {"nome": "Obra do cache", "codigo": "TCACHE1"})
+
+def test_segunda_leitura_vem_do_cache(mcp_cliente, obra):
+    primeira = mcp_cliente.ler(f"obras://id/{obra}")
+    hits = cache_leituras.hits
+    assert mcp_cliente.ler(f"obras://id/{obra}") == primeira
+    assert cache_leituras.hits == hits + 1
+
+def test_leitura_que_cruza_uma_invalidacao_nao_fica_no_cache(mcp_cliente, monkeypatch, sql, obra):
+    """Outro processo grava a obra (e avisa por NOTIFY) depois do SELECT e antes do guardar()."""
+    obra_read = main._obra_read
+
+    def _escrita_no_meio(obra_db):
+        monkeypatch.setattr(main, "_obra_read", obra_read)
+        sql.execute("""UPDATE obras SET dados = dados || '{"nome": "Nome novo"}' WHERE id = %s""", (obra,))
+        main._ao_notificar_cache(main.CANAL_CACHE, f"obras:{obra}")
+        return obra_read(obra_db)
+
+    monkeypatch.setattr(main, "_obra_read", _escrita_no_meio)
+    assert mcp_cliente.ler(f"obras://id/{obra}")["dados"]["nome"] == "Obra do cache"
+    assert cache_leituras.obter(("obras", obra)) is None
+    assert mcp_cliente.ler(f"obras://id/{obra}")["dados"]["nome"] == "Nome novo"
+
+def test_invalidacao_de_outra_linha_tambem_descarta(mcp_cliente, monkeypatch, obra):
+    # A marca é um contador único: qualquer invalidação no meio descarta o valor, mesmo a de outra linha
+    obra_read = main._obra_read
+
+    def _outra_no_meio(obra_db):
+        cache_leituras.invalidar(("obras", obra + 1))
+        return obra_read(obra_db)
+
+    monkeypatch.setattr(main, "_obra_read", _outra_no_meio)
+    mcp_cliente.ler(f"obras://id/{obra}")
+    assert cache_leituras.obter(("obras", obra)) is None
+
+@pytest.mark.parametrize("na_replica, guardado", [(True, False), (False, True)], ids=["replica", "primario"])
+def test_invalidacao_recente_e_leitura_na_replica(mcp_cliente, monkeypatch, obra, na_replica, guardado):
+    """
+    A escrita já foi confirmada (e invalidada) antes da marca, mas a réplica atrasada
+    ainda pode devolver a versão antiga: nos LEITURA_APOS_ESCRITA_S seguintes o
+    que vem da réplica não é guardado; o que vem do primário é.
+    """
+    monkeypatch.setattr(settings, "LEITURA_APOS_ESCRITA_S", 60.0)
+    monkeypatch.setattr(main, "na_replica", lambda db: na_replica)
+    cache_leituras.invalidar(("obras", obra))
+    lido = mcp_cliente.ler(f"obras://id/{obra}")
+    em_cache = cache_leituras.obter(("obras", obra))
+    assert (em_cache is not None) == guardado
+    if guardado:
+        assert json.loads(em_cache) == lido
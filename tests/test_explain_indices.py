@@ -0,0 +1,32 @@
+"""
+As buscas de buscar_pessoas/buscar_obras, tarefas://{nivel}/{nivel_id} e os filtros
+das páginas usam os índices esperados (EXPLAIN com enable_seqscan desligado).
+Os casos e as funções são os de benchmarks/explain_indices.py.
+
+Precisa de uma base com as migrações aplicadas em DATABASE_URL:
+    DATABASE_URL=postgresql+psycopg://... python -m pytest
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+from benchmarks.explain_indices import CASOS, engine, indice_existe, preparar, usa_indice
+
+@pytest.fixture(scope="module")
+def conn():
+    with engine.connect() as conexao:
+        preparar(conexao)
+        yield conexao
+        conexao.rollback()
+
+@pytest.mark.parametrize("statement, indice", [(statement, indice) for _, statement, indice in CASOS],
+                         ids=[descricao for descricao, _, _ in CASOS])
+def test_consulta_usa_indice(conn, statement, indice):
+    if not indice_existe(conn, indice):
+        pytest.skip(f"{indice} não existe nesta base (pg_trgm não instalado?)")
+    with conn.begin_nested():
+        ok, usados = usa_indice(conn, statement, indice)
+    assert ok, f"esperado {indice}, plano usa {sorted(usados) or 'nenhum índice'}"
@@ -0,0 +1,106 @@
+"""
+Reanudación de app/db/importacao_legado.py sin base: lotes() arma lotes encadenados
+que saltan los tramos ya grabados y tramos_grabados() encuentra desde dónde seguir.
+"""
+import datetime
+import random
+
+import pytest
+
+from app.db.importacao_legado import FilaRechazada, _tarefa, lotes, tramos_grabados
+
+class _ConexionLotes:
+    """Lo mínimo de psycopg.Connection que usa tramos_grabados: las filas (anterior_id, ultimo_id) de una etapa."""
+
+    def __init__(self, tramos):
+        self.tramos = list(tramos)
+
+    def execute(self, consulta, parametros):
+        tramos = self.tramos
+
+        class _Cursor:
+            def fetchall(self):
+                return tramos
+        return _Cursor()
+
+def _filas(*ids):
+    return [(id_, f"fila {id_}") for id_ in ids]
+
+def _en_bloques(filas, tamano=4):
+    """Como _leer: las filas en bloques de FETCH (que no coinciden con los lotes)."""
+    return iter([filas[i:i + tamano] for i in range(0, len(filas), tamano)])
+
+def _ids(filas):
+    return [fila[0] for fila in filas]
+
+def test_sin_tramos_lotes_encadenados():
+    resultado = list(lotes(_en_bloques(_filas(*range(1, 8))), 0, [], 3))
+    assert [(a, u, _ids(l)) for a, u, l in resultado] == [(0, 3, [1, 2, 3]), (3, 6, [4, 5, 6]), (6, 7, [7])]
+
+def test_salta_tramos_contiguos():
+    # (20, 30] y (30, 40] ya grabados: el lote anterior termina en 20 y el siguiente sale de 40
+    filas = _filas(*range(11, 51))
+    resultado = list(lotes(_en_bloques(filas), 10, [(20, 30), (30, 40)], 100))
+    assert [(a, u) for a, u, _ in resultado] == [(10, 20), (40, 50)]
+    assert _ids(resultado[0][2]) == list(range(11, 21))
+    assert _ids(resultado[1][2]) == list(range(41, 51))
+
+def test_reanuda_con_huecos_entre_tramos():
+    # Tramos (5, 8] y (12, 15] grabados por otras conexiones; la cadena llegaba hasta 3
+    filas = _filas(*range(4, 19))
+    resultado = list(lotes(_en_bloques(filas), 3, [(5, 8), (12, 15)], 10))
+    assert [(a, u, _ids(l)) for a, u, l in resultado] == [
+        (3, 5, [4, 5]), (8, 12, [9, 10, 11, 12]), (15, 18, [16, 17, 18])]
+
+def test_lote_vacio_para_cerrar_un_hueco_sin_filas():
+    # Entre 10 y el tramo (15, 30] no hay filas (borradas en el origen): un lote vacío
+    # (10, 15] encadena el punto de reanudación con el tramo
+    filas = _filas(16, 20, 31, 32)
+    resultado = list(lotes(_en_bloques(filas), 10, [(15, 30)], 100))
+    assert [(a, u, _ids(l)) for a, u, l in resultado] == [(10, 15, []), (30, 32, [31, 32])]
+    # Con la cadena (0, 10] de antes, la etapa queda completa hasta 32
+    anteriores = [(0, 10), (15, 30)]
+    assert tramos_grabados(_ConexionLotes(anteriores + [(a, u) for a, u, _ in resultado]), "tarefas") == (32, [])
+
+def test_tramos_grabados_fin_de_la_cadena_y_sueltos():
+    conexion = _ConexionLotes([(0, 5), (5, 9), (12, 20), (9, 11), (25, 30)])
+    assert tramos_grabados(conexion, "obras") == (11, [(12, 20), (25, 30)])
+    assert tramos_grabados(_ConexionLotes([]), "obras") == (0, [])
+    assert tramos_grabados(_ConexionLotes([(3, 9)]), "obras") == (0, [(3, 9)])
+
+@pytest.mark.parametrize("semilla", range(20))
+@pytest.mark.parametrize("tamano_antes, tamano_despues", [(5, 5), (5, 3), (3, 7), (1, 4)])
+def test_reanudar_con_otro_lote_graba_cada_fila_una_vez(semilla, tamano_antes, tamano_despues):
+    """
+    Una importación cortada (sólo algunos lotes confirmados, en cualquier orden) y
+    reanudada con otro --lote: cada fila se graba una sola vez y la cadena de tramos
+    llega hasta el último id.
+    """
+    rnd = random.Random(semilla)
+    ids = sorted(rnd.sample(range(1, 200), 60))
+    filas = _filas(*ids)
+
+    primera = list(lotes(_en_bloques(filas, 7), 0, [], tamano_antes))
+    confirmados = [lote for lote in primera if rnd.random() < 0.5]
+    grabadas = [id_ for _, _, l in confirmados for id_ in _ids(l)]
+
+    desde, tramos = tramos_grabados(_ConexionLotes([(a, u) for a, u, _ in confirmados]), "tarefas")
+    pendientes = [fila for fila in filas if fila[0] > desde]
+    segunda = list(lotes(_en_bloques(pendientes, 7), desde, tramos, tamano_despues))
+    grabadas += [id_ for _, _, l in segunda for id_ in _ids(l)]
+
+    assert sorted(grabadas) == ids
+    assert all(len(l) <= tamano_despues for _, _, l in segunda)
+    todos = [(a, u) for a, u, _ in confirmados + segunda]
+    assert tramos_grabados(_ConexionLotes(todos), "tarefas") == (ids[-1], [])
+
+def _fila_tarefa(local_id, obra_id):
+    return (7, "Tarefa", datetime.datetime(2024, 1, 1), None, None, local_id, None, None, obra_id, None)
+
+def test_tarefa_sin_local_va_a_la_obra_0():
+    assert _tarefa(_fila_tarefa(None, None))[3] == 0
+    assert _tarefa(_fila_tarefa(5, 3))[3] == 3
+
+def test_tarefa_con_local_sin_obra_se_rechaza():
+    with pytest.raises(FilaRechazada, match="local 5"):
+        _tarefa(_fila_tarefa(5, None))
@@ -0,0 +1,64 @@
+"""
+JanelasPreco.vigente (app/core/precos.py) sem base: o bisect com o máximo acumulado de
+validade_fim escolhe o mesmo preço que olhar todas as janelas que cobrem a data.
+"""
+import datetime
+import random
+from decimal import Decimal
+
+import pytest
+
+from app.core.precos import JanelasPreco, PrecoVigente
+
+D = datetime.date
+
+def _preco(id_, inicio, fim):
+    return PrecoVigente(id=id_, preco=Decimal(id_), unidade_medida=None, validade_inicio=inicio, validade_fim=fim)
+
+def _vigente_por_forca_bruta(precos, data):
+    """Entre as janelas que cobrem 'data', a que começou por último (e, empatadas, a de maior id)."""
+    cobrem = [p for p in precos
+              if (p.validade_inicio or D.min) <= data <= (p.validade_fim or D.max)]
+    return max(cobrem, key=lambda p: (p.validade_inicio or D.min, p.id), default=None)
+
+def test_janelas_solapadas():
+    precos = [
+        _preco(1, None, D(2024, 1, 31)),
+        _preco(2, D(2024, 1, 1), None),
+        _preco(3, D(2024, 3, 1), D(2024, 3, 31)),
+        _preco(4, D(2024, 3, 1), D(2024, 3, 10)), # mesmo início que 3: vale o maior id
+    ]
+    janelas = JanelasPreco(precos)
+    vigentes = {data: janelas.vigente(data) for data in
+                [D(2023, 6, 1), D(2024, 1, 15), D(2024, 3, 5), D(2024, 3, 15), D(2024, 4, 1)]}
+    assert {data: p.id for data, p in vigentes.items()} == {
+        D(2023, 6, 1): 1, D(2024, 1, 15): 2, D(2024, 3, 5): 4, D(2024, 3, 15): 3, D(2024, 4, 1): 2}
+
+def test_sem_janela_que_cubra():
+    janelas = JanelasPreco([_preco(1, D(2024, 1, 1), D(2024, 1, 31)), _preco(2, D(2024, 3, 1), D(2024, 3, 31))])
+    assert janelas.vigente(D(2023, 12, 31)) is None
+    assert janelas.vigente(D(2024, 2, 15)) is None
+    assert janelas.vigente(D(2024, 4, 1)) is None
+    assert JanelasPreco([]).vigente(D(2024, 1, 1)) is None
+
+def test_janela_longa_antiga_atras_de_curtas():
+    # A janela sem fim de 2020 cobre a data mesmo com várias janelas curtas depois dela
+    precos = [_preco(1, D(2020, 1, 1), None)] + [
+        _preco(10 + mes, D(2024, mes, 1), D(2024, mes, 5)) for mes in range(1, 13)]
+    janelas = JanelasPreco(precos)
+    assert janelas.vigente(D(2024, 6, 20)).id == 1
+    assert janelas.vigente(D(2024, 6, 3)).id == 16
+
+@pytest.mark.parametrize("semilla", range(30))
+def test_igual_a_forca_bruta(semilla):
+    rnd = random.Random(semilla)
+    base = D(2024, 1, 1)
+    precos = []
+    for id_ in range(1, rnd.randint(1, 25)):
+        inicio = None if rnd.random() < 0.1 else base + datetime.timedelta(days=rnd.randint(0, 120))
+        fim = None if rnd.random() < 0.2 else (inicio or base) + datetime.timedelta(days=rnd.randint(0, 40))
+        precos.append(_preco(id_, inicio, fim))
+    janelas = JanelasPreco(precos)
+    for dias in range(-5, 170):
+        data = base + datetime.timedelta(days=dias)
+        assert janelas.vigente(data) == _vigente_por_forca_bruta(precos, data), data
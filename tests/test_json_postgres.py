@@ -0,0 +1,79 @@
+"""
+O JSON montado pelo Postgres (JSON_LISTAS_POSTGRES e os templates .../campos/{campos})
+é o mesmo que o caminho em Python devolve para as mesmas linhas: created_at no
+formato do str() do datetime e os defaults dos modelos, também nos itens de
+obras_associadas e responsaveis.
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+from app.core.config import settings
+
+@pytest.fixture
+def linhas(criar):
+    """Uma obra, uma pessoa e uma tarefa cujos itens aninhados não trazem os campos com default."""
+    obra = criar("obras", {"nome": "Obra JSON", "codigo": "TJSON1"})
+    pessoa = criar("pessoas", {"nome_completo": "Pessoa JSON", "obras_associadas": [{"obra_id_ref": obra}]})
+    tarefa = criar("tarefas", {"nome": "Tarefa JSON", "obra_id_ref": obra, "responsaveis": [{"pessoa_id": pessoa, "eh_principal": True}]})
+    return {"obra": obra, "pessoa": pessoa, "tarefa": tarefa}
+
+def _ler_nos_dois_caminhos(mcp_cliente, monkeypatch, uri: str):
+    monkeypatch.setattr(settings, "JSON_LISTAS_POSTGRES", False)
+    python = mcp_cliente.ler(uri)
+    monkeypatch.setattr(settings, "JSON_LISTAS_POSTGRES", True)
+    postgres = mcp_cliente.ler(uri)
+    return python, postgres
+
+@pytest.mark.parametrize("confiavel", [True, False], ids=["dicts", "modelos"])
+@pytest.mark.parametrize("uri", [
+    "obras://pagina/{obra_anterior}/1",
+    "pessoas://pagina/{pessoa_anterior}/1",
+    "tarefas://obra/{obra}/pagina/0/10",
+])
+def test_pagina_igual_nos_dois_caminhos(mcp_cliente, monkeypatch, linhas, uri, confiavel):
+    monkeypatch.setattr(settings, "LEITURA_CONFIAVEL", confiavel)
+    uri = uri.format(obra_anterior=linhas["obra"] - 1, pessoa_anterior=linhas["pessoa"] - 1, obra=linhas["obra"])
+    python, postgres = _ler_nos_dois_caminhos(mcp_cliente, monkeypatch, uri)
+    assert python["itens"], uri
+    assert postgres == python
+
+def test_created_at_no_formato_do_python(mcp_cliente, monkeypatch, linhas, sql):
+    # Um TimeZone diferente no servidor não muda o texto (as sessões usam UTC)
+    sql.execute("ALTER DATABASE " + sql.info.dbname + " SET TimeZone = 'America/Sao_Paulo'")
+    try:
+        python, postgres = _ler_nos_dois_caminhos(mcp_cliente, monkeypatch, f"tarefas://obra/{linhas['obra']}/pagina/0/10")
+    finally:
+        sql.execute("ALTER DATABASE " + sql.info.dbname + " RESET TimeZone")
+    created_at = postgres["itens"][0]["created_at"]
+    assert created_at == python["itens"][0]["created_at"]
+    assert created_at.endswith("+00:00") and "T" not in created_at
+
+def test_defaults_dos_itens_aninhados(mcp_cliente, monkeypatch, linhas):
+    monkeypatch.setattr(settings, "JSON_LISTAS_POSTGRES", True)
+    tarefa = mcp_cliente.ler(f"tarefas://obra/{linhas['obra']}/pagina/0/10")["itens"][0]
+    assert tarefa["dados"]["responsaveis"] == [{"pessoa_id": linhas["pessoa"], "percentual": 100.0, "eh_principal": True}]
+    pessoa = mcp_cliente.ler(f"pessoas://pagina/{linhas['pessoa'] - 1}/1")["itens"][0]
+    assert pessoa["dados"]["obras_associadas"] == [
+        {"obra_id_ref": linhas["obra"], "obra_nome_ref": None, "matricula_obra": None, "funcao_na_obra": None}
+    ]
+
+@pytest.mark.parametrize("inteiro, projetado, campos", [
+    ("obras://id/{obra}", "obras://id/{obra}/campos/{campos}", ["codigo", "status", "created_at"]),
+    ("pessoas://id/{pessoa}", "pessoas://id/{pessoa}/campos/{campos}", ["obras_associadas", "situacao_atual", "created_at"]),
+    ("tarefas://obra/{obra}/pagina/0/10", "tarefas://obra/{obra}/pagina/0/10/campos/{campos}", ["responsaveis", "status", "created_at"]),
+])
+def test_projecao_igual_ao_documento_inteiro(mcp_cliente, linhas, inteiro, projetado, campos):
+    inteiro = mcp_cliente.ler(inteiro.format(**linhas))
+    projetado = mcp_cliente.ler(projetado.format(**linhas, campos=",".join(campos)))
+    if "itens" in inteiro:
+        inteiro, projetado = inteiro["itens"][0], projetado["itens"][0]
+    campos_dados = [campo for campo in campos if campo != "created_at"]
+    assert projetado == {
+        "id": inteiro["id"],
+        "dados": {campo: inteiro["dados"][campo] for campo in campos_dados},
+        "created_at": inteiro["created_at"],
+    }
@@ -0,0 +1,38 @@
+"""
+criar_*_lote devolve o id de cada item na posição ('indice') em que foi enviado,
+mesmo quando os ids não saem da sequência na ordem dos itens.
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+def _conferir(sql, tabela: str, enviados: list, resultado: dict, campo: str) -> None:
+    assert [item["indice"] for item in resultado["itens"]] == list(range(len(enviados)))
+    for item in resultado["itens"]:
+        if item["erro"] is not None:
+            continue
+        gravado = sql.execute(f"SELECT dados ->> %s FROM {tabela} WHERE id = %s", (campo, item["id"])).fetchone()
+        assert gravado == (enviados[item["indice"]][campo],), item
+
+def test_obras_lote_ids_na_posicao_de_cada_item(mcp_cliente, sql, sequencia_decrescente):
+    sequencia_decrescente("obras")
+    obras = [{"nome": "Lote A"}, {"codigo": "sem nome"}, {"nome": "Lote B"}, {"nome": "Lote C"}]
+    resultado = mcp_cliente.chamar("criar_obras_lote", obras=obras)
+    assert (resultado["criados"], resultado["com_erro"]) == (3, 1)
+    assert resultado["itens"][1]["id"] is None and resultado["itens"][1]["erro"]
+    _conferir(sql, "obras", obras, resultado, "nome")
+
+def test_tarefas_lote_ids_na_posicao_de_cada_item(mcp_cliente, sql, criar, sequencia_decrescente):
+    obras = [criar("obras", {"nome": f"Obra lote {i}"}) for i in range(2)]
+    sequencia_decrescente("tarefas")
+    tarefas = [{"nome": f"Tarefa {i}", "obra_id_ref": obras[i % 2]} for i in range(6)]
+    resultado = mcp_cliente.chamar("criar_tarefas_lote", tarefas=tarefas)
+    assert resultado["criados"] == 6
+    _conferir(sql, "tarefas", tarefas, resultado, "nome")
+    # Cada tarefa na partição (obra_id) da sua obra
+    for item in resultado["itens"]:
+        obra_id, = sql.execute("SELECT obra_id FROM tarefas WHERE id = %s", (item["id"],)).fetchone()
+        assert obra_id == tarefas[item["indice"]]["obra_id_ref"]
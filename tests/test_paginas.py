@@ -0,0 +1,86 @@
+"""
+Paginação keyset de obras://pagina e pessoas://pagina (cursor = último id recebido):
+seguindo a 'proxima_uri' cada linha aparece uma vez, em ordem de id, e os filtros
+por chave de 'dados' (coluna gerada ou @>) valem em todas as páginas.
+"""
+import os
+from urllib.parse import quote
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+from app.core.config import settings
+
+@pytest.fixture(params=[False, True], ids=["python", "postgres"])
+def json_postgres(request, monkeypatch):
+    monkeypatch.setattr(settings, "JSON_LISTAS_POSTGRES", request.param)
+
+def _percorrer(mcp_cliente, uri: str):
+    """Lê a página e as seguintes pela 'proxima_uri'; devolve as páginas (listas de ids)."""
+    paginas = []
+    while uri is not None:
+        pagina = mcp_cliente.ler(uri)
+        paginas.append([item["id"] for item in pagina["itens"]])
+        assert (pagina["proximo_cursor"] is None) == (pagina["proxima_uri"] is None)
+        if pagina["proximo_cursor"] is not None:
+            assert pagina["proximo_cursor"] == paginas[-1][-1]
+        uri = pagina["proxima_uri"]
+        assert len(paginas) <= 10, "a paginação não termina"
+    return paginas
+
+@pytest.fixture
+def obras(criar):
+    """Cinco obras; três com o status marcado, uma delas com '/' e espaço no código."""
+    status = "pausada teste/paginas"
+    ids = [
+        criar("obras", {"nome": "Pag 1", "codigo": "TPAG1", "status": status}),
+        criar("obras", {"nome": "Pag 2", "codigo": "TPAG2", "status": "ativa"}),
+        criar("obras", {"nome": "Pag 3", "codigo": "TPAG 3/A", "status": status}),
+        criar("obras", {"nome": "Pag 4", "codigo": "TPAG4", "status": "ativa"}),
+        criar("obras", {"nome": "Pag 5", "codigo": "TPAG5", "status": status}),
+    ]
+    return {"ids": ids, "status": status}
+
+def test_paginas_em_ordem_sem_repetir(mcp_cliente, json_postgres, obras):
+    ids = obras["ids"]
+    paginas = _percorrer(mcp_cliente, f"obras://pagina/{ids[0] - 1}/2")
+    assert paginas == [ids[0:2], ids[2:4], ids[4:5]]
+
+def test_pagina_exata_nao_deixa_pagina_vazia(mcp_cliente, json_postgres, obras):
+    # Com a linha a mais da consulta, a última página cheia já sai sem cursor
+    ids = obras["ids"]
+    assert _percorrer(mcp_cliente, f"obras://pagina/{ids[0] - 1}/5") == [ids]
+
+def test_filtro_por_coluna_gerada_em_todas_as_paginas(mcp_cliente, json_postgres, obras):
+    ids = obras["ids"]
+    uri = f"obras://filtro/status/{quote(obras['status'], safe='')}/pagina/{ids[0] - 1}/2"
+    assert _percorrer(mcp_cliente, uri) == [[ids[0], ids[2]], [ids[4]]]
+
+def test_filtro_por_chave_de_dados(mcp_cliente, json_postgres, obras):
+    # 'codigo' não é coluna gerada: o filtro é dados @> {"codigo": ...}
+    ids = obras["ids"]
+    uri = f"obras://filtro/codigo/{quote('TPAG 3/A', safe='')}/pagina/{ids[0] - 1}/1"
+    assert _percorrer(mcp_cliente, uri) == [[ids[2]]]
+
+def test_filtro_de_pessoas(mcp_cliente, json_postgres, criar):
+    ids = [criar("pessoas", {"nome_completo": f"Pessoa Pag {i}", "situacao_atual": "afastada-teste" if i % 2 else "ativa"})
+           for i in range(5)]
+    uri = f"pessoas://filtro/situacao_atual/afastada-teste/pagina/{ids[0] - 1}/1"
+    assert _percorrer(mcp_cliente, uri) == [[ids[1]], [ids[3]]]
+
+def test_limite_truncado_no_maximo(mcp_cliente, monkeypatch, json_postgres, obras):
+    monkeypatch.setattr(settings, "PAGINA_TAMANHO_MAX", 2)
+    ids = obras["ids"]
+    pagina = mcp_cliente.ler(f"obras://pagina/{ids[0] - 1}/100")
+    assert [item["id"] for item in pagina["itens"]] == ids[0:2]
+    assert pagina["proxima_uri"] == f"obras://pagina/{ids[1]}/2"
+
+@pytest.mark.parametrize("uri, erro", [
+    ("obras://filtro/responsavel/x/pagina/0/10", "não suportado"),
+    ("obras://pagina/0/0", "pelo menos 1"),
+])
+def test_pedido_invalido(mcp_cliente, uri, erro):
+    with pytest.raises(Exception, match=erro):
+        mcp_cliente.ler(uri)
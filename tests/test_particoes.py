@@ -0,0 +1,92 @@
+"""
+tarefas particionada por obra (f1b6d3a8c452): o UPDATE que muda a obra de uma tarefa
+tem que trazer o obra_id novo, e o UPDATE de atribuir_responsaveis_lote só abre as
+partições das obras das tarefas.
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+import psycopg
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+EQUIPE = [{"pessoa_id": 1, "eh_principal": True}]
+
+@pytest.fixture
+def obra_particionada(sql, criar):
+    """Uma obra com a sua partição tarefas_obra_<id>, removida no fim do teste."""
+    obra = criar("obras", {"nome": "Obra particionada", "codigo": "TPART1"})
+    sql.execute("SELECT tarefas_criar_particao(%s)", (obra,))
+    yield obra
+    sql.execute("DELETE FROM tarefas WHERE obra_id = %s", (obra,))
+    sql.execute(f"DROP TABLE IF EXISTS tarefas_obra_{obra}")
+
+@pytest.fixture
+def outra_obra(criar):
+    """Uma obra sem partição (as tarefas dela ficam em tarefas_padrao)."""
+    return criar("obras", {"nome": "Obra na padrão", "codigo": "TPART2"})
+
+@pytest.fixture
+def updates_de_tarefas():
+    """Os UPDATE tarefas enviados pela aplicação, com os parâmetros, para o EXPLAIN."""
+    enviados = []
+
+    def _capturar(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().startswith("UPDATE tarefas"):
+            enviados.append((statement, parameters))
+
+    event.listen(Engine, "before_cursor_execute", _capturar)
+    yield enviados
+    event.remove(Engine, "before_cursor_execute", _capturar)
+
+def _particao(sql, tarefa: int) -> str:
+    return sql.execute("SELECT tableoid::regclass::text FROM tarefas WHERE id = %s", (tarefa,)).fetchone()[0]
+
+def _relacoes(plano: dict) -> set:
+    nomes = {plano["Relation Name"]} if "Relation Name" in plano else set()
+    for filho in plano.get("Plans", []):
+        nomes |= _relacoes(filho)
+    return nomes
+
+def test_update_que_muda_a_obra_sem_obra_id_e_recusado(sql, criar, obra_particionada, outra_obra):
+    tarefa = criar("tarefas", {"nome": "Muda de obra", "obra_id_ref": outra_obra})
+    novos = f'{{"obra_id_ref": {obra_particionada}}}'
+    with pytest.raises(psycopg.errors.RaiseException, match=f"passou para a obra {obra_particionada}"):
+        sql.execute("UPDATE tarefas SET dados = dados || %s::jsonb WHERE id = %s", (novos, tarefa))
+    assert _particao(sql, tarefa) == "tarefas_padrao"
+
+    sql.execute(
+        "UPDATE tarefas SET dados = dados || %s::jsonb, obra_id = tarefa_obra_de(dados || %s::jsonb) WHERE id = %s",
+        (novos, novos, tarefa))
+    assert _particao(sql, tarefa) == f"tarefas_obra_{obra_particionada}"
+
+def test_update_de_outros_campos_fica_na_particao(sql, criar, obra_particionada):
+    tarefa = criar("tarefas", {"nome": "Fica", "obra_id_ref": obra_particionada})
+    sql.execute("""UPDATE tarefas SET dados = dados || '{"status": "concluida"}' WHERE id = %s""", (tarefa,))
+    assert _particao(sql, tarefa) == f"tarefas_obra_{obra_particionada}"
+
+def test_atribuir_com_e_sem_obra_id(mcp_cliente, sql, criar, obra_particionada, outra_obra):
+    na_obra = [criar("tarefas", {"nome": f"T{i}", "obra_id_ref": obra_particionada}) for i in range(3)]
+    na_padrao = criar("tarefas", {"nome": "T padrão", "obra_id_ref": outra_obra})
+    resultado = mcp_cliente.chamar("atribuir_responsaveis_lote", atribuicoes=[
+        {"tarefa_ids": [na_obra[0]], "obra_id": obra_particionada, "responsaveis": EQUIPE},
+        {"tarefa_ids": [na_obra[1], na_padrao, 2000000001], "responsaveis": EQUIPE},
+        {"tarefa_ids": [na_obra[2]], "obra_id": outra_obra, "responsaveis": EQUIPE}, # obra errada
+    ])
+    assert [(item["atualizadas"], item["nao_encontradas"]) for item in resultado["itens"]] == [
+        (1, []), (2, [2000000001]), (0, [na_obra[2]])]
+    com_equipe = sql.execute(
+        "SELECT array_agg(id ORDER BY id) FROM tarefas WHERE id = ANY(%s) AND dados ? 'responsaveis'",
+        (na_obra + [na_padrao],)).fetchone()[0]
+    assert com_equipe == sorted([na_obra[0], na_obra[1], na_padrao])
+
+def test_update_da_atribuicao_so_abre_as_particoes_das_obras(mcp_cliente, sql, criar, obra_particionada, updates_de_tarefas):
+    tarefa = criar("tarefas", {"nome": "Atribuída", "obra_id_ref": obra_particionada})
+    mcp_cliente.chamar("atribuir_responsaveis_lote", atribuicoes=[{"tarefa_ids": [tarefa], "responsaveis": EQUIPE}])
+    (statement, parametros), = updates_de_tarefas
+    plano = sql.execute("EXPLAIN (FORMAT JSON) " + statement, parametros).fetchone()[0][0]["Plan"]
+    assert _relacoes(plano) == {"tarefas", f"tarefas_obra_{obra_particionada}"}
@@ -0,0 +1,67 @@
+"""
+precificar_tarefas e criar_preco com o índice de janelas em memória: o preço de cada
+data sai da janela certa, um preço novo aparece na chamada seguinte e gravar=True
+escreve preco_tarefa_local_id nas tarefas.
+"""
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+from app.core.precos import indice_precos
+
+TIPO, LOCAL = 990001, 990001
+
+@pytest.fixture
+def precos(sql):
+    """Três janelas de (TIPO, LOCAL); os preços deste tipo são apagados no fim."""
+    indice_precos.limpar()
+    ids = {}
+    for nome, preco, inicio, fim in [
+        ("antigo", 10, None, "2024-01-31"),
+        ("atual", 20, "2024-01-01", None),
+        ("marco", 30, "2024-03-01", "2024-03-31"),
+    ]:
+        ids[nome] = sql.execute(
+            "INSERT INTO precos_tarefa_local (tipos_tarefa_id, local_id, preco, validade_inicio, validade_fim) "
+            "VALUES (%s, %s, %s, %s, %s) RETURNING id", (TIPO, LOCAL, preco, inicio, fim)).fetchone()[0]
+    yield ids
+    sql.execute("DELETE FROM precos_tarefa_local WHERE tipos_tarefa_id = %s", (TIPO,))
+    indice_precos.limpar()
+
+def _item(data, **extra):
+    return {"tipos_tarefa_id": TIPO, "local_id": LOCAL, "data": data, **extra}
+
+def test_preco_de_cada_data(mcp_cliente, precos):
+    resultado = mcp_cliente.chamar("precificar_tarefas", itens=[
+        _item("2023-06-01"), _item("2024-01-15"), _item("2024-03-15"), _item("2024-04-01"),
+        {"tipos_tarefa_id": TIPO, "local_id": LOCAL + 1, "data": "2024-01-15"},
+    ])
+    assert [item["preco_tarefa_local_id"] for item in resultado["itens"]] == [
+        precos["antigo"], precos["atual"], precos["marco"], precos["atual"], None]
+    assert (resultado["precificados"], resultado["sem_preco"]) == (4, 1)
+
+def test_preco_novo_aparece_na_chamada_seguinte(mcp_cliente, precos):
+    # A primeira chamada deixa as janelas de (TIPO, LOCAL) no índice; criar_preco as invalida
+    antes = mcp_cliente.chamar("precificar_tarefas", itens=[_item("2024-06-01")])
+    assert antes["itens"][0]["preco_tarefa_local_id"] == precos["atual"]
+    novo = mcp_cliente.chamar("criar_preco", dados_preco={
+        "tipos_tarefa_id": TIPO, "local_id": LOCAL, "preco": "40", "validade_inicio": "2024-05-01"})
+    depois = mcp_cliente.chamar("precificar_tarefas", itens=[_item("2024-06-01"), _item("2024-04-01")])
+    assert [item["preco_tarefa_local_id"] for item in depois["itens"]] == [novo["id"], precos["atual"]]
+
+def test_gravar_na_obra_pelo_inicio_das_tarefas(mcp_cliente, sql, criar, precos):
+    obra = criar("obras", {"nome": "Obra dos preços", "codigo": "TPRECO1"})
+    marco = criar("tarefas", {"nome": "Em março", "obra_id_ref": obra, "tipos_tarefa_id": TIPO, "local_id": LOCAL, "inicio": "2024-03-10"})
+    abril = criar("tarefas", {"nome": "Em abril", "obra_id_ref": obra, "tipos_tarefa_id": TIPO, "local_id": LOCAL, "inicio": "2024-04-10"})
+    sem_tipo = criar("tarefas", {"nome": "Sem tipo", "obra_id_ref": obra})
+    resultado = mcp_cliente.chamar("precificar_tarefas", obra_id=obra, gravar=True)
+    assert (resultado["precificados"], resultado["com_erro"], resultado["gravados"]) == (2, 1, 2)
+    gravados = dict(sql.execute(
+        "SELECT id, (dados ->> 'preco_tarefa_local_id')::int FROM tarefas WHERE id = ANY(%s)",
+        ([marco, abril, sem_tipo],)).fetchall())
+    assert gravados == {marco: precos["marco"], abril: precos["atual"], sem_tipo: None}
+    # Sem mudança, nada é reescrito
+    assert mcp_cliente.chamar("precificar_tarefas", obra_id=obra, gravar=True)["gravados"] == 0
@@ -0,0 +1,102 @@
+"""
+Leituras na réplica (DATABASE_READ_URL): quem escreveu lê do primário, as outras
+sessões da réplica, uma petição sem sessão MCP do primário e uma réplica caída cai
+no primário.
+
+Com DATABASE_READ_URL apontando para uma réplica de verdade (README, "Réplica de
+lectura") os testes usam essa réplica; sem ela, o próprio DATABASE_URL faz o papel
+de réplica e o destino de cada leitura é conferido pelos contadores de estado_replica.
+"""
+import json
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+from fastmcp import Client
+
+from app.core.config import settings
+from app.db import session as sessao_db
+from app.server.main import mcp
+
+REPLICA_URL = os.environ.get("DATABASE_READ_URL") or os.environ["DATABASE_URL"]
+# Um socket onde nenhum Postgres escuta
+REPLICA_CAIDA_URL = "postgresql+psycopg://postgres@/mcp?host=/nao-existe&port=1"
+
+@pytest.fixture
+def replica(monkeypatch):
+    """replica(url) liga a leitura na réplica 'url' com os contadores zerados; devolve estado_replica."""
+    def _configurar(url: str) -> dict:
+        monkeypatch.setattr(settings, "DATABASE_READ_URL", url)
+        monkeypatch.setattr(sessao_db, "_async_engine_leitura", None)
+        monkeypatch.setattr(sessao_db, "_replica_indisponivel_ate", 0.0)
+        monkeypatch.setattr(sessao_db, "_escrita_sem_cliente", 0.0)
+        sessao_db.estado_replica.update(leituras=0, no_primario=0, falhas=0, ultimo_erro=None)
+        return sessao_db.estado_replica
+    return _configurar
+
+@pytest.fixture
+def codigo(sql):
+    """Código das obras criadas pelo teste (removidas no fim)."""
+    codigo = f"TREPL{os.getpid()}"
+    yield codigo
+    sql.execute("DELETE FROM obras WHERE dados @> %s", (json.dumps({"codigo": codigo}),))
+
+def _pagina_do_codigo(codigo: str) -> str:
+    return f"obras://filtro/codigo/{codigo}/pagina/0/10"
+
+async def _ler(client, uri: str):
+    return json.loads((await client.read_resource(uri))[0].text)
+
+def test_sem_escrita_le_da_replica(executar, replica):
+    estado = replica(REPLICA_URL)
+
+    async def _sessao():
+        async with Client(mcp) as client:
+            await _ler(client, "obras://pagina/0/1")
+    executar(_sessao())
+    assert (estado["leituras"], estado["no_primario"]) == (1, 0)
+
+def test_quem_escreveu_le_do_primario(executar, replica, codigo):
+    estado = replica(REPLICA_URL)
+
+    async def _sessoes():
+        async with Client(mcp) as escritor, Client(mcp) as outro:
+            await escritor.call_tool("criar_obra", {"dados_obra": {"nome": "Obra réplica", "codigo": codigo}})
+            lida = await _ler(escritor, _pagina_do_codigo(codigo))
+            apos_escritor = dict(estado)
+            await _ler(outro, _pagina_do_codigo(codigo))
+            return lida, apos_escritor
+    lida, apos_escritor = executar(_sessoes())
+    assert [obra["dados"]["codigo"] for obra in lida["itens"]] == [codigo]
+    assert (apos_escritor["leituras"], apos_escritor["no_primario"]) == (0, 1)
+    assert (estado["leituras"], estado["no_primario"]) == (1, 1)
+
+@pytest.mark.parametrize("replica_sem_sessao, leituras, no_primario", [(False, 0, 1), (True, 1, 0)])
+def test_sem_sessao_le_do_primario(executar, replica, monkeypatch, replica_sem_sessao, leituras, no_primario):
+    # Com stateless_http a escrita pode ter ido para outro worker
+    estado = replica(REPLICA_URL)
+    monkeypatch.setattr(mcp.settings, "stateless_http", True)
+    monkeypatch.setattr(settings, "REPLICA_SEM_SESSAO", replica_sem_sessao)
+
+    async def _sessao():
+        async with Client(mcp) as client:
+            await _ler(client, "obras://pagina/0/1")
+    executar(_sessao())
+    assert (estado["leituras"], estado["no_primario"]) == (leituras, no_primario)
+
+def test_replica_caida_cai_no_primario(executar, replica):
+    estado = replica(REPLICA_CAIDA_URL)
+
+    async def _sessao():
+        async with Client(mcp) as client:
+            primeira = await _ler(client, "obras://pagina/0/1")
+            segunda = await _ler(client, "obras://pagina/0/1")
+            return primeira, segunda
+    primeira, segunda = executar(_sessao())
+    assert primeira == segunda and primeira["itens"]
+    # Só a primeira leitura tenta a réplica; a segunda já vai direto ao primário
+    assert (estado["falhas"], estado["leituras"], estado["no_primario"]) == (1, 0, 1)
+    assert sessao_db.estado_leitura()["indisponivel_por_s"] > 0
@@ -0,0 +1,65 @@
+"""
+tarefas_responsaveis_validos (migração 9f3a6d1c7e25) é um constraint trigger adiado:
+a equipe de cada tarefa é conferida no commit, então a transação pode passar por
+estados inválidos, e o que chega ao commit inválido é recusado mesmo sem passar pela
+validação em Python de atribuir_responsaveis_lote.
+"""
+import json
+import os
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+import psycopg
+
+@pytest.fixture
+def tarefa(criar):
+    return criar("tarefas", {"nome": "Tarefa da equipe"})
+
+def _equipe(sql, tarefa: int, responsaveis: list) -> None:
+    sql.execute("UPDATE tarefas SET dados = dados || jsonb_build_object('responsaveis', %s::jsonb) WHERE id = %s",
+                (json.dumps(responsaveis), tarefa))
+
+def _gravada(sql, tarefa: int):
+    return sql.execute("SELECT dados -> 'responsaveis' FROM tarefas WHERE id = %s", (tarefa,)).fetchone()[0]
+
+def test_estado_invalido_no_meio_da_transacao(sql, tarefa):
+    final = [{"pessoa_id": 1, "percentual": 70, "eh_principal": True}, {"pessoa_id": 2, "percentual": 30}]
+    with sql.transaction():
+        # Uma pessoa por vez: a soma só chega a 100 no último UPDATE
+        _equipe(sql, tarefa, final[:1])
+        _equipe(sql, tarefa, final)
+    assert _gravada(sql, tarefa) == final
+
+@pytest.mark.parametrize("responsaveis, erro", [
+    ([{"pessoa_id": 1, "percentual": 90, "eh_principal": True}], "soma dos percentuais"),
+    ([{"pessoa_id": 1, "percentual": 50, "eh_principal": True}, {"pessoa_id": 2, "percentual": 50, "eh_principal": True}],
+     "exatamente um responsável principal"),
+    ([{"pessoa_id": 1, "percentual": 50, "eh_principal": True}, {"pessoa_id": 1, "percentual": 50}], "mesma pessoa"),
+], ids=["soma", "principais", "repetida"])
+def test_invalido_no_commit_e_recusado(sql, tarefa, responsaveis, erro):
+    antes = _gravada(sql, tarefa)
+    with pytest.raises(psycopg.errors.RaiseException, match=erro):
+        with sql.transaction():
+            _equipe(sql, tarefa, responsaveis)
+            # O UPDATE passa: a conferência fica para o commit
+            assert _gravada(sql, tarefa) == responsaveis
+    assert _gravada(sql, tarefa) == antes
+
+def test_equipe_vazia_e_aceita(sql, tarefa):
+    _equipe(sql, tarefa, [])
+    assert _gravada(sql, tarefa) == []
+
+def test_atribuir_lote_grava_validos_e_devolve_erros(mcp_cliente, sql, criar):
+    tarefas = [criar("tarefas", {"nome": f"Lote {i}"}) for i in range(3)]
+    valida = [{"pessoa_id": 1, "percentual": 60, "eh_principal": True}, {"pessoa_id": 2, "percentual": 40}]
+    resultado = mcp_cliente.chamar("atribuir_responsaveis_lote", atribuicoes=[
+        {"tarefa_ids": tarefas[:2], "responsaveis": valida},
+        {"tarefa_ids": [tarefas[2]], "responsaveis": [{"pessoa_id": 1, "percentual": 90, "eh_principal": True}]},
+    ])
+    assert (resultado["atualizadas"], resultado["com_erro"]) == (2, 1)
+    assert resultado["itens"][1]["erro"]
+    equipes = [_gravada(sql, id_) for id_ in tarefas]
+    assert [[r["pessoa_id"] for r in equipe or []] for equipe in equipes] == [[1, 2], [1, 2], []]
@@ -0,0 +1,109 @@
+"""
+obras_resumo e obras_resumo_responsavel (migração 5b8e0c3f9a12): depois de cada
+INSERT, UPDATE e DELETE em tarefas, e de cada mudança de preço, os totais mantidos
+pelos triggers são os mesmos que somar as tarefas da obra do zero.
+"""
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+if not os.environ.get("DATABASE_URL"):
+    pytest.skip("DATABASE_URL não definido (base com as migrações aplicadas)", allow_module_level=True)
+
+TIPO = 990002
+
+def _mantido(sql, obra: int):
+    por_status = sql.execute(
+        "SELECT status, tarefas, sem_preco, valor FROM obras_resumo WHERE obra_id = %s ORDER BY status", (obra,)).fetchall()
+    por_responsavel = sql.execute(
+        "SELECT pessoa_id, tarefas, valor FROM obras_resumo_responsavel WHERE obra_id = %s ORDER BY pessoa_id", (obra,)).fetchall()
+    return por_status, por_responsavel
+
+def _do_zero(sql, obra: int):
+    por_status = sql.execute("""
+        SELECT coalesce(t.dados ->> 'status', ''), count(*), count(*) FILTER (WHERE p.preco IS NULL), coalesce(sum(p.preco), 0)
+          FROM tarefas t LEFT JOIN precos_tarefa_local p ON p.id = (t.dados ->> 'preco_tarefa_local_id')::integer
+         WHERE t.obra_id = %s GROUP BY 1 ORDER BY 1""", (obra,)).fetchall()
+    por_responsavel = sql.execute("""
+        SELECT (e ->> 'pessoa_id')::integer, count(*), coalesce(sum(p.preco * coalesce((e ->> 'percentual')::numeric, 100) / 100), 0)
+          FROM tarefas t LEFT JOIN precos_tarefa_local p ON p.id = (t.dados ->> 'preco_tarefa_local_id')::integer,
+               jsonb_array_elements(coalesce(t.dados -> 'responsaveis', '[]')) e
+         WHERE t.obra_id = %s GROUP BY 1 ORDER BY 1""", (obra,)).fetchall()
+    return por_status, por_responsavel
+
+def _confere(sql, obra: int):
+    mantido = _mantido(sql, obra)
+    assert mantido == _do_zero(sql, obra)
+    return mantido
+
+@pytest.fixture
+def preco(sql):
+    """preco(valor) cria um preço de TIPO; os preços de TIPO são apagados no fim."""
+    def _preco(valor) -> int:
+        return sql.execute(
+            "INSERT INTO precos_tarefa_local (tipos_tarefa_id, local_id, preco) VALUES (%s, 1, %s) RETURNING id",
+            (TIPO, valor)).fetchone()[0]
+    yield _preco
+    sql.execute("DELETE FROM precos_tarefa_local WHERE tipos_tarefa_id = %s", (TIPO,))
+
+def _equipe(principal: int, outra: int):
+    return [{"pessoa_id": principal, "percentual": 60, "eh_principal": True}, {"pessoa_id": outra, "percentual": 40}]
+
+def test_totais_acompanham_as_escritas(sql, criar, preco):
+    obra = criar("obras", {"nome": "Obra do resumo", "codigo": "TRES1"})
+    cem, cinquenta = preco("100.00"), preco("50.00")
+
+    # INSERT
+    a = criar("tarefas", {"nome": "A", "obra_id_ref": obra, "status": "pendente", "preco_tarefa_local_id": cem,
+                          "responsaveis": _equipe(1, 2)})
+    b = criar("tarefas", {"nome": "B", "obra_id_ref": obra, "status": "pendente", "preco_tarefa_local_id": cinquenta})
+    c = criar("tarefas", {"nome": "C", "obra_id_ref": obra})
+    por_status, por_responsavel = _confere(sql, obra)
+    assert por_status == [("", 1, 1, Decimal(0)), ("pendente", 2, 0, Decimal("150.00"))]
+    assert por_responsavel == [(1, 1, Decimal("60.00")), (2, 1, Decimal("40.00"))]
+
+    # UPDATE de status, preço e equipe
+    sql.execute("""UPDATE tarefas SET dados = dados || '{"status": "concluida"}' WHERE id = %s""", (a,))
+    sql.execute("UPDATE tarefas SET dados = dados || %s::jsonb WHERE id = %s",
+                (json.dumps({"preco_tarefa_local_id": cem, "responsaveis": _equipe(2, 3)}), c))
+    _confere(sql, obra)
+
+    # Preço alterado e removido: as obras das tarefas com esse preço são recalculadas
+    sql.execute("UPDATE precos_tarefa_local SET preco = 80 WHERE id = %s", (cem,))
+    por_status, _ = _confere(sql, obra)
+    assert dict((s, v) for s, _, _, v in por_status) == {"": Decimal(80), "concluida": Decimal(80), "pendente": Decimal("50.00")}
+    sql.execute("DELETE FROM precos_tarefa_local WHERE id = %s", (cinquenta,))
+    por_status, _ = _confere(sql, obra)
+    assert [s for s in por_status if s[0] == "pendente"] == [("pendente", 1, 1, Decimal(0))]
+
+    # DELETE: as linhas que zeram somem
+    sql.execute("DELETE FROM tarefas WHERE id = %s", (b,))
+    por_status, _ = _confere(sql, obra)
+    assert "pendente" not in [s for s, *_ in por_status]
+    sql.execute("DELETE FROM tarefas WHERE id = ANY(%s)", ([a, c],))
+    assert _confere(sql, obra) == ([], [])
+
+def test_tarefa_que_muda_de_obra(sql, criar, preco):
+    origem = criar("obras", {"nome": "Origem", "codigo": "TRES2"})
+    destino = criar("obras", {"nome": "Destino", "codigo": "TRES3"})
+    tarefa = criar("tarefas", {"nome": "Muda", "obra_id_ref": origem, "preco_tarefa_local_id": preco("10.00"),
+                               "responsaveis": _equipe(1, 2)})
+    novos = json.dumps({"obra_id_ref": destino})
+    sql.execute("UPDATE tarefas SET dados = dados || %s::jsonb, obra_id = %s WHERE id = %s", (novos, destino, tarefa))
+    assert _confere(sql, origem) == ([], [])
+    por_status, por_responsavel = _confere(sql, destino)
+    assert por_status == [("", 1, 0, Decimal("10.00"))]
+    assert [pessoa for pessoa, *_ in por_responsavel] == [1, 2]
+
+def test_resumir_obra_le_os_totais(mcp_cliente, criar, preco):
+    obra = criar("obras", {"nome": "Obra resumida", "codigo": "TRES4"})
+    valor = preco("30.00")
+    criar("tarefas", {"nome": "Feita", "obra_id_ref": obra, "status": "concluida", "preco_tarefa_local_id": valor})
+    criar("tarefas", {"nome": "Falta", "obra_id_ref": obra, "status": "pendente", "preco_tarefa_local_id": valor})
+    criar("tarefas", {"nome": "Sem preço", "obra_id_ref": obra, "status": "pendente"})
+    resumo = mcp_cliente.chamar("resumir_obra", codigo="TRES4")
+    assert resumo["obra_id"] == obra
+    assert (resumo["tarefas"], resumo["sem_preco"]) == (3, 1)
+    assert (Decimal(resumo["valor_total"]), Decimal(resumo["valor_pendente"])) == (Decimal("60.00"), Decimal("30.00"))